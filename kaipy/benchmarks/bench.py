@@ -0,0 +1,366 @@
+#Benchmark suite for kaipy post-processing hot paths
+#Each group writes its synthetic inputs (untimed), then times a set of calls.
+#Every call is run nWarm times untimed, nRep times timed, and once more under
+#tracemalloc to get its peak Python-side allocation (numpy buffers included).
+#Results are returned as plain dicts/lists and written as JSON.
+
+# Standard modules
+import os
+import io
+import gc
+import sys
+import json
+import time
+import datetime
+import platform
+import tempfile
+import tracemalloc
+import contextlib
+
+# Third-party modules
+import numpy as np
+import h5py
+
+# Kaipy modules
+import kaipy.kaiH5 as kh5
+import kaipy.benchmarks.synth as synth
+
+#Problem sizes, "small" runs in well under a minute on a laptop
+SIZES = {
+	"small": {
+		"gam": dict(Ni=32, Nj=16, Nk=32, Ri=2, Rj=2, Rk=1, Nt=8),
+		"mix": dict(Nlat=45, Nlon=90, Nt=4),
+		"rcm": dict(Ni=50, Nj=90, Nk=40, Nt=8),
+		"chimp": dict(Np=5000, Nt=8),
+		"egg": dict(Ni=16, Nj=8, Nk=16),
+		"sm": dict(Nsim=500, Nsta=50, Nt=60),
+		"dB": dict(Npts=50),
+		"cda": dict(Nt=1440),
+	},
+	"medium": {
+		"gam": dict(Ni=96, Nj=48, Nk=64, Ri=4, Rj=2, Rk=2, Nt=16),
+		"mix": dict(Nlat=90, Nlon=180, Nt=8),
+		"rcm": dict(Ni=100, Nj=180, Nk=90, Nt=16),
+		"chimp": dict(Np=50000, Nt=16),
+		"egg": dict(Ni=32, Nj=16, Nk=32),
+		"sm": dict(Nsim=2000, Nsta=150, Nt=240),
+		"dB": dict(Npts=200),
+		"cda": dict(Nt=10080),
+	},
+	"large": {
+		"gam": dict(Ni=192, Nj=96, Nk=128, Ri=8, Rj=4, Rk=2, Nt=16),
+		"mix": dict(Nlat=180, Nlon=360, Nt=8),
+		"rcm": dict(Ni=200, Nj=360, Nk=160, Nt=32),
+		"chimp": dict(Np=200000, Nt=32),
+		"egg": dict(Ni=48, Nj=24, Nk=48),
+		"sm": dict(Nsim=8000, Nsta=300, Nt=1440),
+		"dB": dict(Npts=500),
+		"cda": dict(Nt=43200),
+	},
+}
+
+def timeCall(func, nRep=3, nWarm=1, doMem=True):
+	"""
+	Time a zero-argument callable.
+
+	Args:
+		func (callable): The call to time.
+		nRep (int): Number of timed repetitions.
+		nWarm (int): Number of untimed warm-up calls.
+		doMem (bool): Measure the peak allocation of an extra call with tracemalloc.
+
+	Returns:
+		dict: Wall-clock times [s] of each repetition, their min/median/mean and,
+			if doMem, the peak traced allocation [MB].
+	"""
+	for n in range(nWarm):
+		func()
+	times = []
+	for n in range(nRep):
+		t0 = time.perf_counter()
+		func()
+		times.append(time.perf_counter() - t0)
+	rec = {
+		"times": times,
+		"min": float(np.min(times)),
+		"median": float(np.median(times)),
+		"mean": float(np.mean(times)),
+	}
+	if doMem:
+		gc.collect()
+		tracemalloc.start()
+		func()
+		_, peak = tracemalloc.get_traced_memory()
+		tracemalloc.stop()
+		rec["peakMB"] = peak/2.0**20
+	return rec
+
+def maxRSS():
+	"""
+	Peak resident set size of this process [MB], None where unavailable.
+	"""
+	try:
+		import resource
+	except ImportError:
+		return None
+	rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+	#Linux reports kB, macOS bytes
+	if sys.platform == "darwin":
+		return rss/2.0**20
+	return rss/2.0**10
+
+#------
+#Benchmark groups
+#Each takes the scratch directory, size dict, options and the suite's ExitStack
+#(for anything to tear down after the run) and returns a list of
+#(name, callable) pairs, all setup done before returning
+#------
+
+def grpKaiH5(fdir, sz, opts, stack):
+	"""
+	kaiH5.getTs on every synthetic file type, with and without the time attribute cache.
+	"""
+	fGam = synth.writeGamera(fdir, "tsgam", Ri=1, Rj=1, Rk=1, **{k: v for k, v in sz["gam"].items() if k[0] != "R"})[0]
+	fMix = synth.writeMix(os.path.join(fdir, "ts.mix.h5"), **sz["mix"])
+	fRCM = synth.writeRCM(os.path.join(fdir, "ts.rcm.h5"), **sz["rcm"])
+	fChp = synth.writeChimp(os.path.join(fdir, "ts.h5part"), **sz["chimp"])
+	cases = []
+	for lab, fIn in [("gam", fGam), ("mix", fMix), ("rcm", fRCM), ("chimp", fChp)]:
+		for useTAC in [True, False]:
+			tStr = "TAC" if useTAC else "scan"
+			cases.append(("getTs/%s/%s" % (lab, tStr),
+				lambda fIn=fIn, useTAC=useTAC: kh5.getTs(fIn, aID="MJD", useTAC=useTAC, useBars=False)))
+	return cases
+
+def grpGamera(fdir, sz, opts, stack):
+	"""
+	GameraPipe construction and reads on a synthetic MPI run, plus GamsphPipe.EggSlice.
+	"""
+	import kaipy.gamera.gampp as gampp
+	import kaipy.gamera.magsphere as msph
+	ftag = "msphere"
+	synth.writeGamera(fdir, ftag, **sz["gam"])
+	gsph = gampp.GameraPipe(fdir, ftag, doVerbose=False)
+	gsph.GetGrid(doVerbose=False)
+	gpar = gampp.GameraPipe(fdir, ftag, doVerbose=False, doParallel=True, nWorkers=opts.get("nWorkers", 2))
+	gpar.GetGrid(doVerbose=False)
+	msp = msph.GamsphPipe(fdir, ftag)
+	nStp = gsph.s0 + gsph.Nt//2
+	cases = [
+		("GameraPipe/open", lambda: gampp.GameraPipe(fdir, ftag, doVerbose=False)),
+		("GameraPipe/GetVar", lambda: gsph.GetVar("D", nStp, doVerb=False)),
+		("GameraPipe/GetVarParallel", lambda: gpar.GetVarParallel("D", nStp, doVerb=False)),
+		("GameraPipe/GetSlice/idir", lambda: gsph.GetSlice("D", nStp, ijkdir='idir', n=gsph.Ni//2, doVerb=False)),
+		("GameraPipe/GetSlice/kdir", lambda: gsph.GetSlice("D", nStp, ijkdir='kdir', n=gsph.Nk//2, doVerb=False)),
+		("GamsphPipe/EggSlice", lambda: msp.EggSlice("D", nStp, doVerb=False)),
+	]
+	return cases
+
+def grpRemix(fdir, sz, opts, stack):
+	"""
+	remix.remix construction and the Biot-Savart dB on a ring of ground points.
+	"""
+	import kaipy.remix.remix as remix
+	fMix = synth.writeMix(os.path.join(fdir, "msphere.mix.h5"), **sz["mix"])
+	nStp = sz["mix"]["Nt"]//2
+	ion = remix.remix(fMix, nStp)
+	Npts = sz["dB"]["Npts"]
+	lat = np.radians(np.linspace(50, 80, Npts))
+	lon = np.linspace(0, 2*np.pi, Npts)
+	xyz = np.column_stack((np.cos(lat)*np.cos(lon), np.cos(lat)*np.sin(lon), np.sin(lat)))
+	cases = [
+		("remix/init", lambda: remix.remix(fMix, nStp)),
+		("remix/dB", lambda: ion.dB(xyz)),
+	]
+	return cases
+
+def grpEmbiggen(fdir, sz, opts, stack):
+	"""
+	embiggenUtils doubling of an egg grid, its volumes, gas and face fluxes.
+	"""
+	import kaipy.gamera.gamGrids as gg
+	import kaipy.embiggenUtils as upscl
+	Ni, Nj, Nk = sz["egg"]["Ni"], sz["egg"]["Nj"], sz["egg"]["Nk"]
+	xx, yy = gg.genEgg(Ni=Ni, Nj=Nj, Rin=8.0)
+	xxG, yyG = gg.Aug2D(xx, yy, doEps=True, TINY=upscl.TINY)
+	X, Y, Z = [Q.T for Q in gg.Aug3D(xxG, yyG, Nk=Nk, TINY=upscl.TINY)]
+	Xu, Yu, Zu = upscl.upGrid(X, Y, Z)
+	dV0 = upscl.Volume(X, Y, Z)
+	dVu = upscl.Volume(Xu, Yu, Zu)
+	rng = np.random.default_rng(0)
+	G = 1.0 + rng.random((1, 5) + dV0.shape)
+	M = rng.random((3,) + X.shape)
+	cases = [
+		("embiggen/upGrid", lambda: upscl.upGrid(X, Y, Z)),
+		("embiggen/Volume", lambda: upscl.Volume(Xu, Yu, Zu)),
+		("embiggen/upGas", lambda: upscl.upGas(G, dV0, dVu)),
+		("embiggen/upFlux", lambda: upscl.upFlux(M)),
+	]
+	return cases
+
+def grpSupermag(fdir, sz, opts, stack):
+	"""
+	supermage.InterpolateSimData on synthetic simulated/station data.
+	"""
+	import kaipy.supermage as sm
+	SIM, SM = synth.genSuperMag(**sz["sm"])
+	cases = [
+		("supermage/InterpolateSimData", lambda: sm.InterpolateSimData(SIM, SM)),
+	]
+	return cases
+
+def grpCdaweb(fdir, sz, opts, stack):
+	"""
+	scutils.pullVar served from the CDAWeb response cache, locally and through the stand-in server.
+	"""
+	import kaipy.satcomp.cdascache as cdascache
+	import kaipy.satcomp.scutils as scutils
+	Nt = sz["cda"]["Nt"]
+	data = synth.genCdaweb(Nt)
+	t0, t1 = data["Epoch"][0], data["Epoch"][-1]
+	tq0 = t0 + (t1 - t0)/4
+	tq1 = t0 + 3*(t1 - t0)/4
+	fmt = "%Y-%m-%dT%H:%M:%SZ"
+	cacheDir = os.path.join(fdir, "cache")
+	cache = cdascache.CdasCache(cacheDir)
+	binData = {'interval': 60.0, 'interpolateMissingValues': True, 'sigmaMultipler': 4}
+	cache.put("SYNTH_EPHEM", "XYZ_GSM", t0, t1, {'http': {'status_code': 200}}, data, binData=binData)
+	srv = stack.enter_context(cdascache.CacheServer(cacheDir))
+	stack.callback(cdascache.resetConfig)
+
+	def pull(cfg):
+		cdascache.resetConfig()
+		cdascache.configure(**cfg)
+		return scutils.pullVar("SYNTH_EPHEM", "XYZ_GSM", tq0.strftime(fmt), tq1.strftime(fmt), 60.0)
+
+	cases = [
+		("cdaweb/pullVar/cache", lambda: pull(dict(cacheDir=cacheDir, offline=True))),
+		("cdaweb/pullVar/server", lambda: pull(dict(server=srv.url, offline=True))),
+	]
+	return cases
+
+#Registry of groups, in run order
+GROUPS = {
+	"kaiH5": grpKaiH5,
+	"gamera": grpGamera,
+	"remix": grpRemix,
+	"embiggen": grpEmbiggen,
+	"supermage": grpSupermag,
+	"cdaweb": grpCdaweb,
+}
+
+def getMeta(size, opts):
+	"""
+	Environment and configuration of a benchmark run.
+	"""
+	try:
+		from importlib.metadata import version
+		kVer = version("kaipy")
+	except Exception:
+		kVer = "unknown"
+	return {
+		"kaipy": kVer,
+		"python": platform.python_version(),
+		"numpy": np.__version__,
+		"h5py": h5py.__version__,
+		"platform": platform.platform(),
+		"machine": platform.machine(),
+		"cpus": os.cpu_count(),
+		"size": size,
+		"sizes": SIZES[size],
+		"opts": opts,
+		"date": datetime.datetime.now().isoformat(timespec="seconds"),
+	}
+
+def runSuite(size="small", groups=None, nRep=3, nWarm=1, doMem=True, fdir=None, opts=None, doQuiet=True, doVerb=True):
+	"""
+	Run the benchmark suite.
+
+	Args:
+		size (str): Key of SIZES.
+		groups (list of str, optional): Groups to run, defaults to all of GROUPS.
+		nRep (int): Number of timed repetitions per case.
+		nWarm (int): Number of untimed warm-up calls per case.
+		doMem (bool): Record the peak traced allocation of each case.
+		fdir (str, optional): Scratch directory for the synthetic files, a temporary
+			directory is used (and removed) if None.
+		opts (dict, optional): Extra options passed to the groups, e.g. nWorkers.
+		doQuiet (bool): Swallow stdout of the benchmarked code.
+		doVerb (bool): Report progress on stderr.
+
+	Returns:
+		dict: {"meta":..., "results":[...]}, one result per case. Groups whose
+			modules can't be imported are listed in meta["skipped"].
+	"""
+	if size not in SIZES:
+		raise ValueError("Unknown size %s, choose from %s" % (size, ", ".join(SIZES.keys())))
+	if groups is None:
+		groups = list(GROUPS.keys())
+	for grp in groups:
+		if grp not in GROUPS:
+			raise ValueError("Unknown group %s, choose from %s" % (grp, ", ".join(GROUPS.keys())))
+	opts = {} if opts is None else dict(opts)
+	sz = SIZES[size]
+
+	results = []
+	skipped = {}
+	with contextlib.ExitStack() as stack:
+		if fdir is None:
+			fdir = stack.enter_context(tempfile.TemporaryDirectory(prefix="kaibench"))
+		for grp in groups:
+			gdir = os.path.join(fdir, grp)
+			os.makedirs(gdir, exist_ok=True)
+			if doVerb:
+				print("Setting up %s ..." % (grp), file=sys.stderr)
+			try:
+				with contextlib.redirect_stdout(io.StringIO()) if doQuiet else contextlib.nullcontext():
+					cases = GROUPS[grp](gdir, sz, opts, stack)
+			except ImportError as e:
+				#Optional dependency of the benchmarked module is missing
+				skipped[grp] = str(e)
+				if doVerb:
+					print("\tSkipping %s: %s" % (grp, e), file=sys.stderr)
+				continue
+			for name, func in cases:
+				with contextlib.redirect_stdout(io.StringIO()) if doQuiet else contextlib.nullcontext():
+					rec = timeCall(func, nRep=nRep, nWarm=nWarm, doMem=doMem)
+				rec = dict(group=grp, name=name, **rec)
+				results.append(rec)
+				if doVerb:
+					print("\t%-32s %10.4fs (min)" % (name, rec["min"]), file=sys.stderr)
+			del cases
+			gc.collect()
+
+	meta = getMeta(size, opts)
+	meta.update(nRep=nRep, nWarm=nWarm, maxRSSMB=maxRSS(), skipped=skipped)
+	return {"meta": meta, "results": results}
+
+def writeResults(fname, res):
+	"""
+	Write suite results as JSON.
+
+	Args:
+		fname (str): Output file.
+		res (dict): Output of runSuite.
+	"""
+	with open(fname, 'w') as f:
+		json.dump(res, f, indent=2)
+
+def compareResults(res0, res1, key="min"):
+	"""
+	Ratio of the timings of two suite results, case by case.
+
+	Args:
+		res0, res1 (dict): Baseline and new results (from runSuite or the JSON).
+		key (str): Statistic to compare.
+
+	Returns:
+		dict: Case name -> res1/res0 for the cases present in both.
+	"""
+	t0 = {(r["group"], r["name"]): r[key] for r in res0["results"]}
+	ratios = {}
+	for r in res1["results"]:
+		k = (r["group"], r["name"])
+		if k in t0 and t0[k] > 0:
+			ratios["%s:%s" % k] = r[key]/t0[k]
+	return ratios
@@ -0,0 +1,298 @@
+#Synthetic Kaiju output for benchmarking
+#Writers for files with the layout (names, shapes, Fortran [k,j,i] ordering,
+#step groups and attributes) that the kaipy readers expect, filled with smooth
+#analytic fields. Sizes are configurable so the same code can produce a
+#laptop-sized test set or something closer to a production run.
+
+# Standard modules
+import os
+
+# Third-party modules
+import numpy as np
+import h5py
+
+# Kaipy modules
+import kaipy.kaiH5 as kh5
+
+#Reference MJD of the synthetic runs
+MJD0 = 58000.0
+
+def lfmGrid(Ni, Nj, Nk, Rin=2.0, Rout=30.0):
+	"""
+	Corners of a spherical LFM-style grid.
+
+	i is radial (geometric spacing), j the polar angle from the +x axis and k the
+	azimuth about x, so k-averages of the equatorial plane look like an egg slice.
+
+	Args:
+		Ni, Nj, Nk (int): Number of cells.
+		Rin, Rout (float): Inner/outer radius [Re].
+
+	Returns:
+		X, Y, Z (numpy.ndarray): Corners, indexed [k,j,i] as stored in Gamera output.
+	"""
+	r = np.geomspace(Rin, Rout, Ni+1)
+	th = np.linspace(0, np.pi, Nj+1)
+	ph = np.linspace(0, 2*np.pi, Nk+1)
+	P, T, R = np.meshgrid(ph, th, r, indexing='ij')
+	X = R*np.cos(T)
+	Y = R*np.sin(T)*np.cos(P)
+	Z = R*np.sin(T)*np.sin(P)
+	return X, Y, Z
+
+def cellVolumes(X, Y, Z):
+	"""
+	Approximate cell volumes of a [k,j,i] corner grid, |(dx_i x dx_j) . dx_k| at the cell centers.
+	"""
+	def dQ(Q, ax):
+		D = np.diff(Q, axis=ax)
+		#Average the edges around the cell
+		for a in range(3):
+			if a != ax:
+				D = 0.5*(np.take(D, range(D.shape[a] - 1), axis=a) + np.take(D, range(1, D.shape[a]), axis=a))
+		return D
+	E = [np.stack([dQ(Q, ax) for Q in (X, Y, Z)], axis=-1) for ax in (2, 1, 0)]
+	return np.abs(np.einsum('...a,...a', np.cross(E[0], E[1]), E[2]))
+
+def stepFields(X, Y, Z, n, vIDs):
+	"""
+	Smooth cell-centered fields for step n, indexed [k,j,i].
+	"""
+	xc, yc, zc = [0.125*(Q[:-1,:-1,:-1] + Q[1:,:-1,:-1] + Q[:-1,1:,:-1] + Q[:-1,:-1,1:] +
+						Q[1:,1:,:-1] + Q[1:,:-1,1:] + Q[:-1,1:,1:] + Q[1:,1:,1:]) for Q in (X, Y, Z)]
+	r = np.sqrt(xc**2 + yc**2 + zc**2)
+	ph = 0.1*n
+	Q = {}
+	for m, vID in enumerate(vIDs):
+		Q[vID] = (1.0 + 0.5*np.sin(xc/3.0 + ph + m)*np.cos(yc/5.0))/r
+	return Q
+
+def writeGamera(fdir, ftag="msphere", Ni=32, Nj=16, Nk=32, Ri=1, Rj=1, Rk=1, Nt=10,
+				vIDs=("D", "P", "Vx", "Vy", "Vz", "Bx", "By", "Bz"), doTAC=True):
+	"""
+	Write a synthetic (possibly MPI-decomposed) Gamera magnetosphere run.
+
+	Args:
+		fdir (str): Output directory.
+		ftag (str): Run ID.
+		Ni, Nj, Nk (int): Global number of cells, must be divisible by Ri, Rj, Rk.
+		Ri, Rj, Rk (int): MPI decomposition, a serial run is written for 1,1,1.
+		Nt (int): Number of steps.
+		vIDs (tuple of str): Step variables.
+		doTAC (bool): Write the time attribute cache.
+
+	Returns:
+		list of str: Files written.
+	"""
+	X, Y, Z = lfmGrid(Ni, Nj, Nk)
+	dV = cellVolumes(X, Y, Z)
+	dNi, dNj, dNk = Ni//Ri, Nj//Rj, Nk//Rk
+	isMPI = (Ri*Rj*Rk > 1)
+	Qs = [stepFields(X, Y, Z, n, vIDs) for n in range(Nt)]
+	fOuts = []
+	for i in range(Ri):
+		for j in range(Rj):
+			for k in range(Rk):
+				if isMPI:
+					fOut = os.path.join(fdir, kh5.genName(ftag, i, j, k, Ri, Rj, Rk))
+				else:
+					fOut = os.path.join(fdir, "%s.gam.h5" % (ftag))
+				cS = (slice(k*dNk, (k+1)*dNk+1), slice(j*dNj, (j+1)*dNj+1), slice(i*dNi, (i+1)*dNi+1))
+				bS = (slice(k*dNk, (k+1)*dNk), slice(j*dNj, (j+1)*dNj), slice(i*dNi, (i+1)*dNi))
+				with h5py.File(fOut, 'w') as f5:
+					f5.attrs["UnitsID"] = "CODE"
+					for c, Q in zip("XYZ", (X, Y, Z)):
+						f5.create_dataset(c, data=Q[cS].astype(np.float32))
+					f5.create_dataset("dV", data=dV[bS].astype(np.float32))
+					for n in range(Nt):
+						s5 = f5.create_group("Step#%d" % (n))
+						s5.attrs["time"] = 60.0*n
+						s5.attrs["MJD"] = MJD0 + n/1440.0
+						s5.attrs["timestep"] = n
+						for vID in vIDs:
+							s5.create_dataset(vID, data=Qs[n][vID][bS].astype(np.float32))
+				if doTAC:
+					kh5.buildTAC(fOut, useBars=False)
+				fOuts.append(fOut)
+	return fOuts
+
+def writeMix(fname, Nlat=45, Nlon=180, Nt=5, doTAC=True):
+	"""
+	Write a synthetic ReMIX file with a two-cell potential and region 1/2 currents.
+
+	Args:
+		fname (str): Output file.
+		Nlat, Nlon (int): Number of cells in colatitude/longitude.
+		Nt (int): Number of steps.
+		doTAC (bool): Write the time attribute cache.
+
+	Returns:
+		str: The file written.
+	"""
+	colat = np.linspace(0, 45, Nlat+1)
+	lon = np.linspace(0, 360, Nlon+1)
+	#Colatitude is the first (row) dimension as in the ReMIX output
+	C, L = np.meshgrid(colat, lon, indexing='ij')
+	X = np.sin(np.radians(C))*np.cos(np.radians(L))
+	Y = np.sin(np.radians(C))*np.sin(np.radians(L))
+	cc = 0.5*(colat[:-1] + colat[1:])
+	lc = np.radians(0.5*(lon[:-1] + lon[1:]))
+	Cc, Lc = np.meshgrid(cc, lc, indexing='ij')
+	with h5py.File(fname, 'w') as f5:
+		f5.create_dataset("X", data=X)
+		f5.create_dataset("Y", data=Y)
+		for n in range(Nt):
+			s5 = f5.create_group("Step#%d" % (n))
+			s5.attrs["time"] = 60.0*n
+			s5.attrs["MJD"] = MJD0 + n/1440.0
+			amp = 1.0 + 0.1*n
+			shape = np.exp(-((Cc - 20.0)/6.0)**2)
+			for h in ["NORTH", "SOUTH"]:
+				s5.create_dataset("Potential " + h, data=50*amp*shape*np.sin(Lc))
+				s5.create_dataset("Field-aligned current " + h, data=amp*shape*np.cos(Lc)*np.sign(Cc - 20.0))
+				s5.create_dataset("Pedersen conductance " + h, data=5.0 + 5.0*shape)
+				s5.create_dataset("Hall conductance " + h, data=10.0 + 10.0*shape)
+				s5.create_dataset("Average energy " + h, data=1.0 + 4.0*shape)
+				s5.create_dataset("Number flux " + h, data=1.0e8*(0.1 + shape))
+	if doTAC:
+		kh5.buildTAC(fname, useBars=False)
+	return fname
+
+def writeRCM(fname, Ni=50, Nj=90, Nk=60, Nt=10, doTAC=True):
+	"""
+	Write a synthetic RCM (rcm.h5) file.
+
+	Args:
+		fname (str): Output file.
+		Ni, Nj (int): Number of latitude/longitude points, arrays are stored [lon,lat].
+		Nk (int): Number of energy channels.
+		Nt (int): Number of steps.
+		doTAC (bool): Write the time attribute cache.
+
+	Returns:
+		str: The file written.
+	"""
+	lon = np.linspace(0, 2*np.pi, Nj)
+	colat = np.linspace(0.1, 0.6, Ni)
+	Lo, Co = np.meshgrid(lon, colat, indexing='ij')
+	alamc = np.concatenate([[0.0], -np.logspace(1, 4, Nk//2), np.logspace(1, 5, Nk - Nk//2 - 1)])
+	L = 1.0/np.sin(Co)**2
+	with h5py.File(fname, 'w') as f5:
+		for n in range(Nt):
+			s5 = f5.create_group("Step#%d" % (n))
+			s5.attrs["time"] = 60.0*n
+			s5.attrs["MJD"] = MJD0 + n/1440.0
+			s5.attrs["dtCpl"] = 15.0
+			s5.create_dataset("aloct", data=Lo)
+			s5.create_dataset("colat", data=Co)
+			s5.create_dataset("alamc", data=alamc)
+			s5.create_dataset("rcmxmin", data=L*np.cos(Lo))
+			s5.create_dataset("rcmymin", data=L*np.sin(Lo))
+			s5.create_dataset("rcmzmin", data=np.zeros_like(L))
+			s5.create_dataset("rcmvm", data=L**(-4.0/3))
+			s5.create_dataset("rcmpp", data=np.exp(-((L - 4.0)/2.0)**2)*(1 + 0.01*n))
+			s5.create_dataset("rcmnn", data=np.exp(-((L - 4.0)/3.0)**2))
+			s5.create_dataset("IOpen", data=np.where(L > 10, 1.0, -1.0))
+			eeta = np.exp(-((L[None] - 4.0)/2.0)**2)*np.abs(alamc[:, None, None] + 1.0)**(-1.5)
+			s5.create_dataset("rcmeeta", data=eeta)
+	if doTAC:
+		kh5.buildTAC(fname, useBars=False)
+	return fname
+
+def writeChimp(fname, Np=10000, Nt=10, doTAC=True, seed=0):
+	"""
+	Write a synthetic CHIMP test-particle (h5part) file.
+
+	Args:
+		fname (str): Output file.
+		Np (int): Number of particles.
+		Nt (int): Number of steps.
+		doTAC (bool): Write the time attribute cache.
+		seed (int): Random seed.
+
+	Returns:
+		str: The file written.
+	"""
+	rng = np.random.default_rng(seed)
+	x0 = rng.uniform(-10, 10, (3, Np))
+	K0 = 10.0**rng.uniform(0, 3, Np)
+	with h5py.File(fname, 'w') as f5:
+		for n in range(Nt):
+			s5 = f5.create_group("Step#%d" % (n))
+			s5.attrs["time"] = 1.0*n
+			s5.attrs["MJD"] = MJD0 + n/86400.0
+			ph = 0.05*n
+			s5.create_dataset("id", data=np.arange(1, Np+1))
+			s5.create_dataset("x", data=x0[0]*np.cos(ph) - x0[1]*np.sin(ph))
+			s5.create_dataset("y", data=x0[0]*np.sin(ph) + x0[1]*np.cos(ph))
+			s5.create_dataset("z", data=x0[2])
+			s5.create_dataset("K", data=K0)
+			s5.create_dataset("isIn", data=np.ones(Np))
+	if doTAC:
+		kh5.buildTAC(fname, useBars=False)
+	return fname
+
+def genSuperMag(Nsim=2000, Nsta=100, Nt=120, dtSim=60.0, seed=0):
+	"""
+	Synthetic simulated ground dB and SuperMag-like station data, as returned by
+	supermage.ReadSimData and supermage.FetchSMData.
+
+	Args:
+		Nsim (int): Number of simulation ground points.
+		Nsta (int): Number of stations.
+		Nt (int): Number of minutes of station data.
+		dtSim (float): Cadence of the simulation output [s].
+		seed (int): Random seed.
+
+	Returns:
+		SIM, SM (dict): Inputs of supermage.InterpolateSimData.
+	"""
+	import datetime
+	rng = np.random.default_rng(seed)
+	t0 = datetime.datetime(2017, 9, 7)
+	NtS = int(Nt*60.0/dtSim) + 2
+	tdSim = np.array([t0 + datetime.timedelta(seconds=dtSim*n) for n in range(NtS)])
+	tdSM = np.array([t0 + datetime.timedelta(minutes=n) for n in range(Nt)])
+
+	glon = rng.uniform(-180, 180, Nsim)
+	glat = rng.uniform(-89, 89, Nsim)
+	tt = np.arange(NtS)[:, None]
+	SIM = {'td': tdSim, 'glon': glon, 'glat': glat, 'mlat': glat}
+	for m, vID in enumerate(['dBn', 'dBt', 'dBp', 'dBr']):
+		SIM[vID] = 100*np.sin(np.radians(glat))[None, :]*np.cos(0.01*tt + np.radians(glon)[None, :] + m)
+	SIM['mlt'] = np.mod((glon[None, :] + 180)/15.0 + tt*dtSim/3600.0, 24)
+
+	SM = {'td': tdSM,
+		'sitenames': np.array(["S%03d" % (n) for n in range(Nsta)]),
+		'glon': rng.uniform(-180, 180, Nsta),
+		'glat': rng.uniform(-80, 80, Nsta),
+	}
+	SM['mlon'] = SM['glon']
+	SM['mlat'] = SM['glat']
+	return SIM, SM
+
+def genCdaweb(Nt=1440, dt=60.0, seed=0):
+	"""
+	Synthetic CDAWeb ephemeris response, as returned by CdasWs.get_data.
+
+	Args:
+		Nt (int): Number of records.
+		dt (float): Cadence [s].
+		seed (int): Random seed.
+
+	Returns:
+		spacepy.datamodel.SpaceData: Epoch and a (Nt,4) XYZ_GSM trajectory [km].
+	"""
+	import datetime
+	import spacepy.datamodel as dm
+	rng = np.random.default_rng(seed)
+	t0 = datetime.datetime(2017, 9, 7)
+	t = np.array([t0 + datetime.timedelta(seconds=dt*n) for n in range(Nt)])
+	ph = 2*np.pi*np.arange(Nt)*dt/(9*3600.0)
+	R = 6371.0*(4.0 + 2.0*np.cos(ph))
+	xyz = np.column_stack((R*np.cos(ph), R*np.sin(ph), 100.0*rng.standard_normal(Nt)))
+	xyzr = np.column_stack((xyz, np.sqrt((xyz**2).sum(axis=1))))
+	data = dm.SpaceData(attrs={'Source_name': 'SYNTH>Synthetic spacecraft'})
+	data['Epoch'] = dm.dmarray(t, attrs={'FIELDNAM': 'Time'})
+	data['XYZ_GSM'] = dm.dmarray(xyzr, attrs={'DEPEND_0': 'Epoch', 'UNITS': 'km', 'FILLVAL': -1.0e31})
+	return data
@@ -16,6 +16,7 @@ from sunpy.coordinates import frames
 
 # Import project modules.
 import kaipy.kaiTools as kaiTools
+import kaipy.satcomp.cdascache as cdascache
 import kaipy.satcomp.scutils as scutils
 from kaipy import satcomp
 
@@ -57,7 +58,7 @@ def fetch_satellite_geographic_position(spacecraft, when):
     sc_info = scutils.getScIds()
 
     # Create the CDAWeb connection.
-    cdas = CdasWs()
+    cdas = cdascache.wrapCdas(CdasWs())
 
     # Format the start and end time strings.
     t0 = when.strftime(CDAWEB_DATETIME_FORMAT)
@@ -128,7 +129,7 @@ def fetch_satellite_SM_position(spacecraft, when):
     sc_info = scutils.getScIds()
 
     # Create the CDAWeb connection.
-    cdas = CdasWs()
+    cdas = cdascache.wrapCdas(CdasWs())
 
     # Format the start and end time strings.
     t0 = when.strftime(CDAWEB_DATETIME_FORMAT)
@@ -199,7 +200,7 @@ def fetch_spacecraft_SM_trajectory(spacecraft, t_start, t_end):
     sc_info = scutils.getScIds()
 
     # Create the CDAWeb connection.
-    cdas = CdasWs()
+    cdas = cdascache.wrapCdas(CdasWs())
 
     # Format the start and end time strings.
     t0 = t_start.strftime(CDAWEB_DATETIME_FORMAT)
@@ -274,7 +275,7 @@ def fetch_satellite_magnetic_northern_footprint_position(spacecraft, when):
     sc_info = scutils.getScIds()
 
     # Create the CDAWeb connection.
-    cdas = CdasWs()
+    cdas = cdascache.wrapCdas(CdasWs())
 
     # Format the start and end time strings.
     t0 = when.strftime(CDAWEB_DATETIME_FORMAT)
@@ -359,7 +360,7 @@ def fetch_satellite_magnetic_southern_footprint_position(spacecraft, when):
     sc_info = scutils.getScIds()
 
     # Create the CDAWeb connection.
-    cdas = CdasWs()
+    cdas = cdascache.wrapCdas(CdasWs())
 
     # Format the start and end time strings.
     t0 = when.strftime(CDAWEB_DATETIME_FORMAT)
@@ -441,7 +442,7 @@ def fetch_helio_spacecraft_HGS_trajectory(spacecraft, t_start, t_end, mjdc):
     sc_info = scutils.getScIds(spacecraft_data_file=spacecraft_data_file)
 
     # Create the CDAWeb connection.
-    cdas = CdasWs()
+    cdas = cdascache.wrapCdas(CdasWs())
 
     # Format the start and end time strings.
     t0 = t_start.strftime(CDAWEB_DATETIME_FORMAT)
@@ -513,7 +514,7 @@ def fetch_helio_spacecraft_trajectory(sc_id, t_start, t_end):
     sc_metadata = scutils.getScIds(spacecraft_data_file=sc_metadata_path)
 
     # Create the CDAWeb connection.
-    cdas = CdasWs()
+    cdas = cdascache.wrapCdas(CdasWs())
 
     # Format the start and end time strings.
     t0 = t_start.strftime(CDAWEB_DATETIME_FORMAT)
@@ -0,0 +1,322 @@
+#Ragged-array layout for CHIMP field-line output
+#Each step holds the points of all its lines concatenated, with per-line lengths/offsets and attribute tables,
+#instead of one HDF5 group per Step#N/Line#M
+
+# Standard modules
+import xml.etree.ElementTree as et
+import xml.dom.minidom
+
+# Third-party modules
+import numpy as np
+import h5py
+from alive_progress import alive_bar
+
+# Kaipy modules
+import kaipy.kaiH5 as kh5
+import kaipy.kdefs as kdefs
+
+#Root attribute marking a ragged field-line file
+fmtAtt = "LineFormat"
+fmtTag = "ragged"
+
+#Per-step datasets that are not per-point variables
+idxVars = ["xyz", "LCon", "Np", "Offsets", "PolyCon"]
+#Line attributes that are bookkeeping rather than physics
+nullAtts = ["Np", "n0"]
+
+#XDMF Mixed topology code for a polyline, followed by its number of nodes
+xdmfPolyline = 2
+
+def isRagged(fIn):
+	"""
+	Check whether a field-line file uses the ragged layout.
+
+	Args:
+		fIn (str): Field-line HDF5 file.
+
+	Returns:
+		bool: True for ragged files, False for the one group per line layout.
+	"""
+	with h5py.File(fIn, 'r') as hf:
+		return _isRagged(hf)
+
+def _isRagged(hf):
+	fmt = hf.attrs.get(fmtAtt, b"")
+	if isinstance(fmt, bytes):
+		fmt = fmt.decode('utf-8')
+	return fmt == fmtTag
+
+def lineOffsets(Np):
+	"""
+	Offsets of the lines in the concatenated point arrays.
+
+	Args:
+		Np (array): Number of points of each line.
+
+	Returns:
+		numpy.ndarray: Index of the first point of each line (int64).
+	"""
+	Np = np.asarray(Np, dtype=np.int64)
+	return np.concatenate([[0], np.cumsum(Np)[:-1]]).astype(np.int64)
+
+def polyCon(Np):
+	"""
+	XDMF Mixed topology connectivity for a set of polylines.
+
+	Each line is written as [2, Np, i0, ..., i0+Np-1] with i0 its offset.
+
+	Args:
+		Np (array): Number of points of each line.
+
+	Returns:
+		numpy.ndarray: Connectivity, 2*Nl + sum(Np) entries.
+	"""
+	Np = np.asarray(Np, dtype=np.int64)
+	Nl = len(Np)
+	NpT = int(Np.sum())
+	dtype = np.int32 if NpT < np.iinfo(np.int32).max else np.int64
+	#Position of each line's header in the connectivity array
+	hIdx = lineOffsets(Np) + 2*np.arange(Nl)
+	isHdr = np.zeros(NpT + 2*Nl, dtype=bool)
+	isHdr[hIdx] = True
+	isHdr[hIdx+1] = True
+	con = np.zeros(NpT + 2*Nl, dtype=dtype)
+	con[hIdx] = xdmfPolyline
+	con[hIdx+1] = Np
+	con[~isHdr] = np.arange(NpT)
+	return con
+
+def readLegacyStep(gStp, lSk=1):
+	"""
+	Read all lines of a step in the one group per line layout into ragged arrays.
+
+	Args:
+		gStp (h5py.Group): Step#N group holding Line#M groups.
+		lSk (int, optional): Stride over lines. Default is 1.
+
+	Returns:
+		dict: Ragged lines, see readStep.
+	"""
+	lIds = sorted(int(k.split("#")[-1]) for k in gStp.keys() if k.startswith("Line#"))[::lSk]
+	lines = {"Np": np.zeros(len(lIds), dtype=np.int32), "vars": {}, "atts": {}}
+	if len(lIds) == 0:
+		lines["xyz"] = np.zeros((0, 3), dtype=np.float32)
+		lines["Offsets"] = np.zeros(0, dtype=np.int64)
+		lines["atts"]["ID"] = np.zeros(0)
+		return lines
+
+	lGrps = [gStp["Line#%d" % (m)] for m in lIds]
+	vIDs = [str(k) for k in lGrps[0].keys() if k not in idxVars]
+	aIDs = [str(k) for k in lGrps[0].attrs.keys() if k != "Np"]
+	xyz = [lG["xyz"][()] for lG in lGrps]
+	lines["Np"][:] = [len(Q) for Q in xyz]
+	lines["Offsets"] = lineOffsets(lines["Np"])
+	lines["xyz"] = np.concatenate(xyz)
+	for vID in vIDs:
+		lines["vars"][vID] = np.concatenate([lG[vID][()] for lG in lGrps])
+	for aID in aIDs:
+		lines["atts"][aID] = np.array([float(lG.attrs[aID]) for lG in lGrps])
+	lines["atts"]["ID"] = np.array(lIds, dtype=float)
+	return lines
+
+def readStep(gStp, vIDs=None):
+	"""
+	Read the lines of a ragged step with one read per dataset.
+
+	Args:
+		gStp (h5py.Group): Ragged Step#N group.
+		vIDs (list, optional): Per-point variables to read. Default is all of them.
+
+	Returns:
+		dict: With keys
+			- Np (array): Number of points of each line, (Nl,).
+			- Offsets (array): Index of the first point of each line, (Nl,).
+			- xyz (array): Points of all lines, (sum(Np),3).
+			- vars (dict): Per-point variables, (sum(Np),) each.
+			- atts (dict): Line attributes, (Nl,) each, including the source line ID.
+	"""
+	if vIDs is None:
+		vIDs = stepVars(gStp)
+	lines = {"Np": gStp["Np"][()], "Offsets": gStp["Offsets"][()], "xyz": gStp["xyz"][()]}
+	lines["vars"] = {vID: gStp[vID][()] for vID in vIDs}
+	lines["atts"] = {str(k): gStp["Lines"][k][()] for k in gStp["Lines"].keys()}
+	return lines
+
+def stepVars(gStp):
+	"""
+	Names of the per-point variables of a ragged step.
+	"""
+	return [str(k) for k, Q in gStp.items() if isinstance(Q, h5py.Dataset) and k not in idxVars]
+
+def splitLines(lines, vID="xyz"):
+	"""
+	Split a concatenated per-point array back into one array per line.
+
+	Args:
+		lines (dict): Ragged lines, see readStep.
+		vID (str, optional): "xyz" or the name of a per-point variable. Default is "xyz".
+
+	Returns:
+		list: One array per line.
+	"""
+	Q = lines["xyz"] if vID == "xyz" else lines["vars"][vID]
+	return np.split(Q, lines["Offsets"][1:])
+
+def slimLines(lines, pSk=1, lSk=1):
+	"""
+	Stride over the lines and over the points along each line.
+
+	Each kept line keeps its first point and every pSk-th one after it, as in slimFL.
+	The n0 attribute no longer points at the same place when pSk > 1 and is dropped.
+
+	Args:
+		lines (dict): Ragged lines, see readStep.
+		pSk (int, optional): Stride over points on each line. Default is 1.
+		lSk (int, optional): Stride over lines. Default is 1.
+
+	Returns:
+		dict: Slimmed ragged lines.
+	"""
+	Np = lines["Np"][::lSk].astype(np.int64)
+	Off = lines["Offsets"][::lSk].astype(np.int64)
+	NpN = (Np + pSk - 1)//pSk
+	OffN = lineOffsets(NpN)
+	#Point k of new line l comes from Off[l] + pSk*k
+	idx = np.repeat(Off - pSk*OffN, NpN) + pSk*np.arange(NpN.sum(), dtype=np.int64)
+
+	slim = {"Np": NpN.astype(np.int32), "Offsets": OffN, "xyz": lines["xyz"][idx]}
+	slim["vars"] = {vID: Q[idx] for vID, Q in lines["vars"].items()}
+	slim["atts"] = {aID: Q[::lSk] for aID, Q in lines["atts"].items() if not (pSk > 1 and aID == "n0")}
+	return slim
+
+def writeStep(gStp, lines):
+	"""
+	Write ragged lines into a (new, empty) step group.
+
+	Args:
+		gStp (h5py.Group): Step#N group to write into.
+		lines (dict): Ragged lines, see readStep.
+	"""
+	gStp.create_dataset("Np", data=np.asarray(lines["Np"], dtype=np.int32))
+	gStp.create_dataset("Offsets", data=np.asarray(lines["Offsets"], dtype=np.int64))
+	gStp.create_dataset("PolyCon", data=polyCon(lines["Np"]))
+	gStp.create_dataset("xyz", data=lines["xyz"])
+	for vID, Q in lines["vars"].items():
+		gStp.create_dataset(vID, data=Q)
+	gL = gStp.create_group("Lines")
+	for aID, Q in lines["atts"].items():
+		gL.create_dataset(aID, data=Q)
+
+def toRagged(fIn, fOut, pSk=1, lSk=1, doVerb=True):
+	"""
+	Write a field-line file in the ragged layout, optionally slimmed.
+
+	Works from either layout: one group per line files are read line by line once,
+	ragged files with a few bulk reads per step. Root datasets/groups and all
+	attributes are carried over.
+
+	Args:
+		fIn (str): Input field-line file.
+		fOut (str): Output ragged file.
+		pSk (int, optional): Stride over points on each line. Default is 1.
+		lSk (int, optional): Stride over lines. Default is 1.
+		doVerb (bool, optional): Show a progress bar. Default is True.
+	"""
+	nSteps, sIds = kh5.cntSteps(fIn, useBars=False)
+	with h5py.File(fIn, 'r') as iH5, h5py.File(fOut, 'w') as oH5:
+		doRag = _isRagged(iH5)
+		for k, v in iH5.attrs.items():
+			oH5.attrs[k] = v
+		oH5.attrs[fmtAtt] = fmtTag
+		for k in iH5.keys():
+			if not k.startswith("Step#"):
+				iH5.copy(k, oH5)
+		with alive_bar(nSteps, title="Lines".ljust(kdefs.barLab), length=kdefs.barLen, bar=kdefs.barDef, disable=not doVerb) as bar:
+			for nStp in sIds:
+				gStr = "Step#%d" % (nStp)
+				if doRag:
+					lines = slimLines(readStep(iH5[gStr]), pSk, lSk)
+				else:
+					lines = slimLines(readLegacyStep(iH5[gStr], lSk), pSk)
+				gOut = oH5.create_group(gStr)
+				for k, v in iH5[gStr].attrs.items():
+					gOut.attrs[k] = v
+				writeStep(gOut, lines)
+				bar()
+
+def genXDMF(fIn, fOutXML, doAtts=True):
+	"""
+	Write the XDMF description of a ragged field-line file.
+
+	Every step is a single grid of Mixed (polyline) topology, with the per-point
+	variables on the nodes and the line attributes on the cells. Only dataset shapes
+	are read.
+
+	Args:
+		fIn (str): Ragged field-line file.
+		fOutXML (str): XDMF file to write.
+		doAtts (bool, optional): Add the line attributes. Default is True.
+	"""
+	nSteps, sIds = kh5.cntSteps(fIn, useBars=False)
+	Xdmf = et.Element("Xdmf")
+	Xdmf.set("Version", "2.0")
+	Dom = et.SubElement(Xdmf, "Domain")
+	TGrid = et.SubElement(Dom, "Grid")
+	TGrid.set("Name", "tlMesh")
+	TGrid.set("GridType", "Collection")
+	TGrid.set("CollectionType", "Temporal")
+
+	with h5py.File(fIn, 'r') as hf:
+		for nStp in sIds:
+			gStr = "Step#%d" % (nStp)
+			gStp = hf[gStr]
+			Nl = gStp["Np"].shape[0]
+			if Nl == 0:
+				continue
+			NpT = gStp["xyz"].shape[0]
+			lGrid = et.SubElement(TGrid, "Grid")
+			lGrid.set("Name", "tLines")
+			lGrid.set("GridType", "Uniform")
+			tLab = et.SubElement(lGrid, "Time")
+			tLab.set("Value", "%f" % (gStp.attrs.get("time", nStp)))
+
+			Topo = et.SubElement(lGrid, "Topology")
+			Topo.set("TopologyType", "Mixed")
+			Topo.set("NumberOfElements", str(Nl))
+			addDataItem(Topo, fIn, gStr, "PolyCon", gStp["PolyCon"])
+
+			Geom = et.SubElement(lGrid, "Geometry")
+			Geom.set("GeometryType", "XYZ")
+			addDataItem(Geom, fIn, gStr, "xyz", gStp["xyz"])
+
+			for vID in stepVars(gStp):
+				vAtt = et.SubElement(lGrid, "Attribute")
+				vAtt.set("Name", vID)
+				vAtt.set("AttributeType", "Scalar")
+				vAtt.set("Center", "Node")
+				addDataItem(vAtt, fIn, gStr, vID, gStp[vID])
+			if doAtts:
+				for aID in gStp["Lines"].keys():
+					if aID in nullAtts:
+						continue
+					vAtt = et.SubElement(lGrid, "Attribute")
+					vAtt.set("Name", aID)
+					vAtt.set("AttributeType", "Scalar")
+					vAtt.set("Center", "Cell")
+					addDataItem(vAtt, fIn, gStr, "Lines/%s" % (aID), gStp["Lines"][aID])
+
+	xmlStr = xml.dom.minidom.parseString(et.tostring(Xdmf)).toprettyxml(indent="    ")
+	with open(fOutXML, "w") as f:
+		f.write(xmlStr)
+
+def addDataItem(parent, fIn, gStr, vID, dset):
+	"""
+	Add an HDF DataItem pointing at a dataset of a step, typed from the dataset.
+	"""
+	DI = et.SubElement(parent, "DataItem")
+	DI.set("Dimensions", " ".join(str(n) for n in dset.shape))
+	DI.set("NumberType", "Int" if np.issubdtype(dset.dtype, np.integer) else "Float")
+	DI.set("Precision", str(dset.dtype.itemsize))
+	DI.set("Format", "HDF")
+	DI.text = "%s:/%s/%s" % (fIn, gStr, vID)
+	return DI
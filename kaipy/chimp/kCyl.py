@@ -9,6 +9,12 @@ import h5py
 
 # Kaipy modules
 import kaipy.kaiViz as kv
+import kaipy.kaiH5 as kh5
+import kaipy.kdefs as kdefs
+
+#Rest mass energies [keV]
+mpc2 = 938272.08816
+mec2 = 510.99895
 
 #Get grid from K-Cyl
 def getGrid(fIn, do4D=False):
@@ -88,22 +94,30 @@ def PIso(fIn, nStp=0, pCut=1.0e-3, doAsym=False):
 	"""
 	Pxy = getSlc(fIn, nStp, "Pxy")
 	Pz = getSlc(fIn, nStp, "Pz")
+	return anisotropy(Pxy, Pz, pCut=pCut, doAsym=doAsym)
+
+def anisotropy(Pxy, Pz, pCut=1.0e-3, doAsym=False):
+	"""
+	Pressure anisotropy of arrays of any (matching) shape, e.g. a (Nt,Nx,Ny) stack.
+
+	Args:
+		Pxy (numpy.ndarray): Perpendicular pressure.
+		Pz (numpy.ndarray): Parallel pressure.
+		pCut (float, optional): Cells with 2Pxy+Pz or Pz below pCut are masked. Default is 1.0e-3.
+		doAsym (bool, optional): Return Pxy/Pz-1 (0 where masked), otherwise Pxy/(Pxy+Pz) (NaN where masked). Default is False.
+
+	Returns:
+		pR (numpy.ndarray): The anisotropy.
+	"""
+	Pxy = np.asarray(Pxy, dtype=float)
+	Pz = np.asarray(Pz, dtype=float)
 	Pk = 2 * Pxy + Pz
-	Nx, Ny = Pz.shape
-	pR = np.zeros((Nx, Ny))
-
-	for i in range(Nx):
-		for j in range(Ny):
-			if Pk[i, j] > pCut and Pz[i, j] > pCut:
-				if doAsym:
-					pR[i, j] = Pxy[i, j] / Pz[i, j] - 1.0
-				else:
-					pR[i, j] = Pxy[i, j] / (Pxy[i, j] + Pz[i, j])
-			else:
-				if doAsym:
-					pR[i, j] = 0.0
-				else:
-					pR[i, j] = np.nan
+	isOK = (Pk > pCut) & (Pz > pCut)
+	with np.errstate(divide='ignore', invalid='ignore'):
+		if doAsym:
+			pR = np.where(isOK, Pxy / Pz - 1.0, 0.0)
+		else:
+			pR = np.where(isOK, Pxy / (Pxy + Pz), np.nan)
 	return pR
 
 
@@ -151,6 +165,164 @@ def getEQGrid(fIn, doCenter=False, doWrap=False):
 		return xxc, yyc
 	else:
 		return kv.reWrap(xxc), kv.reWrap(yyc)
-	
-	
 
+
+#------
+#Moments
+#------
+
+def kWeights(Ki, kMin=None, kMax=None):
+	"""
+	Energy bin widths, clipped to the band [kMin,kMax] for partial moments.
+
+	Args:
+		Ki (numpy.ndarray): Energy grid at cell edges [keV].
+		kMin, kMax (float, optional): Energy band [keV], defaults to the whole grid.
+
+	Returns:
+		dK (numpy.ndarray): Width of each energy bin inside the band [keV].
+	"""
+	K0 = Ki[:-1] if kMin is None else np.maximum(Ki[:-1], kMin)
+	K1 = Ki[1:] if kMax is None else np.minimum(Ki[1:], kMax)
+	return np.maximum(K1 - K0, 0.0)
+
+def aWeights(Ai):
+	"""
+	Solid angle weights of pitch angle bins, 2*pi*(cos(a0)-cos(a1)).
+
+	Grids covering only [0,pi/2] are taken as symmetric about 90 degrees and doubled.
+
+	Args:
+		Ai (numpy.ndarray): Pitch angle grid at cell edges [rad].
+
+	Returns:
+		dO (numpy.ndarray): Solid angle of each bin [sr].
+		cos2 (numpy.ndarray): Solid-angle average of cos^2 over each bin.
+	"""
+	c0 = np.cos(Ai[:-1])
+	c1 = np.cos(Ai[1:])
+	dO = 2 * np.pi * (c0 - c1)
+	cos2 = (c0**3 - c1**3) / (3 * (c0 - c1))
+	if Ai.max() <= 0.5 * np.pi + 1.0e-6:
+		dO = 2 * dO
+	return dO, cos2
+
+def kMoments(jPSD, Ki, Ai=None, m0=mpc2, kMin=None, kMax=None):
+	"""
+	Density and pressure moments of a differential intensity.
+
+	n = int j/v dK dOmega, P = (1/3) int j p dK dOmega, with P split into
+	perpendicular/parallel parts when resolved in pitch angle.
+
+	Args:
+		jPSD (numpy.ndarray): Intensity [1/(s*sr*keV*cm^2)], energy in the last
+			dimension, or energy then pitch angle in the last two if Ai is given.
+			Leading dimensions (space, time) are carried along.
+		Ki (numpy.ndarray): Energy grid at cell edges [keV].
+		Ai (numpy.ndarray, optional): Pitch angle grid at cell edges [rad], isotropy assumed if None.
+		m0 (float, optional): Rest mass energy of the species [keV]. Default is protons.
+		kMin, kMax (float, optional): Energy band [keV] for partial moments.
+
+	Returns:
+		dict: "n" density [#/cc], "P" pressure [nPa], and with Ai also
+			"Pxy"/"Pz" perpendicular/parallel pressure [nPa].
+	"""
+	jPSD = np.asarray(jPSD, dtype=float)
+	Kc = 0.5 * (Ki[:-1] + Ki[1:])
+	dK = kWeights(Ki, kMin, kMax)
+	#Relativistic speed [cm/s] and momentum [kg m/s]
+	gam = 1.0 + Kc / m0
+	v = kdefs.vc_cgs * np.sqrt(1.0 - 1.0 / gam**2)
+	p = np.sqrt(Kc**2 + 2 * Kc * m0) * kdefs.kev2J / (1.0e-2 * kdefs.vc_cgs)
+	#j*p*dK -> Pa (cm^-2 -> m^-2), then nPa
+	pScl = 1.0e4 * 1.0e9
+	if Ai is None:
+		jK = np.nan_to_num(jPSD)
+		n = 4 * np.pi * (jK @ (dK / v))
+		P = (4 * np.pi / 3) * pScl * (jK @ (dK * p))
+		return {"n": n, "P": P}
+
+	dO, cos2 = aWeights(Ai)
+	jK = np.nan_to_num(jPSD)
+	#Contract pitch angle first, then energy
+	jO = jK @ dO
+	jPz = jK @ (dO * cos2)
+	n = jO @ (dK / v)
+	Pz = pScl * (jPz @ (dK * p))
+	Pt = pScl * (jO @ (dK * p))
+	Pxy = 0.5 * (Pt - Pz)
+	return {"n": n, "P": Pt / 3.0, "Pxy": Pxy, "Pz": Pz}
+
+def getMoments(fIn, sIds=None, pCut=1.0e-3, doAsym=False, kMin=None, kMax=None, m0=mpc2, doWrap=False, doJ=True):
+	"""
+	Equatorial moments of a K-Cyl file for a range of steps, read in one pass.
+
+	jPSD, Pxy and Pz of every step are read with the file opened once and all
+	moments are computed with array operations, giving (Nt,Nx,Ny) stacks for
+	movies, or for L-time spectrograms after averaging over phi (see phiAvg).
+
+	Args:
+		fIn (str): The path to the PSD HDF5 file.
+		sIds (list of int, optional): Steps to read, defaults to all.
+		pCut (float, optional): Pressure cut of the anisotropy, see anisotropy.
+		doAsym (bool, optional): Anisotropy as Pxy/Pz-1 rather than Pxy/(Pxy+Pz).
+		kMin, kMax (float, optional): Energy band [keV] of the intensity moments.
+		m0 (float, optional): Rest mass energy of the species [keV]. Default is protons.
+		doWrap (bool, optional): Add the wrapped phi layer to every slice, as getSlc. Default is False.
+		doJ (bool, optional): Compute the intensity moments (needs jPSD). Default is True.
+
+	Returns:
+		dict: "sIds", "T" (time of each step), and (Nt,Nx,Ny) stacks of "Pxy",
+			"Pz", "pR" (anisotropy) and, if doJ, the kMoments of jPSD ("n", "P",
+			plus "jPxy"/"jPz" for pitch angle resolved output).
+	"""
+	if sIds is None:
+		Nt, sIds = kh5.cntSteps(fIn)
+	sIds = np.asarray(sIds, dtype=int)
+	Nt = len(sIds)
+
+	moms = {}
+	with h5py.File(fIn, 'r') as hf:
+		if doJ:
+			Ki = 10 ** hf["Z"][()].T[0, 0, :]
+			Ai = hf["A"][()].T if "A" in hf else None
+		for n, nStp in enumerate(sIds):
+			gID = "Step#%d" % (nStp)
+			Q = {
+				"Pxy": hf[gID]["Pxy"][()].T,
+				"Pz": hf[gID]["Pz"][()].T,
+			}
+			if doJ:
+				jM = kMoments(hf[gID]["jPSD"][()].T, Ki, Ai=Ai, m0=m0, kMin=kMin, kMax=kMax)
+				Q["n"] = jM["n"]
+				Q["P"] = jM["P"]
+				if Ai is not None:
+					Q["jPxy"] = jM["Pxy"]
+					Q["jPz"] = jM["Pz"]
+			if doWrap:
+				Q = {k: kv.reWrap(V) for k, V in Q.items()}
+			if n == 0:
+				moms = {k: np.zeros((Nt,) + V.shape) for k, V in Q.items()}
+			for k, V in Q.items():
+				moms[k][n] = V
+
+	moms["pR"] = anisotropy(moms["Pxy"], moms["Pz"], pCut=pCut, doAsym=doAsym)
+	moms["sIds"] = sIds
+	moms["T"] = kh5.getTs(fIn, sIds, aID="time")
+	return moms
+
+def phiAvg(Q, axis=-1):
+	"""
+	Average over phi, ignoring masked (NaN) cells, e.g. to turn a (Nt,Nx,Ny) stack into an L-time spectrogram.
+
+	Args:
+		Q (numpy.ndarray): Stack of equatorial slices.
+		axis (int, optional): Phi axis. Default is the last.
+
+	Returns:
+		numpy.ndarray: The average, NaN where every cell was masked.
+	"""
+	Q = np.asarray(Q, dtype=float)
+	Nv = np.sum(~np.isnan(Q), axis=axis)
+	with np.errstate(invalid='ignore'):
+		return np.where(Nv > 0, np.nansum(Q, axis=axis) / np.maximum(Nv, 1), np.nan)
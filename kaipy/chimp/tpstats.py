@@ -0,0 +1,371 @@
+#Streaming population statistics of CHIMP test particles (h5part output)
+#The steps are walked once, in step ranges spread over worker processes, accumulating weighted
+#histograms, loss counters and per-particle first-crossing times without an (Nt x Np) array
+
+#stats = tpstats.tpStats("tps.h5part",nWorkers=4)
+#tpstats.writeStats("tps.stats.h5",stats)
+
+# Standard modules
+import operator
+from concurrent.futures import ProcessPoolExecutor
+
+# Third-party modules
+import numpy as np
+import h5py
+from alive_progress import alive_bar
+
+# Kaipy modules
+import kaipy.kaiH5 as kH5
+import kaipy.kdefs as kdefs
+
+inCut = 0.5 #isIn above this is still in the domain
+opFns = {"<": operator.lt, "<=": operator.le, ">": operator.gt, ">=": operator.ge}
+
+#Derived per-particle quantities, from the equatorial mapping if present
+def calcL(grp):
+	"""
+	L of every particle, the radius of its equatorial crossing (or its radius if there is none).
+
+	Args:
+		grp (h5py.Group): Step group of the h5part file.
+
+	Returns:
+		numpy.ndarray: L of every particle.
+	"""
+	if ("xeq" in grp) and ("yeq" in grp):
+		return np.sqrt(grp["xeq"][()]**2 + grp["yeq"][()]**2)
+	return np.sqrt(grp["x"][()]**2 + grp["y"][()]**2 + grp["z"][()]**2)
+
+def calcMLT(grp):
+	"""
+	Magnetic local time of every particle, from its equatorial crossing (or position if there is none).
+
+	Args:
+		grp (h5py.Group): Step group of the h5part file.
+
+	Returns:
+		numpy.ndarray: MLT [hr] of every particle.
+	"""
+	if ("xeq" in grp) and ("yeq" in grp):
+		x, y = grp["xeq"][()], grp["yeq"][()]
+	else:
+		x, y = grp["x"][()], grp["y"][()]
+	return np.mod(12.0 + np.arctan2(y, x)*12.0/np.pi, 24.0)
+
+derivedVars = {"L": (calcL, ["x", "y", "z"]), "MLT": (calcMLT, ["x", "y"])}
+
+def histSpec(name, vIDs, edges, wID=None, onlyIn=True):
+	"""
+	Specification of a histogram accumulated every step.
+
+	Args:
+		name (str): Name of the histogram.
+		vIDs (list): Variables (or derived quantities, e.g. L and MLT) binned.
+		edges (list): Bin edges for every variable.
+		wID (str, optional): Variable to weight the particles by (default is None, counts).
+		onlyIn (bool, optional): Only count particles still in the domain (default is True).
+
+	Returns:
+		dict: The specification.
+	"""
+	vIDs = list(vIDs)
+	edges = [np.asarray(e, dtype=float) for e in edges]
+	if len(vIDs) != len(edges):
+		raise ValueError("Histogram %s needs one set of edges per variable" % (name))
+	return {"name": name, "vIDs": vIDs, "edges": edges, "wID": wID, "onlyIn": onlyIn}
+
+def crossSpec(name, vID, op, val, onlyIn=False, fromOut=False):
+	"""
+	Specification of a per-particle first crossing, the first step where vID op val holds.
+
+	Args:
+		name (str): Name of the crossing.
+		vID (str): Variable (or derived quantity) tested.
+		op (str): One of <, <=, >, >=.
+		val (float): Threshold.
+		onlyIn (bool, optional): Only count steps where the particle is still in the domain (default is False).
+		fromOut (bool, optional): Only count particles that start on the other side of the threshold,
+			i.e. where vID op val does not hold at their first step (default is False).
+
+	Returns:
+		dict: The specification.
+	"""
+	if op not in opFns:
+		raise ValueError("Unknown comparison %s, use one of %s" % (op, list(opFns.keys())))
+	return {"name": name, "vID": vID, "op": op, "val": float(val), "onlyIn": bool(onlyIn), "fromOut": bool(fromOut)}
+
+def defaultHists():
+	"""
+	Default histograms: energy spectra vs L, pitch angle, and MLT vs L.
+
+	Returns:
+		list: Histogram specifications.
+	"""
+	return [histSpec("KL", ["K", "L"], [np.geomspace(1.0, 1.0e4, 41), np.linspace(1.0, 10.0, 37)]),
+		histSpec("alpha", ["alpha"], [np.linspace(0.0, 180.0, 37)]),
+		histSpec("MLTL", ["MLT", "L"], [np.linspace(0.0, 24.0, 25), np.linspace(1.0, 10.0, 37)])]
+
+def defaultCross():
+	"""
+	Default crossings: loss from the domain, and injection inside geosynchronous orbit
+	of particles that start outside of it and are still in the domain.
+
+	Returns:
+		list: Crossing specifications.
+	"""
+	return [crossSpec("lost", "isIn", "<", inCut), crossSpec("geo", "L", "<", 6.6, onlyIn=True, fromOut=True)]
+
+def hasVar(vIDs, vID):
+	"""
+	Whether a variable (or derived quantity) can be found from the variables of a step.
+
+	Args:
+		vIDs (list): Variables of the step.
+		vID (str): Variable asked for.
+
+	Returns:
+		bool: Whether vID is available.
+	"""
+	if vID in vIDs:
+		return True
+	if vID in derivedVars:
+		return all(v in vIDs for v in derivedVars[vID][1])
+	return False
+
+def getVar(grp, vID, cache):
+	"""
+	Read a variable (or derived quantity) of a step, once per step.
+
+	Args:
+		grp (h5py.Group): Step group of the h5part file.
+		vID (str): Variable.
+		cache (dict): Variables of this step read so far, updated in place.
+
+	Returns:
+		numpy.ndarray: The variable for every particle.
+	"""
+	if vID not in cache:
+		if (vID in derivedVars) and (vID not in grp):
+			cache[vID] = derivedVars[vID][0](grp)
+		else:
+			cache[vID] = grp[vID][()]
+	return cache[vID]
+
+def statsChunk(fname, sIds, hSpecs, cSpecs, idBds):
+	"""
+	Statistics of a range of steps.
+
+	Args:
+		fname (str): The h5part file.
+		sIds (list): Steps of the range, in time order.
+		hSpecs (list): Histogram specifications.
+		cSpecs (list): Crossing specifications.
+		idBds (tuple): Smallest and largest particle ID.
+
+	Returns:
+		dict: Partial statistics, combine with mergeStats.
+	"""
+	Nt = len(sIds)
+	nS, nE = idBds
+	NpT = nE - nS + 1
+	R = {"sIds": np.array(sIds), "T": np.zeros(Nt), "MJD": np.full(Nt, np.nan), "nIn": np.zeros(Nt, dtype=int), "nOut": np.zeros(Nt, dtype=int),
+		"hists": {}, "cross": {}, "cStart": {}}
+	for hS in hSpecs:
+		R["hists"][hS["name"]] = np.zeros((Nt,) + tuple(len(e)-1 for e in hS["edges"]))
+	for cS in cSpecs:
+		R["cross"][cS["name"]] = np.full(NpT, -1, dtype=int)
+		#Whether the crossing already holds at the particle's first step, -1 if not seen yet
+		R["cStart"][cS["name"]] = np.full(NpT, -1, dtype=np.int8)
+
+	with h5py.File(fname, 'r') as hf:
+		for n, s in enumerate(sIds):
+			grp = hf["Step#%d" % (s)]
+			cache = {}
+			R["T"][n] = grp.attrs.get("time")
+			if "MJD" in grp.attrs:
+				R["MJD"][n] = grp.attrs["MJD"]
+			pIdx = getVar(grp, "id", cache).astype(int) - nS
+			if "isIn" in grp:
+				isIn = getVar(grp, "isIn", cache) > inCut
+			else:
+				isIn = np.ones(len(pIdx), dtype=bool)
+			R["nIn"][n] = isIn.sum()
+			R["nOut"][n] = len(isIn) - R["nIn"][n]
+
+			for hS in hSpecs:
+				I = isIn if hS["onlyIn"] else slice(None)
+				Q = np.stack([getVar(grp, vID, cache)[I] for vID in hS["vIDs"]], axis=-1)
+				W = None if hS["wID"] is None else getVar(grp, hS["wID"], cache)[I]
+				R["hists"][hS["name"]][n], _ = np.histogramdd(Q, bins=hS["edges"], weights=W)
+
+			for cS in cSpecs:
+				first = R["cross"][cS["name"]]
+				start = R["cStart"][cS["name"]]
+				isX = opFns[cS["op"]](getVar(grp, cS["vID"], cache), cS["val"])
+				isFirst = start[pIdx] < 0
+				start[pIdx[isFirst]] = isX[isFirst]
+				if cS.get("onlyIn", False):
+					isX = isX & isIn
+				isNew = isX & (first[pIdx] < 0)
+				first[pIdx[isNew]] = s
+	return R
+
+def mergeStats(A, B):
+	"""
+	Combine the statistics of two step ranges, A before B.
+
+	Args:
+		A, B (dict): Statistics from statsChunk (or mergeStats).
+
+	Returns:
+		dict: Statistics of both ranges.
+	"""
+	if A is None:
+		return B
+	R = {}
+	for key in ["sIds", "T", "MJD", "nIn", "nOut"]:
+		R[key] = np.concatenate((A[key], B[key]))
+	R["hists"] = {name: np.concatenate((H, B["hists"][name])) for name, H in A["hists"].items()}
+	#First crossing is A's, unless A never crossed
+	R["cross"] = {name: np.where(X >= 0, X, B["cross"][name]) for name, X in A["cross"].items()}
+	R["cStart"] = {name: np.where(X >= 0, X, B["cStart"][name]) for name, X in A["cStart"].items()}
+	return R
+
+def tpStats(fname, hSpecs=None, cSpecs=None, sIds=None, nChunk=16, nWorkers=1, doVerb=True):
+	"""
+	Population statistics of a CHIMP test-particle run in one pass over its steps.
+
+	The steps are split into ranges of nChunk steps, done by nWorkers processes and merged in time order,
+	memory stays at one step of particles plus the histograms and one integer per particle and crossing.
+
+	Args:
+		fname (str): The h5part file.
+		hSpecs (list, optional): Histogram specifications, see histSpec (default is the defaultHists
+			whose variables are in the file).
+		cSpecs (list, optional): Crossing specifications, see crossSpec (default is the defaultCross
+			whose variables are in the file).
+		sIds (list, optional): Steps to use (default is all).
+		nChunk (int, optional): Number of steps per range (default is 16).
+		nWorkers (int, optional): Number of worker processes (default is 1, serial).
+		doVerb (bool, optional): Show a progress bar (default is True).
+
+	Returns:
+		dict: With keys
+			- sIds, T, MJD: Steps, times and MJDs (NaN if missing).
+			- ids: Particle IDs.
+			- nIn, nOut: Number of particles in and out of the domain every step.
+			- hists: Histograms by name, (Nt, bins...).
+			- cross: First step of every particle's crossing by name, -1 if never.
+			- cTimes: Same as cross as times, NaN if never.
+			- hSpecs, cSpecs: The specifications used.
+	"""
+	if sIds is None:
+		Nt, sIds = kH5.cntSteps(fname)
+	sIds = np.sort(np.atleast_1d(sIds)).astype(int)
+	with h5py.File(fname, 'r') as hf:
+		grp = hf["Step#%d" % (sIds[0])]
+		vIDs = list(grp.keys())
+		ids = grp["id"][()]
+		nS, nE = ids.min(), ids.max()
+	if hSpecs is None:
+		hSpecs = [hS for hS in defaultHists() if all(hasVar(vIDs, v) for v in hS["vIDs"] + [hS["wID"]] if v is not None)]
+	if cSpecs is None:
+		cSpecs = [cS for cS in defaultCross() if hasVar(vIDs, cS["vID"])]
+
+	chunks = [list(sIds[i:i+nChunk]) for i in range(0, len(sIds), nChunk)]
+	args = [(fname, c, hSpecs, cSpecs, (int(nS), int(nE))) for c in chunks]
+	R = None
+	with alive_bar(len(chunks), title="TP stats".ljust(kdefs.barLab), length=kdefs.barLen, bar=kdefs.barDef, disable=not doVerb) as bar:
+		if nWorkers > 1:
+			with ProcessPoolExecutor(max_workers=nWorkers) as executor:
+				for Rc in executor.map(statsChunk, *zip(*args)):
+					R = mergeStats(R, Rc)
+					bar()
+		else:
+			for a in args:
+				R = mergeStats(R, statsChunk(*a))
+				bar()
+
+	#Particles that started past the threshold never cross it
+	cStart = R.pop("cStart")
+	for cS in cSpecs:
+		if cS.get("fromOut", False):
+			R["cross"][cS["name"]][cStart[cS["name"]] == 1] = -1
+	R["ids"] = np.arange(nS, nE+1)
+	R["cTimes"] = {name: crossTimes(X, R["sIds"], R["T"]) for name, X in R["cross"].items()}
+	R["hSpecs"] = hSpecs
+	R["cSpecs"] = cSpecs
+	return R
+
+def crossTimes(first, sIds, T):
+	"""
+	Convert first-crossing steps to times.
+
+	Args:
+		first (numpy.ndarray): First crossing step of every particle, -1 if never.
+		sIds (numpy.ndarray): Steps, increasing.
+		T (numpy.ndarray): Time of every step.
+
+	Returns:
+		numpy.ndarray: First crossing time of every particle, NaN if never.
+	"""
+	idx = np.clip(np.searchsorted(sIds, first), 0, len(sIds)-1)
+	return np.where(first >= 0, T[idx], np.nan)
+
+def writeStats(fOut, stats):
+	"""
+	Write the statistics to a compact HDF5 summary.
+
+	The root has the per-step series and particle IDs, with a group per histogram
+	(H, its edges and variables) and per crossing (first step and time of every particle).
+
+	Args:
+		fOut (str): Output file.
+		stats (dict): Statistics from tpStats.
+	"""
+	with h5py.File(fOut, 'w') as hf:
+		for key in ["sIds", "T", "MJD", "nIn", "nOut", "ids"]:
+			hf.create_dataset(key, data=stats[key])
+		hG = hf.create_group("Hists")
+		for hS in stats["hSpecs"]:
+			gH = hG.create_group(hS["name"])
+			gH.create_dataset("H", data=stats["hists"][hS["name"]], compression="gzip")
+			gH.attrs["vIDs"] = hS["vIDs"]
+			gH.attrs["wID"] = "" if hS["wID"] is None else hS["wID"]
+			gH.attrs["onlyIn"] = hS["onlyIn"]
+			for vID, e in zip(hS["vIDs"], hS["edges"]):
+				gH.create_dataset("edges_%s" % (vID), data=e)
+		cG = hf.create_group("Cross")
+		for cS in stats["cSpecs"]:
+			gC = cG.create_group(cS["name"])
+			gC.create_dataset("step", data=stats["cross"][cS["name"]], compression="gzip")
+			gC.create_dataset("time", data=stats["cTimes"][cS["name"]], compression="gzip")
+			for key in ["vID", "op", "val", "onlyIn", "fromOut"]:
+				gC.attrs[key] = cS[key]
+
+def readStats(fIn):
+	"""
+	Read a summary written by writeStats.
+
+	Args:
+		fIn (str): Summary file.
+
+	Returns:
+		dict: Statistics laid out as returned by tpStats.
+	"""
+	R = {"hists": {}, "cross": {}, "cTimes": {}, "hSpecs": [], "cSpecs": []}
+	with h5py.File(fIn, 'r') as hf:
+		for key in ["sIds", "T", "MJD", "nIn", "nOut", "ids"]:
+			R[key] = hf[key][()]
+		for name, gH in hf["Hists"].items():
+			vIDs = [str(v) for v in gH.attrs["vIDs"]]
+			wID = str(gH.attrs["wID"])
+			edges = [gH["edges_%s" % (vID)][()] for vID in vIDs]
+			R["hSpecs"].append(histSpec(name, vIDs, edges, wID=wID if wID else None, onlyIn=bool(gH.attrs["onlyIn"])))
+			R["hists"][name] = gH["H"][()]
+		for name, gC in hf["Cross"].items():
+			R["cSpecs"].append(crossSpec(name, str(gC.attrs["vID"]), str(gC.attrs["op"]), gC.attrs["val"],
+				onlyIn=bool(gC.attrs.get("onlyIn", False)), fromOut=bool(gC.attrs.get("fromOut", False))))
+			R["cross"][name] = gC["step"][()]
+			R["cTimes"][name] = gC["time"][()]
+	return R
@@ -145,21 +145,25 @@ def GenTStr(Ax, fname, nStp, doVerb=True):
 		str: The generated title string.
 
 	"""
+	# Pull all annotation attributes with one file open (served from the time cache if present)
+	aIDs = ["MJD", "SMR", "SMR_06", "SMR_12", "SMR_18", "SMR_00", "SML", "SMU", "SME"]
+	Q = kh5.PullAtts(fname, aIDs, nStp)
+
 	# Get MJD to UT
-	MJD = kh5.tStep(fname, nStp, aID="MJD")
+	MJD = Q["MJD"] if Q["MJD"] is not None else 0.0
 	utS = ktools.MJD2UT([MJD])
 	utDT = utS[0]
 
 	# Get SMRs/SMLs
-	SMR = kh5.PullAtt(fname, "SMR", nStp)
-	SMR06 = kh5.PullAtt(fname, "SMR_06", nStp)
-	SMR12 = kh5.PullAtt(fname, "SMR_12", nStp)
-	SMR18 = kh5.PullAtt(fname, "SMR_18", nStp)
-	SMR00 = kh5.PullAtt(fname, "SMR_00", nStp)
-
-	SML = kh5.PullAtt(fname, "SML", nStp)
-	SMU = kh5.PullAtt(fname, "SMU", nStp)
-	SME = kh5.PullAtt(fname, "SME", nStp)
+	SMR = Q["SMR"]
+	SMR06 = Q["SMR_06"]
+	SMR12 = Q["SMR_12"]
+	SMR18 = Q["SMR_18"]
+	SMR00 = Q["SMR_00"]
+
+	SML = Q["SML"]
+	SMU = Q["SMU"]
+	SME = Q["SME"]
 
 	tStr = utDT.strftime("%m/%d/%Y\n%H:%M:%S")
 	aStr = "Auroral Indices [nT]\nSME = %8.2f\nSML = %8.2f\nSMU = %8.2f" % (SME, SML, SMU)
@@ -56,16 +56,10 @@ def genEllip(Ni=Ni0,Nj=Nj0,Rin=3.0,Rout=30,TINY=1.0e-8):
 	e = 0.75
 	#B = 0.1
 	#x0 = 0.0
-	for i in range(Ni+1):
-		for j in range(Nj+1):
-			phi = P[j]
-			#e = eI[i]
-			r = Tau[i]*A*(1-e*e)/(1+e*np.cos(phi))
-
-			#XX[i,j] = x0 + A*Tau[i]*np.cos(P[j])
-			#YY[i,j] = B*Tau[i]*np.sin(P[j])
-			XX[i,j] = r*np.cos(P[j])
-			YY[i,j] =r*np.sin(P[j])
+	#Shells along i, angles along j
+	r = Tau[:,None]*A*(1-e*e)/(1+e*np.cos(P[None,:]))
+	XX[:,:] = r*np.cos(P[None,:])
+	YY[:,:] = r*np.sin(P[None,:])
 
 	return XX,YY
 
@@ -91,10 +85,8 @@ def genSph(Ni=Ni0, Nj=Nj0, Rin=3.0, Rout=30, TINY=1.0e-8):
 	YY = np.zeros((Ni + 1, Nj + 1))
 	R = np.linspace(Rin, Rout, Ni + 1)
 	P = np.linspace(0 + TINY, np.pi - TINY, Nj + 1)
-	for i in range(Ni + 1):
-		for j in range(Nj + 1):
-			XX[i, j] = R[i] * np.cos(P[j])
-			YY[i, j] = R[i] * np.sin(P[j])
+	XX[:, :] = R[:, None] * np.cos(P[None, :])
+	YY[:, :] = R[:, None] * np.sin(P[None, :])
 	return XX, YY
 
 
@@ -130,15 +122,8 @@ def genEgg(Ni=Ni0, Nj=Nj0, Rin=3.0, Rout=30.0, xtail=250, NumSph=5, TINY=1.0e-8,
 	xx = np.zeros((Ni + 1, Nj + 1))
 	yy = np.zeros((Ni + 1, Nj + 1))
 
-	for j in range(Nj + 1):
-		for i in range(Ni + 1):
-			th = theta[j]
-			A = (np.cos(th) / a[i]) ** 2.0 + (np.sin(th) / b[i]) ** 2.0
-			B = -2 * np.cos(th) * x0[i] / a[i] ** 2.0
-			C = x0[i] ** 2.0 / a[i] ** 2.0 - 1.0
-			r = (-B + np.sqrt(B * B - 4 * A * C)) / (2 * A)
-			xx[i, j] = r * np.cos(th)
-			yy[i, j] = r * np.sin(th)
+	# Intersect every ray (j) with every shell (i)
+	xx[:, :], yy[:, :] = rayEllipse(theta[None, :], x0[:, None], a[:, None], b[:, None])
 	
 	return xx, yy
 
@@ -185,56 +170,67 @@ def genFatEgg(Ni=Ni0,Nj=Nj0,Rin=3.0,Rout=30.0,xtail=250,NumSph=5,TINY=1.0e-8,A=0
 	
 	AScl = 3*A
 
-	for i in range(Ni+1):
-		#Calculate theta profile for this shell
-		xTi = np.abs(x0[i]-a[i])
-		
-		theta = L*eta + A*(xC-L*eta)*(1-eta)*eta #Lines of constant phi
-		if (xTi>xSun):
-			#Outer region, keep tailward near-axis region packed tightly
-			Ai = A - (A-AScl)*RampUp(xTi,xSun,xBack)
-			thTail = L*eta + Ai*(xC-L*eta)*(1-eta)*eta
-			#Only use back half (past half-way)
-			theta[Nj//2:] = thTail[Nj//2:]
-
-		for j in range(Nj+1):
-			th = theta[j]
-			Ae = (np.cos(th)/a[i])**2.0 + (np.sin(th)/b[i])**2.0
-			Be = -2*np.cos(th)*x0[i]/a[i]**2.0
-			Ce = x0[i]**2.0/a[i]**2.0 - 1.0
-			r = (-Be+np.sqrt(Be*Be-4*Ae*Ce))/(2*Ae)
-
-			xx[i,j] = r*np.cos(th)
-			
-			taui = min(tau0*RampUp(1.0*i,i1,di),1.0)
-			tauscl = taui*(xx[i,j])/a[i]
-			tau = min(1.0+tauscl,1)
-			yy[i,j] = r*np.sin(th)/np.sqrt(tau)				
+	#Theta profile of every shell, lines of constant phi
+	theta = np.tile(L*eta + A*(xC-L*eta)*(1-eta)*eta,(Ni+1,1))
+	xTi = np.abs(x0-a)
+	isOut = xTi>xSun
+	#Outer region, keep tailward near-axis region packed tightly
+	Ai = A - (A-AScl)*RampUp(xTi,xSun,xBack)
+	thTail = L*eta[None,:] + Ai[:,None]*(xC-L*eta[None,:])*(1-eta[None,:])*eta[None,:]
+	#Only use back half (past half-way)
+	theta[isOut,Nj//2:] = thTail[isOut,Nj//2:]
+
+	xE,yE = rayEllipse(theta,x0[:,None],a[:,None],b[:,None])
+	xx[:,:] = xE
 
+	taui = np.minimum(tau0*RampUp(1.0*np.arange(Ni+1),i1,di),1.0)
+	tauscl = taui[:,None]*xx/a[:,None]
+	tau = np.minimum(1.0+tauscl,1)
+	yy[:,:] = yE/np.sqrt(tau)
 
 	return xx,yy
 
+def rayEllipse(th, x0, a, b):
+	"""
+	Intersect rays from the origin with x-shifted ellipses.
+
+	Positive root of the quadratic for r along a ray at angle th, for the ellipse
+	((x-x0)/a)^2 + (y/b)^2 = 1. All arguments are broadcast together.
+
+	Args:
+		th (ndarray): Ray angles from the +x axis [rad].
+		x0 (ndarray): Centers of the ellipses.
+		a (ndarray): Semi-axes along x.
+		b (ndarray): Semi-axes along y.
+
+	Returns:
+		tuple: x and y of the intersections.
+	"""
+	Ae = (np.cos(th)/a)**2.0 + (np.sin(th)/b)**2.0
+	Be = -2*np.cos(th)*x0/a**2.0
+	Ce = x0**2.0/a**2.0 - 1.0
+	r = (-Be+np.sqrt(Be*Be-4*Ae*Ce))/(2*Ae)
+	return r*np.cos(th),r*np.sin(th)
+
 def RampUp(r, rC, lC):
 	"""
 	Calculate the ramp-up value based on the given parameters.
 
 	Args:
-		r (float): The input value.
+		r (float or ndarray): The input value(s).
 		rC (float): The center value for the ramp-up.
 		lC (float): The length of the ramp-up.
 
 	Returns:
-		float: The ramp-up value.
+		float or ndarray: The ramp-up value(s), same shape as r.
 
 	"""
-	rScl = (r - rC) / lC
-	if rScl <= 0:
-		M = 0
-	elif rScl >= 1.0:
-		M = 1.0
-	else:
-		eArg = -1.0 / (rScl * rScl)
-		M = np.exp(1.0) * np.exp(eArg)
+	rScl = (np.asarray(r, dtype=float) - rC) / lC
+	isIn = (rScl > 0) & (rScl < 1.0)
+	rIn = np.where(isIn, rScl, 1.0)
+	M = np.where(isIn, np.exp(1.0) * np.exp(-1.0 / (rIn * rIn)), np.where(rScl >= 1.0, 1.0, 0.0))
+	if M.ndim == 0:
+		return float(M)
 	return M
 
 
@@ -272,10 +268,8 @@ def Egglipses(Ni=Ni0,Nj=Nj0,Rin=3.0,Rout=30.0,rtail=250.0,NumSph=5):
 
 	dx[0:NumSph-1] = d1
 	dx[NumSph-1:] = np.linspace(d1,d2,Ni-NumSph+2)
-	xs[0] = Rin
-
-	for i in range(Ni):
-		xs[i+1] = xs[i]+dx[i]
+	#Running sums, accumulated in the same order as a shell by shell loop
+	xs[:] = np.cumsum(np.concatenate(([Rin],dx[:Ni])))
 
 	#Now compute tailward x values
 	#d2 = 40.0/(NI/32.0) #Max dx
@@ -285,13 +279,10 @@ def Egglipses(Ni=Ni0,Nj=Nj0,Rin=3.0,Rout=30.0,rtail=250.0,NumSph=5):
 	yp = np.tanh(xp)+1
 	zp = (d2-d1)*yp+d1
 	xe = np.zeros(Ni+1)
-	xe[0] = -Rin
-
 	dx[0:NumSph-1] = d1
 	dx[NumSph-1:] = zp
 
-	for i in range(Ni):
-		xe[i+1] = xe[i]-dx[i]
+	xe[:] = np.cumsum(np.concatenate(([-Rin],-dx[:Ni])))
 
 	#Now compute Y
 	d2 = 9.0/(NI/32.0)
@@ -303,9 +294,7 @@ def Egglipses(Ni=Ni0,Nj=Nj0,Rin=3.0,Rout=30.0,rtail=250.0,NumSph=5):
 	dy[0:NumSph-1] = d1
 	dy[NumSph-1:] = zp
 
-	yc[0] = Rin
-	for i in range(Ni):
-		yc[i+1] = yc[i]+dy[i]
+	yc[:] = np.cumsum(np.concatenate(([Rin],dy[:Ni])))
 
 	#Ellipse calculations
 	a = 0.5*(xs-xe)
@@ -401,14 +390,11 @@ def GenKSphNonU(Ni=Ni0,Nj=Nj0,Nk=Nk0,Rin=5,Rout=40,tMin=0.2,tMax=0.8):
 			sys.exit("Ghost cell region includes the spherical axis. This is not implemented yet.")
 
 	nu = np.linspace(0,1,Ni+1)
-	r0 = []
-	r1 = [((Rout - Rin)*(x*x+x)/2. + Rin) for x in nu]
+	r1 = (Rout - Rin)*(nu*nu+nu)/2. + Rin
 	dxN = Rout - ((Rout-Rin)*(nu[Ni-1]*nu[Ni-1]+nu[Ni-1])/2. + Rin)
 	dx0 = (Rout-Rin)*(nu[1]*nu[1]+nu[1])/2.
-	for i in range(Ng):
-			r1.append(Rout + (i+1)*dxN)
-			r0.append(Rin - (Ng-i)*dx0)
-	r = r0 + r1
+	nG = np.arange(Ng)
+	r = np.concatenate((Rin - (Ng-nG)*dx0, r1, Rout + (nG+1)*dxN))
 
 	t = np.linspace(tMin-Ng*dx2,tMax+Ng*dx2,Ngj)*np.pi
 	p = np.linspace(-Ng*dx3,1.+Ng*dx3,Ngk)*2*np.pi
@@ -461,25 +447,19 @@ def GenKSphNonUGL(Ni=Ni0,Nj=Nj0,Nk=Nk0,Rin=5,Rout=40,tMin=0.2,tMax=0.8):
 	Nwl = 194
 	Rmid = 64.5
 	dtau = np.arctan((Rmid-Rin)/Rin)/Nwl  #dtau in radians
-	r1 = [Rin + Rin*(np.tan(i*dtau)) for i in range(Nwl+1)] #194 cells
+	rWL = Rin + Rin*(np.tan(np.arange(Nwl+1)*dtau)) #194 cells
 
 	Nout = Ni - Nwl
 	coeff = (Rout-Rmid)/Nout*2.-0.9-0.9
-	dr = [0.9 + coeff*i/(Nout-1) for i in range(Nout)]
-
-	r = Rmid
-	for i in range(Nout):
-			r = r + dr[i]
-			r1.append(r)
+	dr = 0.9 + coeff*np.arange(max(Nout,0))/(Nout-1)
+	#Running sum from Rmid, in the same order as a cell by cell loop
+	rOut = np.cumsum(np.concatenate(([Rmid],dr)))[1:]
+	r1 = np.concatenate((rWL,rOut))
 
 	dx0 = r1[1] - r1[0]
 	dxN = r1[Ni] - r1[Ni-1]
-	r0 = [ ]
-
-	for i in range(Ng):
-			r1.append(Rout + (i+1)*dxN)
-			r0.append(Rin - (Ng-i)*dx0)
-	r = r0 + r1
+	nG = np.arange(Ng)
+	r = np.concatenate((Rin - (Ng-nG)*dx0, r1, Rout + (nG+1)*dxN))
 
 	t = np.linspace(tMin-Ng*dx2,tMax+Ng*dx2,Ngj)*np.pi
 	p = np.linspace(-Ng*dx3,1.+Ng*dx3,Ngk)*2*np.pi
@@ -553,11 +533,10 @@ def Aug2D(XX,YY,doEps=False,TINY=1.0e-8,KeepOut=True,Rpx=1.15):
 		drAvg = (R0-Rpx-TINY)/Ng
 	pIn = PP[0,:]
 
-	#Do inner I, active J
-	for i in range(1,Ng+1):
-		rIn = R0-i*drAvg
-		xxG[iS-i,jS:jE] = rIn*np.cos(pIn)
-		yyG[iS-i,jS:jE] = rIn*np.sin(pIn)
+	#Do inner I, active J, ghost shell i at R0-i*drAvg
+	rIn = R0-np.arange(Ng,0,-1)[:,None]*drAvg
+	xxG[iS-Ng:iS,jS:jE] = rIn*np.cos(pIn)
+	yyG[iS-Ng:iS,jS:jE] = rIn*np.sin(pIn)
 	
 
 	#Do outer I, active J
@@ -585,11 +564,9 @@ def Aug2D(XX,YY,doEps=False,TINY=1.0e-8,KeepOut=True,Rpx=1.15):
 	
 	#Dx[0:J4] = (xS-xOut[0:J4])/Ng
 
-	for i in range(0,Ng):
-		xxG[iE+i,jS:jE] = xOut+(i+1)*dO*Dx/nD
-		yyG[iE+i,jS:jE] = yOut+(i+1)*dO*Dy/nD
-
-
+	nO = np.arange(1,Ng+1)[:,None]
+	xxG[iE:iE+Ng,jS:jE] = xOut+nO*dO*Dx/nD
+	yyG[iE:iE+Ng,jS:jE] = yOut+nO*dO*Dy/nD
 
 	#Now finish by doing all J boundaries
 	#Just reflect about X-axis
@@ -641,6 +618,33 @@ def Aug2Dext(XX,YY,Nadd):
 	return xxG, yyG
 
 
+#Cell spacings used for ring recommendations
+def ringSpacing(XX, YY, Nk=64):
+	"""
+	Cell spacings of the 2D grid once rotated about the X-axis into Nk wedges.
+
+	Args:
+		XX (ndarray): Array of x-coordinates (corners).
+		YY (ndarray): Array of y-coordinates (corners).
+		Nk (int): Number of divisions about the axis. Default is 64.
+
+	Returns:
+		tuple: dI (radial), dJ (polar) and dK (about the axis) spacings, each (Ni,Nj).
+	"""
+	dTh = 2 * np.pi / Nk
+	rr = np.sqrt(XX ** 2.0 + YY ** 2.0)
+	pp = np.arctan2(YY, XX)
+	# Corners of every cell, (i,j) (i,j+1) (i+1,j) (i+1,j+1)
+	c00 = (slice(None, -1), slice(None, -1))
+	c01 = (slice(None, -1), slice(1, None))
+	c10 = (slice(1, None), slice(None, -1))
+	c11 = (slice(1, None), slice(1, None))
+	dI = 0.5 * (rr[c10] + rr[c11]) - 0.5 * (rr[c00] + rr[c01])
+	dP = 0.5 * (pp[c01] + pp[c11]) - 0.5 * (pp[c00] + pp[c10])
+	Rc = 0.25 * (rr[c00] + rr[c01] + rr[c10] + rr[c11])
+	Yc = 0.25 * (YY[c00] + YY[c01] + YY[c10] + YY[c11])
+	return dI, Rc * dP, Yc * dTh
+
 #Do ring recommendations
 def genRing(XX, YY, Nk=64, Tol=1.0, doVerb=False):
 	"""
@@ -654,59 +658,42 @@ def genRing(XX, YY, Nk=64, Tol=1.0, doVerb=False):
 		doVerb (bool): Flag to enable verbose output. Default is False.
 
 	Returns:
-		None
+		tuple: Safe and aggressive number of chunks for each ring (0 for rings that don't need it).
 
 	"""
-	Ni = XX.shape[0] - 1
 	Nj = XX.shape[1] - 1
-	dTh = 2 * np.pi / Nk
-	# For each ring (j), calculate max ring value
-	rr = np.sqrt(XX ** 2.0 + YY ** 2.0)
-	pp = np.arctan2(YY, XX)
-	dI = np.zeros((Ni, Nj))
-	dJ = np.zeros((Ni, Nj))
-	dK = np.zeros((Ni, Nj))
-	for i in range(Ni):
-		for j in range(Nj):
-			dR = 0.5 * (rr[i + 1, j] + rr[i + 1, j + 1]) - 0.5 * (rr[i, j] + rr[i, j + 1])
-			dP = 0.5 * (pp[i, j + 1] + pp[i + 1, j + 1]) - 0.5 * (pp[i, j] + pp[i + 1, j])
-			Rc = 0.25 * (rr[i, j] + rr[i, j + 1] + rr[i + 1, j] + rr[i + 1, j + 1])
-			Yc = 0.25 * (YY[i, j] + YY[i, j + 1] + YY[i + 1, j] + YY[i + 1, j + 1])
-
-			dI[i, j] = dR
-			dJ[i, j] = Rc * dP
-			dK[i, j] = Yc * dTh
+	dI, dJ, dK = ringSpacing(XX, YY, Nk)
 	Nrng = Nj // 2
 
+	# For each ring (j) and its mirror (-j), calculate max ring value
+	kiMax = np.max(dK / dI, axis=0)
+	kjMax = np.max(dK / dJ, axis=0)
+	nP = np.arange(Nrng)
+	nM = (-nP) % max(Nj, 1)
+	dkoMax = np.max(np.stack([kiMax[nP], kjMax[nP], kiMax[nM], kjMax[nM]]), axis=0)
+	dRng = dkoMax / Tol
+	isRng = dRng <= 1.0
+
+	# Do safe and aggressive
 	NChs = np.zeros(Nrng, dtype=int)
 	NCha = np.zeros(Nrng, dtype=int)
-	rS = []
-	for n in range(Nrng):
-		kiP = np.max(dK[:, n] / dI[:, n])
-		kjP = np.max(dK[:, n] / dJ[:, n])
-		kiM = np.max(dK[:, -n] / dI[:, -n])
-		kjM = np.max(dK[:, -n] / dJ[:, -n])
-		dkoMax = np.max([kiP, kjP, kiM, kjM])
-		dRng = dkoMax / Tol
-		# Do safe and aggressive
-		djRs = int(2 ** np.floor(np.log2(Tol / dkoMax)))
-		djRa = int(2 ** np.ceil(np.log2(Tol / dkoMax)))
-
-		if dRng <= 1.0:
-			if doVerb:
-				print("Ring %d, MaxScl = %5.3f" % (n + 1, 1 / dRng))
-				# print("Ring %d, MaxChunk = %5.3f"%(n+1,Nk*dRng))
-			# print("\tChunking: %d (Safe) / %d (Aggressive)"%(djRs,djRa))
-			rS.append("%4.2f" % (Nk * dkoMax))
-			if djRs >= 2:
-				NChs[n] = Nk / djRs
-			if djRa >= 2:
-				NCha[n] = Nk / djRa
-
-	# print(rS)
+	with np.errstate(divide='ignore', invalid='ignore', over='ignore'):
+		lScl = np.log2(Tol / np.where(isRng, dkoMax, 1.0))
+	djRs = (2 ** np.floor(lScl)).astype(int)
+	djRa = (2 ** np.ceil(lScl)).astype(int)
+	isS = isRng & (djRs >= 2)
+	isA = isRng & (djRa >= 2)
+	NChs[isS] = Nk / djRs[isS]
+	NCha[isA] = Nk / djRa[isA]
+
+	if doVerb:
+		for n in np.nonzero(isRng)[0]:
+			print("Ring %d, MaxScl = %5.3f" % (n + 1, 1 / dRng[n]))
+
 	PrintRing(NChs, "Safe")
 	if doVerb:
 		PrintRing(NCha, "Aggressive", doWarn=True)
+	return NChs, NCha
 
 
 def PrintRing(NCh, rID="safe", doWarn=False):
@@ -771,39 +758,27 @@ def Aug3D(xxG, yyG, Nk=32, TINY=1.0e-8):
 	# Angle about axis including ghosts
 	A = np.linspace(0, 2 * np.pi, Nk + 1)
 
-	for n in range(Nk + 1):
-		X3[:, :, kS + n] = xxG
-		Y3[:, :, kS + n] = yyG * np.cos(A[n])
-		Z3[:, :, kS + n] = yyG * np.sin(A[n])
+	X3[:, :, kS:kE] = xxG[:, :, None]
+	Y3[:, :, kS:kE] = yyG[:, :, None] * np.cos(A)[None, None, :]
+	Z3[:, :, kS:kE] = yyG[:, :, None] * np.sin(A)[None, None, :]
 
 	# K is periodic so ensure the last entry equals the first
 	X3[:, :, kE - 1] = X3[:, :, kS]
 	Y3[:, :, kE - 1] = Y3[:, :, kS]
 	Z3[:, :, kE - 1] = Z3[:, :, kS]
 
-	# Correct K periodic ghosts
-	for i in range(0, Ng):
-		ip = i + 1
-		X3[:, :, kS - ip] = X3[:, :, kE - 1 - ip]
-		Y3[:, :, kS - ip] = Y3[:, :, kE - 1 - ip]
-		Z3[:, :, kS - ip] = Z3[:, :, kE - 1 - ip]
-		X3[:, :, kE - 1 + ip] = X3[:, :, kS + ip]
-		Y3[:, :, kE - 1 + ip] = Y3[:, :, kS + ip]
-		Z3[:, :, kE - 1 + ip] = Z3[:, :, kS + ip]
-
-	# Correct J reflective ghosts
-	for k in range(0, nFk):
-		kp = k + Nk // 2
-		if kp >= kE - 1:
-			kp = k - Nk // 2
-		for i in range(0, Ng):
-			ip = i + 1
-			X3[:, jS - ip, k] = X3[:, jS + ip, kp]
-			Y3[:, jS - ip, k] = Y3[:, jS + ip, kp]
-			Z3[:, jS - ip, k] = Z3[:, jS + ip, kp]
-			X3[:, jE - 1 + ip, k] = X3[:, jE - 1 - ip, kp]
-			Y3[:, jE - 1 + ip, k] = Y3[:, jE - 1 - ip, kp]
-			Z3[:, jE - 1 + ip, k] = Z3[:, jE - 1 - ip, kp]
+	# Correct K periodic ghosts, kS-ip <- kE-1-ip and kE-1+ip <- kS+ip
+	for Q in (X3, Y3, Z3):
+		Q[:, :, kS - Ng:kS] = Q[:, :, kE - 1 - Ng:kE - 1]
+		Q[:, :, kE:kE + Ng] = Q[:, :, kS + 1:kS + 1 + Ng]
+
+	# Correct J reflective ghosts from the half-turn opposite k
+	kp = np.arange(nFk) + Nk // 2
+	kp = np.where(kp >= kE - 1, kp - 2 * (Nk // 2), kp)
+	ip = np.arange(1, Ng + 1)
+	for Q in (X3, Y3, Z3):
+		Q[:, jS - ip, :] = Q[:, jS + ip, :][:, :, kp]
+		Q[:, jE - 1 + ip, :] = Q[:, jE - 1 - ip, :][:, :, kp]
 
 	# Force points to plane
 	Z3[:, :, Ng] = 0.0
@@ -992,29 +967,20 @@ def regrid(xxi, yyi, Ni, Nj, Rin=0.0, Rout=0.0, TINY=1.0e-8, scale=False):
 		dxScl = (xSclOut - xSclIn)
 
 		# Now rescale each i shell
-		for i in range(Ni0 + 1):
-			rScl = xSclIn + iLFM[i] * dxScl
-			rr0[i, :] = rScl * rr0[i, :]
+		rr0 = (xSclIn + iLFM[:, None] * dxScl) * rr0
 
 	# Create interpolants using RectBivariateSpline
 	fR = RectBivariateSpline(iLFM, jLFM, rr0, kx=3, ky=3)
 	fP = RectBivariateSpline(iLFM, jLFM, pp0, kx=3, ky=3)
 
-	# Regrid onto new
-	XXi = np.zeros((Ni + 1, Nj + 1))
-	YYi = np.zeros((Ni + 1, Nj + 1))
-
+	# Regrid onto new, evaluating the splines on the whole (si,sj) grid at once
 	si = np.linspace(0, 1, Ni + 1)
 	sj = np.linspace(0, 1, Nj + 1)
-	for i in range(Ni + 1):
-		for j in range(Nj + 1):
-			r = fR(si[i], sj[j])[0, 0]
-			phi = fP(si[i], sj[j])[0, 0]
-			phi = np.maximum(TINY, phi)
-			phi = np.minimum(np.pi - TINY, phi)
+	r = fR(si, sj)
+	phi = np.clip(fP(si, sj), TINY, np.pi - TINY)
 
-			XXi[i, j] = r * np.cos(phi)
-			YYi[i, j] = r * np.sin(phi)
+	XXi = r * np.cos(phi)
+	YYi = r * np.sin(phi)
 
 	# vgm: added scaling option to extend the grid for low Mach numbers
 	# needs playing around with the numbers below
@@ -1026,9 +992,9 @@ def regrid(xxi, yyi, Ni, Nj, Rin=0.0, Rout=0.0, TINY=1.0e-8, scale=False):
 		scale[nscl // 2:] = 1.25  # 1.5
 		scale[3 * nscl // 4:] = 1.5  # 2.
 		scale[-4:] = 2.  # 4.
-		for i in np.arange(1, Ni + 1):
-			XXi[i, :] = XXi[i - 1, :] + scale[i - 1] * dx[i - 1, :]
-			YYi[i, :] = YYi[i - 1, :] + scale[i - 1] * dy[i - 1, :]
+		# Running sums down i, in the same order as a shell by shell loop
+		XXi = np.cumsum(np.concatenate((XXi[:1, :], scale[:, None] * dx)), axis=0)
+		YYi = np.cumsum(np.concatenate((YYi[:1, :], scale[:, None] * dy)), axis=0)
 
 	return XXi, YYi
 
@@ -0,0 +1,281 @@
+#Single-pass comparison of two Gamera runs
+#Both runs are streamed rank block by rank block, accumulating error norms and per-plane error maps
+#so only one block of each run is ever in memory
+
+#Initialize,
+#gsphP = gampp.GameraPipe(fdirP,ftagP) ; gsphO = gampp.GameraPipe(fdirO,ftagO)
+#Q = gamcomp.compareRuns(gsphP,gsphO,["Bx","By","Bz"],meanAxes=[2],nWorkers=4)
+#Q["relL1"] is then the per-cell mean relative error of every step
+
+# Standard modules
+import itertools
+from concurrent.futures import ProcessPoolExecutor
+
+# Third-party modules
+import numpy as np
+import h5py
+from alive_progress import alive_bar
+
+# Kaipy modules
+import kaipy.kdefs as kdefs
+import kaipy.kaiH5 as kh5
+
+tinyBase = np.finfo(np.float32).tiny #Stand-in for base fields that are exactly 0
+normIDs = ["absL1", "absL2", "absLinf", "relL1", "relL2", "relLinf"]
+
+def gridShape(gsph):
+	"""
+	Shape of the global (cell-centered) grid of a pipe.
+
+	Args:
+		gsph (GameraPipe): The pipe.
+
+	Returns:
+		tuple: (Ni,Nj) for 2D runs, (Ni,Nj,Nk) otherwise.
+	"""
+	if gsph.is2D:
+		return (gsph.Ni, gsph.Nj)
+	return (gsph.Ni, gsph.Nj, gsph.Nk)
+
+def rankBlocks(gsph):
+	"""
+	File and global index bounds of every rank block of a pipe.
+
+	Args:
+		gsph (GameraPipe): The pipe.
+
+	Returns:
+		list: (fname, bounds) for every rank, bounds being one slice per grid dimension.
+	"""
+	Nd = len(gridShape(gsph))
+	if not gsph.isMPI:
+		fIn = gsph.fdir + "/" + gsph.ftag + ".h5"
+		return [(fIn, tuple(slice(0, N) for N in gridShape(gsph)))]
+	dNs = (gsph.dNi, gsph.dNj, gsph.dNk)[:Nd]
+	blocks = []
+	for (i, j, k) in itertools.product(range(gsph.Ri), range(gsph.Rj), range(gsph.Rk)):
+		fIn = gsph.fdir + "/" + kh5.genName(gsph.ftag, i, j, k, gsph.Ri, gsph.Rj, gsph.Rk)
+		bds = tuple(slice(n*dN, (n+1)*dN) for n, dN in zip((i, j, k), dNs))
+		blocks.append((fIn, bds))
+	return blocks
+
+def overlapBounds(bdsA, bdsB):
+	"""
+	Overlap of two blocks.
+
+	Args:
+		bdsA, bdsB (tuple): One slice per dimension, global indices.
+
+	Returns:
+		tuple or None: Global slices of the overlap, None if the blocks do not overlap.
+	"""
+	bds = tuple(slice(max(a.start, b.start), min(a.stop, b.stop)) for a, b in zip(bdsA, bdsB))
+	if any(s.start >= s.stop for s in bds):
+		return None
+	return bds
+
+def readBlock(gStp, vID, bds, bds0):
+	"""
+	Read part of a rank's variable.
+
+	Args:
+		gStp (h5py.Group): Step group of the rank file.
+		vID (str): Variable name.
+		bds (tuple): Global slices to read.
+		bds0 (tuple): Global slices of the whole rank block.
+
+	Returns:
+		numpy.ndarray: The variable in (i,j,k) order.
+	"""
+	loc = tuple(slice(s.start-s0.start, s.stop-s0.start) for s, s0 in zip(bds, bds0))
+	#Data is stored (k,j,i)
+	return gStp[vID][loc[::-1]].T
+
+def newStats(shape, meanAxes=()):
+	"""
+	Empty accumulators for a comparison.
+
+	Args:
+		shape (tuple): Global grid shape.
+		meanAxes (list): Axes to produce per-plane mean error maps along.
+
+	Returns:
+		dict: Accumulated sums, maxima and (per-plane) map sums.
+	"""
+	Q = {"N": 0, "absSum": 0.0, "absSq": 0.0, "absLinf": 0.0, "relSum": 0.0, "relSq": 0.0, "relLinf": 0.0}
+	for ax in meanAxes:
+		mShape = tuple(N for n, N in enumerate(shape) if n != ax)
+		Q["absMap%d" % (ax)] = np.zeros(mShape)
+		Q["relMap%d" % (ax)] = np.zeros(mShape)
+	return Q
+
+def addBlock(Q, bds, dataP, dataO, meanAxes=()):
+	"""
+	Add the errors of one block to the accumulators.
+
+	As msphViz.CalcTotalErrAbs/Rel, the cell error is the norm over the fields
+	of O-P and the relative error divides it by the norm of P.
+
+	Args:
+		Q (dict): Accumulators from newStats, updated in place.
+		bds (tuple): Global slices of the block.
+		dataP, dataO (list): The block of every field for both runs.
+		meanAxes (list): Axes of the per-plane maps.
+	"""
+	dAbs = 0.0
+	dBase = 0.0
+	for P, O in zip(dataP, dataO):
+		dAbs = dAbs + np.square(O - P)
+		dBase = dBase + np.square(P)
+	dAbs = np.sqrt(dAbs)
+	dBase = np.sqrt(dBase)
+	dBase[dBase == 0] = tinyBase
+	dRel = np.absolute(dAbs/dBase)
+
+	Q["N"] += dAbs.size
+	for eID, E in [("abs", dAbs), ("rel", dRel)]:
+		Q[eID+"Sum"] += E.sum()
+		Q[eID+"Sq"] += np.square(E).sum()
+		Q[eID+"Linf"] = max(Q[eID+"Linf"], E.max())
+		for ax in meanAxes:
+			mBds = tuple(s for n, s in enumerate(bds) if n != ax)
+			Q["%sMap%d" % (eID, ax)][mBds] += E.sum(axis=ax)
+
+def finishStats(Q, shape, meanAxes=()):
+	"""
+	Turn the accumulators into norms and mean error maps.
+
+	Args:
+		Q (dict): Accumulators from newStats/addBlock.
+		shape (tuple): Global grid shape.
+		meanAxes (list): Axes of the per-plane maps.
+
+	Returns:
+		dict: With keys
+			- absL1, relL1: Per-cell mean absolute/relative error.
+			- absL2, relL2: Root mean square of the absolute/relative error.
+			- absLinf, relLinf: Largest absolute/relative error.
+			- absMap<ax>, relMap<ax>: Mean error along axis ax, for every ax of meanAxes.
+	"""
+	N = max(Q["N"], 1)
+	R = {"absL1": Q["absSum"]/N, "absL2": np.sqrt(Q["absSq"]/N), "absLinf": Q["absLinf"],
+		"relL1": Q["relSum"]/N, "relL2": np.sqrt(Q["relSq"]/N), "relLinf": Q["relLinf"]}
+	for ax in meanAxes:
+		for eID in ["abs", "rel"]:
+			R["%sMap%d" % (eID, ax)] = Q["%sMap%d" % (eID, ax)]/shape[ax]
+	return R
+
+def compareStep(blocksP, blocksO, shape, sID, fieldNames, meanAxes=()):
+	"""
+	Compare one step of two runs, streaming the overlaps of their rank blocks.
+
+	The two runs can have different MPI decompositions of the same grid.
+
+	Args:
+		blocksP, blocksO (list): rankBlocks of the two runs.
+		shape (tuple): Global grid shape.
+		sID (int): Step number, or None for root variables.
+		fieldNames (list): Fields making up the error.
+		meanAxes (list): Axes to produce per-plane mean error maps along.
+
+	Returns:
+		dict: See finishStats.
+	"""
+	gID = "/" if sID is None else "/Step#%d" % (sID)
+	Q = newStats(shape, meanAxes)
+	for fP, bdsP in blocksP:
+		with h5py.File(fP, 'r') as hP:
+			for fO, bdsO in blocksO:
+				bds = overlapBounds(bdsP, bdsO)
+				if bds is None:
+					continue
+				with h5py.File(fO, 'r') as hO:
+					dataP = [readBlock(hP[gID], fn, bds, bdsP) for fn in fieldNames]
+					dataO = [readBlock(hO[gID], fn, bds, bdsO) for fn in fieldNames]
+				addBlock(Q, bds, dataP, dataO, meanAxes)
+	return finishStats(Q, shape, meanAxes)
+
+def pipeStep(gsphP, gsphO, sID, fieldNames, meanAxes=()):
+	"""
+	Compare one step of two pipes, see compareStep.
+
+	Args:
+		gsphP, gsphO (GameraPipe): The predicted and observed (reference) runs.
+		sID (int): Step number.
+		fieldNames (list): Fields making up the error.
+		meanAxes (list): Axes to produce per-plane mean error maps along.
+
+	Returns:
+		dict: See finishStats.
+
+	Raises:
+		ValueError: If the runs have different grids.
+	"""
+	shape = checkGrids(gsphP, gsphO)
+	return compareStep(rankBlocks(gsphP), rankBlocks(gsphO), shape, sID, fieldNames, meanAxes)
+
+def checkGrids(gsphP, gsphO):
+	"""
+	Check two pipes are on the same grid.
+
+	Args:
+		gsphP, gsphO (GameraPipe): The two runs.
+
+	Returns:
+		tuple: The shared grid shape.
+
+	Raises:
+		ValueError: If the grids differ.
+	"""
+	shape = gridShape(gsphP)
+	if gridShape(gsphO) != shape:
+		raise ValueError("Runs have different grids, %s and %s" % (shape, gridShape(gsphO)))
+	return shape
+
+def compareRuns(gsphP, gsphO, fieldNames, sIds=None, meanAxes=(), nWorkers=1, doVerb=True):
+	"""
+	Compare many steps of two runs in one pass over their data.
+
+	Every step is streamed block by block (see compareStep), steps are spread over nWorkers processes.
+
+	Args:
+		gsphP, gsphO (GameraPipe): The predicted and observed (reference) runs.
+		fieldNames (list): Fields making up the error, e.g. ["Bx","By","Bz"].
+		sIds (array, optional): Steps to compare (default is all steps of gsphP).
+		meanAxes (list, optional): Axes to produce per-plane mean error maps along (default is none).
+		nWorkers (int, optional): Number of worker processes (default is 1, serial).
+		doVerb (bool, optional): Show a progress bar (default is True).
+
+	Returns:
+		dict: sIds, and the keys of finishStats stacked over steps, norms (Nt,) and maps (Nt,...).
+
+	Raises:
+		ValueError: If the runs have different grids.
+	"""
+	shape = checkGrids(gsphP, gsphO)
+	if sIds is None:
+		sIds = np.sort(gsphP.sids)
+	sIds = np.atleast_1d(sIds).astype(int)
+	Nt = len(sIds)
+	blocksP = rankBlocks(gsphP)
+	blocksO = rankBlocks(gsphO)
+	args = [(blocksP, blocksO, shape, int(s), list(fieldNames), tuple(meanAxes)) for s in sIds]
+
+	R = {"sIds": sIds}
+	def addStep(n, Rs):
+		for key, V in Rs.items():
+			if key not in R:
+				R[key] = np.zeros((Nt,) + np.shape(V))
+			R[key][n] = V
+
+	with alive_bar(Nt, title="Comparing".ljust(kdefs.barLab), length=kdefs.barLen, bar=kdefs.barDef, disable=not doVerb) as bar:
+		if nWorkers > 1:
+			with ProcessPoolExecutor(max_workers=nWorkers) as executor:
+				for n, Rs in enumerate(executor.map(compareStep, *zip(*args))):
+					addStep(n, Rs)
+					bar()
+		else:
+			for n, a in enumerate(args):
+				addStep(n, compareStep(*a))
+				bar()
+	return R
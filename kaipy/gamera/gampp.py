@@ -3,9 +3,12 @@
 
 # Standard modules
 import glob
+import os
+import time
 
 # Third-party modules
 import numpy as np
+import h5py
 import itertools
 from concurrent.futures import ProcessPoolExecutor, as_completed
 from alive_progress import alive_bar
@@ -90,6 +93,10 @@ class GameraPipe(object):
 		self.hasUT = False
 		self.UT = []
 
+		#Files/stat used by Refresh to follow a run in progress
+		self.fTails = []
+		self.tailStat = None
+
 		#Scrape data from directory
 		self.OpenPipe(doVerbose)
 
@@ -215,6 +222,144 @@ class GameraPipe(object):
 		self.GetGrid(doVerbose)
 		self.f0 = f0
 
+		#First and last rank, a step is only complete once both have it
+		if (self.isMPI):
+			fN = self.fdir + "/" + kh5.genName(self.ftag,self.Ri-1,self.Rj-1,self.Rk-1,self.Ri,self.Rj,self.Rk)
+			self.fTails = [f0] if (fN == f0) else [f0,fN]
+		else:
+			self.fTails = [f0]
+		self.tailStat = self.TailStat()
+
+	def TailStat(self):
+		"""
+		Cheap signature (size, modification time) of the files Refresh looks at.
+
+		Returns:
+			list: (st_size, st_mtime_ns) of each file in fTails, None if missing.
+		"""
+		sts = []
+		for fIn in self.fTails:
+			try:
+				st = os.stat(fIn)
+				sts.append((st.st_size,st.st_mtime_ns))
+			except OSError:
+				sts.append(None)
+		return sts
+
+	def NewSteps(self,fIn,useSWMR=True):
+		"""
+		Finds the complete steps after sFin in a file that may still be written.
+
+		Steps are probed one at a time from sFin+1, so the cost only depends on
+		the number of new steps. A step counts once it holds all of the step
+		variables. The file is opened as an SWMR reader when possible.
+
+		Args:
+			fIn (str): The file to check.
+			useSWMR (bool): Try to open the file as an SWMR reader. Default is True.
+
+		Returns:
+			sIds (np.ndarray): The new steps.
+			T (np.ndarray): Their times.
+			MJDs (np.ndarray): Their MJDs (-inf if not present).
+		"""
+		hf = None
+		if (useSWMR):
+			try:
+				hf = h5py.File(fIn,'r',libver='latest',swmr=True)
+			except (OSError,ValueError):
+				hf = None
+		if (hf is None):
+			hf = h5py.File(fIn,'r')
+
+		sIds = [] ; T = [] ; MJDs = []
+		with hf:
+			n = self.sFin+1
+			while ("Step#%d"%(n) in hf):
+				gStp = hf["Step#%d"%(n)]
+				if (not all(vID in gStp for vID in self.vIDs)):
+					break
+				sIds.append(n)
+				T.append(gStp.attrs.get("time",0.0))
+				MJDs.append(gStp.attrs.get("MJD",-np.inf))
+				n = n+1
+		return np.array(sIds,dtype=int),np.array(T,dtype=float),np.array(MJDs,dtype=float)
+
+	def Refresh(self,callback=None,useSWMR=True,doVerbose=False):
+		"""
+		Picks up steps appended since the pipe was opened (or last refreshed).
+
+		Nothing is opened if the size/modification time of the files is
+		unchanged. Otherwise new Step#N groups are looked for in the first
+		(and, for MPI, last) rank file and sids/T/MJDs/UT/Nt/sFin are extended
+		in place.
+
+		Args:
+			callback (callable, optional): Called as callback(self,newIds) when there are new steps. Default is None.
+			useSWMR (bool): Try to open the files as an SWMR reader. Default is True.
+			doVerbose (bool): Print the new steps. Default is False.
+
+		Returns:
+			np.ndarray: The new step IDs (empty if none).
+		"""
+		noNew = np.array([],dtype=int)
+		tailStat = self.TailStat()
+		if (tailStat == self.tailStat):
+			return noNew
+
+		newIds = None
+		for fIn in self.fTails:
+			sIds,T,MJDs = self.NewSteps(fIn,useSWMR)
+			if (newIds is None):
+				newIds,newT,newMJDs = sIds,T,MJDs
+			else:
+				#Keep what every file has
+				Nn = min(len(newIds),len(sIds))
+				newIds,newT,newMJDs = newIds[:Nn],newT[:Nn],newMJDs[:Nn]
+		#A step still being written changes the stat again once it's done
+		self.tailStat = tailStat
+		if (len(newIds) == 0):
+			return noNew
+
+		self.sids = np.append(self.sids,newIds)
+		self.Nt = len(self.sids)
+		self.sFin = self.sids.max()
+		if (self.doFast):
+			self.T = np.append(self.T,np.zeros(len(newIds)))
+		else:
+			self.T = np.append(self.T,newT)
+		if (self.hasMJD):
+			self.MJDs = np.append(self.MJDs,newMJDs)
+			self.UT = list(self.UT) + MJD2UT(list(newMJDs))
+		if (doVerbose):
+			print("Found %d new steps, [%d,%d]"%(len(newIds),newIds.min(),newIds.max()))
+		if (callback is not None):
+			callback(self,newIds)
+		return newIds
+
+	def Follow(self,callback=None,dtPoll=60.0,tIdle=None,useSWMR=True,doVerbose=True):
+		"""
+		Follows a run in progress, calling Refresh every dtPoll seconds.
+
+		Args:
+			callback (callable, optional): Called as callback(self,newIds) for each batch of new steps. Default is None.
+			dtPoll (float): Seconds between checks. Default is 60.
+			tIdle (float, optional): Stop after this many seconds without new steps, None to follow forever. Default is None.
+			useSWMR (bool): Try to open the files as an SWMR reader. Default is True.
+			doVerbose (bool): Print the new steps. Default is True.
+
+		Returns:
+			None
+		"""
+		tLast = time.time()
+		while True:
+			newIds = self.Refresh(callback,useSWMR,doVerbose)
+			if (len(newIds) > 0):
+				tLast = time.time()
+			elif (tIdle is not None) and (time.time()-tLast >= tIdle):
+				break
+			time.sleep(dtPoll)
+
 	def SetUnits(self, f0):
 		"""
 		Sets the units for the given file.
@@ -4,7 +4,6 @@
 import glob
 
 # Third-party modules
-from scipy.interpolate import griddata
 import numpy as np
 import h5py
 from astropy.time import Time
@@ -12,6 +11,7 @@ from astropy.time import Time
 # Kaipy modules
 import kaipy.gamera.remixpp as remixpp
 import kaipy.kaiH5 as kh5
+import kaipy.gridLocator as gl
 from kaipy.kdefs import *
 import kaipy.gamera.gampp
 from kaipy.gamera.gampp import GameraPipe
@@ -60,6 +60,9 @@ class GamsphPipe(GameraPipe):
 		self.xxi = [] ; self.yyi = []
 		self.xxc = [] ; self.yyc = []
 
+		#Cached streamline interpolation weights, keyed by (xyBds,dx)
+		self.streamCache = {}
+
 		GameraPipe.__init__(self,fdir,ftag,doFast=doFast)
 
 		self.Rin = self.xxi[0,0]
@@ -502,33 +505,8 @@ class GamsphPipe(GameraPipe):
 			gM (ndarray): Interpolated magnitude of velocity values on the Cartesian grid.
 		"""
 
-
-		N1 = int((xyBds[1] - xyBds[0]) / dx)
-		N2 = int((xyBds[3] - xyBds[2]) / dx)
-
-		# Create matching Cartesian grid
-		x1 = np.linspace(xyBds[0], xyBds[1], N1)
-		y1 = np.linspace(xyBds[2], xyBds[3], N2)
-
-		xx1, yy1 = np.meshgrid(x1, y1)
-		r1 = np.sqrt(xx1 ** 2.0 + yy1 ** 2.0)
-		# Flatten and interpolate
-		px = self.xxc.flatten()
-		py = self.yyc.flatten()
-		pu = U.flatten()
-		pv = V.flatten()
-		pMag = np.sqrt(U ** 2.0 + V ** 2.0).flatten()
-
-		gu = griddata(zip(px, py), pu, (xx1, yy1), method='linear', fill_value=0.0)
-		gv = griddata(zip(px, py), pv, (xx1, yy1), method='linear', fill_value=0.0)
-		gM = griddata(zip(px, py), pMag, (xx1, yy1), method='linear', fill_value=0.0)
-
-		kOut = (r1 <= self.Rin * 1.01)
-		gu[kOut] = 0.0
-		gv[kOut] = 0.0
-		gM[kOut] = 0.0
-
-		return x1, y1, gu, gv, gM
+		#Weights are built once per (xyBds,dx) and reused for every step
+		return gl.streamGrid(self.streamCache, self.xxc, self.yyc, self.Rin, U, V, xyBds, dx)
 
 
 	#Replacement for remixpp adding inset remix plots
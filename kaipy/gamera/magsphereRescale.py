@@ -6,7 +6,6 @@
 import h5py
 import numpy as np
 import scipy
-from scipy.spatial import ConvexHull
 
 # Kaipy modules
 import kaipy.kaiH5 as kh5
@@ -200,6 +199,99 @@ def PullRestartMPI(bStr, nRes, Ri, Rj, Rk, dIn=None, oH5=None):
 	return G, M, G0, oG, oM
 
 
+#------
+#Block (2x) refinement/coarsening engine
+#------
+
+def blockSum(Q, axes, n=2):
+	"""
+	Sum over n-blocks of cells along the given axes.
+
+	Trailing cells that don't fill a whole block are dropped.
+
+	Args:
+		Q (ndarray): Input array.
+		axes (tuple of int): Axes to coarsen.
+		n (int, optional): Block size. Default is 2.
+
+	Returns:
+		ndarray: Array with Q.shape[a]//n cells along each axis a in axes.
+	"""
+	axes = sorted([a % Q.ndim for a in axes])
+	slc = tuple(slice(0, n*(N//n)) if a in axes else slice(None) for a, N in enumerate(Q.shape))
+	Q = Q[slc]
+	shp = []
+	for a, N in enumerate(Q.shape):
+		shp.extend([N//n, n] if a in axes else [N])
+	#Position of the block axes in the reshaped array
+	bAx = tuple(a + 1 + axes.index(a) for a in axes)
+	return Q.reshape(shp).sum(axis=bAx)
+
+def blockMean(Q, axes, n=2):
+	"""
+	Average over n-blocks of cells along the given axes, see blockSum.
+	"""
+	return blockSum(Q, axes, n)/n**len(axes)
+
+def blockRep(Q, axes, n=2):
+	"""
+	Repeat each cell n times along the given axes.
+
+	Args:
+		Q (ndarray): Input array.
+		axes (tuple of int): Axes to refine.
+		n (int, optional): Block size. Default is 2.
+
+	Returns:
+		ndarray: Array with n*Q.shape[a] cells along each axis a in axes.
+	"""
+	for a in axes:
+		Q = np.repeat(Q, n, axis=a)
+	return Q
+
+def gasTotals(G, dV):
+	"""
+	Total (volume integrated) content of each species/variable.
+
+	This is the quantity that downGas/upGas conserve.
+
+	Args:
+		G (ndarray): Gas variables, (Ns,Nv,Nk,Nj,Ni).
+		dV (ndarray): Cell volumes, (Nk,Nj,Ni).
+
+	Returns:
+		ndarray: Totals of shape (Ns,Nv).
+	"""
+	return (G*dV).sum(axis=(-3, -2, -1))
+
+def fluxTotals(M):
+	"""
+	Net flux through each boundary of the domain, (Nd,2) for the low/high faces.
+
+	This is the quantity that downFlux/upFlux conserve.
+
+	Args:
+		M (ndarray): Face fluxes, (Nd,Nk+1,Nj+1,Ni+1).
+
+	Returns:
+		ndarray: Boundary fluxes of shape (3,2).
+	"""
+	return np.array([[M[IDIR,:-1,:-1, 0].sum(), M[IDIR,:-1,:-1,-1].sum()],
+					 [M[JDIR,:-1, 0,:-1].sum(), M[JDIR,:-1,-1,:-1].sum()],
+					 [M[KDIR, 0,:-1,:-1].sum(), M[KDIR,-1,:-1,:-1].sum()]])
+
+def printTotals(Tc, Tf):
+	"""
+	Print the coarse/fine conservation check of gasTotals for each species/variable.
+	"""
+	Ns, Nv = Tc.shape
+	for s in range(Ns):
+		for v in range(Nv):
+			print("\tSpecies %d, Variable %d"%(s,v))
+			print("\t\tCoarse (Total) = %e"%(Tc[s,v]))
+			print("\t\tFine   (Total) = %e"%(Tf[s,v]))
+
+
 #Downscale a grid (with ghosts, k-j-i order)
 def downGrid(X,Y,Z):
 	"""
@@ -234,13 +326,9 @@ def downGrid(X,Y,Z):
 	NjD = Nj//2
 	NkD = Nk//2
 
-	rrD = np.zeros((NiD+1,NjD+1))
-	ppD = np.zeros((NiD+1,NjD+1))
-
-	for i in range(NiD+1):
-		for j in range(NjD+1):
-			rrD[i,j] = rr[2*i,2*j]
-			ppD[i,j] = pp[2*i,2*j]
+	# Keep every other corner
+	rrD = rr[0:2*NiD+1:2,0:2*NjD+1:2]
+	ppD = pp[0:2*NiD+1:2,0:2*NjD+1:2]
 
 	# Convert back to 2D Cartesian
 	xxD = rrD*np.cos(ppD)
@@ -293,28 +381,15 @@ def upGrid(X,Y,Z):
 	rrH = np.zeros((NiH+1,NjH+1))
 	ppH = np.zeros((NiH+1,NjH+1))
 
-	#Embed old points into new grid
-	for i in range(Ni+1):
-		for j in range(Nj+1):
-			rrH[2*i,2*j] = rr[i,j]
-			ppH[2*i,2*j] = pp[i,j]
-
-	#Create I midpoints
-	for i in range(Ni):
-		rrH[2*i+1,:] = 0.5*( rrH[2*i,:] + rrH[2*i+2,:] )
-		ppH[2*i+1,:] = 0.5*( ppH[2*i,:] + ppH[2*i+2,:] )
-
-	#Create J midpoints
-	for j in range(Nj):
-		rrH[:,2*j+1] = 0.5*( rrH[:,2*j] + rrH[:,2*j+2])
-		ppH[:,2*j+1] = 0.5*( ppH[:,2*j] + ppH[:,2*j+2])
-
-	#Create I-J midpoints
-	for i in range(Ni):
-		for j in range(Nj):
-			rrH[2*i+1,2*j+1] = 0.25*( rrH[2*i,2*j] + rrH[2*i,2*j+2] + rrH[2*i+2,2*j] + rrH[2*i+2,2*j+2] )
-			ppH[2*i+1,2*j+1] = 0.25*( ppH[2*i,2*j] + ppH[2*i,2*j+2] + ppH[2*i+2,2*j] + ppH[2*i+2,2*j+2] )
-
+	for qq,qqH in [(rr,rrH),(pp,ppH)]:
+		#Embed old points into new grid
+		qqH[0::2,0::2] = qq
+		#Create I midpoints
+		qqH[1::2,0::2] = 0.5*( qqH[0:-1:2,0::2] + qqH[2::2,0::2] )
+		#Create J midpoints
+		qqH[:,1::2] = 0.5*( qqH[:,0:-1:2] + qqH[:,2::2] )
+		#Create I-J midpoints
+		qqH[1::2,1::2] = 0.25*( qqH[0:-1:2,0:-1:2] + qqH[0:-1:2,2::2] + qqH[2::2,0:-1:2] + qqH[2::2,2::2] )
 
 	#Convert back to 2D Cartesian
 	xxH = rrH*np.cos(ppH)
@@ -340,144 +415,68 @@ def downVolt(G):
 	Returns:
 		ndarray: Downscaled array of shape (Nd, Nk//2, Nj//2, Ni) representing the downscaled volt variables.
 	"""
-	Nd, Nk, Nj, Ni = G.shape
-	Gu = np.zeros((Nd, Nk//2, Nj//2, Ni))
 	print("Downscaling volt variables gBAvg etc...")
-	# Loop over fine grid
-	for d in range(Nd):
-		for i in range(Ni):
-			for k in range(Nk//2):
-				for j in range(Nj//2):
-					j0 = 2*j
-					k0 = 2*k
-					Gjk = G[d, k0:k0+2, j0:j0+2, i].mean()
-					Gu[d, k, j, i] = Gjk
-	return Gu
+	#Average 2x2 blocks in k-j
+	return blockMean(G, (1, 2))
 
 
 #Upscale gBAvg variable (G) on grid X,Y,Z to doubled grid with simple linear interpolation.
 #Typical size at quad for example: gBAvg                    Dataset {3, 128, 96, 1}
 def upVolt(G):
-	def upVolt(G):
-		"""
-		Upscales the volt variables in the input array G.
-
-		Args:
-			G (ndarray): Input array representing the volt variables.
-
-		Returns:
-			ndarray: Upscaled array of volt variables.
-
-		Raises:
-			None
-
-		"""
-		try:
-			Nd, Nk, Nj, Ni = G.shape
-			Gu = np.zeros((Nd, 2*Nk, 2*Nj, Ni))
-			print("Upscaling volt variables gBAvg etc...")
-			# Loop over coarse grid
-			for d in range(Nd):
-				for i in range(Ni):
-					for k in range(Nk):
-						for j in range(Nj):
-							Gjk = G[d, k, j, i]
-							j0 = 2*j
-							k0 = 2*k
-							Gu[d, k0:k0+2, j0:j0+2, i] = Gjk
-		except:
-			Nd, Nk, Nj, Ni, Nh = G.shape
-			Gu = np.zeros((Nd, 2*Nk, 2*Nj, Ni, Nh))
-			print("Upscaling volt variables gBHist etc...")
-			print(G.shape)
-			# Loop over coarse grid
-			for h in range(Nh):
-				for d in range(Nd):
-					for i in range(Ni):
-						for k in range(Nk):
-							for j in range(Nj):
-								Gjk = G[d, k, j, i, h]
-								j0 = 2*j
-								k0 = 2*k
-								Gu[d, k0:k0+2, j0:j0+2, i, h] = Gjk
-		return Gu
-	try:
-		Nd, Nk, Nj, Ni = G.shape
-		Gu = np.zeros((Nd, 2*Nk, 2*Nj, Ni))
+	"""
+	Upscales the volt variables in the input array G.
+
+	Args:
+		G (ndarray): Input array representing the volt variables, (Nd,Nk,Nj,Ni)
+			or (Nd,Nk,Nj,Ni,Nh) for histories like gBHist.
+
+	Returns:
+		ndarray: Upscaled array of volt variables, each k-j cell repeated 2x2.
+	"""
+	if G.ndim == 4:
 		print("Upscaling volt variables gBAvg etc...")
-		# Loop over coarse grid
-		for d in range(Nd):
-			for i in range(Ni):
-				for k in range(Nk):
-					for j in range(Nj):
-						Gjk = G[d, k, j, i]
-						j0 = 2*j
-						k0 = 2*k
-						Gu[d, k0:k0+2, j0:j0+2, i] = Gjk
-	except:
-		Nd, Nk, Nj, Ni, Nh = G.shape
-		Gu = np.zeros((Nd, 2*Nk, 2*Nj, Ni, Nh))
+	else:
 		print("Upscaling volt variables gBHist etc...")
 		print(G.shape)
-		# Loop over coarse grid
-		for h in range(Nh):
-			for d in range(Nd):
-				for i in range(Ni):
-					for k in range(Nk):
-						for j in range(Nj):
-							Gjk = G[d, k, j, i, h]
-							j0 = 2*j
-							k0 = 2*k
-							Gu[d, k0:k0+2, j0:j0+2, i, h] = Gjk
-	return Gu
+	return blockRep(G, (1, 2))
 
 
 #Downscale gas variable (G) on grid X,Y,Z (w/ ghosts) to halved grid
 def downGas(X,Y,Z,G,Xd,Yd,Zd):
 	"""
-	Downscale gas variables from a coarse grid to a fine grid.
+	Downscale gas variables from a fine grid to a coarse grid, conserving
+	the volume integrated content of each variable.
 
 	Args:
-		X (ndarray): X-coordinates of the coarse grid.
-		Y (ndarray): Y-coordinates of the coarse grid.
-		Z (ndarray): Z-coordinates of the coarse grid.
-		G (ndarray): Gas variables on the coarse grid.
-		Xd (ndarray): X-coordinates of the fine grid.
-		Yd (ndarray): Y-coordinates of the fine grid.
-		Zd (ndarray): Z-coordinates of the fine grid.
+		X (ndarray): X-coordinates of the fine grid.
+		Y (ndarray): Y-coordinates of the fine grid.
+		Z (ndarray): Z-coordinates of the fine grid.
+		G (ndarray): Gas variables on the fine grid.
+		Xd (ndarray): X-coordinates of the coarse grid.
+		Yd (ndarray): Y-coordinates of the coarse grid.
+		Zd (ndarray): Z-coordinates of the coarse grid.
 
 	Returns:
-		ndarray: Gas variables downscaled to the fine grid.
+		ndarray: Gas variables downscaled to the coarse grid.
 	"""
-	Ns,Nv,Nk,Nj,Ni = G.shape
 	dV  = Volume(X ,Y ,Z )
 	dVd = Volume(Xd,Yd,Zd)
 	print("Volume ratio (Coarse/Fine) = %f"%(dVd.sum()/dV.sum()))
-	Gd = np.zeros((Ns,Nv,Nk//2,Nj//2,Ni//2))
 	print("Downscaling gas variables ...")
 
-	#Loop over coarse grid
-	for s in range(Ns):
-		for v in range(Nv):
-			print("\tDownscaling Species %d, Variable %d"%(s,v))
-			for k in range(Nk//2):
-				for j in range(Nj//2):
-					for i in range(Ni//2):
-						dVijk = dV[2*k:2*k+2,2*j:2*j+2,2*i:2*i+2] #Volumes of the finer subgrid
-						dQijk = G[s,v,2*k:2*k+2,2*j:2*j+2,2*i:2*i+2] #stuff density in finer subgrid
-						#Stuff in the subchunk
-						QdV = (dVijk*dQijk).sum()
-						Gd[s,v,k,j,i] = QdV/dVd[k,j,i] #Scale back to density
-			#Test conservation
-			print("\t\tCoarse (Total) = %e"%(Gd[s,v,:,:,:]*dVd).sum())
-			print("\t\tFine   (Total) = %e"%(G [s,v,:,:,:]*dV ).sum())
+	#Stuff in each 2x2x2 chunk of the finer grid, scaled back to density
+	Gd = blockSum(G*dV, (2, 3, 4))/dVd
+
+	#Test conservation
+	printTotals(gasTotals(Gd,dVd), gasTotals(G,dV))
 
 	return Gd
 	
 #Upscale gas variable (G) on grid X,Y,Z (w/ ghosts) to doubled grid
 def upGas(X, Y, Z, G, Xu, Yu, Zu):
 	"""
-	Upscales gas variables from a coarse grid to a finer grid.
+	Upscales gas variables from a coarse grid to a finer grid, conserving
+	the volume integrated content of each variable.
 
 	Args:
 		X (ndarray): Coarse grid X coordinates.
@@ -490,34 +489,19 @@ def upGas(X, Y, Z, G, Xu, Yu, Zu):
 
 	Returns:
 		ndarray: Upscaled gas variables on the fine grid.
-
-	Raises:
-		None
-
 	"""
-	Ns, Nv, Nk, Nj, Ni = G.shape
-
 	dV = Volume(X, Y, Z)
 	dVu = Volume(Xu, Yu, Zu)
 
 	print("Volume ratio (Coarse/Fine) = %f" % (dV.sum() / dVu.sum()))
-	Gu = np.zeros((Ns, Nv, 2 * Nk, 2 * Nj, 2 * Ni))
 	print("Upscaling gas variables ...")
-	# Loop over coarse grid
-	for s in range(Ns):
-		for v in range(Nv):
-			print("\tUpscaling Species %d, Variable %d" % (s, v))
-			for k in range(Nk):
-				for j in range(Nj):
-					for i in range(Ni):
-						QdV = G[s, v, k, j, i] * dV[k, j, i]
-						dVijk = dVu[2 * k:2 * k + 2, 2 * j:2 * j + 2, 2 * i:2 * i + 2]  # Volumes of the finer subgrid
-						vScl = dVijk.sum()  # Total volume of the finer subchunks
-						QdVu = QdV * (dVijk / vScl)  # Give weighted contribution to each subcell
-						Gu[s, v, 2 * k:2 * k + 2, 2 * j:2 * j + 2, 2 * i:2 * i + 2] = QdVu / dVijk  # Scale back to density
-			# Test conservation
-			print("\t\tCoarse (Total) = %e" % (G[s, v, :, :, :] * dV).sum())
-			print("\t\tFine   (Total) = %e" % (Gu[s, v, :, :, :] * dVu).sum())
+	#Each coarse cell's content is spread over its 8 subcells in proportion to their volume,
+	#i.e. every subcell gets the density content/(total subcell volume)
+	vScl = blockSum(dVu, (0, 1, 2))
+	Gu = blockRep(G*dV/vScl, (2, 3, 4))
+
+	#Test conservation
+	printTotals(gasTotals(G,dV), gasTotals(Gu,dVu))
 	return Gu
 
 
@@ -536,24 +520,19 @@ def upRCMCpl(Q, N=1):
 	Examples:
 		>>> Q = np.array([[1, 2], [3, 4]])
 		>>> upRCMCpl(Q)
-		array([[1., 1., 2.],
-			   [1., 1., 2.],
-			   [3., 3., 4.]])
+		array([[1., 2.],
+			   [1., 2.],
+			   [3., 4.],
+			   [3., 4.]])
 	"""
 	Nd = len(Q.shape)
 	if (Nd >= 3):
-		Nk, Ni, Nj = Q.shape
-		Qr = np.zeros((Nk, Ni * 2, Nj))
-		for n in range(Nk):
-			Qr[n, :, :] = upRCM1D(Q[n, :, :])
+		Qr = blockRep(np.asarray(Q, dtype=float), (1,))
 	elif (Nd == 1):
 		# Just leave it alone
 		if (len(Q) == N):
 			# Upscale the one dimension
-			Q2D = np.zeros((N, 1))
-			Q2D[:, 0] = Q
-			Qr2D = upRCM1D(Q2D)
-			Qr = Qr2D[:, 0]
+			Qr = upRCM1D(Q[:, None])[:, 0]
 		else:
 			Qr = Q
 	else:
@@ -583,16 +562,10 @@ def upRCM(Q, Ni=1, Nj=1, Nk=1):
 	"""
 	Nd = len(Q.shape)
 	if (Nd >= 3):
-		Nk = Q.shape[0]
-		Qr = np.zeros((Nk, (Nj-2)*2+2, Ni))
-		for n in range(Nk):
-			Qr[n, :, :] = upRCM1Dw(Q[n, :, :])
+		Qr = upRCM1Dw(Q, axis=1)
 	elif (Nd == 1):
 		if (len(Q) == Nj):
-			Q2D = np.zeros((Nj, 1))
-			Q2D[:, 0] = Q
-			Qr2D = upRCM1Dw(Q2D)
-			Qr = Qr2D[:, 0]
+			Qr = upRCM1Dw(Q[:, None])[:, 0]
 		else:
 			Qr = Q
 	else:
@@ -601,25 +574,22 @@ def upRCM(Q, Ni=1, Nj=1, Nk=1):
 
 
 #Upscale first dimension of 2D array w/ strange rcm-wrap
-def upRCM1Dw(Q):
+def upRCM1Dw(Q, axis=0):
 	"""
 	Upscale the input array Q for RCM using its wrapping method.
 
 	Parameters:
-	Q (ndarray): Input array of shape (Ni, Nj).
+	Q (ndarray): Input array of shape (Ni, Nj), or any shape with the wrapped dimension along axis.
+	axis (int, optional): Dimension to upscale. Default is 0.
 
 	Returns:
-	Qr (ndarray): Upscaled array of shape (Nri, Nj).
+	Qr (ndarray): Upscaled array of shape (Nri, Nj), Nri = 2*(Ni-2)+2.
 	"""
-	Ni, Nj = Q.shape
-	Nip = Ni - 2
-	Nri = Nip * 2 + 2
-	Qr = np.zeros((Nri, Nj))
-	Qr[0:Nri-2, :] = upRCM1D(Q[0:-2, :])
-
-	Qr[Nri-2, :] = Qr[0, :]
-	Qr[Nri-1, :] = Qr[1, :]
-	return Qr
+	Q = np.moveaxis(np.asarray(Q, dtype=float), axis, 0)
+	Qr = blockRep(Q[0:-2], (0,))
+	#Periodic wrap of the last two points
+	Qr = np.concatenate((Qr, Qr[0:2]), axis=0)
+	return np.moveaxis(Qr, 0, axis)
 
 
 #Upscale just first dimension of 2D array
@@ -633,15 +603,7 @@ def upRCM1D(Q):
 	Returns:
 		ndarray: Rescaled array of shape (2*Ni, Nj).
 	"""
-	Ni, Nj = Q.shape
-	Qr = np.zeros((Ni*2, Nj))
-	for j in range(Nj):
-		for i in range(Ni):
-			Qij = Q[i, j]
-			i0 = 2*i
-			j0 = j
-			Qr[i0:i0+2, j0] = Qij
-	return Qr
+	return blockRep(np.asarray(Q, dtype=float), (0,))
 
 
 #Upscale mix variable
@@ -655,17 +617,7 @@ def upMIX(Q):
 	Returns:
 		ndarray: Upscaled matrix of shape (2*Ni, 2*Nj).
 	"""
-	Ni, Nj = Q.shape
-
-	Qr = np.zeros((2*Ni, 2*Nj))
-	for j in range(Nj):
-		for i in range(Ni):
-			Qij = Q[i, j]
-			i0 = 2*i
-			j0 = 2*j
-			Qr[i0:i0+2, j0:j0+2] = Qij
-
-	return Qr
+	return blockRep(np.asarray(Q, dtype=float), (0, 1))
 
 
 #Downscale mix variable
@@ -679,17 +631,7 @@ def downMIX(Q):
 	Returns:
 		ndarray: Downmixed matrix of shape (Ni//2, Nj//2).
 	"""
-	Ni, Nj = Q.shape
-	Qr = np.zeros((Ni//2, Nj//2))
-
-	# Loop over coarse grid
-	for j in range(Nj//2):
-		for i in range(Ni//2):
-			i0 = 2*i
-			j0 = 2*j
-			Qij = Q[i0:i0+2, j0:j0+2].mean()
-			Qr[i, j] = Qij
-	return Qr
+	return blockMean(Q, (0, 1))
 
 	
 #Return cell centered volume (active only) from grid X,Y,Z (w/ ghosts)
@@ -697,6 +639,11 @@ def Volume(Xg, Yg, Zg):
 	"""
 	Calculate the volume of a grid.
 
+	Cells are treated as trilinear hexahedra, their volume is the integral of
+	the Jacobian of the trilinear map, which 2x2x2 Gauss quadrature
+	evaluates exactly. For convex cells with planar faces this is the volume
+	of the convex hull of the 8 corners.
+
 	Args:
 		Xg (ndarray): X-coordinate grid.
 		Yg (ndarray): Y-coordinate grid.
@@ -712,26 +659,27 @@ def Volume(Xg, Yg, Zg):
 	Nj = Ngj - 2 * NumG - 1
 	Ni = Ngi - 2 * NumG - 1
 
-	X = Xg[NumG:-NumG, NumG:-NumG, NumG:-NumG]
-	Y = Yg[NumG:-NumG, NumG:-NumG, NumG:-NumG]
-	Z = Zg[NumG:-NumG, NumG:-NumG, NumG:-NumG]
-
 	print("Calculating volume of grid of size (%d,%d,%d)" % (Ni, Nj, Nk))
 
-	dV = np.zeros((Nk, Nj, Ni))
-	ijkPts = np.zeros((8, 3))
+	# Assuming LFM-like symmetry, only the first k layer is needed
+	P = [Q[NumG:NumG+2, NumG:-NumG, NumG:-NumG] for Q in (Xg, Yg, Zg)]
+	#Corner (a,b,c) of each cell in k,j,i
+	C = {(a,b,c): np.stack([Q[a, b:b+Nj, c:c+Ni] for Q in P]) for a in (0,1) for b in (0,1) for c in (0,1)}
 
-	# Assuming LFM-like symmetry
-	k = 0
-	for j in range(Nj):
-		for i in range(Ni):
-			ijkPts[:, 0] = X[k:k + 2, j:j + 2, i:i + 2].flatten()
-			ijkPts[:, 1] = Y[k:k + 2, j:j + 2, i:i + 2].flatten()
-			ijkPts[:, 2] = Z[k:k + 2, j:j + 2, i:i + 2].flatten()
+	gP = [0.5 - 0.5/np.sqrt(3), 0.5 + 0.5/np.sqrt(3)]
+	L  = lambda n, t: t if n else 1.0 - t
+	dL = lambda n: 1.0 if n else -1.0
 
-			dV[:, j, i] = ConvexHull(ijkPts, incremental=False).volume
+	dV = np.zeros((Nj, Ni))
+	for u in gP:
+		for v in gP:
+			for w in gP:
+				Ju = sum(dL(a)*L(b,v)*L(c,w)*Q for (a,b,c),Q in C.items())
+				Jv = sum(L(a,u)*dL(b)*L(c,w)*Q for (a,b,c),Q in C.items())
+				Jw = sum(L(a,u)*L(b,v)*dL(c)*Q for (a,b,c),Q in C.items())
+				dV += 0.125*np.abs(np.einsum('i...,i...->...', Ju, np.cross(Jv, Jw, axis=0)))
 
-	return dV
+	return np.broadcast_to(dV, (Nk, Nj, Ni)).copy()
 
 
 #Downscale magnetic fluxes (M) on grid X,Y,Z (w/ ghosts) to halved grid
@@ -756,29 +704,15 @@ def downFlux(X,Y,Z,M,Xu,Yu,Zu):
 	Nk = Nkc-1
 	Nj = Njc-1
 	Ni = Nic-1
+	NkD = Nk//2 ; NjD = Nj//2 ; NiD = Ni//2
 
-	Md = np.zeros((Nd,Nk//2+1,Nj//2+1,Ni//2+1))
+	Md = np.zeros((Nd,NkD+1,NjD+1,NiD+1))
 
-	#Loop over coarse grid cells
+	#Coarse faces are the sum of the 2x2 fine faces they cover
 	print("Downscaling face fluxes ...")
-	for k in range(Nk//2):
-		for j in range(Nj//2):
-			for i in range(Ni//2):
-				ip = 2*i
-				jp = 2*j
-				kp = 2*k
-
-				#West/east i faces
-				Md[IDIR,k  ,j  ,i  ] = M[IDIR,kp:kp+2,jp:jp+2,ip  ].sum()
-				Md[IDIR,k  ,j  ,i+1] = M[IDIR,kp:kp+2,jp:jp+2,ip+2].sum()
-
-				#South/north j faces
-				Md[JDIR,k  ,j  ,i  ] = M[JDIR,kp:kp+2,jp  ,ip:ip+2].sum()
-				Md[JDIR,k  ,j+1,i  ] = M[JDIR,kp:kp+2,jp+2,ip:ip+2].sum()
-				
-				#Bottom/top k faces
-				Md[KDIR,k  ,j  ,i  ] = M[KDIR,kp  ,jp:jp+2,ip:ip+2].sum()
-				Md[KDIR,k+1,j  ,i  ] = M[KDIR,kp+2,jp:jp+2,ip:ip+2].sum()
+	Md[IDIR,:NkD,:NjD,:] = blockSum(M[IDIR,:2*NkD,:2*NjD,0:2*NiD+1:2], (0, 1))
+	Md[JDIR,:NkD,:,:NiD] = blockSum(M[JDIR,:2*NkD,0:2*NjD+1:2,:2*NiD], (0, 2))
+	Md[KDIR,:,:NjD,:NiD] = blockSum(M[KDIR,0:2*NkD+1:2,:2*NjD,:2*NiD], (1, 2))
 
 	return Md
 
@@ -806,41 +740,16 @@ def upFlux(X,Y,Z,M,Xu,Yu,Zu):
 
 	Mu = np.zeros((Nd,2*Nk+1,2*Nj+1,2*Ni+1))
 
-	#Loop over coarse grid
 	print("Upscaling face fluxes ...")
-	for k in range(Nk):
-		for j in range(Nj):
-			for i in range(Ni):
-				ip = 2*i
-				jp = 2*j
-				kp = 2*k
-
-				#West i face (4)
-				Mu[IDIR,kp:kp+2,jp:jp+2,ip] = 0.25*M[IDIR,k,j,i]
-				#East i face (4)
-				Mu[IDIR,kp:kp+2,jp:jp+2,ip+2] = 0.25*M[IDIR,k,j,i+1]
-
-				#South j face (4)
-				Mu[JDIR,kp:kp+2,jp,ip:ip+2] = 0.25*M[JDIR,k,j,i]
-				#North j face (4)
-				Mu[JDIR,kp:kp+2,jp+2,ip:ip+2] = 0.25*M[JDIR,k,j+1,i]
-
-				#Bottom k face (4)
-				Mu[KDIR,kp,jp:jp+2,ip:ip+2] = 0.25*M[KDIR,k,j,i]
-				#Top k face (4)
-				Mu[KDIR,kp+2,jp:jp+2,ip:ip+2] = 0.25*M[KDIR,k+1,j,i]
-
-				#Now all exterior faces are done
-				#12 remaining interior faces
-
-				#Interior i faces (4)
-				Mu[IDIR,kp:kp+2,jp:jp+2,ip+1] = 0.5*( Mu[IDIR,kp:kp+2,jp:jp+2,ip] + Mu[IDIR,kp:kp+2,jp:jp+2,ip+2] )
-
-				#Interior j faces (4)
-				Mu[JDIR,kp:kp+2,jp+1,ip:ip+2] = 0.5*( Mu[JDIR,kp:kp+2,jp,ip:ip+2] + Mu[JDIR,kp:kp+2,jp+2,ip:ip+2] )
-
-				#Interior k faces (4)
-				Mu[KDIR,kp+1,jp:jp+2,ip:ip+2] = 0.5*( Mu[KDIR,kp,jp:jp+2,ip:ip+2] + Mu[KDIR,kp+2,jp:jp+2,ip:ip+2] )
+	#Exterior faces of each coarse cell, each coarse face split into 4
+	Mu[IDIR,:2*Nk,:2*Nj,0::2] = 0.25*blockRep(M[IDIR,:Nk,:Nj,:], (0, 1))
+	Mu[JDIR,:2*Nk,0::2,:2*Ni] = 0.25*blockRep(M[JDIR,:Nk,:,:Ni], (0, 2))
+	Mu[KDIR,0::2,:2*Nj,:2*Ni] = 0.25*blockRep(M[KDIR,:,:Nj,:Ni], (1, 2))
+
+	#Interior faces, average of the bounding exterior faces
+	Mu[IDIR,:2*Nk,:2*Nj,1::2] = 0.5*( Mu[IDIR,:2*Nk,:2*Nj,0:-1:2] + Mu[IDIR,:2*Nk,:2*Nj,2::2] )
+	Mu[JDIR,:2*Nk,1::2,:2*Ni] = 0.5*( Mu[JDIR,:2*Nk,0:-1:2,:2*Ni] + Mu[JDIR,:2*Nk,2::2,:2*Ni] )
+	Mu[KDIR,1::2,:2*Nj,:2*Ni] = 0.5*( Mu[KDIR,0:-1:2,:2*Nj,:2*Ni] + Mu[KDIR,2::2,:2*Nj,:2*Ni] )
 	#MaxDiv(M)
 
 	return Mu
@@ -859,16 +768,7 @@ def MaxDiv(M):
 					Nk = Nkc - 1, Nj = Njc - 1, and Ni = Nic - 1.
 
 	"""
-	Nd,Nkc,Njc,Nic = M.shape
-	Nk = Nkc-1
-	Nj = Njc-1
-	Ni = Nic-1
-
-	Div = np.zeros((Nk,Nj,Ni))
-	for k in range(Nk):
-		for j in range(Nj):
-			for i in range(Ni):
-				Div[k,j,i] = M[IDIR,k,j,i+1]-M[IDIR,k,j,i]+M[JDIR,k,j+1,i]-M[JDIR,k,j,i]+M[KDIR,k+1,j,i]-M[KDIR,k,j,i]
+	Div = np.diff(M[IDIR,:-1,:-1,:],axis=2) + np.diff(M[JDIR,:-1,:,:-1],axis=1) + np.diff(M[KDIR,:,:-1,:-1],axis=0)
 
 	mDiv = np.abs(Div).max()
 	bDiv = np.abs(Div).mean()
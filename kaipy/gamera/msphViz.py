@@ -13,6 +13,7 @@ import numpy as np
 import kaipy.kaiViz as kv
 import kaipy.kaiTools as kt
 import kaipy.gamera.magsphere as msph
+import kaipy.gamera.gamcomp as gcmp
 import kaipy.remix.remix as remix
 
 
@@ -204,7 +205,7 @@ def PlotEqErrRel(gsphP, gsphO, nStp, xyBds, Ax, fieldNames, AxCB=None, doClear=T
 	return dataRel
 
 #Plot absolute error along the requested logical axis
-def PlotLogicalErrAbs(gsphP, gsphO, nStp, Ax, fieldNames, meanAxis, AxCB=None, doClear=True, doDeco=True, vMin=1e-16, vMax=1, doLog=True, doVerb=True):
+def PlotLogicalErrAbs(gsphP, gsphO, nStp, Ax, fieldNames, meanAxis, AxCB=None, doClear=True, doDeco=True, vMin=1e-16, vMax=1, doLog=True, doVerb=True, errStats=None):
 	"""
 	Plot the absolute error between two gsph objects.
 
@@ -222,6 +223,7 @@ def PlotLogicalErrAbs(gsphP, gsphO, nStp, Ax, fieldNames, meanAxis, AxCB=None, d
 		vMax (float, optional): The maximum value for the colorbar. (default: 1)
 		doLog (bool, optional): Whether to use logarithmic scale for the colorbar. (default: True)
 		doVerb (bool, optional): Whether to print verbose output. (default: True)
+		errStats (dict, optional): Stats from CalcErrStats with the same meanAxis, to reuse instead of re-reading the runs. (default: None)
 
 	Returns:
 		ndarray: The calculated absolute error data.
@@ -251,7 +253,10 @@ def PlotLogicalErrAbs(gsphP, gsphO, nStp, Ax, fieldNames, meanAxis, AxCB=None, d
 	#Now do main plotting
 	if (doClear):
 		Ax.clear()
-	dataAbs = CalcTotalErrAbs(gsphP,gsphO,nStp,fieldNames,doVerb=doVerb,meanAxis=meanAxis)
+	if (errStats is None):
+		dataAbs = CalcTotalErrAbs(gsphP,gsphO,nStp,fieldNames,doVerb=doVerb,meanAxis=meanAxis)
+	else:
+		dataAbs = errStats["absMap%d"%(meanAxis % len(gcmp.gridShape(gsphP)))]
 	dataAbs = np.transpose(dataAbs) # transpose to put I/J on the horizontal axis
 	Ax.pcolormesh(dataAbs,cmap=cmapAbs,norm=normAbs)
 
@@ -268,7 +273,7 @@ def PlotLogicalErrAbs(gsphP, gsphO, nStp, Ax, fieldNames, meanAxis, AxCB=None, d
 	return dataAbs
 
 #Plot relative error along the requested logical axis
-def PlotLogicalErrRel(gsphP, gsphO, nStp, Ax, fieldNames, meanAxis, AxCB=None, doClear=True, doDeco=True, vMin=1e-16, vMax=1, doLog=True, doVerb=True):
+def PlotLogicalErrRel(gsphP, gsphO, nStp, Ax, fieldNames, meanAxis, AxCB=None, doClear=True, doDeco=True, vMin=1e-16, vMax=1, doLog=True, doVerb=True, errStats=None):
 	"""
 	Plot the logical error relative to the observed values.
 
@@ -286,6 +291,7 @@ def PlotLogicalErrRel(gsphP, gsphO, nStp, Ax, fieldNames, meanAxis, AxCB=None, d
 		vMax (float, optional): The maximum value for the colorbar. (default: 1)
 		doLog (bool, optional): Whether to use logarithmic scale for the colorbar. (default: True)
 		doVerb (bool, optional): Whether to print verbose output. (default: True)
+		errStats (dict, optional): Stats from CalcErrStats with the same meanAxis, to reuse instead of re-reading the runs. (default: None)
 
 	Returns:
 		dataRel (ndarray): The calculated relative error data.
@@ -316,7 +322,10 @@ def PlotLogicalErrRel(gsphP, gsphO, nStp, Ax, fieldNames, meanAxis, AxCB=None, d
 	# Now do main plotting
 	if doClear:
 		Ax.clear()
-	dataRel = CalcTotalErrRel(gsphP, gsphO, nStp, fieldNames, doVerb=doVerb, meanAxis=meanAxis)
+	if errStats is None:
+		dataRel = CalcTotalErrRel(gsphP, gsphO, nStp, fieldNames, doVerb=doVerb, meanAxis=meanAxis)
+	else:
+		dataRel = errStats["relMap%d" % (meanAxis % len(gcmp.gridShape(gsphP)))]
 	dataRel = np.transpose(dataRel)  # transpose to put I/J on the horizontal axis
 	Ax.pcolormesh(dataRel, cmap=cmapRel, norm=normRel)
 
@@ -343,23 +352,17 @@ def CalcTotalErrAbs(gsphP, gsphO, nStp, fieldNames, doVerb=True, meanAxis=None):
 		gsphO (gsph): The second set of data.
 		nStp (int): Step number to use 
 		fieldNames (list): A list of field names.
-		doVerb (bool, optional): Whether to print verbose output (default is True).
+		doVerb (bool, optional): Unused, the runs are streamed without progress bars (default is True).
 		meanAxis (int, optional): The axis along which to calculate the mean (default is None).
 
 	Returns:
 		float: The mean of the absolute error.
 
 	"""
-	dataAbs = None
-	for fn in fieldNames:
-		dataP = gsphP.GetVar(fn, nStp, doVerb=doVerb)
-		dataO = gsphO.GetVar(fn, nStp, doVerb=doVerb)
-		if dataAbs is None:
-			dataAbs = np.square(dataO - dataP)
-		else:
-			dataAbs = dataAbs + np.square(dataO - dataP)
-	dataAbs = np.sqrt(dataAbs)
-	return np.mean(dataAbs, axis=meanAxis)
+	R = CalcErrStats(gsphP, gsphO, nStp, fieldNames, meanAxis=meanAxis)
+	if meanAxis is None:
+		return R["absL1"]
+	return R["absMap%d" % (meanAxis % len(gcmp.gridShape(gsphP)))]
 
 #Calculate total cumulative relative error between two cases
 def CalcTotalErrRel(gsphP, gsphO, nStp, fieldNames, doVerb=True, meanAxis=None):
@@ -371,30 +374,38 @@ def CalcTotalErrRel(gsphP, gsphO, nStp, fieldNames, doVerb=True, meanAxis=None):
 		gsphO (object): The gsphO object.
 		nStp (int): Step number to use 
 		fieldNames (list): A list of field names.
-		doVerb (bool): Whether to print verbose output. Default is True.
+		doVerb (bool): Unused, the runs are streamed without progress bars. Default is True.
 		meanAxis (int): The axis along which to compute the mean. Default is None.
 
 	Returns:
 		float: The mean of the total relative error.
 
 	"""
-	dataAbs = None
-	dataBase = None
-	for fn in fieldNames:
-		dataP = gsphP.GetVar(fn, nStp, doVerb=doVerb)
-		dataO = gsphO.GetVar(fn, nStp, doVerb=doVerb)
-		if dataAbs is None:
-			dataBase = np.square(dataP)
-			dataAbs = np.square(dataO - dataP)
-		else:
-			dataBase = dataBase + np.square(dataP)
-			dataAbs = dataAbs + np.square(dataO - dataP)
-	dataBase = np.sqrt(dataBase)
-	dataAbs = np.sqrt(dataAbs)
-	# math breaks when Base field is exactly 0
-	dataBase[dataBase == 0] = np.finfo(np.float32).tiny
-	dataRel = np.absolute(dataAbs / dataBase)
-	return np.mean(dataRel, axis=meanAxis)
+	R = CalcErrStats(gsphP, gsphO, nStp, fieldNames, meanAxis=meanAxis)
+	if meanAxis is None:
+		return R["relL1"]
+	return R["relMap%d" % (meanAxis % len(gcmp.gridShape(gsphP)))]
+
+#Calculate all error norms (and a mean error map) between two cases in one pass
+def CalcErrStats(gsphP, gsphO, nStp, fieldNames, meanAxis=None):
+	"""
+	Calculate absolute and relative error norms between two cases in one pass over their data.
+
+	The two runs are streamed rank block by rank block, see gamcomp.compareStep.
+
+	Args:
+		gsphP (gsph): The predicted values.
+		gsphO (gsph): The observed values.
+		nStp (int): Step number to use 
+		fieldNames (list): A list of field names.
+		meanAxis (int, optional): Also compute the mean error maps along this axis (default is None).
+
+	Returns:
+		dict: The L1/L2/Linf norms (and maps) of gamcomp.finishStats.
+
+	"""
+	meanAxes = () if meanAxis is None else (meanAxis % len(gcmp.gridShape(gsphP)),)
+	return gcmp.pipeStep(gsphP, gsphO, nStp, fieldNames, meanAxes=meanAxes)
 
 #Plot equatorial field
 def PlotEqB(gsph, nStp, xyBds, Ax, AxCB=None, doClear=True, doDeco=True, doBz=False):
@@ -2,6 +2,7 @@
 
 # Standard modules
 import os
+from concurrent.futures import ThreadPoolExecutor
 
 # Third-party modules
 import numpy as np
@@ -40,13 +41,141 @@ doCorot = True #Add corotation potential
 DenPP = 50.0
 ppCol = "orange"
 
+#Variables read by RCMInset, the default set to prefetch
+insetVars = ["xMin", "yMin", "zMin", "IOpen", "P", "toMHD", "pot", "colat", "Npsph"]
+
+#Equatorial data of one RCM step, reading each variable and computing the mask only once
+#snap = rcmpp.RCMSnapshot(rcmdata,nStp)
+#bmX,bmY = rcmpp.RCMEq(snap,nStp,doMask=True) ; P = rcmpp.GetVarMask(snap,nStp,"P")
+class RCMSnapshot(object):
+	"""
+	RCMSnapshot wraps one step of an RCM (mhdrcm) pipe and caches what is read from it.
+
+	It can be passed anywhere an rcmdata object is used for that step (RCMEq, GetMask,
+	GetVarMask, GetPotential, RCMInset), so all of them share the reads and the mask.
+
+	Attributes:
+		rcmdata: The underlying pipe.
+		nStp (int): The step.
+		Vars (dict): Variables read so far.
+	"""
+
+	def __init__(self, rcmdata, nStp, vIDs=None, doVerb=False):
+		"""
+		Initialize the snapshot, optionally reading a set of variables up front.
+
+		Args:
+			rcmdata: The rcmdata (GameraPipe) object.
+			nStp (int): The time step index.
+			vIDs (list, optional): Variables to read now (default is None, read on demand).
+			doVerb (bool, optional): Whether to print verbose output on reads (default is False).
+		"""
+		self.rcmdata = rcmdata
+		self.nStp = nStp
+		self.doVerb = doVerb
+		self.Vars = {}
+		self.Mask = None
+		self.Masked = {}
+		if (vIDs is not None):
+			for vID in vIDs:
+				self.GetVar(vID)
+
+	def GetVar(self, vID, sID=None, vScl=None, doVerb=None):
+		"""
+		Read a variable of this step, only the first time it is asked for.
+
+		Args:
+			vID (str): The name of the variable.
+			sID (int, optional): Ignored if None, otherwise must be the snapshot step.
+			vScl (float, optional): The scaling factor for the variable (default is None).
+			doVerb (bool, optional): Verbose read, defaults to the snapshot setting.
+
+		Returns:
+			np.ndarray: The variable data.
+		"""
+		if (sID is not None) and (sID != self.nStp):
+			raise ValueError("Snapshot of step %d asked for step %d" % (self.nStp, sID))
+		if (vID not in self.Vars):
+			if (doVerb is None):
+				doVerb = self.doVerb
+			self.Vars[vID] = self.rcmdata.GetVar(vID, self.nStp, doVerb=doVerb)
+		if (vScl is not None):
+			return vScl*self.Vars[vID]
+		return self.Vars[vID]
+
+	def GetMask(self):
+		"""
+		The RCM mask of this step, computed on first use.
+
+		Returns:
+			I: The mask, True outside of the RCM region.
+		"""
+		if (self.Mask is None):
+			self.Mask = CalcMask(self)
+		return self.Mask
+
+	def GetVarMask(self, vID):
+		"""
+		A variable of this step masked with the RCM mask, computed on first use.
+
+		Args:
+			vID (str): The name of the variable.
+
+		Returns:
+			Q: The masked variable.
+		"""
+		if (vID not in self.Masked):
+			self.Masked[vID] = ma.masked_array(self.GetVar(vID), mask=self.GetMask())
+		return self.Masked[vID]
+
+def GetSnapshot(rcmdata, nStp, doVerb=True):
+	"""
+	Snapshot of a step, reusing rcmdata if it already is a snapshot of that step.
+
+	Args:
+		rcmdata: The rcmdata object or an RCMSnapshot.
+		nStp: The time step index.
+		doVerb: Whether to print verbose output on reads (default is True).
+
+	Returns:
+		RCMSnapshot: The snapshot of step nStp.
+	"""
+	if isinstance(rcmdata, RCMSnapshot) and (rcmdata.nStp == nStp):
+		return rcmdata
+	return RCMSnapshot(rcmdata, nStp, doVerb=doVerb)
+
+def PrefetchSnapshots(rcmdata, sIds, vIDs=insetVars, nAhead=1, doVerb=False):
+	"""
+	Iterate over the snapshots of many steps, reading the next steps in the background.
+
+	While one step is processed (e.g. plotted), the variables of the next nAhead steps are read.
+
+	Args:
+		rcmdata: The rcmdata (GameraPipe) object.
+		sIds (list): Steps to iterate over.
+		vIDs (list, optional): Variables read for every step (default is insetVars).
+		nAhead (int, optional): Number of steps to read ahead (default is 1).
+		doVerb (bool, optional): Whether to print verbose output on reads (default is False).
+
+	Yields:
+		RCMSnapshot: The snapshot of every step, in order.
+	"""
+	sIds = list(sIds)
+	with ThreadPoolExecutor(max_workers=1) as executor:
+		futures = [executor.submit(RCMSnapshot, rcmdata, s, vIDs, doVerb) for s in sIds[:nAhead+1]]
+		for n in range(len(sIds)):
+			if (n+nAhead+1 < len(sIds)):
+				futures.append(executor.submit(RCMSnapshot, rcmdata, sIds[n+nAhead+1], vIDs, doVerb))
+			yield futures[n].result()
+			futures[n] = None
+
 #Get equatorial coordinates, masked if asked to
 def RCMEq(rcmdata, nStp, doMask=False, doXYZ=doXYZ, doVerb=True):
 	"""
 	Calculate the RCMEq values for the given rcmdata and time step.
 
 	Args:
-		rcmdata: The rcmdata object containing the data.
+		rcmdata: The rcmdata object containing the data, or an RCMSnapshot of step nStp.
 		nStp: The time step index.
 		doMask: A boolean indicating whether to apply a mask to the calculated values. Default is False.
 		doXYZ: A boolean indicating whether to calculate the values in XYZ coordinates. Default is doXYZ.
@@ -56,16 +185,17 @@ def RCMEq(rcmdata, nStp, doMask=False, doXYZ=doXYZ, doVerb=True):
 		bmX: The calculated X values.
 		bmY: The calculated Y values.
 	"""
-	bmX = rcmdata.GetVar("xMin", nStp, doVerb=doVerb)
-	bmY = rcmdata.GetVar("yMin", nStp, doVerb=doVerb)
+	snap = GetSnapshot(rcmdata, nStp, doVerb=doVerb)
+	bmX = snap.GetVar("xMin")
+	bmY = snap.GetVar("yMin")
 	if (doXYZ):
-		bmZ = rcmdata.GetVar("zMin", nStp, doVerb=doVerb)
+		bmZ = snap.GetVar("zMin")
 		bmP = np.arctan2(bmY, bmX)
 		bmR = np.sqrt(bmX * bmX + bmY * bmY + bmZ * bmZ)
 		bmX = bmR * np.cos(bmP)
 		bmY = bmR * np.sin(bmP)
 	if (doMask):
-		I = GetMask(rcmdata, nStp)
+		I = snap.GetMask()
 		bmX = ma.masked_array(bmX, mask=I)
 		bmY = ma.masked_array(bmY, mask=I)
 	return bmX, bmY
@@ -76,7 +206,7 @@ def GetVarMask(rcmdata, nStp, Qid="P", I=None, doVerb=True):
 	Get the variable mask for a given RCM data.
 
 	Args:
-		rcmdata: The RCM data object.
+		rcmdata: The RCM data object, or an RCMSnapshot of step nStp.
 		nStp: The time step index.
 		Qid: The variable identifier (default is "P").
 		I: The mask array (default is None).
@@ -85,9 +215,10 @@ def GetVarMask(rcmdata, nStp, Qid="P", I=None, doVerb=True):
 	Returns:
 		Q: The variable array with the mask applied.
 	"""
+	snap = GetSnapshot(rcmdata, nStp, doVerb=doVerb)
 	if I is None:
-		I = GetMask(rcmdata, nStp)
-	Q = rcmdata.GetVar(Qid, nStp, doVerb=doVerb)
+		return snap.GetVarMask(Qid)
+	Q = snap.GetVar(Qid)
 	Q = ma.masked_array(Q, mask=I)
 	return Q
 
@@ -97,7 +228,7 @@ def GetPotential(rcmdata, nStp, I=None, NumCP=25, doVerb=True):
 	Calculate the potential and potential values for a given rcmdata.
 
 	Args:
-		rcmdata: The rcmdata object containing the data.
+		rcmdata: The rcmdata object containing the data, or an RCMSnapshot of step nStp.
 		nStp: The time step index.
 		I: The mask array. If None, it will be calculated using GetMask.
 		NumCP: The number of potential values to generate.
@@ -108,13 +239,14 @@ def GetPotential(rcmdata, nStp, I=None, NumCP=25, doVerb=True):
 		pVals: The potential values.
 
 	"""
+	snap = GetSnapshot(rcmdata, nStp, doVerb=doVerb)
 	if (I is None):
-		I = GetMask(rcmdata, nStp)
-	pot = (1.0e-3) * rcmdata.GetVar("pot", nStp, doVerb=doVerb)
+		I = snap.GetMask()
+	pot = (1.0e-3) * snap.GetVar("pot")
 
 	if (doCorot):
 		# Add corotation potential
-		colat = GetVarMask(rcmdata, nStp, "colat", I, doVerb=doVerb)
+		colat = GetVarMask(snap, nStp, "colat", I)
 		pcorot = -Psi0 * (RioRe) * (np.sin(colat) ** 2.0)
 		pot = pot + pcorot
 	pMag = np.abs(pot).max()
@@ -130,7 +262,7 @@ def GetMask(rcmdata, nStp, doVerb=True):
 	Generate a mask based on the given rcmdata, nStp, and doVerb parameters.
 
 	Args:
-		rcmdata: The rcmdata object containing the data.
+		rcmdata: The rcmdata object containing the data, or an RCMSnapshot of step nStp.
 		nStp: The value of nStp parameter.
 		doVerb: A boolean indicating whether to enable verbose mode (default is True).
 
@@ -138,19 +270,31 @@ def GetMask(rcmdata, nStp, doVerb=True):
 		I: The generated mask.
 
 	"""
-	IOpen = rcmdata.GetVar("IOpen", nStp, doVerb=doVerb)
+	return GetSnapshot(rcmdata, nStp, doVerb=doVerb).GetMask()
+
+def CalcMask(snap):
+	"""
+	Calculate the RCM mask from the variables of a snapshot.
+
+	Args:
+		snap (RCMSnapshot): The snapshot of the step.
+
+	Returns:
+		I: The mask, True outside of the RCM region.
+	"""
+	IOpen = snap.GetVar("IOpen")
 	
 	if (doEll):
 		ioCut = -0.5
 	else:
 		ioCut = 0.5
-	bmX = rcmdata.GetVar("xMin", nStp, doVerb=doVerb)
-	bmY = rcmdata.GetVar("yMin", nStp, doVerb=doVerb)
+	bmX = snap.GetVar("xMin")
+	bmY = snap.GetVar("yMin")
 	bmR = np.sqrt(bmX * bmX + bmY * bmY)
 
 	Ir = (bmR < rMin) | (bmR > rMax)
 	if (doCut):
-		Prcm = rcmdata.GetVar("P", nStp, doVerb=doVerb)
+		Prcm = snap.GetVar("P")
 		I = Ir | (IOpen > ioCut) | (Prcm < pCut)
 	else:
 		I = Ir | (IOpen > ioCut)
@@ -164,7 +308,7 @@ def RCMInset(AxRCM, rcmdata, nStp, vP, pCol="k", doPP=True):
 
 	Args:
 		AxRCM (matplotlib.axes.Axes): The axis on which to plot the RCM pressure inset.
-		rcmdata (numpy.ndarray): The RCM data.
+		rcmdata (GameraPipe): The RCM data, or an RCMSnapshot of step nStp.
 		nStp (int): The number of steps.
 		vP (matplotlib.colors.Normalize): The normalization object for the color map.
 		pCol (str, optional): The color of the contour lines. Defaults to "k".
@@ -173,18 +317,19 @@ def RCMInset(AxRCM, rcmdata, nStp, vP, pCol="k", doPP=True):
 	if (AxRCM is None):
 		AxRCM = plt.gca()
 
-	bmX,bmY = RCMEq(rcmdata,nStp,doMask=True)
-	I = GetMask(rcmdata,nStp)
+	snap = GetSnapshot(rcmdata,nStp)
+	bmX,bmY = RCMEq(snap,nStp,doMask=True)
+	I = snap.GetMask()
 	Ni = (~I).sum()
 
 	if (Ni == 0):
 		return
 
-	Prcm  = GetVarMask(rcmdata,nStp,"P"    ,I)
-	toMHD = GetVarMask(rcmdata,nStp,"toMHD",I)
-	pot,pVals = GetPotential(rcmdata,nStp,I,NumCP=11)
+	Prcm  = snap.GetVarMask("P")
+	toMHD = snap.GetVarMask("toMHD")
+	pot,pVals = GetPotential(snap,nStp,I,NumCP=11)
 	if (doPP):
-		Npp  = GetVarMask(rcmdata,nStp,"Npsph"    ,I)
+		Npp  = snap.GetVarMask("Npsph")
 		
 	#Start plotting
 	AxRCM.pcolor(bmX,bmY,Prcm,norm=vP,cmap=pCMap,shading='auto')
@@ -18,6 +18,7 @@ import kaipy.kaiViz as kv
 import kaipy.gamhelio.heliosphere as hsph
 from kaipy.kdefs import *
 import kaipy.kaiTools as ktools
+import kaipy.gridLocator as gl
 
 
 
@@ -2058,18 +2059,11 @@ def find_radial_slice(gsph, radius):
     if( radius == 21.5):
         idx = 0
     else: 
-        # Starting with the last radial layer, work inward until the first layer
-        # is found with grid radius less than the specified radius.
-        idx = -1
-        r = np.sqrt(gsph.X[idx][0][0]**2 + gsph.Y[idx][0][0]**2 +
-                    gsph.Z[idx][0][0]**2)
-        while r > radius:
-            idx -= 1
-            r = np.sqrt(gsph.X[idx][0][0]**2 + gsph.Y[idx][0][0]**2 +
-                        gsph.Z[idx][0][0]**2)
-
-        # Convert the index-from-end to an index-from-start.
-        idx += gsph.Ni + 1
+        # Bisect the radii of the radial grid layers for the last layer with
+        # grid radius less than the specified radius.
+        r = np.sqrt(gsph.X[:, 0, 0]**2 + gsph.Y[:, 0, 0]**2 +
+                    gsph.Z[:, 0, 0]**2)
+        idx = int(gl.AxisLocator(r).cellIdx(radius))
 
     # Return the index of the slice containing the radius.
     return idx
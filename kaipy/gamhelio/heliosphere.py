@@ -12,6 +12,7 @@ from kaipy.kdefs import *
 import kaipy.gamera.gampp
 from kaipy.gamera.gampp import GameraPipe
 import kaipy.kaiH5 as kh5
+import kaipy.gridLocator as gl
 
 #Object to pull from MPI/Serial heliosphere runs (H5 data), extends base
 
@@ -21,6 +22,7 @@ dLabFS = "medium" #Default label size
 dBoxC  = "lightgrey" #Default box color
 TINY   = 1.0e-8
 MK     = 1.e6 #MegaKelvin
+tSclIH = 4637. #Inner helio code time unit [s]
 
 #Adapted to helio grid
 class GamsphPipe(GameraPipe):
@@ -32,7 +34,7 @@ class GamsphPipe(GameraPipe):
         #units for inner helio
         self.bScl = 100.    #->nT
         self.vScl = 150.  #-> km/s
-        self.tScl = 4637.    #->seconds
+        self.tScl = tSclIH    #->seconds
         self.dScl = 200. #cm-3
         self.TScl = 1.e-6/4/np.pi/200./kbltz/MK #in MK
     
@@ -47,6 +49,9 @@ class GamsphPipe(GameraPipe):
         self.xxi = [] ; self.yyi = [] #corners
         self.xxc = [] ; self.yyc = [] #centers
 
+        #cached streamline interpolation weights, keyed by (xyBds,dx)
+        self.streamCache = {}
+
         #base class, will use OpenPipe below
         GameraPipe.__init__(self,fdir,ftag,doFast=doFast,doParallel=doParallel,nWorkers=nWorkers)
 
@@ -631,6 +636,11 @@ class GamsphPipe(GameraPipe):
         x1,y1,gu,gv,gM = self.doStream(U,V,xyBds,dx)
         return x1,y1,gu,gv,gM
 
+    #Interpolate egg slice components to a Cartesian grid for streamlines
+    #Weights are built once per (xyBds,dx) and reused for every step
+    def doStream(self,U,V,xyBds=[-35,25,-25,25],dx=0.05):
+        return gl.streamGrid(self.streamCache,self.xxc,self.yyc,self.R0,U,V,xyBds,dx)
+
 
     #Add time label, xy is position in axis (not data) coords
     def AddTime(self,n,Ax,xy=[0.9,0.95],cLab=dLabC,fs=dLabFS,T0=0.0,doBox=True,BoxC=dBoxC):
@@ -0,0 +1,194 @@
+#Tools shared by the gamhelio inner boundary generators (wsa2gamera, ih2oh)
+
+# Third-party modules
+import numpy as np
+import h5py
+
+
+def linWeights(xs, xd):
+    """
+    Linear interpolation weights from monotone source nodes to target points.
+
+    Targets outside of [xs[0],xs[-1]] are clamped to the end values, which is
+    what RectBivariateSpline(kx=1,ky=1) does when evaluated off its domain.
+
+    Args:
+        xs (numpy.ndarray): Monotonically increasing source nodes.
+        xd (numpy.ndarray): Target points.
+
+    Returns:
+        i0 (numpy.ndarray): Index of the left source node for each target.
+        w (numpy.ndarray): Weight of the right node, Q(xd) = (1-w)*Q[i0] + w*Q[i0+1].
+    """
+    xs = np.asarray(xs)
+    xc = np.clip(np.asarray(xd), xs[0], xs[-1])
+    i0 = np.searchsorted(xs, xc, side='right') - 1
+    i0 = np.clip(i0, 0, len(xs) - 2)
+    w = (xc - xs[i0])/(xs[i0 + 1] - xs[i0])
+    return i0, w
+
+
+class BilinearMap(object):
+    """
+    Precomputed bilinear map between two tensor-product (phi,theta) grids.
+
+    Built once per pair of grids and then applied to any number of fields,
+    e.g. every variable of every step of a time-dependent boundary. Only holds
+    numpy arrays so it can be shipped to worker processes.
+
+    Args:
+        pSrc (numpy.ndarray): Source phi nodes (increasing).
+        tSrc (numpy.ndarray): Source theta nodes (increasing).
+        pDst (numpy.ndarray): Target phi points.
+        tDst (numpy.ndarray): Target theta points.
+
+    Attributes:
+        ip, wp (numpy.ndarray): Indices/weights along phi.
+        it, wt (numpy.ndarray): Indices/weights along theta.
+        shape (tuple): Shape of the mapped field, (len(pDst),len(tDst)).
+    """
+
+    def __init__(self, pSrc, tSrc, pDst, tDst):
+        self.ip, self.wp = linWeights(pSrc, pDst)
+        self.it, self.wt = linWeights(tSrc, tDst)
+        self.shape = (len(self.ip), len(self.it))
+
+    def __call__(self, Q):
+        """
+        Interpolate a source field to the target grid.
+
+        Args:
+            Q (numpy.ndarray): Field of shape (Np,Nt,...) on the source grid,
+                trailing dimensions are carried along.
+
+        Returns:
+            numpy.ndarray: Field of shape (Np',Nt',...) on the target grid.
+        """
+        Q = np.asarray(Q)
+        xS = (slice(None),) + (None,)*(Q.ndim - 1)
+        Qp = (1.0 - self.wp)[xS]*Q[self.ip] + self.wp[xS]*Q[self.ip + 1]
+        xS = (None, slice(None)) + (None,)*(Q.ndim - 2)
+        return (1.0 - self.wt)[xS]*Qp[:, self.it] + self.wt[xS]*Qp[:, self.it + 1]
+
+
+class HelioBCGrid(object):
+    """
+    Inner boundary geometry of a spherical gamhelio grid.
+
+    Only the innermost Ng+1 radial corner layers are used, the rest of the
+    grid is never touched. Arrays follow the innerbc.h5 index order [k,j,i].
+
+    Args:
+        X3, Y3, Z3 (numpy.ndarray): Grid corners indexed [i,j,k], as returned
+            by gamGrids.GenKSph and friends.
+        Ng (int): Number of ghost cells.
+
+    Attributes:
+        R0 (float): Radius of the inner boundary.
+        P, T (numpy.ndarray): phi/theta of the physical corners, [k,j,i<=Ng].
+        P_out, T_out, R_out (numpy.ndarray): Ghost region corners for innerbc.h5.
+        Rc, Pc, Tc (numpy.ndarray): r/phi/theta of the physical cell centers, [k,j,i<Ng].
+        pC, tC (numpy.ndarray): 1D phi/theta of the cell centers.
+        pK (numpy.ndarray): 1D phi of the k-faces (all Nk+1 corners).
+    """
+
+    def __init__(self, X3, Y3, Z3, Ng):
+        self.Ng = Ng
+        #Innermost layers in [k,j,i] order, as stored by gamGrids.WriteGrid
+        x = X3[:Ng + 1].T
+        y = Y3[:Ng + 1].T
+        z = Z3[:Ng + 1].T
+
+        xc = cellCenters(x)
+        yc = cellCenters(y)
+        zc = cellCenters(z)
+
+        self.R0 = np.sqrt(x[0, 0, Ng]**2 + y[0, 0, Ng]**2 + z[0, 0, Ng]**2)
+        r = np.sqrt(x**2 + y**2 + z**2)
+
+        #Corners of physical cells
+        self.P = np.arctan2(y[Ng:-Ng, Ng:-Ng, :], x[Ng:-Ng, Ng:-Ng, :])
+        self.P[self.P < 0] += 2*np.pi
+        self.T = np.arccos(z[Ng:-Ng, Ng:-Ng, :]/r[Ng:-Ng, Ng:-Ng, :])
+
+        self.P_out = self.P
+        self.T_out = self.T
+        self.R_out = r[Ng:-Ng, Ng:-Ng, :]
+
+        #Centers of physical cells
+        self.Rc = np.sqrt(xc[Ng:-Ng, Ng:-Ng, :]**2 + yc[Ng:-Ng, Ng:-Ng, :]**2 + zc[Ng:-Ng, Ng:-Ng, :]**2)
+        self.Pc = np.arctan2(yc[Ng:-Ng, Ng:-Ng, :], xc[Ng:-Ng, Ng:-Ng, :])
+        self.Pc[self.Pc < 0] += 2*np.pi
+        self.Tc = np.arccos(zc[Ng:-Ng, Ng:-Ng, :]/self.Rc)
+
+        self.pC = self.Pc[:, 0, 0]
+        self.tC = self.Tc[0, :, 0]
+        self.pK = self.P[:, 0, 0]
+
+    def ghostScale(self):
+        """
+        Radial scaling factor (R0/r)**2 for each ghost layer.
+
+        Returns:
+            numpy.ndarray: Scale factors of shape (Ng,).
+        """
+        return (self.R0/self.Rc[0, 0, :self.Ng])**2
+
+
+def cellCenters(x):
+    """
+    Average the 8 corners of each cell of a 3D corner array.
+
+    Args:
+        x (numpy.ndarray): Corner values of shape (N0+1,N1+1,N2+1).
+
+    Returns:
+        numpy.ndarray: Cell-centered values of shape (N0,N1,N2).
+    """
+    return 0.125*(x[:-1, :-1, :-1] + x[:-1, :-1, 1:] + x[:-1, 1:, :-1] + x[:-1, 1:, 1:] +
+                  x[1:, :-1, :-1] + x[1:, :-1, 1:] + x[1:, 1:, :-1] + x[1:, 1:, 1:])
+
+
+def WriteInnerBC(fOut, bcG, MJDs, stepData, doRoot=False, fGrid=None):
+    """
+    Write a (possibly multi-step) innerbc.h5 file.
+
+    Args:
+        fOut (str): Output file name.
+        bcG (HelioBCGrid): Boundary grid, provides the ghost region corners.
+        MJDs (list of float): MJD of each step, or None if stepData yields
+            (MJD, dict) pairs.
+        stepData (iterable of dict): Variable name -> array for each step,
+            consumed lazily so steps can be written as they are produced.
+        doRoot (bool, optional): Also write the first step's variables (and its
+            MJD as an attribute) at the root of fOut, as read by static runs.
+        fGrid (str, optional): Also write the ghost grid and all steps to this
+            file, e.g. for plotting in Paraview.
+
+    Returns:
+        int: Number of steps written.
+    """
+    Nt = 0
+    fNames = [fOut] if fGrid is None else [fOut, fGrid]
+    hfs = [h5py.File(fName, 'w') for fName in fNames]
+    try:
+        for hf in hfs:
+            hf.create_dataset("X", data=bcG.P_out)
+            hf.create_dataset("Y", data=bcG.T_out)
+            hf.create_dataset("Z", data=bcG.R_out)
+        steps = stepData if MJDs is None else zip(MJDs, stepData)
+        for n, (mjd, vDict) in enumerate(steps):
+            for hf in hfs:
+                grp = hf.create_group("Step#%d" % (n))
+                grp.attrs.create("MJD", mjd)
+                for vID, V in vDict.items():
+                    grp.create_dataset(vID, data=V)
+            if doRoot and n == 0:
+                hfs[0].attrs["MJD"] = mjd
+                for vID, V in vDict.items():
+                    hfs[0].create_dataset(vID, data=V)
+            Nt += 1
+    finally:
+        for hf in hfs:
+            hf.close()
+    return Nt
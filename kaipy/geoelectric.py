@@ -0,0 +1,272 @@
+#Geoelectric fields from ground magnetic perturbations using 1D ground conductivity models
+#Works on many stations (or a whole calcdb ground grid) at once with batched real FFTs
+
+# Standard modules
+import functools
+
+# Third-party modules
+import numpy as np
+import h5py
+from alive_progress import alive_bar
+
+# Kaipy modules
+import kaipy.kaiH5 as kh5
+import kaipy.kdefs as kdefs
+
+mu0 = 4*np.pi*1.0e-7 #Magnetic permeability [H/m]
+fMin = 1.0e-100      #Stand-in for the zero frequency
+
+#Quebec 1D resistivity profile [Ohm.m] and layer thicknesses [m]
+QRes   = np.array([500., 150., 20., 300., 100., 10., 1.])
+QThick = 1000.0*np.array([4., 6., 5., 65., 300., 200.])
+
+def checkProfile(res, thick):
+	"""
+	Check a layered resistivity profile and return it as arrays.
+
+	Args:
+		res (array or list): Resistivities of the layers [Ohm.m], top to basement.
+		thick (array or list): Thicknesses of all but the basement layer [m].
+
+	Returns:
+		res, thick (numpy.ndarray): The profile as float arrays.
+
+	Raises:
+		ValueError: If len(res) != len(thick) + 1.
+	"""
+	res = np.atleast_1d(np.asarray(res, dtype=float))
+	thick = np.atleast_1d(np.asarray(thick, dtype=float))
+	if len(res) != len(thick) + 1:
+		raise ValueError("Need one more resistivity than thickness, got %d and %d" % (len(res), len(thick)))
+	return res, thick
+
+def impedance1D(res, thick, freq):
+	"""
+	Surface impedance of a layered 1D ground at the given frequencies.
+
+	Uses the standard layer recursion from the basement up, vectorised over
+	frequency. Negative frequencies give the complex conjugate of the positive ones.
+
+	Args:
+		res (array or list): Resistivities of the layers [Ohm.m], top to basement.
+		thick (array or list): Thicknesses of all but the basement layer [m].
+		freq (array): Frequencies [Hz].
+
+	Returns:
+		Z (numpy.ndarray): Complex impedance [Ohm], same shape as freq.
+	"""
+	res, thick = checkProfile(res, thick)
+	w = 2*np.pi*np.asarray(freq, dtype=float)
+	Z = np.sqrt(w*mu0*res[-1]*1j)
+	for j in range(len(res)-2, -1, -1):
+		dj = np.sqrt(w*mu0*(1.0/res[j])*1j)
+		wj = dj*res[j]
+		re = np.exp(-2*thick[j]*dj)*(wj - Z)/(wj + Z)
+		Z = wj*(1 - re)/(1 + re)
+	return Z
+
+@functools.lru_cache(maxsize=64)
+def _rImpedance(res, thick, Nt, dt):
+	freq = np.fft.rfftfreq(Nt, d=dt)
+	freq[0] = fMin
+	Z = impedance1D(res, thick, freq)
+	Z.flags.writeable = False
+	return Z
+
+def rImpedance(res, thick, Nt, dt=60.0):
+	"""
+	Impedance at the real FFT frequencies of an Nt point series with cadence dt.
+
+	Results are cached by profile and series length, so repeated calls (many
+	stations sharing a profile, many time windows of the same length) are free.
+
+	Args:
+		res (array or list): Resistivities of the layers [Ohm.m], top to basement.
+		thick (array or list): Thicknesses of all but the basement layer [m].
+		Nt (int): Length of the series.
+		dt (float): Time between samples [s] (default is 60).
+
+	Returns:
+		Z (numpy.ndarray): Read-only complex impedance, Nt//2+1 values.
+	"""
+	res, thick = checkProfile(res, thick)
+	return _rImpedance(tuple(res), tuple(thick), int(Nt), float(dt))
+
+def fillGaps(Q):
+	"""
+	Linearly interpolate over NaNs along the last (time) axis.
+
+	Series with no valid values are set to zero.
+
+	Args:
+		Q (numpy.ndarray): Series, (..., Nt).
+
+	Returns:
+		Qf (numpy.ndarray): Copy of Q without NaNs.
+	"""
+	Qf = np.array(Q, dtype=float)
+	isBad = np.isnan(Qf)
+	if not isBad.any():
+		return Qf
+	Nt = Qf.shape[-1]
+	Q2 = Qf.reshape(-1, Nt)
+	t = np.arange(Nt)
+	for n in np.nonzero(isBad.reshape(-1, Nt).any(axis=1))[0]:
+		isOK = ~np.isnan(Q2[n])
+		if isOK.any():
+			Q2[n] = np.interp(t, t[isOK], Q2[n, isOK])
+		else:
+			Q2[n] = 0.0
+	return Q2.reshape(Qf.shape)
+
+def padSeries(Q, padnum=150):
+	"""
+	Pad series along the last axis to soften FFT edge effects.
+
+	The first padnum values are repeated at the start and the last padnum
+	values are mirrored at the end, as in supermage.E_Field_1D.
+
+	Args:
+		Q (numpy.ndarray): Series, (..., Nt).
+		padnum (int): Number of points to pad at each end (default is 150).
+
+	Returns:
+		numpy.ndarray: Padded series, (..., Nt+2*padnum).
+	"""
+	return np.concatenate((Q[..., :padnum], Q, Q[..., ::-1][..., :padnum]), axis=-1)
+
+def eField(bx, by, res=QRes, thick=QThick, dt=60.0, iModel=None, pad=True, padnum=150, doFill=True):
+	"""
+	Horizontal geoelectric field for many stations at once.
+
+	All series are transformed together with a real FFT along the time axis
+	and multiplied by the (cached) impedance of their ground profile.
+
+	Args:
+		bx (array): Northward dB [nT], (Nt,) or (Nstation, Nt).
+		by (array): Eastward dB [nT], same shape as bx.
+		res (array or list): Resistivities [Ohm.m] of a single profile, or a list of
+			profiles when iModel is given (default is the Quebec model).
+		thick (array or list): Thicknesses [m] of a single profile, or a list of
+			profiles when iModel is given (default is the Quebec model).
+		dt (float): Time between samples [s] (default is 60).
+		iModel (array or None): Index into the res/thick lists for each station.
+			If None every station uses the single res/thick profile.
+		pad (bool): Pad the series before transforming (default is True).
+		padnum (int): Number of points to pad at each end (default is 150).
+		doFill (bool): Interpolate over NaNs first, otherwise NaN series give NaN fields (default is True).
+
+	Returns:
+		ex, ey (numpy.ndarray): Northward and eastward E [mV/km], same shape as bx.
+	"""
+	bx = np.asarray(bx, dtype=float)
+	by = np.asarray(by, dtype=float)
+	if bx.shape != by.shape:
+		raise ValueError("bx and by have different shapes, %s and %s" % (bx.shape, by.shape))
+	if doFill:
+		bx = fillGaps(bx)
+		by = fillGaps(by)
+	Nt = bx.shape[-1]
+	if pad:
+		bx = padSeries(bx, padnum)
+		by = padSeries(by, padnum)
+	NtP = bx.shape[-1]
+
+	if iModel is None:
+		Z = rImpedance(res, thick, NtP, dt)
+	else:
+		iModel = np.asarray(iModel, dtype=int)
+		if bx.ndim != 2 or iModel.shape != bx.shape[:1]:
+			raise ValueError("iModel needs one entry per station")
+		Zs = np.stack([rImpedance(res[m], thick[m], NtP, dt) for m in range(len(res))])
+		Z = Zs[iModel]
+
+	#Z [Ohm] * B [nT] / mu0 -> 1e-9 V/m, mV/km is 1e-6 V/m
+	ex = 1.0e-3*np.fft.irfft(Z*np.fft.rfft(by, axis=-1)/mu0, n=NtP, axis=-1)
+	ey = -1.0e-3*np.fft.irfft(Z*np.fft.rfft(bx, axis=-1)/mu0, n=NtP, axis=-1)
+	if pad:
+		ex = ex[..., padnum:padnum+Nt]
+		ey = ey[..., padnum:padnum+Nt]
+	return ex, ey
+
+def gridEField(fname, res=QRes, thick=QThick, iModel=None, k0=0, sIds=None, pad=True, padnum=150,
+	nChunk=8192, dtype=np.float32, doVerb=True):
+	"""
+	Geoelectric field over the ground grid of a calcdb output file.
+
+	The ground dB of shell k0 is read once for all steps, then the cells are
+	processed in chunks of nChunk series through eField.
+
+	Args:
+		fname (str): calcdb (deltaB) output file.
+		res, thick: Ground profile(s), see eField.
+		iModel (array or None): Profile index of each cell, (Nlat, Nlon). If None all cells use res/thick.
+		k0 (int): Vertical level of the ground grid (default is 0).
+		sIds (array or None): Steps to use, must be evenly spaced in time (default is all).
+		pad (bool): Pad the series before transforming (default is True).
+		padnum (int): Number of points to pad at each end (default is 150).
+		nChunk (int): Number of cells transformed together (default is 8192).
+		dtype (numpy.dtype): Type of the output fields (default is float32).
+		doVerb (bool): Show a progress bar (default is True).
+
+	Returns:
+		dict: With keys
+			- sIds (array): Steps used.
+			- MJD (array): MJD of each step.
+			- Ex, Ey (array): Northward and eastward E [mV/km], (Nt, Nlat, Nlon).
+
+	Raises:
+		ValueError: If the steps are not evenly spaced.
+	"""
+	if sIds is None:
+		nSteps, sIds = kh5.cntSteps(fname, useBars=False)
+	sIds = np.asarray(sIds)
+	Nt = len(sIds)
+	T = kh5.getTs(fname, sIds, "time", useBars=False)
+	MJD = kh5.getTs(fname, sIds, "MJD", useBars=False)
+	dTs = np.diff(T)
+	dt = np.median(dTs) if Nt > 1 else 60.0
+	if Nt > 1 and np.abs(dTs-dt).max() > 1.0e-3*dt:
+		raise ValueError("Steps of %s are not evenly spaced" % (fname))
+
+	with h5py.File(fname, 'r') as hf:
+		Nlat, Nlon = hf["/Step#%d" % (sIds[0])]["dBt"].shape[1:]
+		Nc = Nlat*Nlon
+		Bx = np.zeros((Nt, Nc), dtype=dtype)
+		By = np.zeros((Nt, Nc), dtype=dtype)
+		with alive_bar(Nt, title="Reading dB".ljust(kdefs.barLab), length=kdefs.barLen, bar=kdefs.barDef, disable=not doVerb) as bar:
+			for n, s in enumerate(sIds):
+				gStp = hf["/Step#%d" % (s)]
+				Bx[n] = -gStp["dBt"][k0].ravel() #Northward is -theta
+				By[n] = gStp["dBp"][k0].ravel()
+				bar()
+
+	if iModel is not None:
+		iModel = np.asarray(iModel, dtype=int).ravel()
+	Ex = np.zeros((Nt, Nc), dtype=dtype)
+	Ey = np.zeros((Nt, Nc), dtype=dtype)
+	cBds = np.arange(0, Nc, nChunk)
+	with alive_bar(len(cBds), title="E-field".ljust(kdefs.barLab), length=kdefs.barLen, bar=kdefs.barDef, disable=not doVerb) as bar:
+		for c0 in cBds:
+			c1 = min(c0+nChunk, Nc)
+			iM = None if iModel is None else iModel[c0:c1]
+			ex, ey = eField(Bx[:, c0:c1].T, By[:, c0:c1].T, res, thick, dt=dt, iModel=iM, pad=pad, padnum=padnum)
+			Ex[:, c0:c1] = ex.T
+			Ey[:, c0:c1] = ey.T
+			bar()
+
+	return {"sIds": sIds, "MJD": MJD,
+		"Ex": Ex.reshape(Nt, Nlat, Nlon), "Ey": Ey.reshape(Nt, Nlat, Nlon)}
+
+def peakE(ex, ey, axis=0):
+	"""
+	Peak horizontal geoelectric field magnitude, e.g. for a GIC hazard map.
+
+	Args:
+		ex, ey (numpy.ndarray): Northward and eastward E.
+		axis (int): Time axis (default is 0, as returned by gridEField).
+
+	Returns:
+		numpy.ndarray: max(sqrt(ex**2+ey**2)) along axis.
+	"""
+	return np.sqrt(ex.astype(float)**2 + ey.astype(float)**2).max(axis=axis)
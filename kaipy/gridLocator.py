@@ -0,0 +1,409 @@
+#Reusable point location on structured grids
+#Locators are built once per grid and then answer batched nearest-cell and
+#containing-cell queries, returning indices and interpolation weights that can
+#be reused for any number of variables/steps on the same grid.
+#Locators only hold numpy arrays (and cKDTree/Delaunay objects) so they can be
+#pickled and shipped to worker processes.
+
+# Standard modules
+import itertools
+
+# Third-party modules
+import numpy as np
+from scipy import sparse
+from scipy.spatial import cKDTree, Delaunay
+
+
+class AxisLocator(object):
+	"""
+	Bisection locator on a single monotone axis.
+
+	Args:
+		x (numpy.ndarray): Monotone (increasing or decreasing) node values.
+
+	Attributes:
+		x (numpy.ndarray): Node values.
+		N (int): Number of nodes.
+		isInc (bool): True if x is increasing.
+	"""
+
+	def __init__(self, x):
+		self.x = np.asarray(x, dtype=float)
+		self.N = len(self.x)
+		if self.N < 2:
+			raise ValueError("AxisLocator needs at least 2 nodes")
+		self.isInc = bool(self.x[-1] > self.x[0])
+		#Increasing copy used for bisection
+		self._xs = self.x if self.isInc else -self.x
+
+	def cellIdx(self, xq):
+		"""
+		Index of the cell [x[i],x[i+1]) containing each query point.
+
+		Points off the axis are assigned to the first/last cell.
+
+		Args:
+			xq (float or numpy.ndarray): Query points.
+
+		Returns:
+			numpy.ndarray: Cell index i0 in [0,N-2] for each point.
+		"""
+		xq = np.asarray(xq, dtype=float)
+		xs = xq if self.isInc else -xq
+		i0 = np.searchsorted(self._xs, xs, side='right') - 1
+		return np.clip(i0, 0, self.N - 2)
+
+	def weights(self, xq, i0=None):
+		"""
+		Linear interpolation weights within a cell.
+
+		Weights are not clamped, points off the axis are extrapolated from the
+		end cells.
+
+		Args:
+			xq (float or numpy.ndarray): Query points.
+			i0 (numpy.ndarray, optional): Cell index to use, defaults to cellIdx(xq).
+
+		Returns:
+			i0 (numpy.ndarray): Index of the left node.
+			w (numpy.ndarray): Weight of the right node, Q(xq) = (1-w)*Q[i0] + w*Q[i0+1].
+		"""
+		xq = np.asarray(xq, dtype=float)
+		if i0 is None:
+			i0 = self.cellIdx(xq)
+		w = (xq - self.x[i0])/(self.x[i0 + 1] - self.x[i0])
+		return i0, w
+
+	def nearest(self, xq):
+		"""
+		Index of the node closest to each query point.
+
+		Args:
+			xq (float or numpy.ndarray): Query points.
+
+		Returns:
+			numpy.ndarray: Node index for each point.
+		"""
+		i0, w = self.weights(xq)
+		return i0 + (w >= 0.5)
+
+
+class TensorLocator(object):
+	"""
+	Locator on a tensor-product grid of monotone axes, e.g. the RCM/RAIJU
+	ionospheric grids or a spherical grid's radial axis.
+
+	Args:
+		*axes (numpy.ndarray): Node values of each axis.
+
+	Attributes:
+		axes (list of AxisLocator): Locator for each axis.
+		Nd (int): Number of dimensions.
+	"""
+
+	def __init__(self, *axes):
+		self.axes = [AxisLocator(x) for x in axes]
+		self.Nd = len(self.axes)
+
+	def cellIdx(self, *xq):
+		"""
+		Containing cell of each query point.
+
+		Args:
+			*xq (numpy.ndarray): Query coordinates along each axis.
+
+		Returns:
+			tuple of numpy.ndarray: Cell index along each axis.
+		"""
+		return tuple(ax.cellIdx(x) for ax, x in zip(self.axes, xq))
+
+	def weights(self, *xq):
+		"""
+		Containing cell and multilinear weights of each query point.
+
+		Args:
+			*xq (numpy.ndarray): Query coordinates along each axis.
+
+		Returns:
+			idx (tuple of numpy.ndarray): Cell index along each axis.
+			w (tuple of numpy.ndarray): Weight of the upper node along each axis.
+		"""
+		iw = [ax.weights(x) for ax, x in zip(self.axes, xq)]
+		return tuple(i for i, _ in iw), tuple(w for _, w in iw)
+
+	def nearest(self, *xq):
+		"""
+		Nearest node of each query point, axis by axis.
+
+		Args:
+			*xq (numpy.ndarray): Query coordinates along each axis.
+
+		Returns:
+			tuple of numpy.ndarray: Node index along each axis.
+		"""
+		return tuple(ax.nearest(x) for ax, x in zip(self.axes, xq))
+
+	def interp(self, Q, idx, w):
+		"""
+		Multilinear interpolation with precomputed weights.
+
+		Args:
+			Q (numpy.ndarray): Nodal values, the first Nd dimensions are the
+				grid axes and trailing dimensions are carried along.
+			idx, w (tuple of numpy.ndarray): Output of weights().
+
+		Returns:
+			numpy.ndarray: Interpolated values, shape of idx[0] + Q.shape[Nd:].
+		"""
+		Q = np.asarray(Q)
+		xS = (Ellipsis,) + (None,)*(Q.ndim - self.Nd)
+		Qi = 0.0
+		for corner in itertools.product((0, 1), repeat=self.Nd):
+			wC = 1.0
+			for c, wD in zip(corner, w):
+				wC = wC*(wD if c else 1.0 - wD)
+			Qi = Qi + np.asarray(wC)[xS]*Q[tuple(i + c for i, c in zip(idx, corner))]
+		return Qi
+
+
+class KDLocator(object):
+	"""
+	KD-tree locator on a curvilinear structured grid, e.g. Gamera cell centers.
+
+	Args:
+		*X (numpy.ndarray): Coordinates of the grid points, all of the same shape.
+
+	Attributes:
+		shape (tuple): Shape of the grid.
+		tree (scipy.spatial.cKDTree): Tree over the flattened points.
+	"""
+
+	def __init__(self, *X):
+		self.shape = np.shape(X[0])
+		self.tree = cKDTree(np.column_stack([np.ravel(x) for x in X]))
+
+	def _query(self, xq, k):
+		pnts = np.stack(np.broadcast_arrays(*[np.asarray(x, dtype=float) for x in xq]), axis=-1)
+		return self.tree.query(pnts, k=k)
+
+	def nearest(self, *xq, returnDist=False):
+		"""
+		Nearest grid point of each query point.
+
+		Args:
+			*xq (numpy.ndarray): Query coordinates.
+			returnDist (bool): Also return the distance to the nearest point.
+
+		Returns:
+			tuple of numpy.ndarray: Grid index along each dimension (and the
+				distances if returnDist).
+		"""
+		d, n = self._query(xq, 1)
+		idx = np.unravel_index(n, self.shape)
+		if returnDist:
+			return idx, d
+		return idx
+
+	def weights(self, *xq, k=4, p=2):
+		"""
+		Inverse distance weights from the k nearest grid points.
+
+		Query points that coincide with a grid point take its value.
+
+		Args:
+			*xq (numpy.ndarray): Query coordinates.
+			k (int): Number of neighbors.
+			p (float): Power of the inverse distance.
+
+		Returns:
+			idx (tuple of numpy.ndarray): Grid index of the neighbors along
+				each dimension, shape (...,k).
+			w (numpy.ndarray): Normalized weights, shape (...,k).
+		"""
+		d, n = self._query(xq, k)
+		d = np.atleast_1d(d)
+		n = np.atleast_1d(n)
+		if k == 1:
+			d = d[..., None]
+			n = n[..., None]
+		isHit = d == 0
+		with np.errstate(divide='ignore'):
+			w = 1.0/d**p
+		hasHit = isHit.any(axis=-1, keepdims=True)
+		w = np.where(hasHit, isHit.astype(float), w)
+		w = w/w.sum(axis=-1, keepdims=True)
+		return np.unravel_index(n, self.shape), w
+
+	def interp(self, Q, idx, w):
+		"""
+		Apply weights from weights() to gridded values.
+
+		Args:
+			Q (numpy.ndarray): Values on the grid, trailing dimensions are carried along.
+			idx, w: Output of weights().
+
+		Returns:
+			numpy.ndarray: Interpolated values.
+		"""
+		Q = np.asarray(Q)
+		Qn = Q[idx]
+		xS = (Ellipsis,) + (None,)*(Q.ndim - len(self.shape))
+		return (w[xS]*Qn).sum(axis=w.ndim - 1)
+
+
+class TriLocator(object):
+	"""
+	Delaunay locator on scattered 2D points, e.g. the cell centers of an egg slice.
+
+	The weights returned are the barycentric weights of linear griddata, stored
+	as a sparse matrix so that interpolating a field is a single matvec.
+
+	Args:
+		x, y (numpy.ndarray): Point coordinates, any (matching) shape.
+
+	Attributes:
+		Np (int): Number of points.
+		tri (scipy.spatial.Delaunay): Triangulation of the flattened points.
+	"""
+
+	def __init__(self, x, y):
+		self.Np = np.size(x)
+		self.tri = Delaunay(np.column_stack([np.ravel(x), np.ravel(y)]))
+
+	def weights(self, xq, yq):
+		"""
+		Linear interpolation matrix from the points to the query points.
+
+		Query points outside of the convex hull get an empty row, i.e. a fill
+		value of 0.
+
+		Args:
+			xq, yq (numpy.ndarray): Query coordinates, any (matching) shape.
+
+		Returns:
+			scipy.sparse.csr_matrix: (Nq,Np) matrix W, Q(xq,yq) = W @ Q.flatten().
+		"""
+		uv = np.column_stack([np.ravel(xq), np.ravel(yq)])
+		Nq = len(uv)
+		simplex = self.tri.find_simplex(uv)
+		isIn = simplex >= 0
+		T = self.tri.transform[simplex[isIn]]
+		bary = np.einsum('njk,nk->nj', T[:, :2, :], uv[isIn] - T[:, 2])
+		bary = np.hstack((bary, 1.0 - bary.sum(axis=1, keepdims=True)))
+		rows = np.repeat(np.nonzero(isIn)[0], 3)
+		cols = self.tri.simplices[simplex[isIn]].ravel()
+		return sparse.csr_matrix((bary.ravel(), (rows, cols)), shape=(Nq, self.Np))
+
+
+def streamGrid(cache, xc, yc, rIn, U, V, xyBds, dx):
+	"""
+	Interpolate 2D vector components from scattered points to a Cartesian mesh
+	for streamline plots.
+
+	The TriLocator weights only depend on the points and the target mesh, they
+	are built once per (xyBds,dx) and stored in cache for reuse on later steps.
+	Mesh points with r <= 1.01*rIn are zeroed out.
+
+	Args:
+		cache (dict): Weight cache, owned by the caller and tied to (xc,yc,rIn).
+		xc, yc (numpy.ndarray): Point coordinates, e.g. egg slice cell centers.
+		rIn (float): Inner boundary radius.
+		U, V (numpy.ndarray): Vector components at the points, same shape as xc.
+		xyBds (list): Bounds of the mesh, [xmin,xmax,ymin,ymax].
+		dx (float): Mesh spacing.
+
+	Returns:
+		x1, y1 (numpy.ndarray): Mesh axes.
+		gu, gv, gM (numpy.ndarray): Components and magnitude on the mesh, (len(y1),len(x1)).
+	"""
+	key = (tuple(xyBds), dx)
+	if key not in cache:
+		N1 = int((xyBds[1] - xyBds[0])/dx)
+		N2 = int((xyBds[3] - xyBds[2])/dx)
+
+		#Create matching Cartesian grid
+		x1 = np.linspace(xyBds[0], xyBds[1], N1)
+		y1 = np.linspace(xyBds[2], xyBds[3], N2)
+
+		xx1, yy1 = np.meshgrid(x1, y1)
+		r1 = np.sqrt(xx1**2.0 + yy1**2.0)
+		W = TriLocator(xc, yc).weights(xx1, yy1)
+		#Zero out points inside the inner boundary
+		kIn = (r1 > rIn*1.01).astype(float).reshape(-1, 1)
+		cache[key] = (x1, y1, W.multiply(kIn).tocsr())
+
+	x1, y1, W = cache[key]
+	shp = (len(y1), len(x1))
+	gu = (W @ U.flatten()).reshape(shp)
+	gv = (W @ V.flatten()).reshape(shp)
+	gM = (W @ np.sqrt(U**2.0 + V**2.0).flatten()).reshape(shp)
+	return x1, y1, gu, gv, gM
+
+
+#------
+#Grid constructors
+#------
+
+def cellCenters(*X):
+	"""
+	Cell centers of 2D/3D corner arrays.
+
+	Args:
+		*X (numpy.ndarray): Corner coordinates, (Ni+1,Nj+1) or (Ni+1,Nj+1,Nk+1).
+
+	Returns:
+		list of numpy.ndarray: Center coordinates, (Ni,Nj) or (Ni,Nj,Nk).
+	"""
+	Xc = []
+	for x in X:
+		for d in range(x.ndim):
+			x = 0.5*(np.take(x, range(x.shape[d] - 1), axis=d) + np.take(x, range(1, x.shape[d]), axis=d))
+		Xc.append(x)
+	return Xc
+
+
+def gameraLocator(gamPipe, doVerbose=False):
+	"""
+	KD-tree locator over the cell centers of a Gamera grid.
+
+	Args:
+		gamPipe (kaipy.gamera.gampp.GameraPipe): Pipe to the run, the grid is
+			loaded if needed.
+		doVerbose (bool): Passed to GetGrid.
+
+	Returns:
+		KDLocator: Locator returning (i,j) or (i,j,k) cell indices.
+	"""
+	if not gamPipe.gridLoaded:
+		gamPipe.GetGrid(doVerbose)
+	if gamPipe.is2D:
+		return KDLocator(*cellCenters(gamPipe.X, gamPipe.Y))
+	return KDLocator(*cellCenters(gamPipe.X, gamPipe.Y, gamPipe.Z))
+
+
+def rcmLocator(aloct, colat):
+	"""
+	Locator on an RCM ionospheric grid, in (MLON,MLAT) [deg].
+
+	Args:
+		aloct (numpy.ndarray): RCM longitude [rad], indexed [lon,lat] as stored in rcm.h5.
+		colat (numpy.ndarray): RCM colatitude [rad], indexed [lon,lat].
+
+	Returns:
+		TensorLocator: Locator with axes (MLON, MLAT), MLAT is decreasing.
+	"""
+	return TensorLocator(aloct[:, 0]*180/np.pi, 90.0 - colat[0, :]*180/np.pi)
+
+
+def raijuLocator(X, Y):
+	"""
+	Locator on the RAIJU ionospheric grid corners.
+
+	Args:
+		X (numpy.ndarray): Colatitude of the corners, (Ni+1,Nj+1).
+		Y (numpy.ndarray): Longitude of the corners, (Ni+1,Nj+1).
+
+	Returns:
+		TensorLocator: Locator with axes (colat, lon), cellIdx gives RAIJU cell (i,j).
+	"""
+	return TensorLocator(X[:, 0], Y[0, :])
@@ -402,11 +402,17 @@ def getTs(fname, sIds=None, aID="time", aDef=0.0, useTAC=True, useBars=True):
 	'''
 	Retrieve time series data from an HDF5 file.
 
+	If the file has a time attribute cache (kdefs.grpTimeCache) holding aID
+	the values are served from it with their cached dtype, otherwise the step
+	groups are scanned into a float array. Either way steps lacking the
+	attribute get aDef.
+
 	Args:
 		fname (str): The path to the HDF5 file.
 		sIds (list, optional): List of step IDs to retrieve time series data for. If None, all steps will be used.
 		aID (str, optional): The attribute ID to retrieve. Default is "time".
 		aDef (float, optional): The default value to use if the attribute is not found. Default is 0.0.
+		useTAC (bool, optional): Whether to use the time attribute cache if present. Default is True.
 
 	Returns:
 		numpy.ndarray: An array containing the time series data.
@@ -417,7 +423,7 @@ def getTs(fname, sIds=None, aID="time", aDef=0.0, useTAC=True, useBars=True):
 	'''
 
 	if sIds is None:
-		nSteps, sIds = cntSteps(fname)
+		nSteps, sIds = cntSteps(fname, useTAC=useTAC, useBars=useBars)
 	Nt = len(sIds)
 	T = np.zeros(Nt)
 	CheckOrDie(fname)
@@ -425,20 +431,178 @@ def getTs(fname, sIds=None, aID="time", aDef=0.0, useTAC=True, useBars=True):
 
 	with h5py.File(fname, 'r') as hf:
 		if useTAC and kdefs.grpTimeCache in hf.keys():
-			if aID in hf[kdefs.grpTimeCache]:
-				T = np.asarray(hf[kdefs.grpTimeCache][aID])
-			else:
-				T[:] = aDef
-		else:
-			iterator = enumerate(sIds)
-			if useBars:
-				iterator = alive_it(iterator, title="#-Steps".ljust(kdefs.barLab), length=kdefs.barLen, bar=kdefs.barDef)
-			for idx, n in iterator:
-				gId = "/Step#%d" % (n)
-				T[idx] = hf[gId].attrs.get(aID, aDef)
-				#bar()
+			tac = hf[kdefs.grpTimeCache]
+			if aID in tac:
+				idx = tacRows(tac, sIds)
+				if idx is None and 'step' not in tac and tac[aID].shape == (Nt,):
+					#No step index, assume the cache covers the requested steps
+					idx = slice(None)
+				if idx is not None:
+					#Keep the cached dtype, e.g. integer step counters
+					T = np.asarray(tac[aID])[idx]
+					if np.issubdtype(T.dtype, np.floating):
+						#Steps without the attribute are cached as NaN
+						T[np.isnan(T)] = aDef
+					return T
+		iterator = enumerate(sIds)
+		if useBars:
+			iterator = alive_it(iterator, title="#-Steps".ljust(kdefs.barLab), length=kdefs.barLen, bar=kdefs.barDef)
+		for idx, n in iterator:
+			gId = "/Step#%d" % (n)
+			T[idx] = hf[gId].attrs.get(aID, aDef)
+			#bar()
 	return T
 
+def tacRows(tac, sIds):
+	'''
+	Map step IDs to rows of a time attribute cache group.
+
+	Args:
+		tac (h5py.Group): The kdefs.grpTimeCache group.
+		sIds (list): Step IDs.
+
+	Returns:
+		numpy.ndarray or None: Row of each step, None if the cache does not hold all of the steps.
+	'''
+	sIds = np.asarray(sIds, dtype=int)
+	if 'step' not in tac:
+		return None
+	tSteps = np.asarray(tac['step'], dtype=int)
+	if len(tSteps) == 0:
+		return None if len(sIds) > 0 else sIds
+	order = np.argsort(tSteps, kind='stable')
+	loc = np.clip(np.searchsorted(tSteps, sIds, sorter=order), 0, len(tSteps)-1)
+	idx = order[loc]
+	if not np.array_equal(tSteps[idx], sIds):
+		return None
+	return idx
+
+def isScalarAtt(A):
+	'''
+	Whether an attribute value is a numeric scalar that can be cached.
+
+	Args:
+		A: Attribute value.
+
+	Returns:
+		bool: True for numeric (or bool) scalars and size-1 arrays.
+	'''
+	A = np.asarray(A)
+	return A.size == 1 and (np.issubdtype(A.dtype, np.number) or A.dtype == bool)
+
+def getStepAtts(fname, sIds=None, aIDs=None, useBars=True):
+	'''
+	Read the scalar attributes of all steps in a single pass over the file.
+
+	Args:
+		fname (str): The path to the HDF5 file.
+		sIds (list, optional): Step IDs to read. If None, all steps (from the step groups) will be used.
+		aIDs (list, optional): Attributes to read. If None, every numeric scalar attribute found on any step.
+		useBars (bool, optional): Whether to show a progress bar. Default is True.
+
+	Returns:
+		sIds (numpy.ndarray): Step IDs.
+		atts (dict): Attribute name -> array over steps, NaN where a step lacks the attribute.
+	'''
+	if sIds is None:
+		nSteps, sIds = cntSteps(fname, useTAC=False, useBars=useBars)
+	sIds = np.asarray(sIds, dtype=int)
+	Nt = len(sIds)
+	CheckOrDie(fname)
+	atts = {}
+	if aIDs is not None:
+		atts = {aID: np.full(Nt, np.nan) for aID in aIDs}
+	isInt = {}
+
+	with h5py.File(fname, 'r') as hf:
+		iterator = enumerate(sIds)
+		if useBars:
+			iterator = alive_it(iterator, total=Nt, title="#-Attrs".ljust(kdefs.barLab), length=kdefs.barLen, bar=kdefs.barDef)
+		for n, s in iterator:
+			for aID, A in hf["/Step#%d" % (s)].attrs.items():
+				if aID not in atts:
+					if aIDs is not None or not isScalarAtt(A):
+						continue
+					atts[aID] = np.full(Nt, np.nan)
+				if isScalarAtt(A):
+					A = np.asarray(A)
+					atts[aID][n] = A.item()
+					isInt[aID] = isInt.get(aID, True) and np.issubdtype(A.dtype, np.integer)
+
+	#Keep integer attributes as integers if every step has them
+	for aID, Q in atts.items():
+		if isInt.get(aID, False) and not np.any(np.isnan(Q)):
+			atts[aID] = Q.astype(np.int64)
+	return sIds, atts
+
+def buildTAC(fname, sIds=None, doOverwrite=False, useBars=True):
+	'''
+	Write every per-step scalar attribute into the time attribute cache.
+
+	Extends the kdefs.grpTimeCache group written by the models: cached
+	quantities that already cover all steps are kept (unless doOverwrite),
+	anything missing or stale is (re)written from the step attributes.
+
+	Args:
+		fname (str): The path to the HDF5 file, opened for appending.
+		sIds (list, optional): Step IDs to cache. If None, all step groups.
+		doOverwrite (bool, optional): Rewrite quantities that are already cached. Default is False.
+		useBars (bool, optional): Whether to show a progress bar. Default is True.
+
+	Returns:
+		list: Names of the quantities written.
+	'''
+	sIds, atts = getStepAtts(fname, sIds=sIds, useBars=useBars)
+	Nt = len(sIds)
+	atts['step'] = sIds
+	written = []
+	with h5py.File(fname, 'a') as hf:
+		tac = hf.require_group(kdefs.grpTimeCache)
+		#Existing cache is only valid if it is for the same steps
+		isValid = 'step' in tac and np.array_equal(np.asarray(tac['step']), sIds)
+		for aID, Q in atts.items():
+			if aID in tac:
+				if isValid and tac[aID].shape == (Nt,) and not doOverwrite:
+					continue
+				del tac[aID]
+			tac.create_dataset(aID, data=Q)
+			written.append(aID)
+		#Drop stale cached quantities that can't be rebuilt from step attributes
+		if not isValid:
+			for aID in list(tac.keys()):
+				if aID not in atts:
+					del tac[aID]
+	return written
+
+def getTAC(fname, aIDs=None, sIds=None):
+	'''
+	Read quantities from the time attribute cache.
+
+	Args:
+		fname (str): The path to the HDF5 file.
+		aIDs (list, optional): Quantities to read. If None, everything in the cache.
+		sIds (list, optional): Step IDs to select. If None, all cached steps.
+
+	Returns:
+		dict: Quantity -> array over steps, empty if the file has no cache.
+
+	Raises:
+		ValueError: If sIds are not all in the cache.
+	'''
+	CheckOrDie(fname)
+	with h5py.File(fname, 'r') as hf:
+		if kdefs.grpTimeCache not in hf.keys():
+			return {}
+		tac = hf[kdefs.grpTimeCache]
+		if aIDs is None:
+			aIDs = list(tac.keys())
+		idx = slice(None)
+		if sIds is not None:
+			idx = tacRows(tac, sIds)
+			if idx is None:
+				raise ValueError("Steps not found in %s of %s" % (kdefs.grpTimeCache, fname))
+		return {aID: np.asarray(tac[aID])[idx] for aID in aIDs if aID in tac}
+
 #Used by MageStep to find closest datetime
 def LocDT(items, pivot):
 	'''
@@ -628,3 +792,35 @@ def PullAtt(fname, vID, s0=None, a0=None):
 
 	return Q
 
+def PullAtts(fname, vIDs, s0, a0=None, useTAC=True):
+	'''
+	Retrieve several attributes of one step, opening the file once.
+
+	Values are served from the time attribute cache when it holds them.
+
+	Args:
+		fname (str): The path to the HDF5 file.
+		vIDs (list): Names of the attributes to retrieve.
+		s0 (int): The step number.
+		a0 (optional): Default for attributes that are not found.
+		useTAC (bool, optional): Whether to use the time attribute cache if present. Default is True.
+
+	Returns:
+		dict: Attribute name -> value.
+	'''
+	CheckOrDie(fname)
+	Q = {}
+	with h5py.File(fname, 'r') as hf:
+		if useTAC and kdefs.grpTimeCache in hf.keys():
+			tac = hf[kdefs.grpTimeCache]
+			idx = tacRows(tac, [s0])
+			if idx is not None:
+				for vID in vIDs:
+					if vID in tac:
+						Q[vID] = tac[vID][idx[0]]
+		hfA = hf["/Step#%d" % (s0)].attrs
+		for vID in vIDs:
+			if vID not in Q:
+				Q[vID] = hfA[vID] if vID in hfA.keys() else a0
+	return Q
+
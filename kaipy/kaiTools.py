@@ -83,15 +83,20 @@ def pntIdx_2D(X2D, Y2D, pnt):
 	"""
 	Finds i, j, index within 'X2D' and 'Y2D' closest to 'pnt'
 	Assumes cartesian coordinate system
+	For many points, build a kaipy.gridLocator.KDLocator once and reuse it
 		
 	Parameters:
 		X2D (ndarray[float]): 2D array of X values
 		Y2D (ndarray[float]): 2D array of Y values
-		pnt (List[float])   : [x, y] point to find closest index to
+		pnt (List[float])   : [x, y] point to find closest index to, or (N,2) array of points
 
 	Returns:
-		Tuple of closest i, j index to point 'pnt'
+		Tuple of closest i, j index to point 'pnt' (arrays of length N for multiple points)
 	"""
+	pnt = np.asarray(pnt)
+	if pnt.ndim > 1:
+		import kaipy.gridLocator as gl
+		return gl.KDLocator(X2D, Y2D).nearest(pnt[:,0], pnt[:,1])
 	distSq = (X2D-pnt[0])**2 + (Y2D-pnt[1])**2  # Each source point's euclidian distance from 'pnt'
 	aMinFlattened = distSq.argmin()  # Index of min distance, if it was a flattened array
 	i, j = np.unravel_index(aMinFlattened, X2D.shape)  # Convert back into i,j location
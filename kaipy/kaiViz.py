@@ -252,10 +252,16 @@ def reWrap(V):
 
 #Image files
 #Wrapper to save (and trim) figure
-def savePic(fOut, dpiQ=300, doTrim=True, bLenX=20, bLenY=None, doClose=False, doEps=False, saveFigure=None):
+#File types that are written as vectors, these are never trimmed
+vecFmts = ["eps", "ps", "pdf", "svg", "svgz"]
+
+def savePic(fOut, dpiQ=300, doTrim=True, bLenX=20, bLenY=None, doClose=False, doEps=False, saveFigure=None, frameSink=None):
     """
     Save a matplotlib figure to a file.
 
+    Raster figures are trimmed in memory (see renderFig/trimFrame) and encoded once,
+    without going through ImageMagick.
+
     Parameters:
         fOut (str): The output file path.
         dpiQ (int): The resolution of the saved figure in dots per inch (default: 300).
@@ -265,22 +271,26 @@ def savePic(fOut, dpiQ=300, doTrim=True, bLenX=20, bLenY=None, doClose=False, do
         doClose (bool): Whether to close all figures after saving (default: False).
         doEps (bool): Whether to save the figure in EPS format (default: False).
         saveFigure (matplotlib figure): A predefined figure to plot into (default: None).
+        frameSink (callable): If given, called as frameSink(fOut, frame) with the (trimmed) RGBA
+            frame as a (Ny,Nx,4) uint8 array instead of writing fOut, e.g. to feed a movie encoder (default: None).
 
     Returns:
-        Image File saved to disk.
+        Image File saved to disk (or handed to frameSink).
     """
+    fig = plt.gcf() if saveFigure is None else saveFigure
+    isVec = doEps or (os.path.splitext(fOut)[1][1:].lower() in vecFmts)
     if doEps:
-        if saveFigure is None:
-            plt.savefig(fOut, dpi=dpiQ, format='eps')
-        else:
-            saveFigure.savefig(fOut, dpi=dpiQ, format='eps')
+        fig.savefig(fOut, dpi=dpiQ, format='eps')
+    elif isVec or not (doTrim or frameSink is not None):
+        fig.savefig(fOut, dpi=dpiQ)
     else:
-        if saveFigure is None:
-            plt.savefig(fOut, dpi=dpiQ)
-        else:
-            saveFigure.savefig(fOut, dpi=dpiQ)
+        frame = renderFig(fig, dpiQ)
         if doTrim:
-            trimFig(fOut, bLenX, bLenY)
+            frame = trimFrame(frame, bLenX, bLenY)
+        if frameSink is None:
+            writeFrame(fOut, frame)
+        else:
+            frameSink(fOut, frame)
 
     if doClose:
         if saveFigure is None:
@@ -289,44 +299,121 @@ def savePic(fOut, dpiQ=300, doTrim=True, bLenX=20, bLenY=None, doClose=False, do
             plt.close(saveFigure)
 
 
-#Use imagemagick to trim whitespace off figure
-#doEven: Guarantee even number of pixels in X/Y
-def trimFig(fName, bLenX=20, bLenY=None, doEven=True):
+def renderFig(fig=None, dpiQ=300):
     """
-    Trims the figure image file by removing the borders and resizing it to have even dimensions.
+    Render a figure to an RGBA pixel array in memory.
 
     Parameters:
-        fName (str): The file name of the figure image.
-        bLenX (int): The length of the border to be added on the X-axis. Default is 20.
-        bLenY (int): The length of the border to be added on the Y-axis. If not provided, it will be set to bLenX.
-        doEven (bool): Flag indicating whether to resize the image to have even dimensions. Default is True.
+        fig (matplotlib figure): Figure to render (default: current figure).
+        dpiQ (int): The resolution in dots per inch (default: 300).
 
     Returns:
-        Image file saved to disk.
+        numpy.ndarray: (Ny,Nx,4) uint8 RGBA frame, same pixels as savefig to a PNG.
     """
+    if fig is None:
+        fig = plt.gcf()
+    canvas0 = fig.canvas
+    dpi0 = fig.get_dpi()
+    try:
+        if not hasattr(canvas0, 'print_to_buffer'):
+            #Not an Agg-based canvas, render with Agg and put the original canvas back after
+            from matplotlib.backends.backend_agg import FigureCanvasAgg
+            FigureCanvasAgg(fig)
+        fig.set_dpi(dpiQ)
+        buf, (Nx, Ny) = fig.canvas.print_to_buffer()
+    finally:
+        fig.set_dpi(dpi0)
+        fig.set_canvas(canvas0)
+    #Agg reports the real frame size, no need to guess it from the figure size
+    return np.frombuffer(buf, dtype=np.uint8).reshape(Ny, Nx, 4)
+
+
+def trimFrame(frame, bLenX=20, bLenY=None, doEven=True, bColor=(255, 255, 255, 255)):
+    """
+    Trim the background off an image array, add a border and make the dimensions even.
+
+    Same result as ImageMagick "convert -trim -border" followed by ShaveX/ShaveY: rows and
+    columns that only hold the color of the top-left pixel are cut, a border is added on
+    every side and the last column/row is dropped if the width/height is odd.
 
+    Parameters:
+        frame (numpy.ndarray): (Ny,Nx,C) image.
+        bLenX (int): Width of the border added left and right (default: 20).
+        bLenY (int): Height of the border added top and bottom. If not provided, it will be set to bLenX.
+        doEven (bool): Flag indicating whether to crop the image to even dimensions (default: True).
+        bColor (tuple): Border color, one value per channel (default: opaque white).
 
+    Returns:
+        numpy.ndarray: Trimmed frame.
+    """
     if bLenY is None:
         bLenY = bLenX
+    frame = np.asarray(frame)
+    isFg = (frame != frame[0, 0]).any(axis=-1)
+    iRow = np.nonzero(isFg.any(axis=1))[0]
+    iCol = np.nonzero(isFg.any(axis=0))[0]
+    if len(iRow) == 0:
+        #Nothing but background, ImageMagick leaves a single pixel
+        frame = frame[:1, :1]
+    else:
+        frame = frame[iRow[0]:iRow[-1]+1, iCol[0]:iCol[-1]+1]
 
-    ComS = 'convert -trim -border %dx%d -bordercolor "#FFFFFF" ' % (bLenX, bLenY) + fName + ' ' + fName
-    os.system(ComS)
-
+    Ny, Nx, Nc = frame.shape
+    NyB = Ny + 2*bLenY
+    NxB = Nx + 2*bLenX
     if doEven:
-        Nx, Ny = picSz(fName)
+        NyB -= NyB % 2
+        NxB -= NxB % 2
+    out = np.empty((NyB, NxB, Nc), dtype=frame.dtype)
+    out[...] = np.asarray(bColor, dtype=frame.dtype)[:Nc]
+    ny = min(Ny, NyB-bLenY)
+    nx = min(Nx, NxB-bLenX)
+    out[bLenY:bLenY+ny, bLenX:bLenX+nx] = frame[:ny, :nx]
+    return out
 
-        while (Nx % 2) != 0:
-            ShaveX(fName)
-            Nx, Ny = picSz(fName)
 
-        while (Ny % 2) != 0:
-            ShaveY(fName)
-            Nx, Ny = picSz(fName)
+def writeFrame(fOut, frame):
+    """
+    Encode an RGBA frame to an image file, the format is taken from the extension.
+
+    Parameters:
+        fOut (str): The output file path.
+        frame (numpy.ndarray): (Ny,Nx,4) uint8 RGBA frame.
+
+    Returns:
+        Image file saved to disk.
+    """
+    ext = os.path.splitext(fOut)[1].lower()
+    if ext == "":
+        #Like savefig, fall back to the default format and add its extension
+        ext = "." + mpl.rcParams['savefig.format']
+        fOut = fOut + ext
+    img = Image.fromarray(np.ascontiguousarray(frame), 'RGBA')
+    if ext in [".jpg", ".jpeg", ".bmp"]:
+        img = img.convert('RGB')
+    img.save(fOut)
+
+
+#Trim whitespace off a saved figure
+#doEven: Guarantee even number of pixels in X/Y
+def trimFig(fName, bLenX=20, bLenY=None, doEven=True):
+    """
+    Trims the figure image file by removing the borders and resizing it to have even dimensions.
 
-        Nx, Ny = picSz(fName)
-        if (Nx % 2) != 0 or (Ny % 2) != 0:
-            print("Parity failure on pic sizing")
-            print(Nx, Ny)
+    Done in memory with trimFrame, the file is read and written once.
+
+    Parameters:
+        fName (str): The file name of the figure image.
+        bLenX (int): The length of the border to be added on the X-axis. Default is 20.
+        bLenY (int): The length of the border to be added on the Y-axis. If not provided, it will be set to bLenX.
+        doEven (bool): Flag indicating whether to resize the image to have even dimensions. Default is True.
+
+    Returns:
+        Image file saved to disk.
+    """
+    with Image.open(fName) as img:
+        frame = np.asarray(img.convert('RGBA'))
+    writeFrame(fName, trimFrame(frame, bLenX, bLenY, doEven))
 
 
 def picSz(fName):
@@ -1,10 +1,13 @@
 #Various routines to help scripts that create XMF files from H5 data
 # Standard modules
+import os
 import xml.etree.ElementTree as et
+from concurrent.futures import ProcessPoolExecutor, as_completed
 
 # Third-party modules
 import numpy as np
 import h5py
+from alive_progress import alive_bar
 
 # Kaipy modules
 import kaipy.kdefs as kdefs
@@ -414,3 +417,171 @@ def addHyperslab(Grid, vName, dSetDimStr, vdimStr, startStr, strideStr, numStr,
 	datDI.set("Format", "HDF")
 	datDI.text = fileText
 
+#------
+#Cache-driven XDMF generation
+#------
+#The step listing/times come from the time attribute cache (via kaiH5) and the
+#per-step XML is built from plain arguments, so that long runs can be written
+#in worker processes and existing files only extended with the new steps.
+
+xmlHeader = '<?xml version="1.0" ?>\n'
+xmlIndent = "    "
+
+def getStepTimes(fname, sIds=None):
+	"""
+	Sorted step IDs and their times, served from the time attribute cache when present.
+
+	Args:
+		fname (str): The path to the HDF5 file.
+		sIds (list, optional): Step IDs, defaults to all steps in the file.
+
+	Returns:
+		sIds (numpy.ndarray): Sorted step IDs.
+		T (numpy.ndarray): Time of each step, steps without a time attribute use their step ID.
+	"""
+	if sIds is None:
+		nSteps, sIds = kh5.cntSteps(fname)
+	sIds = np.sort(np.asarray(sIds, dtype=int))
+	T = kh5.getTs(fname, sIds, "time", np.nan)
+	T = np.where(np.isnan(T), sIds, T)
+	return sIds, T
+
+def getStepLinks(fname, sIds):
+	"""
+	File and step each Step# group points to, following ExternalLinks without opening the groups.
+
+	Args:
+		fname (str): The path to the HDF5 file.
+		sIds (list): Step IDs.
+
+	Returns:
+		fNames (list): Basename of the file holding each step (the XDMF file must live next to it).
+		steps (numpy.ndarray): Step ID within that file.
+	"""
+	fBase = os.path.basename(fname)
+	fNames = []
+	steps = np.zeros(len(sIds), dtype=int)
+	with h5py.File(fname, 'r') as hf:
+		for n, s in enumerate(sIds):
+			lnk = hf.get("Step#%d" % (s), getlink=True)
+			if isinstance(lnk, h5py.ExternalLink):
+				fNames.append(os.path.basename(lnk.filename))
+				steps[n] = int(lnk.path.split('#')[-1])
+			else:
+				fNames.append(fBase)
+				steps[n] = s
+	return fNames, steps
+
+def toStr(elt, level=0):
+	"""
+	Pretty-printed XML of an element, indented to sit at the given depth of a document.
+
+	Args:
+		elt (Element): The xdmf element.
+		level (int, optional): Depth of the element in the document. Default is 0.
+
+	Returns:
+		str: XML text, including the leading indentation and a trailing newline.
+	"""
+	et.indent(elt, space=xmlIndent, level=level)
+	return xmlIndent*level + et.tostring(elt, encoding="unicode").rstrip() + "\n"
+
+def _stepStrs(mkStep, level, stepArgs):
+	return [toStr(mkStep(*a), level) for a in stepArgs]
+
+def genStepStrs(mkStep, stepArgs, level=0, nWorkers=1, nChunk=64, doBar=True):
+	"""
+	Build the XML of a set of steps, optionally in worker processes.
+
+	Args:
+		mkStep (callable): Picklable (module level function or functools.partial) returning
+			the xdmf element of a step, called as mkStep(*args) for each entry of stepArgs.
+		stepArgs (list of tuple): Arguments of each step.
+		level (int, optional): Depth of the step elements in the document. Default is 0.
+		nWorkers (int, optional): Number of worker processes. Default is 1.
+		nChunk (int, optional): Number of steps handed to a worker at a time. Default is 64.
+		doBar (bool, optional): Show a progress bar. Default is True.
+
+	Returns:
+		list of str: XML text of each step, in the order of stepArgs.
+	"""
+	chunks = [stepArgs[i:i+nChunk] for i in range(0, len(stepArgs), nChunk)]
+	strs = [None]*len(chunks)
+	with alive_bar(len(stepArgs), title="XDMF steps".ljust(kdefs.barLab), length=kdefs.barLen, bar=kdefs.barDef, disable=not doBar) as bar:
+		if nWorkers <= 1 or len(chunks) <= 1:
+			for n, chunk in enumerate(chunks):
+				strs[n] = _stepStrs(mkStep, level, chunk)
+				bar(len(chunk))
+		else:
+			with ProcessPoolExecutor(max_workers=nWorkers) as executor:
+				futures = {executor.submit(_stepStrs, mkStep, level, chunk): n for n, chunk in enumerate(chunks)}
+				for future in as_completed(futures):
+					n = futures[future]
+					strs[n] = future.result()
+					bar(len(chunks[n]))
+	return [s for chunk in strs for s in chunk]
+
+def readTemporal(fname):
+	"""
+	Step grids and times already in a temporal collection written by writeTemporal.
+
+	Args:
+		fname (str): The path to the XMF file.
+
+	Returns:
+		grids (list of Element): Step grids of the collection, empty if the file is missing or unreadable.
+		T (numpy.ndarray): Time of each step grid.
+	"""
+	try:
+		TGrid = et.parse(fname).getroot().find("Domain/Grid")
+	except (OSError, et.ParseError):
+		return [], np.zeros(0)
+	if TGrid is None:
+		return [], np.zeros(0)
+	grids = TGrid.findall("Grid")
+	T = np.array([float(g.find("Time").get("Value")) for g in grids])
+	return grids, T
+
+def nAppend(Told, T):
+	"""
+	Number of leading steps of T already present in a file holding Told.
+
+	The existing steps are reused only if they match the start of T, otherwise everything is rebuilt.
+
+	Args:
+		Told (numpy.ndarray): Times of the steps in the file.
+		T (numpy.ndarray): Times of all the steps to write.
+
+	Returns:
+		int: Number of steps to keep.
+	"""
+	nOld = len(Told)
+	if nOld == 0 or nOld > len(T):
+		return 0
+	#Times are written with %f
+	if np.allclose(Told, T[:nOld], rtol=0, atol=1.0e-6*max(1.0, np.abs(T[:nOld]).max())):
+		return nOld
+	return 0
+
+def writeTemporal(fname, stepStrs, name="tMesh"):
+	"""
+	Write an XMF file holding a temporal collection of step grids.
+
+	Args:
+		fname (str): The path to the XMF file.
+		stepStrs (list of str): XML text of each step grid, from genStepStrs/toStr with level=3.
+		name (str, optional): Name of the collection. Default is "tMesh".
+
+	Returns:
+		None
+	"""
+	with open(fname, "w") as f:
+		f.write(xmlHeader)
+		f.write('<Xdmf Version="2.0">\n')
+		f.write(xmlIndent + "<Domain>\n")
+		f.write(xmlIndent*2 + '<Grid Name="%s" GridType="Collection" CollectionType="Temporal">\n' % (name))
+		for s in stepStrs:
+			f.write(s)
+		f.write(xmlIndent*2 + "</Grid>\n")
+		f.write(xmlIndent + "</Domain>\n")
+		f.write("</Xdmf>\n")
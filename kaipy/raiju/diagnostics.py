@@ -0,0 +1,287 @@
+"""
+Whole-run diagnostics for RAIJU and MHD-RCM output
+
+Time-invariant grid quantities are read once, then steps are read in chunks
+and reduced with array operations (optionally across a process pool) into
+DPS-Dst, ring current energy content and moment-to-moment summaries.
+"""
+
+# Standard modules
+from concurrent.futures import ProcessPoolExecutor
+
+# Third-party modules
+import h5py as h5
+import numpy as np
+from tqdm import tqdm
+
+# Kaipy modules
+import kaipy.kdefs as kd
+import kaipy.kaiH5 as kh5
+import kaipy.raiju.raijuUtils as ru
+
+#Dessler-Parker-Sckopke: dB [nT] per keV of ring current energy
+DPS_nT_keV = -4.2e-30
+
+#Names of the per-step outputs, in the order they are written
+raijuVars = ["DPSDst_tot", "DPSDst_ele", "Energy_tot", "Energy_ele",
+             "fracP_min", "fracP_max", "fracP_avg",
+             "fracD_min", "fracD_max", "fracD_avg"]
+mhdrcmVars = ["DPSDst_tot", "DPSDst_ele", "Energy_tot", "Energy_ele"]
+
+#Units written as attributes of the output datasets
+diagUnits = {"DPSDst_tot": "nT", "DPSDst_ele": "nT",
+             "Energy_tot": "keV", "Energy_ele": "keV"}
+
+
+def centerStack(A):
+    """
+    Corner to cell-center average of a stack of 2D arrays, (Nt,Ni+1,Nj+1) -> (Nt,Ni,Nj)
+    """
+    return 0.25*(A[:, :-1, :-1] + A[:, 1:, :-1] + A[:, :-1, 1:] + A[:, 1:, 1:])
+
+
+#------
+# Time-invariant quantities
+#------
+
+def raijuStatic(raiI: ru.RAIJUInfo, spcID="HOTP") -> dict:
+    """
+    Read the time-invariant RAIJU quantities needed by raijuChunk
+
+    Returns dict with:
+        eWgt:    [keV per (nPa * Rp/nT)] per cell, energy = Pressure*bVol_cc*eWgt
+        kP_ele:  Pressure index of the electrons
+        kP_m2m:  Pressure/Density index of the species used for moment checks
+        pScl:    Fraction of the MHD pressure that belongs to that species
+    """
+    tiote = 4.0
+
+    with h5.File(raiI.fname, 'r') as f5:
+        Ri_m = f5['Planet'].attrs['Rad_ionosphere']
+        Rp_m = f5['Planet'].attrs['Rad_surface']
+        areaCC = ru.getVar(f5, 'Grid/areaCC')
+        brcc   = ru.getVar(f5, 'Grid/BrCC')
+
+    # p[J/m^3] * bVol[m/T] * B[T] * Re^2[m^2] = [J] * keV/J = [keV]
+    eWgt = 1e-9*(Rp_m*1e9)*(brcc*1e-9)*(areaCC*Ri_m**2)/kd.kev2J
+
+    static = {"eWgt": eWgt,
+              "kP_ele": ru.spcIdx(raiI.species, ru.flavs_s['HOTE'])+1,
+              "kP_m2m": 0,
+              "pScl": 1.0}
+    if spcID == "HOTP":
+        static["kP_m2m"] = ru.spcIdx(raiI.species, ru.flavs_s["HOTP"])+1
+        static["pScl"] = 1.0/(1 + 1/tiote)  # Get just ions
+    if spcID == "HOTE":
+        static["kP_m2m"] = static["kP_ele"]
+        static["pScl"] = 1.0/(1 + tiote)  # Get just electrons
+    return static
+
+
+def mhdrcmStatic(fname: str) -> dict:
+    """
+    Read the time-invariant MHD-RCM quantities needed by mhdrcmChunk
+    """
+    with h5.File(fname, 'r') as f5:
+        br, areaCC = ionoVars(f5['X'][:], f5['Y'][:])
+    Ri_m = kd.RionE*1e6
+    return {"eWgt": 1e-9*(Ri_m*1e9)*(br*1e-9)*(areaCC*Ri_m**2)/kd.kev2J}
+
+
+def ionoVars(X: np.ndarray, Y: np.ndarray):
+    """
+    Dipole Br [nT] and cell area [Re^2] at the ionosphere from the MHD-RCM lon/lat corners [deg]
+    """
+    thetaIono = (90 - 0.25*(Y[:-1,:-1]+Y[1:,:-1]+Y[:-1,1:]+Y[1:,1:]))*np.pi/180
+    phiIono   = 0.25*(X[:-1,:-1]+X[1:,:-1]+X[:-1,1:]+X[1:,1:])*np.pi/180
+    Ri_m = kd.RionE*1e6
+    br = kd.EarthM0g*kd.G2nT/(Ri_m/kd.REarth)**3*2*np.cos(thetaIono)
+
+    dTheta = thetaIono[0,1] - thetaIono[0,0]
+    dPhi = phiIono[1,0] - phiIono[0,0]
+    areaCC = (Ri_m/kd.REarth)**2*np.sin(thetaIono)*dTheta*dPhi
+    return br, areaCC
+
+
+#------
+# Chunk reductions
+#------
+
+def raijuChunk(fname: str, stepStrs: list, static: dict, rmax=6) -> dict:
+    """
+    Reduce a chunk of RAIJU steps to per-step diagnostics, see raijuVars
+    """
+    kP = [0, static["kP_ele"]]
+    with h5.File(fname, 'r') as f5:
+        s5s = [f5[s] for s in stepStrs]
+        xmin = np.stack([ru.getVar(s5, 'xmin') for s5 in s5s])
+        ymin = np.stack([ru.getVar(s5, 'ymin') for s5 in s5s])
+        bvolcc = np.stack([ru.getVar(s5, 'bVol_cc') for s5 in s5s])
+        # Only the species we need, (Nt,2,Ni,Nj)
+        press = np.stack([[s5['Pressure'][k].T for k in kP] for s5 in s5s])
+        maps = momentMaps(s5s, static["kP_m2m"], static["pScl"])
+
+    rmin = np.sqrt(centerStack(xmin)**2 + centerStack(ymin)**2)
+    isGood = (rmin < rmax) & (maps["active"] == ru.domain['ACTIVE'])
+
+    eCell = press*(bvolcc*static["eWgt"])[:,None]
+    energy = np.where(isGood[:,None], eCell, 0.0).sum(axis=(2,3))
+
+    diag = {"Energy_tot": energy[:,0], "Energy_ele": energy[:,1],
+            "DPSDst_tot": DPS_nT_keV*energy[:,0], "DPSDst_ele": DPS_nT_keV*energy[:,1]}
+    diag.update(bufferStats(maps))
+    return diag
+
+
+def mhdrcmChunk(fname: str, stepStrs: list, static: dict, rmax=6) -> dict:
+    """
+    Reduce a chunk of MHD-RCM steps to per-step diagnostics, see mhdrcmVars
+    """
+    with h5.File(fname, 'r') as f5:
+        s5s = [f5[s] for s in stepStrs]
+        xmin = np.stack([s5['xMin'][:] for s5 in s5s])
+        ymin = np.stack([s5['yMin'][:] for s5 in s5s])
+        iopen = np.stack([s5['IOpen'][:] for s5 in s5s])
+        bvol = np.stack([s5['bVol'][:] for s5 in s5s])
+        press = np.stack([np.stack([s5['P'][:], s5['Pe'][:]]) for s5 in s5s])
+
+    rmin = np.sqrt(xmin**2 + ymin**2)
+    isGood = (rmin < rmax) & (iopen < -0.5)
+
+    eCell = press*(bvol*static["eWgt"])[:,None]
+    energy = np.where(isGood[:,None], eCell, 0.0).sum(axis=(2,3))
+    return {"Energy_tot": energy[:,0], "Energy_ele": energy[:,1],
+            "DPSDst_tot": DPS_nT_keV*energy[:,0], "DPSDst_ele": DPS_nT_keV*energy[:,1]}
+
+
+def momentMaps(s5s: list, idx_rai: int, pScl=1.0, idx_mhd=0) -> dict:
+    """
+    MHD and RAIJU moments of one species for a list of steps, each dataset read once per step
+
+    s5s:     list of Step#X groups
+    idx_rai: Pressure/Density index of the RAIJU species
+    pScl:    Fraction of the MHD pressure that belongs to that species
+    idx_mhd: Pavg_in/Davg_in index of the MHD moments
+
+    Returns dict of (Nt,Ni,Nj) arrays: active, p_mhd, d_mhd, p_rai, d_rai and the RAIJU over MHD frac_P, frac_D
+    """
+    # Fortran-ordered on disk so index the first dimension then transpose
+    maps = {"active": np.stack([ru.getVar(s5, 'active') for s5 in s5s]),
+            "p_mhd": np.stack([s5['Pavg_in'][idx_mhd].T for s5 in s5s])*pScl,
+            "d_mhd": np.stack([s5['Davg_in'][idx_mhd].T for s5 in s5s]),
+            "p_rai": np.stack([s5['Pressure'][idx_rai].T for s5 in s5s]),
+            "d_rai": np.stack([s5['Density'][idx_rai].T for s5 in s5s])}
+    with np.errstate(invalid='ignore', divide='ignore'):
+        maps["frac_P"] = maps["p_rai"]/maps["p_mhd"]
+        maps["frac_D"] = maps["d_rai"]/maps["d_mhd"]
+    return maps
+
+
+def bufferStats(maps: dict) -> dict:
+    """
+    fracP/fracD stats of momentMaps output over the buffer region, where MHD moments are mapped to etas
+    """
+    isBuf = maps["active"] == ru.domain['BUFFER']
+    stats = fracStats("fracP", maps["frac_P"], isBuf)
+    stats.update(fracStats("fracD", maps["frac_D"], isBuf))
+    return stats
+
+
+def fracStats(vID: str, frac: np.ndarray, isIn: np.ndarray) -> dict:
+    """
+    Per-step min/max/mean of frac over the cells where isIn is True, nan for empty steps
+    """
+    nIn = isIn.sum(axis=(1,2))
+    with np.errstate(invalid='ignore', divide='ignore'):
+        fMin = np.where(isIn, frac,  np.inf).min(axis=(1,2))
+        fMax = np.where(isIn, frac, -np.inf).max(axis=(1,2))
+        fAvg = np.where(isIn, frac, 0.0).sum(axis=(1,2))/nIn
+    isEmpty = nIn == 0
+    fMin[isEmpty] = np.nan
+    fMax[isEmpty] = np.nan
+    return {vID+"_min": fMin, vID+"_max": fMax, vID+"_avg": fAvg}
+
+
+#------
+# Drivers
+#------
+
+def calcDiag(fname: str, stepStrs: list, chunkFn, static: dict, rmax=6, nChunk=32, nWorkers=1, doBar=True) -> dict:
+    """
+    Run chunkFn over all steps, nChunk steps at a time
+
+    fname:    h5 file to read
+    stepStrs: list of "Step#X" group names
+    chunkFn:  raijuChunk or mhdrcmChunk
+    static:   output of raijuStatic/mhdrcmStatic
+    nWorkers: number of processes, chunks are farmed out if > 1
+
+    Returns dict of per-step arrays, each of length len(stepStrs)
+    """
+    chunks = [stepStrs[i:i+nChunk] for i in range(0, len(stepStrs), nChunk)]
+    args = [(fname, c, static, rmax) for c in chunks]
+    desc = "Diagnostics: {}".format(fname)
+    if nWorkers > 1:
+        with ProcessPoolExecutor(max_workers=nWorkers) as executor:
+            futures = [executor.submit(chunkFn, *a) for a in args]
+            results = [f.result() for f in tqdm(futures, desc=desc, disable=not doBar)]
+    else:
+        results = [chunkFn(*a) for a in tqdm(args, desc=desc, disable=not doBar)]
+
+    return {k: np.concatenate([r[k] for r in results]) for k in results[0].keys()}
+
+
+def raijuDiag(raiI: ru.RAIJUInfo, rmax=6, spcID="HOTP", iSteps=None, **kwargs) -> dict:
+    """
+    Whole-run RAIJU diagnostics, see calcDiag for kwargs
+    iSteps: indices into raiI.stepStrs (default: all)
+    """
+    if iSteps is None:
+        iSteps = range(raiI.Nt)
+    stepStrs = [raiI.stepStrs[i] for i in iSteps]
+    static = raijuStatic(raiI, spcID)
+    diag = calcDiag(raiI.fname, stepStrs, raijuChunk, static, rmax=rmax, **kwargs)
+    return addTimes(diag, raiI, iSteps)
+
+
+def mhdrcmDiag(mrI: kh5.H5Info, rmax=6, iSteps=None, **kwargs) -> dict:
+    """
+    Whole-run MHD-RCM diagnostics, see calcDiag for kwargs
+    iSteps: indices into mrI.stepStrs (default: all)
+    """
+    if iSteps is None:
+        iSteps = range(mrI.Nt)
+    stepStrs = [mrI.stepStrs[i] for i in iSteps]
+    static = mhdrcmStatic(mrI.fname)
+    diag = calcDiag(mrI.fname, stepStrs, mhdrcmChunk, static, rmax=rmax, **kwargs)
+    return addTimes(diag, mrI, iSteps)
+
+
+def addTimes(diag: dict, h5I: kh5.H5Info, iSteps) -> dict:
+    iSteps = np.asarray(iSteps, dtype=int)
+    diag["step"] = np.asarray(h5I.steps)[iSteps]
+    diag["time"] = np.asarray(h5I.times)[iSteps]
+    diag["MJD"]  = np.asarray(h5I.MJDs)[iSteps]
+    return diag
+
+
+def writeDiag(fOut: str, diag: dict, attrs: dict = None):
+    """
+    Write a diagnostics dict as a time-series h5 file, one dataset per quantity
+    """
+    with h5.File(fOut, 'w') as f5:
+        if attrs is not None:
+            for k, v in attrs.items():
+                f5.attrs[k] = v
+        for k, v in diag.items():
+            dset = f5.create_dataset(k, data=v)
+            if k in diagUnits:
+                dset.attrs['units'] = diagUnits[k]
+
+
+def readDiag(fIn: str) -> dict:
+    """
+    Read a file written by writeDiag back into a dict
+    """
+    with h5.File(fIn, 'r') as f5:
+        return {k: f5[k][:] for k in f5.keys()}
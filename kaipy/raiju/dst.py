@@ -7,7 +7,6 @@ import argparse
 import h5py as h5
 import numpy as np
 import matplotlib.pyplot as plt
-from tqdm import tqdm
 
 
 # Kaipy modules
@@ -16,26 +15,12 @@ import kaipy.kaiTools as kt
 import kaipy.kaiViz as kv
 import kaipy.kaiH5 as kh5
 import kaipy.raiju.raijuUtils as ru
+import kaipy.raiju.diagnostics as diag
 
 
 def calcMRIonoVars(s5):
     f5 = s5.file
-    thetaIono = kt.to_center2D((90 - f5['Y'][:])*np.pi/180)
-    phiIono   = kt.to_center2D((f5['X'][:])*np.pi/180)
-    Ri_m = kd.RionE*1e6
-    br = np.zeros(thetaIono.shape)
-    for i in range(thetaIono.shape[0]):
-        br[i,:] = kd.EarthM0g*kd.G2nT \
-                    / (Ri_m/kd.REarth)**3 \
-                    * 2*np.cos(thetaIono[i,:])
-    
-    areaCC = np.zeros(thetaIono.shape)
-    dTheta = thetaIono[0,1] - thetaIono[0,0]
-    dPhi = phiIono[1,0] - phiIono[0,0]
-    for i in range(areaCC.shape[1]):
-        areaCC[:,i] = (Ri_m/kd.REarth)**2*np.sin(thetaIono[:,i])*dTheta*dPhi
-    
-    return br, areaCC
+    return diag.ionoVars(f5['X'][:], f5['Y'][:])
 
 
 def DPSDst_raiju(raiI: ru.RAIJUInfo, s5: h5.Group, rmax=6):
@@ -119,39 +104,37 @@ def DPSDst_mhdrcm(rmI: kh5.H5Info, s5: h5.Group, rmax=6, doMHD=False, br=None, a
     return energyDen_tot, energyDen_ele, dpsdst_2D_tot, dpsdst_2D_ele
 
 
-def plotDstTS(raiI: ru.RAIJUInfo, rmax=6, mrI: kh5.H5Info = None):
+def plotDstTS(raiI: ru.RAIJUInfo, rmax=6, mrI: kh5.H5Info = None, nWorkers=1, fOut=None):
+    """
+    Plot DPS-Dst time series for a RAIJU run (and optionally the matching MHD-RCM run)
+    nWorkers: number of processes used to reduce chunks of steps
+    fOut: if given, also write the time series to this h5 file
+    """
 
     doMR = isinstance(mrI, kh5.H5Info)
 
-    rai5 = h5.File(raiI.fname, 'r')
-    dps_rai_ts     = np.zeros(raiI.Nt)
-    dps_rai_ts_ele = np.zeros(raiI.Nt)
+    dgRai = diag.raijuDiag(raiI, rmax=rmax, nWorkers=nWorkers)
+    dps_rai_ts     = dgRai['DPSDst_tot']
+    dps_rai_ts_ele = dgRai['DPSDst_ele']
+    dps_rai_noEle = dps_rai_ts - dps_rai_ts_ele
 
-    if doMR: 
-        mr5 = h5.File(mrI.fname)
+    if doMR:
         t0 = raiI.times[0]
         t1 = raiI.times[-1]
         i0 = np.abs(mrI.times - t0).argmin()
         i1 = np.abs(mrI.times - t1).argmin()
-        Nt_mr = i1-i0+1
-        dps_mr_ts     = np.zeros(Nt_mr)
-        dps_mr_ts_ele = np.zeros(Nt_mr)
-
-    for t in tqdm(range(raiI.Nt), desc="Calculating RAIJU DPS-Dst"):
-        _, _, dst_tot, dst_ele = DPSDst_raiju(raiI, rai5[raiI.stepStrs[t]], rmax=rmax)
-        dps_rai_ts[t]     = np.sum(dst_tot)
-        dps_rai_ts_ele[t] = np.sum(dst_ele)
-    dps_rai_noEle = dps_rai_ts - dps_rai_ts_ele
-
-
-    if doMR:
-        br, areaCC = calcMRIonoVars(mr5[mrI.stepStrs[0]])
-        for t in tqdm(range(Nt_mr), desc="Calculating MHDRCM DPS-Dst"):
-            _, _, dst_tot, dst_ele = DPSDst_mhdrcm(mrI, mr5[mrI.stepStrs[i0+t]], rmax=rmax, br=br, areaCC=areaCC)
-            dps_mr_ts[t]     = np.sum(dst_tot)
-            dps_mr_ts_ele[t] = np.sum(dst_ele)
+        dgMR = diag.mhdrcmDiag(mrI, rmax=rmax, iSteps=range(i0, i1+1), nWorkers=nWorkers)
+        dps_mr_ts     = dgMR['DPSDst_tot']
+        dps_mr_ts_ele = dgMR['DPSDst_ele']
         dps_mr_noEle = dps_mr_ts - dps_mr_ts_ele
 
+    if fOut is not None:
+        print("Writing {}".format(fOut))
+        diag.writeDiag(fOut, dgRai, attrs={'rmax': rmax, 'source': raiI.fname})
+        if doMR:
+            fOutMR = fOut.replace('.h5', '.mhdrcm.h5')
+            diag.writeDiag(fOutMR, dgMR, attrs={'rmax': rmax, 'source': mrI.fname})
+
     print("Plotting")
     plt.figure(figsize=(8,4))
     plt.plot(raiI.UTs[1:], dps_rai_noEle[1:] , 'b-' , label='RAIJU (Tot-ele)')
@@ -181,6 +164,8 @@ def create_command_line_parser():
     parser.add_argument('-mr',type=str,metavar="runid",default=ftag_mr,help="RunID of mhdrcm h5 (default: %(default)s)")
     parser.add_argument('-rmax',type=float,metavar="Re",default=rmax,help="Maximum Req value to eval DPSDst out to (default: %(default)s)")
     parser.add_argument('--nomr',action='store_true',default=False,help="Don't do mhdrcm stuff (default: %(default)s)")
+    parser.add_argument('-o',type=str,metavar="filename",default=None,help="Also write the Dst time series to this h5 file (default: %(default)s)")
+    parser.add_argument('--ncpus',type=int,metavar="ncpus",default=1,help="Number of processes to reduce steps with (default: %(default)s)")
     
     return parser
 #%%
@@ -215,7 +200,7 @@ def main():
         mrI = None
     
     #%%
-    plotDstTS(raiI, rmax, mrI)
+    plotDstTS(raiI, rmax, mrI, nWorkers=args.ncpus, fOut=args.o)
     # %%
 
 
@@ -3,6 +3,8 @@ from dataclasses import dataclass
 from dataclasses import asdict as dc_asdict
 from typing import Optional, List
 
+import numpy as np
+
 
 # dataclasses_json isn't a default package. Since its only used for reading, don't want to make it a requirement for everyone
 try:
@@ -86,16 +88,14 @@ class DT_Wolf(DistType):
         amax = sP.amax
 
 
-        # Do math
-        alams = []
-        for k in range(sP.n+1):
-            kfrac = (k-kmin)/(kmax-kmin)  # How far through the channel range are we
-            pstar = (1-kfrac)*self.p1 + kfrac*self.p2
-            lammax = amax-amin
-            lam = lammax*((k - kmin + 0.5)/(kmax-kmin + 0.5))**pstar + amin
-            alams.append(lam)
+        # Do math, all interfaces at once
+        k = np.arange(sP.n+1)
+        kfrac = (k-kmin)/(kmax-kmin)  # How far through the channel range are we
+        pstar = (1-kfrac)*self.p1 + kfrac*self.p2
+        lammax = amax-amin
+        alams = lammax*((k - kmin + 0.5)/(kmax-kmin + 0.5))**pstar + amin
 
-        return alams
+        return alams.tolist()
 
 
 # TODO: There's another DistType in the previous RCM generator, should port over
\ No newline at end of file
@@ -12,7 +12,6 @@ import h5py as h5
 import numpy as np
 import matplotlib.pyplot as plt
 from dataclasses import dataclass
-from tqdm import tqdm
 
 # Kaipy modules
 import kaipy.kdefs as kd
@@ -20,6 +19,7 @@ import kaipy.kaiViz as kv
 import kaipy.kaiTools as kt
 import kaipy.raiju.raijuUtils as ru
 import kaipy.raiju.raijuViz as rv
+import kaipy.raiju.diagnostics as diag
 
 @dataclass
 class m2mData_pnt:  # Maybe overkill idk
@@ -73,7 +73,7 @@ def create_command_line_parser():
     )
     parser.add_argument(
         "-dt", type=int, metavar="stride", default=default_nStride,
-        help="Step stride (in minutes)  (default: %(default)s)"
+        help="Step stride (in minutes), 0 for every step (default: %(default)s)"
     )
     parser.add_argument(
         "-phi0", type=int, metavar="int", default=180,
@@ -87,6 +87,14 @@ def create_command_line_parser():
         "-v", "--verbose", action="store_true", default=False,
         help="Print verbose output (default: %(default)s)."
     )
+    parser.add_argument(
+        "--ncpus", type=int, metavar="ncpus", default=1,
+        help="Number of processes for 'summary' mode (default: %(default)s)."
+    )
+    parser.add_argument(
+        "-o", type=str, metavar="outfile", default=None,
+        help="Also write the per-step stats of 'summary' mode to this h5 file (default: %(default)s)."
+    )
     
     return parser
 
@@ -163,27 +171,137 @@ def checkMom2Mom_pnt(raiI: ru.RAIJUInfo, s5: h5.Group,
     return m2mData_pnt(p_mhd,d_mhd,t_mhd,p_rai,d_rai,t_rai)
 
 
+def m2mStatic(raiI: ru.RAIJUInfo, spcID="BLK") -> dict:
+    """
+    Time-invariant species info needed to compare MHD and RAIJU moments
+
+    Returns dict with:
+        idx_mhd: Pavg_in/Davg_in index of the MHD moments
+        idx_rai: Pressure/Density index of the RAIJU species
+        pScl:    Fraction of the MHD pressure that belongs to that species
+        kStart, kEnd, alami, mass: intensity channels, lambda edges and mass [kg] of the species,
+                 only for spcID "HOTP"/"HOTE" (kStart is None for "BLK")
+    """
+    tiote = 4.0
+
+    static = {"idx_mhd": 0, "idx_rai": 0, "pScl": 1.0,
+              "kStart": None, "kEnd": None, "alami": None, "mass": None}
+    if spcID == "BLK":
+        return static
+    if spcID == "HOTP":
+        static["pScl"] = 1.0/(1 + 1/tiote)  # Get just ions
+        mass = kd.Mp_cgs*1e-3
+    if spcID == "HOTE":
+        static["pScl"] = 1.0/(1 + tiote)  # Get just electrons
+        mass = kd.Me_cgs*1e-3
+    idx = ru.spcIdx(raiI.species, ru.flavs_s[spcID])
+    spc = raiI.species[idx]
+    static.update({"idx_rai": idx+1, "kStart": spc.kStart, "kEnd": spc.kEnd,
+                   "alami": np.abs(spc.alami), "mass": mass})
+    return static
+
+
+def intensityMoments(inten: np.ndarray, alami: np.ndarray, bVol_cc: np.ndarray, mass: float):
+    """
+    Density and pressure moments of the RAIJU intensity of every cell at once
+
+    n = 4pi int j/v dE, P = (4pi/3) int j p dE, non-relativistic like ru.intensity_maxwell
+
+    inten:   Intensity [1/(s*sr*keV*cm^2)], (..., Nk) with the species channels last
+    alami:   |lambda| channel edges [eV*(Rx/nT)^(2/3)], (Nk+1,)
+    bVol_cc: Flux tube volume [Rx/nT], (...)
+    mass:    Mass [kg]
+
+    Returns: density [#/cc] and pressure [nPa], both (...)
+    """
+    bScl = np.asarray(bVol_cc)[..., None]**(-2./3.)*1e-3
+    energies = alami*bScl  # [keV], (..., Nk+1)
+    dE = energies[..., 1:] - energies[..., :-1]
+    E_J = 0.5*(energies[..., 1:] + energies[..., :-1])*kd.kev2J
+    v = np.sqrt(2*E_J/mass)*1e2  # [cm/s]
+    p = np.sqrt(2*mass*E_J)  # [kg m/s]
+    jE = np.nan_to_num(inten)*dE
+    n = 4*np.pi*(jE/v).sum(axis=-1)
+    # j*p*dE -> Pa (cm^-2 -> m^-2), then nPa
+    P = (4*np.pi/3)*1.0e4*1.0e9*(jE*p).sum(axis=-1)
+    return n, P
+
+
+def m2mMaps(s5s: list, static: dict, doInten=True) -> dict:
+    """
+    MHD vs RAIJU moments of every cell for a list of steps, each dataset read once per step
+
+    s5s:     list of Step#X groups
+    static:  output of m2mStatic
+    doInten: also take the moments of the intensity (needs a HOTP/HOTE static)
+
+    Returns dict of (Nt,Ni,Nj) arrays: active, p_mhd, d_mhd, kt_mhd, p_rai, d_rai, kt_rai,
+    frac_P, frac_D and, with doInten, p_int, d_int, fracP_int, fracD_int (intensity over RAIJU moments)
+    """
+    # Same moments and fracs as the raiju diagnostics, see diag.momentMaps
+    maps = diag.momentMaps(s5s, static["idx_rai"], static["pScl"], static["idx_mhd"])
+    with np.errstate(invalid='ignore', divide='ignore'):
+        maps["kt_mhd"] = 6.25*maps["p_mhd"]/maps["d_mhd"]
+        maps["kt_rai"] = 6.25*maps["p_rai"]/maps["d_rai"]
+
+    if doInten and static["kStart"] is not None:
+        kS, kE = static["kStart"], static["kEnd"]
+        inten = np.stack([s5['intensity'][kS:kE].T for s5 in s5s])
+        bVol_cc = np.stack([ru.getVar(s5, 'bVol_cc') for s5 in s5s])
+        maps["d_int"], maps["p_int"] = intensityMoments(inten, static["alami"], bVol_cc, static["mass"])
+        with np.errstate(invalid='ignore', divide='ignore'):
+            maps["fracP_int"] = maps["p_int"]/maps["p_rai"]
+            maps["fracD_int"] = maps["d_int"]/maps["d_rai"]
+    return maps
+
+
+def m2mChunk(fname: str, stepStrs: list, static: dict, rmax=None) -> dict:
+    """
+    Reduce a chunk of RAIJU steps to per-step moment-to-moment stats, see diag.calcDiag
+
+    fracP/fracD (RAIJU over MHD) are taken over the buffer cells, where MHD moments are mapped to etas.
+    fracP_int/fracD_int (intensity over RAIJU moments) are taken over all buffer and active cells.
+    rmax is accepted for diag.calcDiag and not used.
+    """
+    with h5.File(fname, 'r') as f5:
+        maps = m2mMaps([f5[s] for s in stepStrs], static)
+
+    stats = diag.bufferStats(maps)
+    if "p_int" in maps:
+        isIn = maps["active"] != ru.domain['INACTIVE']
+        stats.update(diag.fracStats("fracP_int", maps["fracP_int"], isIn))
+        stats.update(diag.fracStats("fracD_int", maps["fracD_int"], isIn))
+    return stats
+
+
+def checkMom2Mom_run(raiI: ru.RAIJUInfo, spcID="HOTP", iSteps=None, **kwargs) -> dict:
+    """
+    Moment-to-moment stats for many steps (default: all), see m2mChunk
+
+    Steps are read and reduced in chunks, optionally across processes, see diag.calcDiag for kwargs
+    iSteps: indices into raiI.stepStrs
+
+    Returns dict of per-step arrays, {fracP,fracD,fracP_int,fracD_int}_{min,max,avg} plus step/time/MJD
+    """
+    if iSteps is None:
+        iSteps = range(raiI.Nt)
+    stepStrs = [raiI.stepStrs[i] for i in iSteps]
+    static = m2mStatic(raiI, spcID)
+    m2m = diag.calcDiag(raiI.fname, stepStrs, m2mChunk, static, **kwargs)
+    return diag.addTimes(m2m, raiI, iSteps)
+
+
 def checkMom2Mom_step(raiI: ru.RAIJUInfo, s5: h5.Group, 
                       mask_cc:np.ndarray = None, spcID="BLK",
                       doPlot=False,doConsoleIO=False) -> m2mData_step:
     
-    active = ru.getVar(s5, 'active')
+    maps = m2mMaps([s5], m2mStatic(raiI, spcID), doInten=False)
     if mask_cc is None:
-        mask_cc = active != ru.domain['BUFFER']
+        mask_cc = maps["active"][0] != ru.domain['BUFFER']
 
-    frac_P = np.ma.ones((raiI.Ni, raiI.Nj))
-    frac_D = np.ma.ones((raiI.Ni, raiI.Nj))
-    kt_mhd = np.ma.ones((raiI.Ni, raiI.Nj))
-    frac_P.mask = mask_cc
-    frac_D.mask = mask_cc
-    
-    for j in range(raiI.Nj):
-        for i in range(raiI.Ni):
-            if mask_cc[i,j]: continue
-            m2m = checkMom2Mom_pnt(raiI, s5, i, j, spcID=spcID,doIntenPlot=False)
-            frac_P[i,j] = m2m.p_rai/m2m.p_mhd
-            frac_D[i,j] = m2m.d_rai/m2m.d_mhd
-            kt_mhd[i,j] = m2m.kt_mhd
+    frac_P = np.ma.array(maps["frac_P"][0], mask=mask_cc)
+    frac_D = np.ma.array(maps["frac_D"][0], mask=mask_cc)
+    kt_mhd = np.ma.array(maps["kt_mhd"][0], mask=mask_cc)
 
     if doPlot:
         iStep = np.argmin(np.abs(raiI.times - s5.attrs['time']))
@@ -240,9 +358,7 @@ def checkMom2Mom_step(raiI: ru.RAIJUInfo, s5: h5.Group,
     return m2mData_step(frac_P,frac_D)
 
 
-def checkMom2Mom_summary(raiI:ru.RAIJUInfo, ut_start:datetime.datetime=None, ut_end:datetime.datetime=None, stride_minutes:float=5):
-
-    f5 = h5.File(raiI.fname,'r')
+def checkMom2Mom_summary(raiI:ru.RAIJUInfo, ut_start:datetime.datetime=None, ut_end:datetime.datetime=None, stride_minutes:float=5, nWorkers=1, fOut:str=None):
 
     if ut_start is None:
         iStart = 0
@@ -255,28 +371,21 @@ def checkMom2Mom_summary(raiI:ru.RAIJUInfo, ut_start:datetime.datetime=None, ut_
     if stride_minutes is None:
         iStep = 10
     else:
-        iStep = int( (stride_minutes*60) / (raiI.UTs[-1]-raiI.UTs[-2]).seconds )
-
-    Nt = int( (iEnd - iStart)/iStep )+1
-    
-    timeArr = np.empty(Nt,dtype=datetime.datetime)
-    min_P = np.zeros(Nt)
-    max_P = np.zeros(Nt)
-    avg_P = np.zeros(Nt)
-    min_D = np.zeros(Nt)
-    max_D = np.zeros(Nt)
-    avg_D = np.zeros(Nt)
-
-    for i, iRai in enumerate(tqdm(range(iStart,iEnd,iStep))):
-        s5 = f5[raiI.stepStrs[iRai]]
-        m2m = checkMom2Mom_step(raiI,s5,spcID="HOTP")
-        timeArr[i] = raiI.UTs[iRai]
-        min_P[i] = np.min(m2m.frac_P)
-        max_P[i] = np.max(m2m.frac_P)
-        avg_P[i] = np.average(m2m.frac_P)
-        min_D[i] = np.min(m2m.frac_D)
-        max_D[i] = np.max(m2m.frac_D)
-        avg_D[i] = np.average(m2m.frac_D)
+        iStep = max(1, int( (stride_minutes*60) / (raiI.UTs[-1]-raiI.UTs[-2]).seconds ))
+
+    # Frac stats for every step in one pass, see m2mChunk
+    iSteps = range(iStart,iEnd+1,iStep)
+    m2m = checkMom2Mom_run(raiI, spcID="HOTP", iSteps=iSteps, nWorkers=nWorkers)
+    if fOut is not None:
+        diag.writeDiag(fOut, m2m, attrs={"spcID": "HOTP"})
+        print(f"Wrote {fOut}")
+    timeArr = np.asarray(raiI.UTs)[iSteps]
+    min_P = m2m['fracP_min']
+    max_P = m2m['fracP_max']
+    avg_P = m2m['fracP_avg']
+    min_D = m2m['fracD_min']
+    max_D = m2m['fracD_max']
+    avg_D = m2m['fracD_avg']
 
     clr_P = "red"
     clr_D = "blue"
@@ -309,6 +418,8 @@ def main(config=None):
         "phi0"      : args.phi0,
         "mode"      : args.mode,
         "doVerbose" : args.verbose,
+        "nWorkers"  : args.ncpus,
+        "fOut"      : args.o,
         }
     indir = os.getcwd()
     fname = "msphere.raiju.h5"
@@ -325,7 +436,7 @@ def main(config=None):
         config['ut_end'] = datetime.datetime.strptime(config['ut_end'],isotfmt)
     
     if config['mode']=="summary":
-        checkMom2Mom_summary(raiI,config['ut_start'],config['ut_end'],config['del_min'])
+        checkMom2Mom_summary(raiI,config['ut_start'],config['ut_end'],config['del_min'],nWorkers=config.get('nWorkers',1),fOut=config.get('fOut'))
     if config['mode']=="step":
         iUT = np.argmin(np.abs(raiI.UTs - config['ut_end']))
         f5 = h5.File(raiI.fname, 'r')
@@ -204,6 +204,69 @@ def intensity_kappa(n, mass, E, kT, kappa=6):
     j = 2*E/mass**2 * f  * 1e2 * np.sqrt(kd.kev2J)
     return j
 
+def maxwellFrac(E, kT):
+    """ Fraction of a Maxwellian's particles below energy E, works on arrays of any (broadcastable) shape
+        E: energy in keV
+        kT: temp in keV
+    """
+    x = np.asarray(E)/kT
+    return sp.erf(np.sqrt(x)) - 2*np.sqrt(x/np.pi)*np.exp(-x)
+
+def kappaFrac(E, kT, kappa=6):
+    """ Fraction of a kappa distribution's particles below energy E, same distribution as intensity_kappa
+        E: energy in keV
+        kT: temp in keV
+        Energies are beta-prime distributed, so this is a regularized incomplete beta function
+    """
+    kap15 = kappa-1.5
+    E0 = kT*kap15/kappa
+    u = (np.asarray(E)/E0)/kap15
+    return sp.betainc(1.5, kappa-0.5, u/(1+u))
+
+def channelFracs(alami, bVol, kT, kappa=None):
+    """ Fraction of the particles in every lambda channel of every cell
+        alami: lambda channel edges [eV*(Rx/nT)^(2/3)], (Nk+1,)
+        bVol: [Rx/nT], (...), e.g. (Ni,Nj) or (Nt,Ni,Nj)
+        kT: temp in keV, (...)
+        kappa: None for a Maxwellian
+        return: fractions, (...,Nk) with the channels last
+    """
+    E = lambda2Energy(np.abs(np.asarray(alami)), np.asarray(bVol)[..., np.newaxis])  # [keV]
+    kT = np.asarray(kT)[..., np.newaxis]
+    with np.errstate(invalid='ignore', divide='ignore'):
+        F = maxwellFrac(E, kT) if kappa is None else kappaFrac(E, kT, kappa)
+    return F[..., 1:] - F[..., :-1]
+
+def moments2Eta(n, kT, alami, bVol, kappa=None):
+    """ Eta of every channel of every cell for a Maxwellian (or kappa) with the given moments,
+        e.g. to initialise RAIJU from MHD over the whole grid and many steps at once
+        n: density in #/cc, (...)
+        kT: temp in keV, (...)
+        alami: lambda channel edges [eV*(Rx/nT)^(2/3)], (Nk+1,)
+        bVol: [Rx/nT], (...)
+        kappa: None for a Maxwellian
+        return: eta [#/cc * Rx/T], (...,Nk), the inverse of etak2Den channel by channel
+    """
+    nk = np.asarray(n)[..., np.newaxis]*channelFracs(alami, bVol, kT, kappa)
+    return nk*np.asarray(bVol)[..., np.newaxis]*1.0E9
+
+def intensityGrid(n, mass, alamc, bVol, kT, kappa=None):
+    """ Intensity at every channel of every cell, intensity_maxwell/intensity_kappa broadcast over a grid
+        n: density in #/cc, (...)
+        mass: mass in kg
+        alamc: lambda channel centers [eV*(Rx/nT)^(2/3)], (Nk,)
+        bVol: [Rx/nT], (...)
+        kT: temp in keV, (...)
+        kappa: None for a Maxwellian
+        return: j [1/(s*sr*keV*cm^2)], (...,Nk)
+    """
+    E = lambda2Energy(np.abs(np.asarray(alamc)), np.asarray(bVol)[..., np.newaxis])
+    n = np.asarray(n)[..., np.newaxis]
+    kT = np.asarray(kT)[..., np.newaxis]
+    if kappa is None:
+        return intensity_maxwell(n, mass, E, kT)
+    return intensity_kappa(n, mass, E, kT, kappa)
+
 #------
 # Conversions
 #------
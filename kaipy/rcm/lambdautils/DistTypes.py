@@ -52,6 +52,34 @@ def getDistTypeFromKwargs(**kwargs):
         return DistType.from_dict(kwargs)
 
 
+def wolfLams(k, amin, amax, p1, p2, kmin=0, kmax=-1):
+    """
+    Wolf lambda spacing at channel positions k, for many species configurations at once.
+
+    amin, amax, p1, p2, kmin and kmax can be arrays of configurations, e.g. (Nc,),
+    and the result then has one row of lambdas per configuration, (Nc, Nk).
+
+    Args:
+        k (array-like): Channel positions, (Nk,).
+        amin (float or array-like): The minimum lambda value.
+        amax (float or array-like): The maximum lambda value.
+        p1 (float or array-like): The p value for the start.
+        p2 (float or array-like): The p value for the end.
+        kmin (int or array-like, optional): The minimum channel range. Defaults to 0.
+        kmax (int or array-like, optional): The maximum channel range. Defaults to -1, the number of channels.
+
+    Returns:
+        numpy.ndarray: Lambda values, (..., Nk).
+    """
+    k = np.asarray(k, dtype=float)
+    kmax = np.where(np.asarray(kmax) == -1, len(k), kmax)  # -1 resolved per configuration
+    amin, amax, p1, p2, kmin, kmax = [np.asarray(v, dtype=float)[..., np.newaxis] for v in (amin, amax, p1, p2, kmin, kmax)]
+    kfrac = (k-kmin)/(kmax-kmin)  # How far through the channel range are we
+    pstar = (1-kfrac)*p1 + kfrac*p2
+    lammax = amax-amin
+    return lammax*((k - kmin + 0.5)/(kmax-kmin + 0.5))**pstar + amin
+
+
 #------
 # Parameters needed to determine lambda distribution
 #------
@@ -141,14 +169,7 @@ class DT_Wolf(DistType):
         """
         if kmax == -1: kmax = n
 
-        alams = []
-        for k in range(n):
-            kfrac = (k-kmin)/(kmax-kmin)  # How far through the channel range are we
-            pstar = (1-kfrac)*self.p1 + kfrac*self.p2
-            lammax = amax-amin
-            lam = lammax*((k - kmin + 0.5)/(kmax-kmin + 0.5))**pstar + amin
-            alams.append(lam)
-        return alams
+        return wolfLams(np.arange(n), amin, amax, self.p1, self.p2, kmin, kmax).tolist()
 
 
 #@dataclass_json
@@ -224,8 +245,8 @@ class ValueSpec:
             self.c = 2*diff/(self.n**2 + self.n)
             print("Spacing_lin: n={}, c={}".format(self.n, self.c))
 
-            spacings = np.array([self.c*k for k in range(self.n)])
-            line = np.array([self.start + np.sum(spacings[:k]) for k in range(self.n)])
+            spacings = self.c*np.arange(self.n)
+            line = self.start + np.concatenate(([0.0], np.cumsum(spacings)[:-1]))
 
         return line
 
@@ -295,10 +316,7 @@ class DT_ValueSpec(DistType):
 
         """
         nSL = len(self.specList)
-        alams = np.array([])
-        for i in range(nSL):
-            doEnd = False if i < nSL-1 else True
-            alams = np.append(alams, self.specList[i].eval(doEnd))
+        alams = np.concatenate([self.specList[i].eval(i == nSL-1) for i in range(nSL)])
         return alams.tolist()
 
 
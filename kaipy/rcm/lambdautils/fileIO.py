@@ -92,14 +92,9 @@ def saveData(f5, alamData, doPrint=False):
 		alamData (AlamData): The AlamData object containing the data to be saved.
 		doPrint (bool, optional): Whether to print the intermediate arrays. Defaults to False.
 	"""
-	lambdas = np.array([])
-	flavs = np.array([], dtype=int)
-	fudges = np.array([])
-
-	for spec in alamData.specs:
-		lambdas = np.append(lambdas, spec.alams)
-		flavs = np.append(flavs, [spec.flav for f in range(spec.n)])
-		fudges = np.append(fudges, [spec.fudge for f in range(spec.n)])
+	lambdas = np.concatenate([np.asarray(spec.alams, dtype=float) for spec in alamData.specs])
+	flavs = np.repeat([spec.flav for spec in alamData.specs], [spec.n for spec in alamData.specs])
+	fudges = np.repeat(np.array([spec.fudge for spec in alamData.specs], dtype=float), [spec.n for spec in alamData.specs])
 
 	if doPrint:
 		print(lambdas)
@@ -23,18 +23,10 @@ def getAlamMinMax(alams):
         tuple: A tuple containing two lists - the minimum values (amin) and the maximum values (amax) for each channel.
     """
 
-    amin = np.array([])
-    amax = np.array([])
-    for i in range(len(alams)):
-        if i == 0:
-            amax = np.append(amax, 0.5*(np.abs(alams[i])+np.abs(alams[i+1])))
-            amin = np.append(amin, 0)
-        elif i == len(alams)-1:
-            amax = np.append(amax, 1.5*np.abs(alams[i]) - 0.5*np.abs(alams[i-1]))
-            amin = np.append(amin, 0.5*(np.abs(alams[i])+np.abs(alams[i-1])))
-        else:
-            amax = np.append(amax, 0.5*(np.abs(alams[i])+np.abs(alams[i+1])))
-            amin = np.append(amin, 0.5*(np.abs(alams[i])+np.abs(alams[i-1])))
+    absAlams = np.abs(np.asarray(alams, dtype=float))
+    mids = 0.5*(absAlams[1:] + absAlams[:-1])
+    amin = np.concatenate(([0], mids))
+    amax = np.concatenate((mids, [1.5*absAlams[-1] - 0.5*absAlams[-2]]))
 
     return amin.tolist(), amax.tolist()
 
@@ -235,36 +235,32 @@ def getClosedRegionMask(s5):
 #------
 def getCumulPress(ilamc, vm, eetas, doFraction=False):
 	"""
-	Returns a 3D array of cumulative pressures.
+	Returns an array of cumulative pressures over energy channels.
+
+	Whole cubes (and stacks of cubes, e.g. many steps) are done at once with a cumulative sum over k.
 
 	Args:
 		ilamc (array-like): [Nk] lambda values (Nk NOT the full number of energy channels, can be subset)
-		vm (array-like): [Nj,Ni] vm value
-		eetas (array-like): [Nk,Nj,Ni] eetas corresponding to ilamc values
+		vm (array-like): [...,Nj,Ni] vm value
+		eetas (array-like): [...,Nk,Nj,Ni] eetas corresponding to ilamc values
 		doFraction (bool, optional): If True, returns cumulative pressure fraction instead of cumulative pressure. 
 			Defaults to False.
 
 	Returns:
-		array-like: [Nk, Nj, Ni] array of cumulative pressures or cumulative pressure fractions.
+		array-like: [...,Nk,Nj,Ni] array of cumulative pressures [nPa] or cumulative pressure fractions.
 
 	"""
-	Nk = len(ilamc)
-	Nj, Ni = vm.shape
-	pCumul = np.zeros((Nk, Nj, Ni))
-
-	ilam_kji = ilamc[:, np.newaxis, np.newaxis]
-	vm_kji = vm[np.newaxis, :, :]
+	ilam_kji = np.asarray(ilamc)[:, np.newaxis, np.newaxis]
+	vm_kji = np.asarray(vm)[..., np.newaxis, :, :]
 
 	pPar = pressure_factor * ilam_kji * eetas * vm_kji ** 2.5 * 1E9  # [Pa -> nPa], partial pressures for each channel
-
-	pCumul[0] = pPar[0]  # First bin's partial press = cumulative pressure
-	for k in range(1, Nk):
-		pCumul[k] = pCumul[k - 1] + pPar[k]  # Get current cumulative pressure by adding this bin's partial onto last bin's cumulative
+	pCumul = np.cumsum(pPar, axis=-3)  # Running sum over channels, k is third from last
 
 	if not doFraction:
 		return pCumul
 	else:
-		return pCumul / pCumul[-1]
+		with np.errstate(invalid='ignore', divide='ignore'):
+			return pCumul / pCumul[..., -1:, :, :]
 
 
 def getValAtLoc_linterp(val, xData, yData, getAxis='y'):
@@ -281,23 +277,139 @@ def getValAtLoc_linterp(val, xData, yData, getAxis='y'):
 		float: The interpolated location value.
 
 	"""
-	idx = 0
-	if getAxis == 'y': # target is x-axis value, find its location in xData
-		while xData[idx+1] < val:
-			idx += 1
-	elif getAxis == 'x': # target is y-axis value, find its location in yData
-		while yData[idx+1] < val:
-			idx += 1
-	m = (yData[idx+1] - yData[idx]) / (xData[idx+1] - xData[idx])
-	b = yData[idx] - m * xData[idx]
-	if getAxis == 'y':
-		loc = m * val + b
-	elif getAxis == 'x':
-		loc = (val - b) / m
+	return float(getValsAtLoc_linterp(val, xData, yData, getAxis=getAxis))
+
+
+def getValsAtLoc_linterp(vals, xData, yData, getAxis='y', axis=0):
+	"""
+	Batch version of getValAtLoc_linterp, for many targets and many data columns at once.
+
+	The segment used is the first one whose upper point reaches the target, as a scan from the
+	start of the data would find, so the cumulative (non-decreasing) data of getCumulPress work
+	without sorting. Targets past the end of the data use the last segment.
+
+	Args:
+		vals (float or array-like): The x/y value(s) to find the y/x location of.
+		xData (array-like): x-axis values, the data run along axis.
+		yData (array-like): y-axis values, same shape as xData.
+		getAxis (str, optional): The desired axis. If 'y', assumes targets are x values, and vice versa. Defaults to 'y'.
+		axis (int, optional): Axis of xData/yData holding the data. Defaults to 0.
+
+	Returns:
+		array-like: Interpolated locations, vals.shape + the shape of the data without axis.
 
+	"""
+	vals = np.asarray(vals, dtype=float)
+	xData = np.moveaxis(np.asarray(xData, dtype=float), axis, -1)
+	yData = np.moveaxis(np.asarray(yData, dtype=float), axis, -1)
+	sData = xData if getAxis == 'y' else yData
+	N = sData.shape[-1]
+	vB = vals.reshape(vals.shape + (1,)*sData.ndim)
+
+	# First idx where a scan stops, i.e. sData[idx+1] is not below the target
+	isStop = ~(sData[..., 1:] < vB)
+	idx = np.where(isStop.any(axis=-1), isStop.argmax(axis=-1), N - 2)[..., np.newaxis]
+	xB = np.broadcast_to(xData, idx.shape[:-1] + (N,))
+	yB = np.broadcast_to(yData, idx.shape[:-1] + (N,))
+	x0 = np.take_along_axis(xB, idx, axis=-1)[..., 0]
+	x1 = np.take_along_axis(xB, idx+1, axis=-1)[..., 0]
+	y0 = np.take_along_axis(yB, idx, axis=-1)[..., 0]
+	y1 = np.take_along_axis(yB, idx+1, axis=-1)[..., 0]
+
+	vals = vB[..., 0]
+	with np.errstate(invalid='ignore', divide='ignore'):
+		m = (y1 - y0) / (x1 - x0)
+		b = y0 - m * x0
+		if getAxis == 'y':
+			loc = m * vals + b
+		elif getAxis == 'x':
+			loc = (vals - b) / m
 	return loc
 
 
+def getEnergyAtPressFrac(ilamc, vm, eetas, fracs=0.5):
+	"""
+	Energy at which the cumulative pressure reaches given fractions of the total, for every cell.
+
+	Channel energies are |ilamc|*vm, the cumulative pressure fraction is interpolated linearly
+	between channels and the result is limited to the channel energy range.
+
+	Args:
+		ilamc (array-like): [Nk] lambda values of a single species
+		vm (array-like): [...,Nj,Ni] vm value
+		eetas (array-like): [...,Nk,Nj,Ni] eetas corresponding to ilamc values
+		fracs (float or array-like, optional): Pressure fraction(s), e.g. 0.5 for the median-pressure energy. Defaults to 0.5.
+
+	Returns:
+		array-like: [fracs...,...,Nj,Ni] energies [keV], NaN where there is no pressure.
+
+	"""
+	pFrac = getCumulPress(ilamc, vm, eetas, doFraction=True)
+	energies = np.abs(np.asarray(ilamc))[:, np.newaxis, np.newaxis] * np.asarray(vm)[..., np.newaxis, :, :] * 1E-3  # [keV]
+	energies = np.broadcast_to(energies, pFrac.shape)
+	eFrac = getValsAtLoc_linterp(fracs, energies, pFrac, getAxis='x', axis=-3)
+	return np.clip(eFrac, energies.min(axis=-3), energies.max(axis=-3))
+
+
+def getSpeciesPress(species, vm, eetas, fracs=None, doCumul=False):
+	"""
+	Pressure products of every species flavour from the full set of channels.
+
+	Args:
+		species (list): RCMSpeciesInfo of every species, e.g. RCMInfo.species
+		vm (array-like): [...,Nj,Ni] vm value
+		eetas (array-like): [...,Nk,Nj,Ni] eetas of all channels
+		fracs (float or array-like, optional): Pressure fraction(s) for getEnergyAtPressFrac. Defaults to None (skip).
+		doCumul (bool, optional): Also return the cumulative pressure cubes. Defaults to False.
+
+	Returns:
+		dict: Keyed by flavour, each a dict with
+			- pTot: [...,Nj,Ni] total pressure [nPa]
+			- eFrac: [fracs...,...,Nj,Ni] energies [keV] at the pressure fractions (if fracs is given)
+			- pCumul: [...,Nk,Nj,Ni] cumulative pressure [nPa] (if doCumul)
+		Species without energy channels (e.g. the plasmasphere) are skipped.
+
+	"""
+	result = {}
+	for spc in species:
+		ilamc = np.abs(np.asarray(spc.alamc, dtype=float))
+		if not np.any(ilamc > 0):
+			continue
+		spcEetas = eetas[..., spc.kStart:spc.kEnd, :, :]
+		pCumul = getCumulPress(ilamc, vm, spcEetas)
+		spcRes = {'pTot': pCumul[..., -1, :, :]}
+		if fracs is not None:
+			spcRes['eFrac'] = getEnergyAtPressFrac(ilamc, vm, spcEetas, fracs)
+		if doCumul:
+			spcRes['pCumul'] = pCumul
+		result[spc.flav] = spcRes
+	return result
+
+
+def getStepsPress(fname, species, sIds, fracs=0.5):
+	"""
+	Total pressure and energy-at-pressure-fraction maps of every species for many steps.
 
+	The file is opened once, rcmeeta/rcmvm are read once per step and each step is done with getSpeciesPress.
 
+	Args:
+		fname (str): rcm.h5 file
+		species (list): RCMSpeciesInfo of every species, e.g. RCMInfo.species
+		sIds (array-like): Step numbers to use
+		fracs (float or array-like, optional): Pressure fraction(s). Defaults to 0.5.
+
+	Returns:
+		dict: Keyed by flavour, each a dict with pTot [Nt,Nj,Ni] and eFrac [Nt,fracs...,Nj,Ni].
 
+	"""
+	result = {}
+	with h5.File(fname, 'r') as f5:
+		for n, nStp in enumerate(sIds):
+			s5 = f5["Step#%d" % (nStp)]
+			spcRes = getSpeciesPress(species, s5['rcmvm'][:], s5['rcmeeta'][:], fracs=fracs)
+			for flav, Q in spcRes.items():
+				if flav not in result:
+					result[flav] = {k: np.zeros((len(sIds),) + v.shape) for k, v in Q.items()}
+				for k, v in Q.items():
+					result[flav][k][n] = v
+	return result
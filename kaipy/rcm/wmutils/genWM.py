@@ -5,7 +5,7 @@ import importlib.resources as pkg_resources
 # Third-party modules
 import numpy as np
 import h5py as h5
-from scipy.interpolate import RectBivariateSpline
+from scipy.interpolate import RectBivariateSpline, make_interp_spline
 
 # Kaipy modules
 from kaipy.rcm.wmutils.wmData import wmParams
@@ -112,70 +112,53 @@ def ChorusPoly(Li, Eki, polyArray):
 
     Parameters:
     Li (array-like): Array of L values.
-    Eki (array-like): Array of Ek values.
-    polyArray (ndarray): Array of polynomial fit coefficients.
+    Eki (array-like): Array of log10(Ek) values.
+    polyArray (ndarray): Array of polynomial fit coefficients, (..., 10) e.g. (Kp, MLT, 10).
 
     Returns:
-    ndarray: Array of electron lifetimes.
+    ndarray: Array of electron lifetimes, (..., len(Li), len(Eki)).
 
     Notes:
     - The polynomial fit coefficients are obtained from a research paper by Dedong Wang et al. (in preparation).
     - The function calculates the electron lifetime for each Kp and MLT value based on the given Li and Eki values.
+    - The fit is evaluated as a single contraction of the coefficients with the (L, Ek) basis, so
+      any leading dimensions of polyArray (Kp, MLT, ...) are handled at once.
 
     References:
     - [Research Paper](https://doi.org/will be provided)
     """
 
-    lenKp, lenMLT, lenParam = polyArray.shape
-    # Extend polyArray
-    polyArrayX = polyArray[:, :, :, np.newaxis, np.newaxis]
-    # Extend Li and Ki
-    lenL = len(Li)
-    lenEki = len(Eki)
-    Lx = np.tile(Li, (lenEki, 1)).T
-    Lx = Lx[np.newaxis, np.newaxis, :, :]
-    Ex = np.tile(Eki, (lenL, 1))
-    Ex = Ex[np.newaxis, np.newaxis, :, :]
-
-    tau = np.ones((lenKp, lenMLT, lenL, lenEki))
-
-    c0 = polyArrayX[:, :, 0, :, :]  # Intercept
-    c1 = polyArrayX[:, :, 1, :, :]  # L
-    c2 = polyArrayX[:, :, 2, :, :]  # log10(E)
-    c3 = polyArrayX[:, :, 3, :, :]  # L^2
-    c4 = polyArrayX[:, :, 4, :, :]  # log10(E)^2
-    c5 = polyArrayX[:, :, 5, :, :]  # L^3
-    c6 = polyArrayX[:, :, 6, :, :]  # log10(E)^3
-    c7 = polyArrayX[:, :, 7, :, :]  # log10(E)*L
-    c8 = polyArrayX[:, :, 8, :, :]  # log10(E)*L^2
-    c9 = polyArrayX[:, :, 9, :, :]  # log10(E)^2*L
-
-    tau = c0 * tau + \
-            c1 * Lx + c2 * Ex + \
-            c3 * np.power(Lx, 2) + \
-            c4 * np.power(Ex, 2) + \
-            c5 * np.power(Lx, 3) + \
-            c6 * np.power(Ex, 3) + \
-            c7 * Lx * Ex + \
-            c8 * np.power(Lx, 2) * Ex + \
-            c9 * Lx * np.power(Ex, 2)  # in log10(days)
+    # Basis of the fit, columns in the order of the coefficients:
+    # Intercept, L, log10(E), L^2, log10(E)^2, L^3, log10(E)^3, log10(E)*L, log10(E)*L^2, log10(E)^2*L
+    Lx = np.asarray(Li, dtype=float)[:, np.newaxis]
+    Ex = np.asarray(Eki, dtype=float)[np.newaxis, :]
+    One = np.ones((Lx.shape[0], Ex.shape[1]))
+    basis = np.stack([One, Lx*One, Ex*One,
+                      Lx**2*One, Ex**2*One,
+                      Lx**3*One, Ex**3*One,
+                      Lx*Ex, Lx**2*Ex, Lx*Ex**2], axis=-1)  # (lenL, lenEki, 10)
+
+    # Contract the coefficients against the basis over the whole (Kp, MLT, L, Ek) grid
+    tau = np.tensordot(polyArray, basis, axes=([-1], [-1]))  # in log10(days)
 
     tau = 10.0 ** tau * (60. * 60. * 24.)  # in seconds
 
     return tau
 
-def ReSample(L, MLT, Qp, xMLT):
+def ReSample(L, MLT, Qp, xMLT, xL=None):
         """
         Resamples the input data based on the given parameters.
 
         Args:
                 L (array-like): Array of L-shell values.
                 MLT (array-like): Array of magnetic local time values.
-                Qp (array-like): Array of input data.
+                Qp (array-like): Array of input data, (L,MLT) or a stack (...,L,MLT).
                 xMLT (float): Magnetic local time value to resample at.
+                xL (array-like, optional): L-shell values to resample at (default is L).
 
         Returns:
-                array-like: 2D (L,MLT) smoothed inupt data resampled in the MLT dimension.
+                array-like: 2D (L,MLT) smoothed inupt data resampled in the MLT dimension,
+                (...,L,MLT) for a stack.
 
         Raises:
                 None
@@ -184,30 +167,36 @@ def ReSample(L, MLT, Qp, xMLT):
                 - This function adds ghosts in MLT to handle periodic boundary.
                 - The resampling is performed by setting the center and then left/right strips.
                 - Equality at the overlap point is enforced.
+                - The ghosts, logs and overlap are done for the whole stack at once. The smoothing
+                  spline picks its knots from the data, so it is still fit one (L,MLT) slice at a time.
 
         """
-        Nr, Np = Qp.shape
+        Qp = np.asarray(Qp)
+        if xL is None:
+                xL = L
+        Nr, Np = Qp.shape[-2:]
         #Add ghosts in MLT to handle periodic boundary
         Ng = 2
         Npg = Np+Ng*2
         gMLT = np.arange(0-Ng,24+Ng+1)
-        Qpg = np.zeros((Nr,Npg))
+        Qpg = np.zeros(Qp.shape[:-1]+(Npg,))
         #Set center and then left/right strips
-        Qpg[:,2:-2] = Qp
-        Qpg[:,1] = Qp[:,-1]
-        Qpg[:,0] = Qp[:,-2]
-        Qpg[:,-1] = Qp[:,0]
-        Qpg[:,-2] = Qp[:,1]
+        Qpg[...,2:-2] = Qp
+        Qpg[...,1] = Qp[...,-1]
+        Qpg[...,0] = Qp[...,-2]
+        Qpg[...,-1] = Qp[...,0]
+        Qpg[...,-2] = Qp[...,1]
 
         Q = np.log10(Qpg)
-        upQ = RectBivariateSpline(L,gMLT,Q,s=10)
-
-        Qu = upQ(L,xMLT)
+        Qu = np.zeros(Qp.shape[:-2]+(len(xL),len(xMLT)))
+        for n in np.ndindex(Qp.shape[:-2]):
+                upQ = RectBivariateSpline(L,gMLT,Q[n],s=10)
+                Qu[n] = upQ(xL,xMLT)
         xQp = 10.0**(Qu)
         #Enforce equality at overlap point
-        tauP = 0.5*(xQp[:,0]+xQp[:,-1])
-        xQp[:, 0] = tauP
-        xQp[:,-1] = tauP
+        tauP = 0.5*(xQp[...,0]+xQp[...,-1])
+        xQp[..., 0] = tauP
+        xQp[...,-1] = tauP
 
         return xQp
 
@@ -240,34 +229,36 @@ def genChorus(params, fInChorus):
         endValue = float(dimKp)
         lenKp = dimKp
         Kpi = np.linspace(startValue, endValue, num=lenKp) 
+        #The smoothing is always fit on the native (Ek,L) grid, 155x41, and then evaluated at the
+        #requested nEk/nL/nMLT points so denser tables only cost evaluations
+        lenEkFit = 155
+        lenLFit = 41
         #Eki
         startValue = 1.0e-3 #in MeV
         endValue = 2.0  
-        lenEk = 155  
+        lenEk = params.nEk
+        EkFit = np.linspace(np.log10(startValue), np.log10(endValue), lenEkFit) #in log10(MeV)
         Eki = np.linspace(np.log10(startValue), np.log10(endValue), lenEk) #in log10(MeV)
         #Li
         startValue = 3.0 #in Re 
         endValue = 7.0
-        lenL = 41  
+        lenL = params.nL
+        LFit = np.linspace(startValue, endValue, num=lenLFit) 
         Li = np.linspace(startValue, endValue, num=lenL) 
-        #Tau from polynomial fit
-        tauP = ChorusPoly(Li,Eki,polyArray)
+        #Tau from polynomial fit over the whole (Kp,MLT,L,Ek) grid
+        tauP = ChorusPoly(LFit,EkFit,polyArray)
         #expand MLT from 0-23 to 0-24
         extraMLT0 = tauP[:, 0, :, :][:,np.newaxis,:,:]
         tauE = np.concatenate((tauP, extraMLT0), axis=1)
-        tauE = tauE.T
         #Interpolation in the MLT dimesion
-        xFac = 4
-        lenMLTx = lenMLT*xFac+1 # 97
+        lenMLTx = params.nMLT # 97
         MLTi = np.linspace(0,24,lenMLT+1)
         xMLTi = np.linspace(0,24,lenMLTx) 
-        tauX = np.zeros((lenEk,lenL,lenMLTx,lenKp))
-        # Smoothing in MLT
-        for i, j in np.ndindex(tauX.shape[0], tauX.shape[3]):
-            Q = tauE[i, :, :, j]
-            tauX[i, :, :, j] = ReSample(Li, MLTi, Q, xMLTi)
+        # Smoothing in MLT, all (Ek,Kp) slices: (Ek,Kp,L,MLT) -> (Ek,L,MLT,Kp)
+        tauX = ReSample(LFit, MLTi, tauE.transpose(3, 0, 2, 1), xMLTi, xL=Li).transpose(0, 2, 3, 1)
+        if (lenEk != lenEkFit) or not np.allclose(Eki, EkFit):
+                #Cubic in log10(tau) vs log10(E) to the requested energies
+                tauX = 10.0**make_interp_spline(EkFit, np.log10(tauX), k=3, axis=0)(Eki)
         Eki = 10.0**Eki #in MeV
 
         return Kpi,xMLTi,Li,Eki,tauX
-
-
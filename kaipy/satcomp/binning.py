@@ -0,0 +1,141 @@
+#Vectorised binning helpers shared by the satcomp products
+#Lookups are done with searchsorted, accumulation with bincount over flattened bin indices
+
+# Third-party modules
+import numpy as np
+
+def nearestIndex(grid, x):
+	"""
+	Index of the nearest grid point for every value.
+
+	Same as [np.abs(grid-xi).argmin() for xi in x] for a sorted grid (ties go
+	to the lower point), but done with a single searchsorted.
+
+	Args:
+		grid (array): Increasing grid.
+		x (array): Values to look up, any shape.
+
+	Returns:
+		numpy.ndarray: Integer indices into grid, shape of x. NaNs map to -1.
+	"""
+	grid = np.asarray(grid, dtype=float)
+	x = np.asarray(x, dtype=float)
+	mids = 0.5*(grid[1:] + grid[:-1])
+	idx = np.searchsorted(mids, x, side='left')
+	return np.where(np.isnan(x), -1, idx)
+
+def binIndex(edges, x):
+	"""
+	Histogram bin of every value, bin n holding edges[n] <= x < edges[n+1].
+
+	The last bin also holds x == edges[-1], as in numpy.histogram.
+
+	Args:
+		edges (array): Increasing bin edges.
+		x (array): Values to look up, any shape.
+
+	Returns:
+		numpy.ndarray: Integer bin indices, shape of x. Values outside of the edges (and NaNs) map to -1.
+	"""
+	edges = np.asarray(edges, dtype=float)
+	x = np.asarray(x, dtype=float)
+	Nb = len(edges) - 1
+	idx = np.searchsorted(edges, x, side='right') - 1
+	idx = np.where(x == edges[-1], Nb-1, idx)
+	return np.where((idx < 0) | (idx >= Nb) | np.isnan(x), -1, idx)
+
+def tentWeights(grid, x):
+	"""
+	Linear (tent) weights of every value onto its two neighbouring grid points.
+
+	Args:
+		grid (array): Increasing grid.
+		x (array): Values, any shape.
+
+	Returns:
+		i0 (numpy.ndarray): Index of the grid point at or below x, -1 outside of the grid.
+		w0, w1 (numpy.ndarray): Weights of grid points i0 and i0+1, w0+w1 = 1.
+	"""
+	grid = np.asarray(grid, dtype=float)
+	x = np.asarray(x, dtype=float)
+	i0 = binIndex(grid, x)
+	iC = np.clip(i0, 0, len(grid)-2)
+	w1 = (x - grid[iC])/(grid[iC+1] - grid[iC])
+	w1 = np.where(i0 >= 0, w1, 0.0)
+	return i0, 1.0 - w1, w1
+
+def overlapFracs(oLower, oUpper, nLower, nUpper):
+	"""
+	Fraction of every new cell covered by every old cell.
+
+	Array version of scutils.getWeights_ConsArea: frac[..., n, k] is the width of
+	the overlap of new cell n and old cell k over the width of new cell n.
+
+	Args:
+		oLower, oUpper (array): Bounds of the old cells, (..., No). Leading dimensions
+			(e.g. one energy grid per spatial point) are broadcast.
+		nLower, nUpper (array): Bounds of the new cells, (Nn,).
+
+	Returns:
+		numpy.ndarray: Overlap fractions, (..., Nn, No).
+	"""
+	oLower = np.asarray(oLower, dtype=float)[..., np.newaxis, :]
+	oUpper = np.asarray(oUpper, dtype=float)[..., np.newaxis, :]
+	nLower = np.asarray(nLower, dtype=float)[:, np.newaxis]
+	nUpper = np.asarray(nUpper, dtype=float)[:, np.newaxis]
+	ovl = np.minimum(oUpper, nUpper) - np.maximum(oLower, nLower)
+	return np.clip(ovl, 0.0, None)/(nUpper - nLower)
+
+def accumulate(idx, shape, weights=None):
+	"""
+	Sum weights into an N-D set of bins.
+
+	Entries with any index outside of shape (e.g. the -1 of the lookups above)
+	are dropped.
+
+	Args:
+		idx (tuple of arrays): One integer index array per dimension of shape, broadcastable together.
+		shape (tuple): Shape of the binned output, e.g. (Nstep, Ne, NL).
+		weights (array or list of arrays, optional): Values to sum, broadcastable with idx.
+			If None the entries are counted.
+
+	Returns:
+		numpy.ndarray or list: Binned sums (or counts) with the given shape, a list if weights is a list.
+	"""
+	shape = tuple(shape)
+	idx = np.broadcast_arrays(*[np.asarray(i) for i in idx])
+	isIn = np.ones(idx[0].shape, dtype=bool)
+	for i, N in zip(idx, shape):
+		isIn &= (i >= 0) & (i < N)
+	fIdx = np.ravel_multi_index(tuple(i[isIn] for i in idx), shape)
+	Nb = int(np.prod(shape))
+
+	def binOne(w):
+		if w is None:
+			return np.bincount(fIdx, minlength=Nb).reshape(shape)
+		w = np.broadcast_to(w, isIn.shape)[isIn]
+		return np.bincount(fIdx, weights=w, minlength=Nb).reshape(shape)
+
+	if isinstance(weights, (list, tuple)):
+		return [binOne(w) for w in weights]
+	return binOne(weights)
+
+def binMean(idx, shape, weights):
+	"""
+	Mean of the weights falling in every bin.
+
+	Args:
+		idx (tuple of arrays): One integer index array per dimension of shape.
+		shape (tuple): Shape of the binned output.
+		weights (array or list of arrays): Values to average.
+
+	Returns:
+		means (numpy.ndarray or list): Bin means, NaN for empty bins.
+		counts (numpy.ndarray): Number of entries in every bin.
+	"""
+	counts = accumulate(idx, shape)
+	sums = accumulate(idx, shape, weights)
+	with np.errstate(invalid='ignore', divide='ignore'):
+		if isinstance(sums, list):
+			return [s/counts for s in sums], counts
+		return sums/counts, counts
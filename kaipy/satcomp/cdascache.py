@@ -0,0 +1,650 @@
+
+# Standard modules
+import datetime
+import hashlib
+import io
+import json
+import os
+import tempfile
+import threading
+import urllib.error
+import urllib.request
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+# Third-party modules
+import h5py
+import numpy as np
+import spacepy.datamodel as dm
+
+# """Local cache and stand-in server for CDAWeb responses.
+
+# CDAWeb queries made through kaipy (cdaweb_utils, scutils.pullVar, ...) go
+# through CdasWs.get_data. wrapCdas wraps a CdasWs object so that responses
+# are kept in a local, content-addressed cache keyed by
+# (dataset, variables, binning, interval), and later queries for the same
+# dataset/variables over the same or a contained interval are served from
+# disk.  A CacheServer serves a cache directory over HTTP so that other
+# processes/nodes can use it as if it were CDAWeb.
+
+# Caching is off unless configured, either with configure() or through the
+# environment:
+#     KAIPY_CDAS_CACHE    cache directory
+#     KAIPY_CDAS_SERVER   URL of a CacheServer to query on a local miss
+#     KAIPY_CDAS_OFFLINE  if set (and not 0), never contact CDAWeb
+# """
+
+# Environment variables used to configure caching.
+ENV_CACHE = "KAIPY_CDAS_CACHE"
+ENV_SERVER = "KAIPY_CDAS_SERVER"
+ENV_OFFLINE = "KAIPY_CDAS_OFFLINE"
+
+# Format string for cached interval bounds.
+CACHE_DATETIME_FORMAT = "%Y-%m-%dT%H:%M:%S.%fZ"
+
+# HTTP status codes used in the mimicked CdasWs status.
+HTTP_STATUS_OK = 200
+HTTP_STATUS_NO_CONTENT = 204
+HTTP_STATUS_NOT_FOUND = 404
+
+# Marker attribute for arrays that need converting back on load.
+KIND_ATTR = "_kaipyKind"
+
+# Configuration set by configure(), overrides the environment.
+_config = {}
+
+
+def configure(cacheDir=None, server=None, offline=None):
+    """Set the cache configuration for this process.
+
+    Args:
+        cacheDir (str, optional): Cache directory, "" to disable the local cache.
+        server (str, optional): URL of a CacheServer, "" to disable.
+        offline (bool, optional): Never contact CDAWeb.
+
+    Returns:
+        dict: The configuration now in effect.
+    """
+    for key, val in (("cacheDir", cacheDir), ("server", server), ("offline", offline)):
+        if val is not None:
+            _config[key] = val
+    return getConfig()
+
+
+def resetConfig():
+    """Drop any configure() settings, going back to the environment."""
+    _config.clear()
+
+
+def getConfig():
+    """Current cache configuration.
+
+    Returns:
+        dict: cacheDir, server (None if unset) and offline.
+    """
+    cacheDir = _config.get("cacheDir", os.environ.get(ENV_CACHE, ""))
+    server = _config.get("server", os.environ.get(ENV_SERVER, ""))
+    offline = _config.get("offline", os.environ.get(ENV_OFFLINE, "0") not in ("", "0"))
+    return {
+        "cacheDir": cacheDir or None,
+        "server": server or None,
+        "offline": bool(offline),
+    }
+
+
+def wrapCdas(cdas):
+    """Wrap a CdasWs object with the configured cache.
+
+    Args:
+        cdas (cdasws.CdasWs): CDAWeb connection.
+
+    Returns:
+        CachedCdasWs or cdasws.CdasWs: The wrapped connection, or cdas itself
+            if no caching is configured.
+    """
+    cfg = getConfig()
+    if cfg["cacheDir"] is None and cfg["server"] is None and not cfg["offline"]:
+        return cdas
+    cache = None if cfg["cacheDir"] is None else CdasCache(cfg["cacheDir"])
+    return CachedCdasWs(cdas, cache=cache, server=cfg["server"], offline=cfg["offline"])
+
+
+#======
+#Helpers
+#======
+
+def toDatetime(t):
+    """Convert a CDAWeb time (string or datetime) to a naive UTC datetime.
+
+    Args:
+        t (str or datetime.datetime): Time, strings as '%Y-%m-%dT%H:%M:%S[.%f][Z]'.
+
+    Returns:
+        datetime.datetime: The time.
+    """
+    if isinstance(t, datetime.datetime):
+        if t.tzinfo is not None:
+            t = t.astimezone(datetime.timezone.utc).replace(tzinfo=None)
+        return t
+    return datetime.datetime.fromisoformat(str(t).rstrip("Z"))
+
+
+def requestKey(dataset, variables, binData=None):
+    """Key of a (dataset, variables, binning) query, independent of the interval.
+
+    Args:
+        dataset (str): CDAWeb dataset ID.
+        variables (str or list of str): Variable name(s), order does not matter.
+        binData (dict, optional): CdasWs binning options.
+
+    Returns:
+        str: Hex digest.
+    """
+    if isinstance(variables, str):
+        variables = [variables]
+    req = {
+        "dataset": dataset,
+        "variables": sorted(variables),
+        "binData": binData or {},
+    }
+    return hashlib.sha256(json.dumps(req, sort_keys=True).encode()).hexdigest()
+
+
+def objectKey(rKey, t0, t1):
+    """Content address of a cached response.
+
+    Args:
+        rKey (str): requestKey of the query.
+        t0, t1 (datetime.datetime): Interval of the query.
+
+    Returns:
+        str: Hex digest.
+    """
+    s = "%s/%s/%s" % (rKey, t0.strftime(CACHE_DATETIME_FORMAT), t1.strftime(CACHE_DATETIME_FORMAT))
+    return hashlib.sha256(s.encode()).hexdigest()
+
+
+def isTimeVar(v):
+    """True if v is an array of datetimes."""
+    v = np.asarray(v)
+    if v.dtype.kind == "M":
+        return True
+    return v.dtype == object and v.size > 0 and isinstance(v.flat[0], datetime.datetime)
+
+
+def subsetData(data, t0, t1):
+    """Restrict a CDAWeb response to the interval [t0,t1].
+
+    Variables are cut along their first axis if it is the time axis, i.e. if
+    they DEPEND_0 on a time variable or, without DEPEND_0, if the response has
+    a single time variable of matching length. Everything else is kept.
+    For binned queries the bins are those of the original query, which may be
+    offset from the bins CDAWeb would return for [t0,t1].
+
+    Args:
+        data (spacepy.datamodel.SpaceData): Response.
+        t0, t1 (datetime.datetime): Interval.
+
+    Returns:
+        spacepy.datamodel.SpaceData: The subset.
+    """
+    masks = {}
+    for k, v in data.items():
+        if isTimeVar(v) and np.ndim(v) == 1:
+            tv = np.asarray(v).astype("datetime64[us]")
+            masks[k] = (tv >= np.datetime64(t0)) & (tv <= np.datetime64(t1))
+    tOnly = list(masks.keys())[0] if len(masks) == 1 else None
+
+    sub = dm.SpaceData(attrs=dict(getattr(data, "attrs", {})))
+    for k, v in data.items():
+        attrs = dict(getattr(v, "attrs", {}))
+        dep = attrs.get("DEPEND_0")
+        if k in masks:
+            mask = masks[k]
+        elif dep in masks and np.ndim(v) > 0 and len(v) == len(masks[dep]):
+            mask = masks[dep]
+        elif dep is None and tOnly is not None and np.ndim(v) > 0 and len(v) == len(masks[tOnly]):
+            mask = masks[tOnly]
+        else:
+            mask = None
+        Q = np.asarray(v) if mask is None else np.asarray(v)[mask]
+        sub[k] = dm.dmarray(Q, attrs=attrs)
+    return sub
+
+
+def _toH5Value(v):
+    # Returns an h5py-storable value and its kind marker
+    v = np.asarray(v)
+    if isTimeVar(v):
+        tv = v.astype("datetime64[us]").astype(str)
+        return np.char.encode(tv, "utf-8"), "datetime"
+    if v.dtype.kind == "U":
+        return np.char.encode(v, "utf-8"), "str"
+    return v, None
+
+
+def _fromH5Value(v, kind):
+    if kind == "datetime":
+        tv = np.char.decode(np.asarray(v), "utf-8").astype("datetime64[us]")
+        return tv.astype(datetime.datetime)
+    if kind == "str":
+        return np.char.decode(np.asarray(v), "utf-8")
+    return v
+
+
+def _setAttrs(obj, attrs):
+    for k, a in attrs.items():
+        try:
+            if isinstance(a, datetime.datetime):
+                a = a.strftime(CACHE_DATETIME_FORMAT)
+            obj.attrs[k] = a
+        except (TypeError, ValueError):
+            # Types h5py can't hold are kept as their string form
+            obj.attrs[k] = str(a)
+
+
+def _getAttrs(obj):
+    attrs = {}
+    for k, a in obj.attrs.items():
+        if k == KIND_ATTR:
+            continue
+        if isinstance(a, bytes):
+            a = a.decode("utf-8")
+        attrs[k] = a
+    return attrs
+
+
+def dumpData(data):
+    """Serialize a CDAWeb response (SpaceData or dict of arrays) to HDF5 bytes.
+
+    Args:
+        data (spacepy.datamodel.SpaceData): Response.
+
+    Returns:
+        bytes: The HDF5 image.
+    """
+    bio = io.BytesIO()
+    with h5py.File(bio, "w") as f5:
+        _setAttrs(f5, dict(getattr(data, "attrs", {})))
+        for k, v in data.items():
+            Q, kind = _toH5Value(v)
+            dset = f5.create_dataset(k, data=Q)
+            _setAttrs(dset, dict(getattr(v, "attrs", {})))
+            if kind is not None:
+                dset.attrs[KIND_ATTR] = kind
+    return bio.getvalue()
+
+
+def loadData(buf):
+    """Inverse of dumpData.
+
+    Args:
+        buf (bytes): HDF5 image.
+
+    Returns:
+        spacepy.datamodel.SpaceData: Response.
+    """
+    with h5py.File(io.BytesIO(buf), "r") as f5:
+        data = dm.SpaceData(attrs=_getAttrs(f5))
+        for k in f5.keys():
+            dset = f5[k]
+            kind = dset.attrs.get(KIND_ATTR)
+            if isinstance(kind, bytes):
+                kind = kind.decode("utf-8")
+            data[k] = dm.dmarray(_fromH5Value(dset[()], kind), attrs=_getAttrs(dset))
+    return data
+
+
+def statusCode(status):
+    """HTTP status code of a CdasWs status, None if it has none."""
+    try:
+        return status["http"]["status_code"]
+    except (TypeError, KeyError):
+        return None
+
+
+def missStatus(reason):
+    """Mimic the CdasWs status of a query that found nothing."""
+    return {"http": {"status_code": HTTP_STATUS_NOT_FOUND}, "kaipy": reason}
+
+
+#======
+#Cache
+#======
+
+class CdasCache(object):
+    """Content-addressed store of CDAWeb responses.
+
+    Layout under root:
+        entries/<requestKey>.json   intervals cached for a (dataset, variables, binning)
+        objects/<objectKey>.h5      response payloads (absent for empty responses)
+
+    Args:
+        root (str): Cache directory, created if needed.
+    """
+
+    def __init__(self, root):
+        self.root = root
+        self.eDir = os.path.join(root, "entries")
+        self.oDir = os.path.join(root, "objects")
+        os.makedirs(self.eDir, exist_ok=True)
+        os.makedirs(self.oDir, exist_ok=True)
+        self._lock = threading.Lock()
+
+    def _entryFile(self, rKey):
+        return os.path.join(self.eDir, rKey + ".json")
+
+    def _objectFile(self, oKey):
+        return os.path.join(self.oDir, oKey + ".h5")
+
+    def _atomicWrite(self, fname, buf):
+        # Write then rename so readers never see partial files
+        fd, tmp = tempfile.mkstemp(dir=os.path.dirname(fname))
+        with os.fdopen(fd, "wb") as f:
+            f.write(buf)
+        os.replace(tmp, fname)
+
+    def entries(self, rKey):
+        """Cached intervals of a query.
+
+        Args:
+            rKey (str): requestKey of the query.
+
+        Returns:
+            list of dict: t0, t1, status and object (None for empty responses).
+        """
+        fname = self._entryFile(rKey)
+        if not os.path.exists(fname):
+            return []
+        with open(fname, "r") as f:
+            return json.load(f)["entries"]
+
+    def find(self, rKey, t0, t1):
+        """Narrowest cached interval containing [t0,t1].
+
+        Args:
+            rKey (str): requestKey of the query.
+            t0, t1 (datetime.datetime): Interval.
+
+        Returns:
+            dict or None: The entry, None on a miss.
+        """
+        best = None
+        for e in self.entries(rKey):
+            e0 = toDatetime(e["t0"])
+            e1 = toDatetime(e["t1"])
+            if e0 <= t0 and e1 >= t1:
+                if best is None or (e1 - e0) < (toDatetime(best["t1"]) - toDatetime(best["t0"])):
+                    best = e
+        return best
+
+    def getPayload(self, e):
+        """Raw payload of an entry, None for empty responses."""
+        if e["object"] is None:
+            return None
+        with open(self._objectFile(e["object"]), "rb") as f:
+            return f.read()
+
+    def get(self, dataset, variables, t0, t1, binData=None):
+        """Look up a query.
+
+        Args:
+            dataset (str): CDAWeb dataset ID.
+            variables (str or list of str): Variable name(s).
+            t0, t1 (str or datetime.datetime): Interval.
+            binData (dict, optional): CdasWs binning options.
+
+        Returns:
+            tuple: (status, data) as CdasWs.get_data would return them, or
+                (None, None) on a miss.
+        """
+        t0 = toDatetime(t0)
+        t1 = toDatetime(t1)
+        e = self.find(requestKey(dataset, variables, binData), t0, t1)
+        if e is None:
+            return None, None
+        buf = self.getPayload(e)
+        if buf is None:
+            return e["status"], None
+        data = loadData(buf)
+        if toDatetime(e["t0"]) != t0 or toDatetime(e["t1"]) != t1:
+            data = subsetData(data, t0, t1)
+        return e["status"], data
+
+    def put(self, dataset, variables, t0, t1, status, data, binData=None):
+        """Store a response.
+
+        Only successful and empty (204/404) responses are kept.
+
+        Args:
+            dataset (str): CDAWeb dataset ID.
+            variables (str or list of str): Variable name(s).
+            t0, t1 (str or datetime.datetime): Interval.
+            status (dict): CdasWs status.
+            data (spacepy.datamodel.SpaceData): Response, may be None.
+            binData (dict, optional): CdasWs binning options.
+
+        Returns:
+            bool: True if the response was stored.
+        """
+        code = statusCode(status)
+        if code == HTTP_STATUS_OK and data is not None:
+            buf = dumpData(data)
+        elif code in (HTTP_STATUS_NO_CONTENT, HTTP_STATUS_NOT_FOUND):
+            buf = None
+        else:
+            return False
+        return self.putPayload(requestKey(dataset, variables, binData), toDatetime(t0), toDatetime(t1),
+                               {"http": {"status_code": code}}, buf)
+
+    def putPayload(self, rKey, t0, t1, status, buf):
+        """Store a serialized response (see put)."""
+        oKey = objectKey(rKey, t0, t1)
+        if buf is not None:
+            self._atomicWrite(self._objectFile(oKey), buf)
+        entry = {
+            "t0": t0.strftime(CACHE_DATETIME_FORMAT),
+            "t1": t1.strftime(CACHE_DATETIME_FORMAT),
+            "status": status,
+            "object": None if buf is None else oKey,
+        }
+        with self._lock:
+            entries = [e for e in self.entries(rKey) if (e["t0"], e["t1"]) != (entry["t0"], entry["t1"])]
+            entries.append(entry)
+            self._atomicWrite(self._entryFile(rKey), json.dumps({"entries": entries}, indent=1).encode())
+        return True
+
+    def summary(self):
+        """Number of cached queries, responses and payload bytes."""
+        nReq = 0
+        nResp = 0
+        for fname in os.listdir(self.eDir):
+            if fname.endswith(".json"):
+                nReq += 1
+                nResp += len(self.entries(fname[:-5]))
+        nBytes = sum(os.path.getsize(os.path.join(self.oDir, f)) for f in os.listdir(self.oDir))
+        return {"queries": nReq, "responses": nResp, "bytes": nBytes}
+
+
+class CachedCdasWs(object):
+    """CdasWs stand-in that serves get_data from a cache.
+
+    Queries are answered, in order, from the local cache, a CacheServer and
+    CDAWeb (unless offline). Responses from the server or CDAWeb are added to
+    the local cache. Everything other than get_data is passed to cdas.
+
+    Args:
+        cdas (cdasws.CdasWs): CDAWeb connection, may be None if offline.
+        cache (CdasCache, optional): Local cache.
+        server (str, optional): URL of a CacheServer.
+        offline (bool): Never contact CDAWeb.
+    """
+
+    def __init__(self, cdas, cache=None, server=None, offline=False):
+        self.cdas = cdas
+        self.cache = cache
+        self.server = server
+        self.offline = offline
+
+    def __getattr__(self, name):
+        if self.cdas is None:
+            raise AttributeError(name)
+        return getattr(self.cdas, name)
+
+    def get_data(self, dataset, variables, start, end, **kwargs):
+        """Cached CdasWs.get_data, see the CdasWs documentation for the arguments."""
+        binData = kwargs.get("binData")
+        # Only plain queries are cached, anything else goes straight through
+        isPlain = all(k == "binData" for k in kwargs)
+        if isPlain and self.cache is not None:
+            status, data = self.cache.get(dataset, variables, start, end, binData=binData)
+            if status is not None:
+                return status, data
+        if isPlain and self.server is not None:
+            status, buf = fetchServer(self.server, dataset, variables, start, end, binData=binData)
+            if status is not None:
+                if self.cache is not None:
+                    self.cache.putPayload(requestKey(dataset, variables, binData), toDatetime(start),
+                                          toDatetime(end), status, buf)
+                return status, (None if buf is None else loadData(buf))
+        if self.offline or self.cdas is None:
+            return missStatus("offline cache miss"), None
+        status, data = self.cdas.get_data(dataset, variables, start, end, **kwargs)
+        if isPlain and self.cache is not None:
+            self.cache.put(dataset, variables, start, end, status, data, binData=binData)
+        return status, data
+
+
+#======
+#Stand-in server
+#======
+
+def _queryBody(dataset, variables, start, end, binData=None):
+    return json.dumps({
+        "dataset": dataset,
+        "variables": variables,
+        "start": toDatetime(start).strftime(CACHE_DATETIME_FORMAT),
+        "end": toDatetime(end).strftime(CACHE_DATETIME_FORMAT),
+        "binData": binData,
+    }).encode()
+
+
+def fetchServer(url, dataset, variables, start, end, binData=None, timeout=30):
+    """Query a CacheServer.
+
+    Args:
+        url (str): Server URL.
+        dataset, variables, start, end, binData: As for CdasWs.get_data.
+        timeout (float): Request timeout [s].
+
+    Returns:
+        tuple: (status, payload bytes or None), (None, None) if the server
+            doesn't have the query or can't be reached.
+    """
+    req = urllib.request.Request(url.rstrip("/") + "/get_data",
+                                 data=_queryBody(dataset, variables, start, end, binData),
+                                 headers={"Content-Type": "application/json"})
+    try:
+        with urllib.request.urlopen(req, timeout=timeout) as resp:
+            code = resp.status
+            buf = resp.read()
+    except (urllib.error.URLError, OSError):
+        # Includes HTTP errors, a 404 from the server is a cache miss
+        return None, None
+    if code == HTTP_STATUS_NO_CONTENT:
+        return {"http": {"status_code": HTTP_STATUS_NO_CONTENT}}, None
+    return {"http": {"status_code": HTTP_STATUS_OK}}, buf
+
+
+class _CacheHandler(BaseHTTPRequestHandler):
+    # Set on the subclass created by CacheServer
+    cache = None
+    doQuiet = True
+
+    def log_message(self, format, *args):
+        if not self.doQuiet:
+            BaseHTTPRequestHandler.log_message(self, format, *args)
+
+    def _reply(self, code, buf=b"", cType="application/octet-stream"):
+        self.send_response(code)
+        self.send_header("Content-Type", cType)
+        self.send_header("Content-Length", str(len(buf)))
+        self.end_headers()
+        self.wfile.write(buf)
+
+    def do_GET(self):
+        if self.path.rstrip("/") == "/summary":
+            self._reply(HTTP_STATUS_OK, json.dumps(self.cache.summary()).encode(), "application/json")
+        else:
+            self._reply(HTTP_STATUS_NOT_FOUND)
+
+    def do_POST(self):
+        if self.path.rstrip("/") != "/get_data":
+            self._reply(HTTP_STATUS_NOT_FOUND)
+            return
+        try:
+            q = json.loads(self.rfile.read(int(self.headers.get("Content-Length", 0))))
+            status, data = self.cache.get(q["dataset"], q["variables"], q["start"], q["end"], binData=q.get("binData"))
+        except (ValueError, KeyError):
+            self._reply(400)
+            return
+        if status is None:
+            self._reply(HTTP_STATUS_NOT_FOUND)
+        elif data is None:
+            self._reply(HTTP_STATUS_NO_CONTENT)
+        else:
+            self._reply(HTTP_STATUS_OK, dumpData(data))
+
+
+class CacheServer(object):
+    """Local HTTP stand-in for CDAWeb serving a CdasCache.
+
+    POST /get_data takes a JSON query (dataset, variables, start, end, binData)
+    and answers 200 with the HDF5 payload, 204 for a cached empty response or
+    404 for a miss. GET /summary returns CdasCache.summary().
+
+    Args:
+        cacheDir (str): Cache directory.
+        host (str): Interface to bind.
+        port (int): Port, 0 picks a free one.
+        doQuiet (bool): Suppress the request log.
+    """
+
+    def __init__(self, cacheDir, host="127.0.0.1", port=0, doQuiet=True):
+        self.cache = CdasCache(cacheDir)
+        handler = type("CacheHandler", (_CacheHandler,), {"cache": self.cache, "doQuiet": doQuiet})
+        self.httpd = ThreadingHTTPServer((host, port), handler)
+        self.thread = None
+
+    @property
+    def url(self):
+        """Base URL of the server."""
+        host, port = self.httpd.server_address[:2]
+        return "http://%s:%d" % (host, port)
+
+    def start(self):
+        """Serve in a background thread."""
+        self.thread = threading.Thread(target=self.httpd.serve_forever, daemon=True)
+        self.thread.start()
+        return self
+
+    def serve(self):
+        """Serve in this thread until interrupted."""
+        try:
+            self.httpd.serve_forever()
+        except KeyboardInterrupt:
+            pass
+        self.httpd.server_close()
+
+    def stop(self):
+        """Stop a server started with start()."""
+        self.httpd.shutdown()
+        self.httpd.server_close()
+        if self.thread is not None:
+            self.thread.join()
+            self.thread = None
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *args):
+        self.stop()
@@ -15,9 +15,11 @@ import kaipy.kaiH5 as kh5
 import kaipy.kaiViz as kv
 import kaipy.kaijson as kj
 import kaipy.kaiTools as kT
+import kaipy.gridLocator as gl
 import kaipy.gamera.gampp as gampp
 import kaipy.gamera.rcmpp as rcmpp
 import kaipy.satcomp.scutils as scutils
+import kaipy.satcomp.binning as kbin
 
 
 #Optionals
@@ -436,9 +438,10 @@ def getRCM_scTrack(trackf5, rcmf5, rcmTimes, jdir=None, forceCalc=False, scName=
 	#Init rcm h5 info
 	rcm5 = h5.File(rcmf5,'r')
 	rcmS0 = rcm5[sIDstrs[0]]
-	Ni, Nj = rcmS0['aloct'].shape
-	rcmMLAT = 90.0-rcmS0['colat'][0,:]*180/np.pi
-	rcmMLON = rcmS0['aloct'][:,0]*180/np.pi
+	rcmLoc = gl.rcmLocator(rcmS0['aloct'][:], rcmS0['colat'][:])
+	lonLoc, latLoc = rcmLoc.axes
+	rcmMLON = lonLoc.x
+	rcmMLAT = latLoc.x  # mlat_rcm goes from high to low
 	rcmMLAT_min = np.min(rcmMLAT)
 	rcmMLAT_max = np.max(rcmMLAT)
 
@@ -456,73 +459,65 @@ def getRCM_scTrack(trackf5, rcmf5, rcmTimes, jdir=None, forceCalc=False, scName=
 	xmin = np.zeros((Nsc))
 	ymin = np.zeros((Nsc))
 	zmin = np.zeros((Nsc))
-	energies_e = np.zeros((Nsc, Nk_e))
-	energies_i = np.zeros((Nsc, Nk_i))
 	eeta_e = np.zeros((Nsc, Nk_e))
 	eeta_i = np.zeros((Nsc, Nk_i))
-	diffFlux_e = np.zeros((Nsc, Nk_e))
-	diffFlux_i = np.zeros((Nsc, Nk_i))
 
-	nearest_i = np.zeros(Nsc)
-	nearest_j = np.zeros(Nsc)
-	
-	if doProgressBar: bar = progressbar.ProgressBar(max_value=Nsc)
-
-	for n in range(Nsc):
-		if doProgressBar: bar.update(n)
+	#Make sure track and rcm domain overlap
+	isIn = (scMJDs >= rcmMJDs[0]) & (scMJDs <= rcmMJDs[-1]) & \
+		(scMLATs >= rcmMLAT_min) & (scMLATs <= rcmMLAT_max)
+
+	# Get bounds in rcm space for the whole track at once
+	# Longitude cells are kept off the first/last 2 (periodic) points
+	ilon = np.clip(lonLoc.cellIdx(scMLONs), 2, len(rcmMLON)-2)
+	ilon, wlon = lonLoc.weights(scMLONs, ilon)
+	ilat, wlat = latLoc.weights(scMLATs)
+	imjd, wmjd = gl.AxisLocator(rcmMJDs).weights(scMJDs)
+
+	#For other things to use for less rigorous mapping
+	nearest_i = np.where(isIn, ilat + (wlat >= 0.5), 0).astype(float)
+	nearest_j = np.where(isIn, ilon + (wlon >= 0.5), 0).astype(float)
+
+	def readStep(n):
+		s5 = rcm5[sIDstrs[n]]
+		Q = {vID: s5[vID][:] for vID in ['rcmvm', 'rcmxmin', 'rcmymin', 'rcmzmin']}
+		#[k,lon,lat] -> [lon,lat,k]
+		Q['eeta_e'] = np.moveaxis(s5['rcmeeta'][kStart_e:kStart_e+Nk_e], 0, -1)
+		Q['eeta_i'] = np.moveaxis(s5['rcmeeta'][kStart_i:kStart_i+Nk_i], 0, -1)
+		return Q
+
+	#Visit each pair of bracketing steps once, all track points inside it are done together
+	mjdIdx = np.unique(imjd[isIn])
+	if doProgressBar: bar = progressbar.ProgressBar(max_value=len(mjdIdx))
+	stepQ = {}
+	for m, n in enumerate(mjdIdx):
+		if doProgressBar: bar.update(m)
+		#Only hold the two bracketing steps
+		stepQ = {nS: stepQ[nS] if nS in stepQ else readStep(nS) for nS in (n, n+1)}
+
+		I = isIn & (imjd == n)
+		idx = (ilon[I], ilat[I])
+		wll = (wlon[I], wlat[I])
+		wt = wmjd[I]
+
+		def interpTrack(vID):
+			Q0 = rcmLoc.interp(stepQ[n  ][vID], idx, wll)
+			Q1 = rcmLoc.interp(stepQ[n+1][vID], idx, wll)
+			wS = wt.reshape(wt.shape + (1,)*(Q0.ndim-1))
+			return (1-wS)*Q0 + wS*Q1
+
+		vms[I] = interpTrack('rcmvm')
+		#Do the same for xeq, yeq, zeq
+		xmin[I] = interpTrack('rcmxmin')
+		ymin[I] = interpTrack('rcmymin')
+		zmin[I] = interpTrack('rcmzmin')
+		eeta_e[I] = interpTrack('eeta_e')
+		eeta_i[I] = interpTrack('eeta_i')
 
-		mjd_sc = scMJDs[n]
-		mlat_sc = scMLATs[n]
-		mlon_sc = scMLONs[n]
-		#Make sure track and rcm domain overlap
-		if mjd_sc < rcmMJDs[0] or mjd_sc > rcmMJDs[-1] or \
-			mlat_sc < rcmMLAT_min or mlat_sc > rcmMLAT_max:
-			continue
+	energies_e = vms[:,None]*sdata['electrons']['ilamc']
+	energies_i = vms[:,None]*sdata['ions']['ilamc']
 
-		# Get bounds in rcm space
-		ilat = len(rcmMLAT)-1  # mlat_rcm goes from high to low
-		while rcmMLAT[ilat] < mlat_sc: ilat -= 1
-		ilon = 2
-		while ilon < len(rcmMLON)-2 and rcmMLON[ilon+1] < mlon_sc: ilon += 1
-		#while rcmMLON[ilon+1] < mlon_sc: ilon += 1
-		imjd = 0
-		while rcmMJDs[imjd+1] < mjd_sc: imjd += 1
-
-		#For other things to use for less rigorous mapping
-		nearest_i[n] = ilat if abs(mlat_sc - rcmMLAT[ilat]) < abs(mlat_sc - rcmMLAT[ilat+1]) else ilat+1
-		nearest_j[n] = ilon if abs(mlon_sc - rcmMLON[ilon]) < abs(mlon_sc - rcmMLON[ilon+1]) else ilon+1
-
-		latbnd = [rcmMLAT[ilat], rcmMLAT[ilat+1]]
-		lonbnd = [rcmMLON[ilon], rcmMLON[ilon+1]]
-		mjdbnd = [rcmMJDs[imjd], rcmMJDs[imjd+1]]		
-		stepLow = sIDstrs[imjd]
-		stepHigh = sIDstrs[imjd+1]
-
-		vmcube = getVarCube(rcm5, 'rcmvm', stepLow, stepHigh, ilon, ilat)
-		vms[n] = scutils.trilinterp(lonbnd, latbnd, mjdbnd, vmcube, mlon_sc, mlat_sc, mjd_sc)
-		#Do the same for xeq, yeq, zeq
-		xmincube = getVarCube(rcm5, 'rcmxmin', stepLow, stepHigh, ilon, ilat)
-		ymincube = getVarCube(rcm5, 'rcmymin', stepLow, stepHigh, ilon, ilat)
-		zmincube = getVarCube(rcm5, 'rcmzmin', stepLow, stepHigh, ilon, ilat)
-		xmin[n] = scutils.trilinterp(lonbnd, latbnd, mjdbnd, xmincube, mlon_sc, mlat_sc, mjd_sc)
-		ymin[n] = scutils.trilinterp(lonbnd, latbnd, mjdbnd, ymincube, mlon_sc, mlat_sc, mjd_sc)
-		zmin[n] = scutils.trilinterp(lonbnd, latbnd, mjdbnd, zmincube, mlon_sc, mlat_sc, mjd_sc)
-
-		def getSpecEetas(kOffset, Nk):
-			eetas = np.zeros((Nk))
-			for k in range(Nk):
-				kr = k + kOffset
-				eetacube = getVarCube(rcm5, 'rcmeeta', stepLow, stepHigh, ilon, ilat, kr)
-				eetas[k] = scutils.trilinterp(lonbnd, latbnd, mjdbnd, eetacube, mlon_sc, mlat_sc, mjd_sc)
-			return eetas
-
-		eeta_e[n,:] = getSpecEetas(kStart_e, Nk_e)
-		eeta_i[n,:] = getSpecEetas(kStart_i, Nk_i)
-		energies_e[n,:] = vms[n]*sdata['electrons']['ilamc']
-		energies_i[n,:] = vms[n]*sdata['ions']['ilamc']
-
-		diffFlux_e[n,:] = J0[n]*specFlux_factor_e*energies_e[n,:]*eeta_e[n,:]/sdata['electrons']['lamscl']
-		diffFlux_i[n,:] = J0[n]*specFlux_factor_i*energies_i[n,:]*eeta_i[n,:]/sdata['ions'     ]['lamscl']
+	diffFlux_e = np.where(isIn[:,None], J0[:,None]*specFlux_factor_e*energies_e*eeta_e/sdata['electrons']['lamscl'], 0.0)
+	diffFlux_i = np.where(isIn[:,None], J0[:,None]*specFlux_factor_i*energies_i*eeta_i/sdata['ions'     ]['lamscl'], 0.0)
 
 	# Package everything together
 	sdata['electrons']['energies'] = energies_e*1E-3  # [eV -> keV]
@@ -678,7 +673,7 @@ def consolidateODFs(scData, rcmTrackData, eGrid=None, doPlot=False):
 
 	return result
 
-def getIntensitiesVsL(rcmf5, mhdrcmf5, sStart, sEnd, sStride, species='ions', eGrid=None, jdir=None, forceCalc=False):
+def getIntensitiesVsL(rcmf5, mhdrcmf5, sStart, sEnd, sStride, species='ions', eGrid=None, jdir=None, forceCalc=False, nChunk=8):
 	"""Calculate rcm intensities (summed diff flux).
 	
 	Args:
@@ -687,6 +682,7 @@ def getIntensitiesVsL(rcmf5, mhdrcmf5, sStart, sEnd, sStride, species='ions', eG
 		AxLvT (matplotlib.axes.Axes, optional): If given, will plot the resulting L shell vs. time intensity.
 		jdir (str, optional): Give JSON directory to enable JSON usage (read/write results to file).
 		forceCalc (bool, optional): If dataset already found in file, re-calculate anyways and overwrite it.
+		nChunk (int, optional): Number of steps binned together. Defaults to 8.
 	
 	Returns:
 		result (dict): Dictionary containing the calculated intensities.
@@ -744,48 +740,45 @@ def getIntensitiesVsL(rcmf5, mhdrcmf5, sStart, sEnd, sStride, species='ions', eG
 	rcmodf_tkl = np.zeros((nSteps, Ne+2, nlbins+2))
 	rcmpress_tkl = np.zeros((nSteps, Ne+2, nlbins+2))
 
+	#Bin nChunk steps at a time, each cell of each step goes to its nearest (energy, L) bin
 	if doProgressBar: bar = progressbar.ProgressBar(max_value=nSteps)
-	for n in range(nSteps):
-		if doProgressBar: bar.update(n)
-
-		rcmS = rcm5[sIDstrs[n]]
-		mhdrcmS = mhdrcm5[sIDstrs[n]]
-
-		IOpen = mhdrcmS['IOpen']
-		Ni, Nj = IOpen.shape  # Default should be (179, 90)
-		#Shorten rcm data to match Ni, Nj of mhdrcm5
-		vms = rcmS['rcmvm'][2:, :]
-		xmins = rcmS['rcmxmin'][2:,:]
-		ymins = rcmS['rcmymin'][2:,:]
-		zmins = rcmS['rcmzmin'][2:,:]
-		eetas = rcmS['rcmeeta'][kStart:kEnd,2:,:]
-
-		vms_xij = vms[np.newaxis,:,:]
-
-		#Calculate L shell for whole plane
-		L_arr = scutils.xyz_to_L(xmins, ymins, zmins)  # [i,j]
-
-		le_counts = np.zeros((Ne+2, nlbins+2))  # Keep track of how many entries into each bin so we can divide by it to get the average later
-
-		energies = vms_xij * alams_kxx  # Should be [Nk, Ni, Nj]
-
-		iL_arr = np.array([np.abs(lbins-i).argmin() for i in L_arr.flatten()]).reshape((Ni, Nj))
-		iE_arr = np.array([np.abs(eGrid-e).argmin() for e in energies.flatten()]).reshape((Nk, Ni, Nj))
-
-		diffFlux_Nk = sf_factor*energies*eetas/alamData['lamscl'][:, np.newaxis, np.newaxis]  # [k,i,j]
-
-		pressure_kij = pressure_factor*alams_kxx*eetas*vms_xij**2.5 * 1E9  # [Pa -> nPa]
-
-		for i in range(Ni):
-			for j in range(Nj):
-				for k in range(Nk):
-					rcmodf_tkl[n, iE_arr[k,i,j], iL_arr[i,j]] += diffFlux_Nk[k,i,j]
-					rcmpress_tkl[n, iE_arr[k,i,j], iL_arr[i,j]] += pressure_kij[k,i,j]
-					le_counts[iE_arr[k,i,j], iL_arr[i,j]] += 1
-
-		#Normalize to get avg. per count
-		rcmodf_tkl[n,:,:] /= le_counts
-		rcmpress_tkl[n,:,:] /= le_counts
+	for n0 in range(0, nSteps, nChunk):
+		if doProgressBar: bar.update(n0)
+		iTs = [] ; iEs = [] ; iLs = [] ; dFs = [] ; Ps = []
+		for n in range(n0, min(n0+nChunk, nSteps)):
+			rcmS = rcm5[sIDstrs[n]]
+			mhdrcmS = mhdrcm5[sIDstrs[n]]
+
+			IOpen = mhdrcmS['IOpen']
+			Ni, Nj = IOpen.shape  # Default should be (179, 90)
+			#Shorten rcm data to match Ni, Nj of mhdrcm5
+			vms = rcmS['rcmvm'][2:, :]
+			xmins = rcmS['rcmxmin'][2:,:]
+			ymins = rcmS['rcmymin'][2:,:]
+			zmins = rcmS['rcmzmin'][2:,:]
+			eetas = rcmS['rcmeeta'][kStart:kEnd,2:,:]
+
+			vms_xij = vms[np.newaxis,:,:]
+
+			#Calculate L shell for whole plane
+			L_arr = scutils.xyz_to_L(xmins, ymins, zmins)  # [i,j]
+
+			energies = vms_xij * alams_kxx  # Should be [Nk, Ni, Nj]
+
+			iLs.append(np.broadcast_to(kbin.nearestIndex(lbins, L_arr), (Nk, Ni, Nj)).ravel())
+			iEs.append(kbin.nearestIndex(eGrid, energies).ravel())
+			iTs.append(np.full(Nk*Ni*Nj, n-n0))
+
+			diffFlux_Nk = sf_factor*energies*eetas/alamData['lamscl'][:, np.newaxis, np.newaxis]  # [k,i,j]
+			pressure_kij = pressure_factor*alams_kxx*eetas*vms_xij**2.5 * 1E9  # [Pa -> nPa]
+			dFs.append(diffFlux_Nk.ravel())
+			Ps.append(pressure_kij.ravel())
+
+		#Average per count in each bin
+		idx = (np.concatenate(iTs), np.concatenate(iEs), np.concatenate(iLs))
+		(odf, press), counts = kbin.binMean(idx, (len(iTs), Ne+2, nlbins+2), [np.concatenate(dFs), np.concatenate(Ps)])
+		rcmodf_tkl[n0:n0+len(iTs)] = odf
+		rcmpress_tkl[n0:n0+len(iTs)] = press
 
 	#Trim off the extra values
 	lbins = lbins[1:-1]
@@ -815,10 +808,13 @@ def getIntensitiesVsL(rcmf5, mhdrcmf5, sStart, sEnd, sStride, species='ions', eG
 	return result
 
 #TODO: Something odd with odf calculation
-#TODO: Break out interpolator/mapper so they can be tested on their own and used by other functions
 def getVarWedge(rcmf5, mhdrcmf5, sStart, sEnd, sStride, wedge_deg, species='ions', rcmTimes=None, eGrid=None, lGrid=None, jdir=None, forceCalc=False):
 	"""Take a slice/wedge centered along the x axis (eq space), calculate average <var> vs. L and E.
 
+	Points in the wedge are mapped onto lGrid with linear (tent) weights, each lGrid point is
+	normalized by the number of points within one grid cell of it. The k channels of each point
+	are mapped onto eGrid by overlap.
+
 	Args:
 		rcmf5 (str): Filename of the RCM data in HDF5 format.
 		mhdrcmf5 (str): Filename of the MHD RCM data in HDF5 format.
@@ -882,6 +878,11 @@ def getVarWedge(rcmf5, mhdrcmf5, sStart, sEnd, sStride, wedge_deg, species='ions
 		eGrid = np.logspace(np.log10(eMin), np.log10(eMax), Ne, endpoint=True)
 	Ne = len(eGrid)
 
+	#eGrid cell bounds, half cells at the ends
+	eMids = 0.5*(eGrid[:-1] + eGrid[1:])
+	e_lower = np.concatenate(([eGrid[0]], eMids))
+	e_upper = np.concatenate((eMids, [eGrid[-1]]))
+
 	odf_tkl = np.zeros((nSteps, Ne, Nl))
 	press_tkl = np.zeros((nSteps, Ne, Nl))
 
@@ -904,157 +905,45 @@ def getVarWedge(rcmf5, mhdrcmf5, sStart, sEnd, sStride, wedge_deg, species='ions
 		L_arr = scutils.xyz_to_L(xmins, ymins, zmins) # [i,j]
 		theta_arr = np.arctan2(ymins,xmins)*180/np.pi%360
 
-		#Collect indicies of points within spatial bounds
-		iPointCloud = []
-		lPointCloud = []
+		#Collect points within spatial bounds, nightside wedge is mapped to negative L
+		isDay = (theta_arr > 360-wedge_deg/2) | (theta_arr < wedge_deg/2)
+		isNight = ~isDay & (theta_arr > 180-wedge_deg/2) & (theta_arr < 180+wedge_deg/2)
+		lSigned = np.where(isDay, L_arr, -L_arr)
+		isIn = (IOpen[:] < 0) & (isDay | isNight) & (lSigned >= lGrid[0]) & (lSigned <= lGrid[-1]) & (np.abs(L_arr) > tkl_lInner)
+		iPC, jPC = np.nonzero(isIn)
+		lPointCloud = lSigned[isIn]
+		Npc = len(lPointCloud)
 
-		for i in range(Ni):
-			for j in range(Nj):
-				l_ij = L_arr[i,j]
-				theta_ij = theta_arr[i,j]
-				#Collect indicies of points within spatial bounds
-				
-				if IOpen[i,j] >= 0:
-					continue
-
-				if (theta_ij > 360-wedge_deg/2 or theta_ij < wedge_deg/2):  # dayside wedge
-					if l_ij >= lGrid[0] and l_ij <= lGrid[-1] and abs(l_ij) > tkl_lInner:
-						iPointCloud.append([i,j])
-						lPointCloud.append(l_ij)	
-				elif (theta_ij > 180-wedge_deg/2 and theta_ij < 180+wedge_deg/2): #nightside wedge
-					if -l_ij >= lGrid[0] and -l_ij <= lGrid[-1] and abs(l_ij) > tkl_lInner:
-						iPointCloud.append([i,j])
-						lPointCloud.append(-l_ij)
-	
-		iPointCloud = np.array(iPointCloud)
-		lPointCloud = np.array(lPointCloud)
-		#Sort index array in order of ascending L values
-		lSort = lPointCloud.argsort()
-		iPointCloud = iPointCloud[lSort]
-		lPointCloud = lPointCloud[lSort]
-		Npc = len(iPointCloud)
-		
 		if Npc == 0:
 			continue
-		#Calc distance-based mapping weights for each lGrid index
-		lMapWeights = [ [] for l in range(Nl)] # Nl x nx2 ,  nx[iPC, lWeight]
-		wFlag = 9999
-		for iLG in range(Nl):
-			iLPC_lower = 0  # iPointCloud/lPointCloud index, 1 grid point below current lGrid index
-			iLPC_upper = 0  # iPointCloud/lPointCloud index, 1 grid point above current lGrid index
-			width_lower = abs(lGrid[iLG] - lGrid[iLG-1]) if iLG > 1 else wFlag
-			width_upper = abs(lGrid[iLG+1] - lGrid[iLG]) if iLG < Nl-1 else wFlag
-			if iLG != 0: 
-				while iLPC_lower < Npc-1 and lPointCloud[iLPC_lower] < lGrid[iLG-1]:
-					iLPC_lower += 1
-			#Set upper iPLC index to next highest lbin value
-			if iLG < Nl-1: 
-				while iLPC_upper+1 < Npc and lPointCloud[iLPC_upper+1] < lGrid[iLG+1]:
-					iLPC_upper += 1
-
-			iLG_WM = []  # weight and points for current lGrid index
-			
-			for iLPC in range(iLPC_lower, iLPC_upper+1):
-				# Is this a point below or above current lGrid point
-				if lPointCloud[iLPC] < lGrid[iLG]:
-					weight = 1-abs(lGrid[iLG] - lPointCloud[iLPC])/width_lower					
-				elif lPointCloud[iLPC] > lGrid[iLG]:
-					weight = 1-abs(lPointCloud[iLPC] - lGrid[iLG])/width_upper
-
-				#Cheating !! this may be breaking something in odf calc
-				if abs(weight)>1:
-					weight = 0
-					#print('iLG={} iLPC={} lG[iLG]={} lPC[iLPC]={} weight={}'.format(iLG, iLPC, lGrid[iLG], lPointCloud[iLPC], weight))
-				iLG_WM.append([iLPC, weight])  # Save pointCloud index and associated lbin weight
-			lMapWeights[iLG] = iLG_WM
-		"""
-		for iLG in range(Nl):
-			print('iLG={}  L={} nP={}'.format(iLG, lGrid[iLG], len(lMapWeights[iLG])))
-			for i in range(len(lMapWeights[iLG])):
-				iPC = lMapWeights[iLG][i][0]
-				print('  Lpc={} iPC={} weight={}'.format(lPointCloud[iPC], iPC, lMapWeights[iLG][i][1]))
-		"""
-		#Calc eGrid mapping weights
-		eMapFracs = [ [ [] for e in range(Ne)] for pnt in range(Npc)] # Npc x Ne x (nx2)
-		for iPC in range(Npc):
-			i,j = iPointCloud[iPC]
-			vm = vms[i,j]
-			ke_center = alamData['ilamc']*vm
-			ke_lower = alamData['ilami'][:-1]*vm
-			ke_upper = alamData['ilami'][1:]*vm
-			ke_width = ke_upper-ke_lower
-
-			e_lower = np.zeros(Ne)
-			e_upper = np.zeros(Ne)
-			for iEG in range(Ne):
-				e_lower[iEG] = eGrid[0] if iEG == 0 else (eGrid[iEG-1] + eGrid[iEG])/2
-				e_upper[iEG] = eGrid[-1] if iEG == Ne-1 else (eGrid[iEG+1] + eGrid[iEG])/2
-
-			eMapFracs[iPC] = scutils.getWeights_ConsArea(ke_center, ke_lower, ke_upper, eGrid, e_lower, e_upper)
-
-			# Iterate over eGrid, grab weights for all overlapping k bins
-			"""
-			for iEG in range(Ne):
-				e_lower = eGrid[0] if iEG == 0 else (eGrid[iEG-1] + eGrid[iEG])/2
-				e_upper = eGrid[-1] if iEG == Ne-1 else (eGrid[iEG+1] + eGrid[iEG])/2
-
-				frac_arr = []
-				#Loop through k values, find k bind in 1D collision with current eGrid element
-				for k in range(Nk):
-					#Does it collide
-					if e_lower < ke_upper[k] and e_upper > ke_lower[k]:
-						#Get overlap bounds
-						o_lower = ke_lower[k] if ke_lower[k] > e_lower else e_lower
-						o_upper = ke_upper[k] if ke_upper[k] < e_upper else e_upper
-						o_width = o_upper-o_lower
-						#frac_arr.append([k, eetas[k,i,j]*o_width/ke_width])  # Fraction of k bin that coincides with eGrid bin
-						frac_arr.append([k, o_width/ke_width[k]])  # Fraction of k bin that coincides with eGrid bin
-				#print('n: {}  arr:{}'.format(len(frac_arr), frac_arr))
-				eMapFracs[iPC][iEG] = frac_arr
-			"""
-		"""
-		for iPC in range(Npc):
-			print('iPC={}  L={}'.format(iPC, lPointCloud[iPC]))
-			i,j = iPointCloud[iPC]
-			vm = vms[i,j]
-			for e in range(Ne):
-				print('  e={}'.format(eGrid[e]))
-				for i in range(len(eMapFracs[iPC][e])):
-					k = eMapFracs[iPC][e][i][0]
-					print('    k={}  E_k={} frac={}'.format(k, alamData['ilamc'][k]*vm,eMapFracs[iPC][e][i][1]))
-		"""
+		#Distance-based (tent) mapping weights onto the two neighbouring lGrid points,
+		#each lGrid point is normalized by the number of points within reach of it
+		iL0, wL0, wL1 = kbin.tentWeights(lGrid, lPointCloud)
+		iL1 = np.where(iL0 >= 0, iL0+1, -1)
+		numPoints = kbin.accumulate((iL0,), (Nl,)) + kbin.accumulate((iL1,), (Nl,))
+
+		#Calc eGrid mapping weights, overlap of each point's k bins with the eGrid bins
+		vm = vms[iPC, jPC][:, np.newaxis]  # [Npc,1]
+		eMapFracs = kbin.overlapFracs(alamData['ilami'][:-1]*vm, alamData['ilami'][1:]*vm, e_lower, e_upper)  # [Npc,Ne,Nk]
 
 		#Calculate the desired variables for all of our points
-		odf_pc = np.zeros((Npc,Nk))
-		press_pc = np.zeros((Npc,Nk))
-		for npc in range(Npc):
-			# Single point's values
-			i,j = iPointCloud[npc]
-			vm = vms[i,j]
-			eeta_k = eetas[:,i,j]
-
-			odf_pc[npc,:] =  sf_factor*alamData['ilamc']*vm*eeta_k/alamData['lamscl'] # [Nk]
-			press_pc[npc,:] =  pressure_factor*alamData['ilamc']*eeta_k*vm**2.5 * 1E9  # [Pa -> nPa]
-			#print('nPC={} vm={} odf={} press={}'.format(npc,vm,odf_pc[npc,:],press_pc[npc,:]))
-			
+		eeta_pk = eetas[:, iPC, jPC].T  # [Npc,Nk]
+		odf_pc = sf_factor*alamData['ilamc']*vm*eeta_pk/alamData['lamscl']
+		press_pc = pressure_factor*alamData['ilamc']*eeta_pk*vm**2.5 * 1E9  # [Pa -> nPa]
+		odf_pe = np.einsum('pek,pk->pe', eMapFracs, odf_pc)
+		press_pe = np.einsum('pek,pk->pe', eMapFracs, press_pc)
+
 		#Now we have all necessary info. Map all points to their corresponding L-E grid point
+		iEG = np.arange(Ne)[np.newaxis, :]
 		odf_EL = np.zeros((Ne,Nl))
 		press_EL = np.zeros((Ne,Nl))
-		for iLG in range(Nl):
-			#print('iLG=' + str(iLG))
-			pointsToMap = lMapWeights[iLG]  # [nx2], nx[pc index, weight]
-			numPoints = len(pointsToMap)
-
-			for i in range(numPoints):
-				iPC = pointsToMap[i][0]
-				lWeight = pointsToMap[i][1]
-				
-				for e in range(Ne):
-					for ik in range(len(eMapFracs[iPC][e])):
-						k = eMapFracs[iPC][e][ik][0]
-						eFrac = eMapFracs[iPC][e][ik][1]
-						odf_EL[e,iLG] += lWeight/numPoints * eFrac * odf_pc[iPC,k]
-						press_EL[e,iLG] += lWeight/numPoints * eFrac * press_pc[iPC,k]
+		for iL, wL in ((iL0, wL0), (iL1, wL1)):
+			wL = wL[:, np.newaxis]
+			odf_w, press_w = kbin.accumulate((iEG, iL[:, np.newaxis]), (Ne,Nl), [wL*odf_pe, wL*press_pe])
+			odf_EL += odf_w
+			press_EL += press_w
+		odf_EL = np.where(numPoints > 0, odf_EL/np.maximum(numPoints, 1), 0.0)
+		press_EL = np.where(numPoints > 0, press_EL/np.maximum(numPoints, 1), 0.0)
 
 		#Yay we made it
 		odf_tkl[n,:,:] = odf_EL
@@ -1154,10 +1043,10 @@ def getRCM_eqlatlon(mhdrcmf5, rcmTimes, sStart, sEnd, sStride, jdir=None, forceC
 	"""
 	#import kaipy.gamera.msphViz as mviz
 	rcmdata = gampp.GameraPipe('',mhdrcmf5.split('.h5')[0])
-	for t in range(0, len(sIDs)):
-		bmX, bmY = rcmpp.RCMEq(rcmdata, sIDs[t], doMask=True)
-		I = rcmpp.GetMask(rcmdata, sIDs[t])
-		pm = rcmpp.GetVarMask(rcmdata, sIDs[t], 'P', I)
+	eqVars = ["xMin", "yMin", "zMin", "IOpen", "P"]
+	for t, rcmSnap in enumerate(rcmpp.PrefetchSnapshots(rcmdata, sIDs, vIDs=eqVars)):
+		bmX, bmY = rcmpp.RCMEq(rcmSnap, sIDs[t], doMask=True)
+		pm = rcmSnap.GetVarMask('P')
 
 		xmin_arr[t,:,:] = np.transpose(bmX)
 		ymin_arr[t,:,:] = np.transpose(bmY)
@@ -19,6 +19,7 @@ from sunpy.coordinates import frames
 
 # Kaipy modules
 import kaipy.kaijson as kj
+import kaipy.satcomp.cdascache as cdascache
 import kaipy.kaiTools as kaiTools
 import kaipy.kdefs
 from kaipy import satcomp
@@ -233,7 +234,7 @@ def getCdasDsetInterval(dsName):
         start (str): The start time of the dataset.
         end (str): The end time of the dataset.
     """
-    cdas = CdasWs()
+    cdas = cdascache.wrapCdas(CdasWs())
 
     data = cdas.get_datasets(idPattern=dsName)
     if len(data) == 0:
@@ -270,7 +271,7 @@ def pullVar(cdaObsId:str, cdaDataId, t0:str, t1:str, deltaT:float=60,
     }
 
     # Create the CDAWeb query object.
-    cdas = CdasWs()
+    cdas = cdascache.wrapCdas(CdasWs())
 
     # Perform the query.
     status, data = cdas.get_data(cdaObsId, cdaDataId, t0, t1, binData=binData)
@@ -1117,7 +1118,7 @@ def helio_pullVar(
     }
 
     # Create the CDAWeb query object.
-    cdas = CdasWs()
+    cdas = cdascache.wrapCdas(CdasWs())
 
     # Perform the query.
     status, data = cdas.get_data(cdaObsId, cdaDataId, t0, t1, binData=binData)
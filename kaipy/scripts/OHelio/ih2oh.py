@@ -1,20 +1,32 @@
 #! /usr/bin/env python
 
 # Standard modules
-import time
-import os,sys,glob
-import matplotlib.pyplot as plt
+import os,sys
 import argparse
+from concurrent.futures import ProcessPoolExecutor
+from functools import partial
 
 # Third-party modules
 import numpy as np
-from scipy import interpolate
 import h5py
 
 # Kaipy modules
 import kaipy.gamhelio.wsa2gamera.params as params
-import kaipy.gamhelio.lib.wsa as wsa
+import kaipy.gamhelio.lib.innerbc as innerbc
 import kaipy.gamera.gamGrids as gg
+import kaipy.kaiH5 as kh5
+from kaipy.gamhelio.heliosphere import tSclIH
+from kaipy.kdefs import Day2s
+
+# constants
+mp = 1.67e-24
+kb = 1.38e-16
+
+#normalization in OH
+B0OH = 5.e-5 # [Gs] 5 nT = 5.e-5 Gs
+n0OH = 10 # [cm-3]
+V0OH = B0OH/np.sqrt(4*np.pi*mp*n0OH) #Alfven speed at 1 AU 34.5 [km/s]
+T0OH = B0OH*B0OH/4/np.pi/n0OH/kb #in K p = nkT
 
 
 def create_command_line_parser():
@@ -28,8 +40,124 @@ def create_command_line_parser():
         help='The name of the configuration file to use (default: startup.config)',
         default='startup.config'
     )
+    parser.add_argument('-nS', type=int, metavar="Step-Start", default=-1,
+        help="First inner helio step to convert (default: first step in file)")
+    parser.add_argument('-nE', type=int, metavar="Step-End", default=-1,
+        help="Last inner helio step to convert (default: last step in file)")
+    parser.add_argument('-dn', type=int, metavar="Step-Stride", default=1,
+        help="Stride between converted steps (default: %(default)s)")
+    parser.add_argument('--mjd0', type=float, metavar="MJD0", default=None,
+        help="MJD at time=0 of the inner helio run, only used if the steps carry no MJD (default: %(default)s)")
+    parser.add_argument('--ncpus', type=int, metavar="ncpus", default=1,
+        help="Number of worker processes (default: %(default)s)")
     return parser
 
+
+def ReadShellGrid(fIn):
+    """
+    Read the geometry of the outermost radial shell of an inner helio file.
+
+    Only the last two radial corner layers are read from the file.
+
+    Args:
+        fIn (str): Inner helio h5 file.
+
+    Returns:
+        phi_c (numpy.ndarray): phi of the shell cell centers, (Nphi,).
+        theta_c (numpy.ndarray): theta of the shell cell centers, (Nth,).
+        rHat (tuple of numpy.ndarray): Radial unit vector (x,y,z)/r at the
+            shell cell centers, each (Nphi,Nth).
+    """
+    with h5py.File(fIn, 'r') as f:
+        Ni = f['X'].shape[-1]
+        x, y, z = [innerbc.cellCenters(f[xID][:, :, Ni-2:])[:, :, 0] for xID in ('X', 'Y', 'Z')]
+
+    r = np.sqrt(x**2 + y**2 + z**2)
+    theta = np.arccos(z/r)
+    phi = np.arctan2(y, x)
+    phi[phi < 0] += 2*np.pi
+
+    return phi[:, 0], theta[0, :], (x/r, y/r, z/r)
+
+
+def ShellStep(nStp, fIn, rHat, ihMap, kfMap, gScl, B0, n0, V0, T0, gWidth=0):
+    """
+    Map the outermost radial cells of one inner helio step to the OH inner boundary.
+
+    Args:
+        nStp (int): Inner helio step number.
+        fIn (str): Inner helio h5 file.
+        rHat (tuple): Radial unit vector at the shell cell centers.
+        ihMap (innerbc.BilinearMap): IH shell centers -> OH cell centers.
+        kfMap (innerbc.BilinearMap): OH cell centers -> OH k-faces.
+        gScl (numpy.ndarray): (R0/r)**2 for each ghost layer.
+        B0, n0, V0, T0 (float): Inner helio normalization.
+        gWidth (int): Width of the Gaussian smoothing kernel for br (0 = off).
+
+    Returns:
+        dict: innerbc variables for this step.
+    """
+    with h5py.File(fIn, 'r') as f:
+        grp = f["Step#%d" % (nStp)]
+        s = np.s_[:, :, grp['D'].shape[-1]-1]
+        #these are normilized according to inner helio normalization
+        Vr = grp['Vx'][s]*rHat[0] + grp['Vy'][s]*rHat[1] + grp['Vz'][s]*rHat[2]
+        Br = grp['Bx'][s]*rHat[0] + grp['By'][s]*rHat[1] + grp['Bz'][s]*rHat[2]
+        Rho = grp['D'][s]
+        T = grp['P'][s]/Rho
+
+    #renormalize inner helio solution, keep temperature in K
+    br = ihMap(Br*B0/B0OH)
+
+    if gWidth != 0:
+        from astropy.convolution import convolve, Gaussian2DKernel
+        br = convolve(br, Gaussian2DKernel(gWidth), boundary='extend')
+
+    vr = ihMap(Vr*V0/V0OH)
+    rho = ihMap(Rho*n0/n0OH)
+    temp = ihMap(T*T0)
+
+    br_kface = kfMap(br)
+    vr_kface = kfMap(vr)
+
+    # Scale inside ghost region
+    Ng = len(gScl)
+    (vr, vr_kface, rho, temp, br, br_kface) = [np.dstack(Ng*[var]) for var in (vr, vr_kface, rho, temp, br, br_kface)]
+    rho *= gScl
+    br *= gScl
+    br_kface *= gScl
+
+    return {"vr": vr, "vr_kface": vr_kface, "rho": rho, "temp": temp, "br": br, "br_kface": br_kface}
+
+
+def StepMJDs(fIn, sIds, mjd0=None):
+    """
+    MJD of each inner helio step.
+
+    Uses the MJD attributes written by the model, otherwise offsets the
+    step times from mjd0.
+
+    Args:
+        fIn (str): Inner helio h5 file.
+        sIds (numpy.ndarray): Step numbers.
+        mjd0 (float, optional): MJD at time=0 of the run.
+
+    Returns:
+        numpy.ndarray: MJD of each step.
+    """
+    MJDs = kh5.getTs(fIn, sIds, "MJD", -np.inf, useBars=False)
+    if np.all(MJDs > 0):
+        return MJDs
+    if mjd0 is None:
+        sys.exit("%s has no step MJDs, supply the MJD at time=0 with --mjd0" % (fIn))
+    uID = kh5.PullAtt(fIn, "UnitsID", a0="CODE")
+    if not isinstance(uID, str):
+        uID = uID.decode('utf-8')
+    tScl = tSclIH if uID == "CODE" else 1.0
+    T = kh5.getTs(fIn, sIds, "time", useBars=False)
+    return mjd0 + T*tScl/Day2s
+
+
 def main():
     # Parse command-line arguments
     parser = create_command_line_parser()
@@ -37,11 +165,7 @@ def main():
 
     # Read params from config file
     prm = params.params(args.ConfigFileName)
-    Ng=prm.NO2
-    gamma = prm.gamma
-    # constants
-    mp = 1.67e-24
-    kb = 1.38e-16
+    Ng = prm.Nghost
 
     #grid parameters
     tMin = prm.tMin
@@ -60,13 +184,6 @@ def main():
 
     print ("inner helio normalization")
     print (B0, n0, V0, T0)
-
-    #normalization in OH
-    B0OH = 5.e-5 # [Gs] 5 nT = 5.e-5 Gs
-    n0OH = 10 # [cm-3]
-    V0OH = B0OH/np.sqrt(4*np.pi*mp*n0OH) #Alfven speed at 1 AU 34.5 [km/s]
-    T0OH = B0OH*B0OH/4/np.pi/n0OH/kb #in K p = nkT
-
     print ("outer helio units")
     print (B0OH, n0OH, V0OH, T0OH)
 
@@ -76,177 +193,48 @@ def main():
 
     X3,Y3,Z3 = gg.GenKSph(Ni=Ni,Nj=Nj,Nk=Nk,Rin=Rin,Rout=Rout,tMin=tMin,tMax=tMax)
 
-    #to generate non-uniform grid for GL cme (more fine in region 0.1-0.3 AU) 
+    #to generate non-uniform grid for GL cme (more fine in region 0.1-0.3 AU)
     #X3,Y3,Z3 = gg.GenKSphNonUGL(Ni=Ni,Nj=Nj,Nk=Nk,Rin=Rin,Rout=Rout,tMin=tMin,tMax=tMax)
     gg.WriteGrid(X3,Y3,Z3,fOut=os.path.join(prm.GridDir,prm.gameraGridFile))
 
     print("Gamera-Ohelio grid ready!")
 
-    #----------GENERATE HELIO GRID------
-
+    bcG = innerbc.HelioBCGrid(X3,Y3,Z3,Ng)
+    print ("shapes of output phi and theta ", bcG.P_out.shape, bcG.T_out.shape, bcG.R_out.shape)
 
     ############### READ GAMERA solution at 1 AU #####################
-    f = h5py.File(prm.wsaFile,'r')
-    #the latest Step saved in inner helio solution wsa.h5
-    step = 'Step#2'
-
-    f[step].attrs.keys()
-    Nphi, Nth, Nr = np.shape(f[step]['Vx'])
-
-    #coordinates of cell centers
-    x = 0.125*(f['X'][:-1,:-1,:-1]+f['X'][:-1,:-1,1:]+f['X'][:-1,1:,:-1]+f['X'][:-1,1:,1:]+
-            f['X'][1:,:-1,:-1]+f['X'][1:,:-1,1:]+f['X'][1:,1:,:-1]+f['X'][1:,1:,1:])
-    y = 0.125*(f['Y'][:-1,:-1,:-1]+f['Y'][:-1,:-1,1:]+f['Y'][:-1,1:,:-1]+f['Y'][:-1,1:,1:]+
-            f['Y'][1:,:-1,:-1]+f['Y'][1:,:-1,1:]+f['Y'][1:,1:,:-1]+f['Y'][1:,1:,1:])
-    z = 0.125*(f['Z'][:-1,:-1,:-1]+f['Z'][:-1,:-1,1:]+f['Z'][:-1,1:,:-1]+f['Z'][:-1,1:,1:]+
-            f['Z'][1:,:-1,:-1]+f['Z'][1:,:-1,1:]+f['Z'][1:,1:,:-1]+f['Z'][1:,1:,1:])
-
-    r = np.sqrt(x[:]**2 + y[:]**2 + z[:]**2)
-    rxy = np.sqrt(x[:]**2 + y[:]**2)
-
-    #phi and theta of centers
-    theta = np.arccos(z/r)
-    phi = np.arctan2(y[:], x[:])
-    phi[phi<0]=phi[phi<0]+2*np.pi
-
-    theta_wsa_c = theta[0,:,0]
-    phi_wsa_c = phi[:,0,0]
-
+    fIn = prm.wsaFile
+    phi_c,theta_c,rHat = ReadShellGrid(fIn)
     print ("grid dimensions from 1 AU input solution")
-    print (theta_wsa_c.shape, phi_wsa_c.shape)
-
-    #these are normilized according to inner helio normalization
-    Vr = (f[step]['Vx'][:]*x[:] + f[step]['Vy'][:]*y[:] + f[step]['Vz'][:]*z[:])/r[:]
-    #Br = f[step]['Br'][:]
-    Br = (f[step]['Bx'][:]*x[:] + f[step]['By'][:]*y[:] + f[step]['Bz'][:]*z[:])/r[:]
-    Rho = f[step]['D'][:]
-    T = f[step]['P'][:]/f[step]['D'][:]
-
-    #take solution from the last cell in i, already normilized
-    #use wsa variable names for now
-    bi_wsa = Br[:,:,Nr-1]
-    v_wsa = Vr[:,:,Nr-1]
-    n_wsa = Rho[:,:,Nr-1]
-    T_wsa = T[:,:,Nr-1]
-
-    print ("1AU arrays")
-    print (bi_wsa.shape, v_wsa.shape, n_wsa.shape, T_wsa.shape)
-
-    #renormalize inner helio solution
-    bi_wsa = bi_wsa * B0/B0OH
-    n_wsa = n_wsa * n0/n0OH
-    v_wsa = v_wsa * V0/V0OH
-    T_wsa = T_wsa * T0     
-    # keep temperature in K
-
-    #######Interpolate to GAMERA grid###########
-    # GAMERA GRID
-    with h5py.File(os.path.join(prm.GridDir,prm.gameraGridFile),'r') as f:
-        x=f['X'][:]
-        y=f['Y'][:]
-        z=f['Z'][:]
-
-    xc = 0.125*(x[:-1,:-1,:-1]+x[:-1,1:,:-1]+x[:-1,:-1,1:]+x[:-1,1:,1:]
-                +x[1:,:-1,:-1]+x[1:,1:,:-1]+x[1:,:-1,1:]+x[1:,1:,1:])
-    yc = 0.125*(y[:-1,:-1,:-1]+y[:-1,1:,:-1]+y[:-1,:-1,1:]+y[:-1,1:,1:]
-                +y[1:,:-1,:-1]+y[1:,1:,:-1]+y[1:,:-1,1:]+y[1:,1:,1:])
-    zc = 0.125*(z[:-1,:-1,:-1]+z[:-1,1:,:-1]+z[:-1,:-1,1:]+z[:-1,1:,1:]
-                +z[1:,:-1,:-1]+z[1:,1:,:-1]+z[1:,:-1,1:]+z[1:,1:,1:])
-
-    # remove the ghosts from angular dimensions
-    R0 = np.sqrt(x[0,0,Ng]**2+y[0,0,Ng]**2+z[0,0,Ng]**2)  # radius of the inner boundary
-
-    #cell corners including ghost cells
-    r = np.sqrt(x[:]**2+y[:]**2+z[:]**2)
-
-    #corners of physical cells
-    P = np.arctan2(y[Ng:-Ng,Ng:-Ng,:],x[Ng:-Ng,Ng:-Ng,:])
-    P[P<0] += 2*np.pi
-    #P = P % (2*np.pi)  # sometimes the very first point may be a very
-                    # small negative number, which the above call sets
-                    # to 2*pi. This takes care of it.
-    T = np.arccos(z[Ng:-Ng,Ng:-Ng,:]/r[Ng:-Ng,Ng:-Ng,:])
-
-    #grid (corners) for output into innerbc.h5
-    P_out = P[:,:,0:Ng+1]
-    T_out = T[:,:,0:Ng+1]
-    R_out = r[Ng:-Ng,Ng:-Ng,0:Ng+1]
-    print ("shapes of output phi and theta ", P_out.shape, T_out.shape, R_out.shape)
-
-    #centers
-    Rc = np.sqrt(xc[Ng:-Ng,Ng:-Ng,:]**2+yc[Ng:-Ng,Ng:-Ng,:]**2+zc[Ng:-Ng,Ng:-Ng,:]**2)
-    Pc = np.arctan2(yc[Ng:-Ng,Ng:-Ng,:],xc[Ng:-Ng,Ng:-Ng,:])
-    Pc[Pc<0] += 2*np.pi
-    Tc = np.arccos(zc[Ng:-Ng,Ng:-Ng,:]/Rc)
-
-
-    # this is fast and better than griddata in that it nicely extrapolates boundaries:
-    fbi      = interpolate.RectBivariateSpline(phi_wsa_c,theta_wsa_c,bi_wsa,kx=1,ky=1)  
-    br = fbi(Pc[:,0,0],Tc[0,:,0])
-
-    ############### SMOOTHING #####################
-    if not prm.gaussSmoothWidth==0:
-        import astropy
-        from astropy.convolution import convolve,Gaussian2DKernel
-
-        gauss=Gaussian2DKernel(width=prm.gaussSmoothWidth)
-        br   =astropy.convolution.convolve(br,gauss,boundary='extend')
-
-
-    ############### INTERPOLATE AND DUMP #####################
-    fv      = interpolate.RectBivariateSpline(phi_wsa_c,theta_wsa_c,v_wsa,kx=1,ky=1)  
-    vr = fv(Pc[:,0,0],Tc[0,:,0])
-
-    f      = interpolate.RectBivariateSpline(phi_wsa_c,theta_wsa_c,n_wsa,kx=1,ky=1)  
-    rho = f(Pc[:,0,0],Tc[0,:,0])
-
-    fT      = interpolate.RectBivariateSpline(phi_wsa_c,theta_wsa_c,T_wsa,kx=1,ky=1)  
-    temp = fT(Pc[:,0,0],Tc[0,:,0])
-
-    fbi = interpolate.RectBivariateSpline(Pc[:,0,0],Tc[0,:,0],br,kx=1,ky=1)
-    fv  = interpolate.RectBivariateSpline(Pc[:,0,0],Tc[0,:,0],vr,kx=1,ky=1)
-
-    br_kface = fbi(P[:,0,0],Tc[0,:,0])
-    vr_kface  = fv (P[:,0,0],Tc[0,:,0])
-
-    # Scale inside ghost region
-    (vr,vr_kface,rho,temp,br,br_kface) = [np.dstack(prm.NO2*[var]) for var in (vr,vr_kface,rho,temp,br,br_kface)]
-    rho *= (R0/Rc[0,0,:Ng])**2
-    br *= (R0/Rc[0,0,:Ng])**2
-    br_kface *= (R0/Rc[0,0,:Ng])**2
-
-    #FIX: 
-    #For now I use wsa.h5 which do not have mjd inside
-    #so hardcoded using WSA fits value + 200*4637/60/60/24 [number of days]
-    mjd_c = 58005.83415
-
-    print ("writing out innerbc.h5...")
-    with h5py.File(os.path.join(prm.IbcDir,prm.gameraIbcFile),'w') as hf:
-        hf.attrs["MJD"] = mjd_c
-        hf.create_dataset("vr",data=vr)
-        hf.create_dataset("vr_kface",data=vr_kface)
-        hf.create_dataset("rho",data=rho)
-        hf.create_dataset("temp",data=temp)
-        hf.create_dataset("br",data=br)
-        hf.create_dataset("br_kface",data=br_kface)
-    hf.close()
-
-    #innerbc to plot in Paraview
-    with h5py.File(os.path.join(prm.IbcDir,'innerbc_OHighostgr.h5'),'w') as hfg:
-        hfg.create_dataset("X", data=P_out)
-        hfg.create_dataset("Y", data=T_out)
-        hfg.create_dataset("Z", data=R_out)
-        grname = "Step#0"
-        grp = hfg.create_group(grname)
-        grp.attrs.create("MJD", mjd_c)
-        #grp.attrs.create("time", time_sec)
-        grp.create_dataset("vr",data=vr)
-        grp.create_dataset("vr_kface",data=vr_kface)
-        grp.create_dataset("rho",data=rho)
-        grp.create_dataset("temp",data=temp)
-        grp.create_dataset("br",data=br)
-        grp.create_dataset("br_kface",data=br_kface)
-    hfg.close
+    print (theta_c.shape, phi_c.shape)
+
+    #Steps to convert
+    _,sIds = kh5.cntSteps(fIn,useBars=False)
+    nS = sIds.min() if args.nS < 0 else args.nS
+    nE = sIds.max() if args.nE < 0 else args.nE
+    sIds = sIds[(sIds >= nS) & (sIds <= nE)][::args.dn]
+    if len(sIds) == 0:
+        sys.exit("No inner helio steps in [%d,%d]" % (nS,nE))
+    MJDs = StepMJDs(fIn,sIds,args.mjd0)
+    print("Converting %d steps in [%d,%d], MJD = [%f,%f]" % (len(sIds),sIds[0],sIds[-1],MJDs[0],MJDs[-1]))
+
+    #Interpolation weights are shared by all steps
+    # this matches RectBivariateSpline(kx=1,ky=1), which nicely extrapolates boundaries
+    ihMap = innerbc.BilinearMap(phi_c,theta_c,bcG.pC,bcG.tC)
+    kfMap = innerbc.BilinearMap(bcG.pC,bcG.tC,bcG.pK,bcG.tC)
+
+    doStep = partial(ShellStep,fIn=fIn,rHat=rHat,ihMap=ihMap,kfMap=kfMap,gScl=bcG.ghostScale(),
+                     B0=B0,n0=n0,V0=V0,T0=T0,gWidth=prm.gaussSmoothWidth)
+
+    #Root variables (first step) for static OH runs, ghost grid copy to plot in Paraview
+    fOut = os.path.join(prm.IbcDir,prm.gameraIbcFile)
+    fGrid = os.path.join(prm.IbcDir,'innerbc_OHighostgr.h5')
+    print ("writing out %s..." % (fOut))
+    if args.ncpus > 1:
+        with ProcessPoolExecutor(max_workers=args.ncpus) as executor:
+            innerbc.WriteInnerBC(fOut,bcG,MJDs,executor.map(doStep,sIds),doRoot=True,fGrid=fGrid)
+    else:
+        innerbc.WriteInnerBC(fOut,bcG,MJDs,map(doStep,sIds),doRoot=True,fGrid=fGrid)
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    main()
@@ -0,0 +1,80 @@
+#!/usr/bin/env python
+#Manage the local CDAWeb response cache: prefetch spacecraft data, summarize, or serve it over HTTP
+
+# Standard modules
+import argparse
+from argparse import RawTextHelpFormatter
+
+# Kaipy modules
+import kaipy.satcomp.cdascache as cdascache
+import kaipy.satcomp.scutils as scutils
+
+
+def create_command_line_parser():
+	"""Create the command-line argument parser.
+
+Create the parser for command-line arguments.
+
+Returns:
+	argparse.ArgumentParser: Command-line argument parser for this script.
+"""
+	MainS = """Manages the local cache of CDAWeb responses used by cdaweb_utils and satcomp.
+  prefetch: Pull the data msphSatComp needs for the given spacecraft/interval into the cache
+  summary:  Print the size of the cache
+  serve:    Serve the cache over HTTP as a stand-in for CDAWeb
+
+To use the cache set %s=<cache directory>, to use a server set
+%s=<url>, and set %s=1 to never contact CDAWeb.""" % (cdascache.ENV_CACHE, cdascache.ENV_SERVER, cdascache.ENV_OFFLINE)
+	parser = argparse.ArgumentParser(description=MainS,
+		formatter_class=RawTextHelpFormatter)
+	parser.add_argument('action',choices=['prefetch','summary','serve'],
+		help='What to do')
+	parser.add_argument('-dir',type=str,metavar='cachedir',default=None,
+		help='Cache directory (default: $%s)' % (cdascache.ENV_CACHE))
+	parser.add_argument('-satId',type=str,nargs='+',metavar='Satellite Id',default=None,
+		help='Spacecraft to prefetch (default: all)')
+	parser.add_argument('-t0',type=str,metavar='start',default=None,
+		help='Prefetch start, %%Y-%%m-%%dT%%H:%%M:%%SZ')
+	parser.add_argument('-t1',type=str,metavar='end',default=None,
+		help='Prefetch end, %%Y-%%m-%%dT%%H:%%M:%%SZ')
+	parser.add_argument('-dt',type=float,metavar='cadence',default=60.0,
+		help='Prefetch cadence [s] (default: %(default)s)')
+	parser.add_argument('--raw',action='store_true',default=False,
+		help='Also prefetch the unbinned ephemeris used by cdaweb_utils (default: %(default)s)')
+	parser.add_argument('-host',type=str,default='127.0.0.1',
+		help='Interface to serve on (default: %(default)s)')
+	parser.add_argument('-port',type=int,default=8642,
+		help='Port to serve on (default: %(default)s)')
+	return parser
+
+def main():
+	parser = create_command_line_parser()
+	args = parser.parse_args()
+
+	cacheDir = args.dir if args.dir is not None else cdascache.getConfig()['cacheDir']
+	if cacheDir is None:
+		parser.error("No cache directory, use -dir or set %s" % (cdascache.ENV_CACHE))
+
+	if args.action == 'summary':
+		summ = cdascache.CdasCache(cacheDir).summary()
+		print("%s: %d queries, %d responses, %.1f MB" % (cacheDir, summ['queries'], summ['responses'], summ['bytes']/2.0**20))
+	elif args.action == 'serve':
+		srv = cdascache.CacheServer(cacheDir, host=args.host, port=args.port, doQuiet=False)
+		print("Serving %s at %s, set %s=%s" % (cacheDir, srv.url, cdascache.ENV_SERVER, srv.url))
+		srv.serve()
+	else:
+		if args.t0 is None or args.t1 is None:
+			parser.error("prefetch needs -t0 and -t1")
+		cdascache.configure(cacheDir=cacheDir, offline=False)
+		scIds = scutils.getScIds()
+		satIds = list(scIds.keys()) if args.satId is None else args.satId
+		for scId in satIds:
+			print("Prefetching %s" % (scId))
+			status, data = scutils.getSatData(scIds[scId], args.t0, args.t1, args.dt)
+			if args.raw:
+				cdas = cdascache.wrapCdas(scutils.CdasWs())
+				cdas.get_data(scIds[scId]['Ephem']['Id'], scIds[scId]['Ephem']['Data'], args.t0, args.t1)
+			print("\tStatus: %s" % (cdascache.statusCode(status)))
+
+if __name__ == "__main__":
+	main()
@@ -35,6 +35,7 @@ import kaipy.kaiViz as kv
 import kaipy.kaiTools as kaiTools
 import kaipy.chimp.kCyl as kc
 import kaipy.kaiH5 as kh5
+import kaipy.satcomp.cdascache as cdascache
 # import kaipy.gamera.gampp as gampp
 
 TINY = 1.0e-8
@@ -167,7 +168,7 @@ def main():
 		print("!!Exiting!!")
 		quit()
 
-	cdas = CdasWs()
+	cdas = cdascache.wrapCdas(CdasWs())
 
 	Qstr = 'FESA'
 	status,data = cdas.get_data(scStr,[Qstr],t0r,t1r)
@@ -5,15 +5,16 @@
 import argparse
 from argparse import RawTextHelpFormatter
 import os
+from functools import partial
 
 # Third-party modules
 import numpy as np
 import xml.etree.ElementTree as et
-import xml.dom.minidom
 
 # Kaipy modules
 import kaipy.gamera.gampp as gampp
 import kaipy.kaiH5 as kh5
+import kaipy.kaixdmf as kxmf
 
 
 # Generate name of restart file
@@ -75,8 +76,86 @@ def create_command_line_parser():
                         default=ftag, help="RunID of data (default: %(default)s)")
     parser.add_argument('-outid', type=str, metavar="outid", default=outid,
                         help="RunID of output XMF files (default: %(default)s)")
+    parser.add_argument('--append', action='store_true', default=False,
+                        help="Only write the XMF files that don't exist yet (default: %(default)s)")
+    parser.add_argument('--ncpus', type=int, metavar="ncpus", default=1,
+                        help="Number of processes building the XMF files (default: %(default)s)")
     return parser
 
+def genStepXdmf(ctx, n, nslc, T):
+    """
+    Build the XDMF document of one step, a spatial collection over the MPI blocks.
+
+    Args:
+        ctx (dict): Decomposition/variable information shared by all steps, see main.
+        n (int): Step ID.
+        nslc (int): Position of the step in the run, used to name the mesh.
+        T (float): Time of the step.
+
+    Returns:
+        Element: The Xdmf element.
+    """
+    Ri = ctx['Ri']
+    Rj = ctx['Rj']
+    Rk = ctx['Rk']
+
+    # Create XMF tree
+    Xdmf = et.Element("Xdmf")
+    Xdmf.set("Version", "2.0")
+
+    Dom = et.SubElement(Xdmf, "Domain")
+
+    # Spatial collection
+    meshName = "g%02d_mesh"%(nslc)
+    gCol = et.SubElement(Dom, "Grid")
+    gCol.set("Name", meshName)
+    gCol.set("GridType", "Collection")
+    gCol.set("CollectionType", "Spatial")
+
+    Time = et.SubElement(gCol, "Time")
+    Time.set("Value", "%s" % (str(T)))
+
+    Cyc = et.SubElement(gCol, "Cycle")
+    Cyc.set("Value", "%d" % (n))
+
+    # Now loop over MPI decomposition
+    for i in range(Ri):
+        for j in range(Rj):
+            for k in range(Rk):
+                nMPI = j + i*Rj + k*Ri*Rj
+                h5F = ctx['fdir'] + '/' + genName(ctx['ftag'], i, j, k, Ri, Rj, Rk, ctx['isOld'])
+
+                Ni = ctx['dNi'][i]
+                Nj = ctx['dNj'][j]
+                Nk = ctx['dNk'][k]
+                Ndim = 3
+
+                iDims = "%d %d %d" % (Nk+1, Nj+1, Ni+1)
+                VDims = "%d %d %d %d" % (Nk+0, Nj+0, Ni+0, Ndim )
+                cDims = "%d %d %d" % (Nk+0, Nj+0, Ni+0)
+
+                # Create new subgrid
+                gName = meshName+"%d" % (nMPI)
+                Grid = et.SubElement(gCol, "Grid")
+                Grid.set("GridType", "Uniform")
+                Grid.set("Name", gName)
+
+                Topo = et.SubElement(Grid, "Topology")
+                Topo.set("TopologyType", ctx['topoStr'])
+                Topo.set("NumberOfElements", iDims)
+                Geom = et.SubElement(Grid, "Geometry")
+                Geom.set("GeometryType", ctx['geoStr'])
+                kxmf.AddGrid(h5F, Geom, iDims, ["X", "Y", "Z"])
+
+                # Create variables
+                for vID in ctx['vIDs']:
+                    kxmf.AddData(Grid, h5F, vID, "Cell", cDims, n)
+
+                # create vectors
+                for Vname, Vecs in ctx['Vecs']:
+                    VectorOutput(Vname, Vecs, VDims, n, h5F, Grid, cDims)
+    return Xdmf
+
 def main():
     parser = create_command_line_parser()
     # Finalize parsing
@@ -85,12 +164,15 @@ def main():
     fodir = args.outd
     ftag = args.id
     outid = args.outid
+    doAppend = args.append
+    ncpus = args.ncpus
 
     # ---------------------
-    # Init data
+    # Init data, step list and times come from the time attribute cache
     print(fdir,"ftag",ftag)
     gamData = gampp.GameraPipe(fdir, ftag)
-    print("isOld  = ", gamData.isOld)
+    isOld = getattr(gamData, "isOld", False)
+    print("isOld  = ", isOld)
 
     print("number of variable",gamData.Nv)
     print("Vars ",gamData.vIDs)
@@ -101,11 +183,6 @@ def main():
     Rj = gamData.Rj
     Rk = gamData.Rk
 
-    tOut = 0
-
-    topoStr = "3DSMesh"
-    geoStr = "X_Y_Z"
-
 #    vIDs = ["D", "Vx", "Vy", "Vz", "P", "Bx", "By", "Bz"]  # ,"Jx","Jy","Jz"]
     vIDs = ["D", "P"]
     VVec =["Vx", "Vy", "Vz"] 
@@ -113,129 +190,35 @@ def main():
     JVec =["Jx", "Jy", "Jz"]
     EVec =["Ex", "Ey", "Ez"]
 
-    haveV = False
-    haveB = False
-    haveJ = False
-    haveE = False
-    for i in gamData.vIDs:
-        if ( i == "Vx" ): haveV = True
-        if ( i == "Bx" ): haveB = True
-        if ( i == "Jx" ): haveJ = True
-        if ( i == "Ex" ): haveE = True
-
-    Nv = len(vIDs)
-    for n in range(gamData.s0, gamData.sFin+1):
-        nslc = n-gamData.s0
-        print(n,gamData.T[nslc])
-
-        # Create XMF tree
-        Xdmf = et.Element("Xdmf")
-        Xdmf.set("Version", "2.0")
-
-        Dom = et.SubElement(Xdmf, "Domain")
-
-        # Spatial collection
-        meshName = "g%02d_mesh"%(nslc)
-        gCol = et.SubElement(Dom, "Grid")
-        gCol.set("Name", meshName)
-        gCol.set("GridType", "Collection")
-        gCol.set("CollectionType", "Spatial")
-
-        Time = et.SubElement(gCol, "Time")
-        Time.set("Value", "%s" % (str(gamData.T[nslc])))
-
-        Cyc = et.SubElement(gCol, "Cycle")
-        Cyc.set("Value", "%d" % (n))
-
-        # Now loop over MPI decomposition
-        for i in range(Ri):
-            for j in range(Rj):
-                for k in range(Rk):
-                    nMPI = j + i*Rj + k*Ri*Rj
-                    h5F = fdir + '/' + genName(ftag, i, j, k, Ri, Rj, Rk,gamData.isOld)
-
-
-                    Ni = gamData.dNi[i]
-                    Nj = gamData.dNj[j]
-                    Nk = gamData.dNk[k]
-                    Ndim = 3
-
-                    iDims = "%d %d %d" % (Nk+1, Nj+1, Ni+1)
-                    VDims = "%d %d %d %d" % (Nk+0, Nj+0, Ni+0, Ndim )
-                    cDims = "%d %d %d" % (Nk+0, Nj+0, Ni+0)
-                    iDimA = "%d %d %d" % (Nk*Rk+1, Nj*Rj+1, Ni*Ri+1)
-                    
-                    # Create new subgrid
-                    gName = meshName+"%d" % (nMPI)
-                    Grid = et.SubElement(gCol, "Grid")
-                    Grid.set("GridType", "Uniform")
-                    Grid.set("Name", gName)
-                    print(Grid)
-
-                    # Time = et.SubElement(Grid,"Time")
-                    # Time.set("TimeType","Single")
-                    # Time.set("Value","%s"%(str(gamData.T[nslc])))
-
-                    Topo = et.SubElement(Grid, "Topology")
-                    Topo.set("TopologyType", topoStr)
-                    Topo.set("NumberOfElements", iDims)
-                    Geom = et.SubElement(Grid, "Geometry")
-                    Geom.set("GeometryType", geoStr)
-
-                    xC = et.SubElement(Geom, "DataItem")
-                    xC.set("Dimensions", iDims)
-                    xC.set("NumberType", "Float")
-                    xC.set("Precision", "4")
-                    xC.set("Format", "HDF")
-                    xC.text = "%s:/X" % (h5F)
-
-                    yC = et.SubElement(Geom, "DataItem")
-                    yC.set("Dimensions", iDims)
-                    yC.set("NumberType", "Float")
-                    yC.set("Precision", "4")
-                    yC.set("Format", "HDF")
-                    yC.text = "%s:/Y" % (h5F)
-
-                    zC = et.SubElement(Geom, "DataItem")
-                    zC.set("Dimensions", iDims)
-                    zC.set("NumberType", "Float")
-                    zC.set("Precision", "4")
-                    zC.set("Format", "HDF")
-                    zC.text = "%s:/Z" % (h5F)
-
-                    # Create variables
-                    for v in range(Nv):
-                        vID = vIDs[v]
-                        vAtt = et.SubElement(Grid, "Attribute")
-                        vAtt.set("Name", vID)
-                        vAtt.set("AttributeType", "Scalar")
-                        vAtt.set("Center", "Cell")
-                        aDI = et.SubElement(vAtt, "DataItem")
-                        aDI.set("Dimensions", cDims)
-                        aDI.set("NumberType", "Float")
-                        aDI.set("Precision", "4")
-                        aDI.set("Format", "HDF")
-                        aDI.text = "%s:/Step#%d/%s" % ( h5F, n, vID)
-                        
-                     # create vectors
-                    if (haveV): VectorOutput("V",VVec,VDims,n,h5F,Grid, cDims)
-                    if (haveB): VectorOutput("B",BVec,VDims,n,h5F,Grid, cDims)
-                    if (haveJ): VectorOutput("J",JVec,VDims,n,h5F,Grid, cDims)
-                    if (haveE): VectorOutput("E",EVec,VDims,n,h5F,Grid, cDims)
-
-        # Write output
-        fOut = "%s/%s.%06d.xmf" % (fodir, outid, tOut)
+    # Vectors are included if their x component is in the run
+    Vecs = [(Vname, Vec) for Vname, Vec in [("V", VVec), ("B", BVec), ("J", JVec), ("E", EVec)] if Vec[0] in gamData.vIDs]
+
+    # Block sizes, either per block or the same for all
+    ctx = {
+        'fdir': fdir, 'ftag': ftag, 'isOld': isOld,
+        'Ri': Ri, 'Rj': Rj, 'Rk': Rk,
+        'dNi': np.broadcast_to(gamData.dNi, Ri),
+        'dNj': np.broadcast_to(gamData.dNj, Rj),
+        'dNk': np.broadcast_to(gamData.dNk, Rk),
+        'topoStr': "3DSMesh", 'geoStr': "X_Y_Z",
+        'vIDs': vIDs, 'Vecs': Vecs,
+    }
+
+    fOuts = ["%s/%s.%06d.xmf" % (fodir, outid, tOut) for tOut in range(len(gamData.sids))]
+    stepArgs = [(n, n-gamData.s0, T, fOut) for n, T, fOut in zip(gamData.sids, gamData.T, fOuts)]
+    if doAppend:
+        stepArgs = [a for a in stepArgs if not os.path.exists(a[-1])]
+        print("Adding %d of %d steps" % (len(stepArgs), len(fOuts)))
+
+    xmlStrs = kxmf.genStepStrs(partial(genStepXdmf, ctx), [a[:-1] for a in stepArgs], nWorkers=ncpus)
+
+    # Write output
+    for a, xmlStr in zip(stepArgs, xmlStrs):
+        fOut = a[-1]
         print("Writing %s" % (fOut))
- #       xTree = et.ElementTree(Xdmf)
- #       xTree.write(fOut, pretty_print=True,
- #                   xml_declaration=True, encoding='UTF-8')
-        xmlStr = xml.dom.minidom.parseString(et.tostring(Xdmf)).toprettyxml(indent="    ")
-        with open(fOut,"w") as f:
+        with open(fOut, "w") as f:
+            f.write(kxmf.xmlHeader)
             f.write(xmlStr)
 
-
-        # Prep for next step
-        tOut = tOut+1
-
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    main()
@@ -0,0 +1,46 @@
+#!/usr/bin/env python
+#Streaming population statistics of a CHIMP test-particle run, written to a compact HDF5 summary
+
+# Standard modules
+import argparse
+from argparse import RawTextHelpFormatter
+
+# Kaipy modules
+import kaipy.kaiH5 as kh5
+import kaipy.chimp.tpstats as tps
+
+def create_command_line_parser():
+	"""Create the command-line argument parser.
+
+	Returns:
+		argparse.ArgumentParser: Command-line argument parser for this script.
+	"""
+	MainS = """Walks the steps of a CHIMP h5part file once, accumulating histograms of K vs L, pitch angle
+	and MLT vs L, the number of particles in/out of the domain and every particle's first loss and
+	first crossing inside geosynchronous orbit. Only the quantities present in the file are done.
+	"""
+	parser = argparse.ArgumentParser(description=MainS, formatter_class=RawTextHelpFormatter)
+	parser.add_argument('h5p',metavar='input.h5part',help="Input H5Part file")
+	parser.add_argument('-o',type=str,metavar="output",default=None,help="Output summary file (default: input with .stats.h5)")
+	parser.add_argument('-nchunk',type=int,metavar="nchunk",default=16,help="Steps per worker task (default: %(default)s)")
+	parser.add_argument('-nw',type=int,metavar="nWorkers",default=1,help="Number of worker processes (default: %(default)s)")
+	return parser
+
+def main():
+	parser = create_command_line_parser()
+	args = parser.parse_args()
+
+	fIn = args.h5p
+	kh5.CheckOrDie(fIn)
+	fOut = args.o
+	if fOut is None:
+		fOut = fIn.rsplit('.', 1)[0] + ".stats.h5"
+
+	stats = tps.tpStats(fIn, nChunk=args.nchunk, nWorkers=args.nw)
+	tps.writeStats(fOut, stats)
+	print("Wrote %s: %d steps, %d particles"%(fOut,len(stats["sIds"]),len(stats["ids"])))
+	print("\tHistograms: %s"%(list(stats["hists"].keys())))
+	print("\tCrossings: %s"%(list(stats["cross"].keys())))
+
+if __name__ == "__main__":
+	main()
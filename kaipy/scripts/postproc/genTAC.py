@@ -0,0 +1,41 @@
+#!/usr/bin/env python
+#Scan Kaiju H5 files once and cache every per-step scalar attribute in the time attribute cache
+
+# Standard modules
+import argparse
+from argparse import RawTextHelpFormatter
+
+# Kaipy modules
+import kaipy.kaiH5 as kh5
+import kaipy.kdefs as kd
+
+def create_command_line_parser():
+	"""Create the command-line argument parser.
+	Create the parser for command-line arguments.
+	Returns:
+		argparse.ArgumentParser: Command-line argument parser for this script.
+	"""
+	MainS = """Writes every per-step scalar attribute (time, MJD, nSW, cpcp, ...) of Kaiju HDF-5 files
+into the %s group, extending what the model already wrote.
+kaiH5.getTs then serves any of these quantities without touching the step groups.""" % (kd.grpTimeCache)
+
+	parser = argparse.ArgumentParser(description=MainS, formatter_class=RawTextHelpFormatter)
+	parser.add_argument('h5F',nargs='+',metavar='model.h5',help="Filename(s) of Gamera/ReMIX/RCM HDF5 output")
+	parser.add_argument('--overwrite',action='store_true',default=False,help="Rewrite quantities that are already cached (default: %(default)s)")
+	return parser
+
+def main():
+	parser = create_command_line_parser()
+	#Finished getting arguments, parse and move on
+	args = parser.parse_args()
+	for h5F in args.h5F:
+		print("Caching %s"%(h5F))
+		written = kh5.buildTAC(h5F,doOverwrite=args.overwrite)
+		if len(written) > 0:
+			print("\tWrote: %s"%(", ".join(written)))
+		else:
+			print("\tCache already complete")
+	#---------------------
+
+if __name__ == "__main__":
+	main()
@@ -3,11 +3,11 @@
 # Standard modules
 import argparse
 import os
+from functools import partial
 
 # Third-party modules
 import h5py as h5
 import xml.etree.ElementTree as et
-import xml.dom.minidom
 import numpy as np
 
 # Kaipy modules
@@ -77,6 +77,17 @@ def getDimInfo(h5fname,s0IDstr,preset):
 	return result
 
 
+def getRCMInfo(rcmInfo, sID):
+	"""
+	Read the rcm.h5 grid size and the shape of the requested variables once, from step sID.
+	"""
+	sIDstr = "Step#" + str(sID)
+	with h5.File(rcmInfo['rcmh5fname'],'r') as rcm5:
+		rcmInfo['Nj'], rcmInfo['Ni'] = rcm5[sIDstr]['aloct'].shape
+		rcmInfo['Nk'] = rcm5[sIDstr]['alamc'].shape[0]
+		rcmInfo['vShapes'] = {vName: rcm5[sIDstr][vName].shape for vName in rcmInfo['rcmVars']}
+	return rcmInfo
+
 def addRCMVars(Grid, dimInfo, rcmInfo, sID):
 
 	sIDstr = "Step#" + str(sID) 
@@ -88,11 +99,8 @@ def addRCMVars(Grid, dimInfo, rcmInfo, sID):
 	rcmVars = rcmInfo['rcmVars'] # List of rcm.h5 variables we want in mhdrcm.xmf
 	rcmKs = rcmInfo['rcmKs'] # List if rcm.h5 k values for 3d rcm.h5 vars
 
-	rcm5 = h5.File(rcmh5fname,'r')
-	if 'Nk' not in rcmInfo.keys():
-		rcmInfo['Nj'], rcmInfo['Ni'] = rcm5[sIDstr]['aloct'].shape
-		rcmInfo['Nk'] = rcm5[sIDstr]['alamc'].shape[0]
-		#print("Adding Nk to rcmInfo")
+	if 'vShapes' not in rcmInfo.keys():
+		getRCMInfo(rcmInfo, sID)
 	Ni = rcmInfo['Ni']
 	Nj = rcmInfo['Nj']
 	Nk = rcmInfo['Nk']
@@ -100,8 +108,7 @@ def addRCMVars(Grid, dimInfo, rcmInfo, sID):
 	
 	for vName in rcmVars:
 		doHyperslab = False
-		r_var = rcm5[sIDstr][vName]
-		r_vShape = r_var.shape
+		r_vShape = rcmInfo['vShapes'][vName]
 		r_vDimStr = " ".join([str(d) for d in r_vShape])
 		r_nDims = len(r_vShape)
 		dimTrim = 0
@@ -136,6 +143,72 @@ def addRCMVars(Grid, dimInfo, rcmInfo, sID):
 					vName_k = vName + "_k{}".format(k)
 					kxmf.addHyperslab(Grid,vName_k,mr_vDimStr,dimStr,startStr,strideStr,numStr,r_vDimStr,text)
 
+def genStepGrid(ctx, sID, T, fName, sLink, dtCpl=None):
+	"""
+	Build the grid element of one step of the temporal collection.
+
+	Only uses what is in ctx and the arguments (no h5 access unless rcm vars have
+	to be added), so it can run in worker processes.
+
+	Args:
+		ctx (dict): Grid/variable information shared by all steps, see main.
+		sID (int): Step ID.
+		T (float): Time of the step.
+		fName (str): File holding the step data.
+		sLink (int): Step ID within fName.
+		dtCpl (float, optional): Coupling time step, for rcm3D.
+
+	Returns:
+		Element: The step grid.
+	"""
+	Grid = et.Element("Grid")
+	mStr = "gMesh"#+str(nStp)
+	Grid.set("Name",mStr)
+	Grid.set("GridType","Uniform")
+
+	Topo = et.SubElement(Grid,"Topology")
+	Topo.set("TopologyType",ctx['topoStr'])
+	Topo.set("NumberOfElements",ctx['gDimStr'])
+	Geom = et.SubElement(Grid,"Geometry")
+	Geom.set("GeometryType",ctx['geoStr'])
+	
+	#Add grid info to each step
+	if ctx['doAppendStep']:
+		stepStr = "Step#%d"%(sID)
+		sgVars = [os.path.join(stepStr, v) for v in ctx['gridVars']]
+		kxmf.AddGrid(fName,Geom,ctx['gDimStr'],sgVars)
+	else:
+		kxmf.AddGrid(fName,Geom,ctx['gDimStr'],ctx['gridVars'])
+
+	Time = et.SubElement(Grid,"Time")
+	Time.set("Value","%f"%T)
+
+	if dtCpl is not None:
+		other  = et.SubElement(Grid, "dtCpl")
+		other.set("Value","%f"%dtCpl)
+
+	#--------------------------------
+	#Step variables
+	for vId,vLoc in zip(ctx['vIds'],ctx['vLocs']):
+		vDimStr = ctx['vDimStr_corner'] if vLoc=="Node" else ctx['vDimStr_cc']
+		kxmf.AddData(Grid,fName,vId,vLoc,vDimStr,sLink)
+	#--------------------------------
+	#Base grid variables
+	for vId,vLoc in zip(ctx['rvIds'],ctx['rvLocs']):
+		vDimStr = ctx['vDimStr_corner'] if vLoc=="Node" else ctx['vDimStr_cc']
+		kxmf.AddData(Grid,fName,vId,vLoc,vDimStr)
+
+	if ctx['rcmInfo'] is not None:
+		addRCMVars(Grid, ctx['dimInfo'], ctx['rcmInfo'], sID)
+
+	#--------------------------------
+	#Add some extra aliases
+	if ctx['preset']=="gam":
+		vDims = ctx['vDimStr_cc'] + " %d"%(ctx['Nd'])
+		kxmf.AddVectors(Grid,fName,ctx['vIds'],ctx['vDimStr_cc'],vDims,ctx['Nd'],sLink)
+
+	return Grid
+
 def create_command_line_parser():
 	"""Create a command line parser for the script.
 	Returns:
@@ -154,6 +227,8 @@ def create_command_line_parser():
 	parser.add_argument('-rcmv',type=str,help="Comma-separated rcm.h5 vars to include in an mhdrcm preset (ex: rcmvm, rcmeeta)")
 	parser.add_argument('-rcmk',type=str,help="Comma-separated RCM k values to pull from 3D vars specified with '-rcmv'")
 	parser.add_argument('--printVars',action='store_true',default=False,help="Print root and step vars (default: %(default)s)")
+	parser.add_argument('--append',action='store_true',default=False,help="Only add the steps missing from an existing XMF file (default: %(default)s)")
+	parser.add_argument('--ncpus',type=int,metavar="ncpus",default=1,help="Number of processes building the step XML (default: %(default)s)")
 	return parser
 
 def main():
@@ -168,6 +243,8 @@ def main():
 	rcmVars = args.rcmv
 	rcmKs = args.rcmk
 	doPrintVars = args.printVars
+	doAppend = args.append
+	ncpus = args.ncpus
 
 	pre,ext = os.path.splitext(h5fname)
 	if outfname is None or outfname == "":
@@ -175,55 +252,39 @@ def main():
 	else:
 		fOutXML = outfname
 
-	#Scrape necessary data from H5 file
-	nSteps,sIDs = kh5.cntSteps(h5fname)
-	sIDs = np.sort(sIDs)
-	sIDstrs = ['Step#'+str(s) for s in sIDs]
+	#Scrape necessary data from H5 file, step list and times come from the time attribute cache
+	sIDs,T = kxmf.getStepTimes(h5fname)
+	nSteps = len(sIDs)
 	s0 = sIDs[0]
-	s0str = sIDstrs[0]
+	s0str = 'Step#'+str(s0)
 
 	#Determine grid and dimensionality
 	if preset is None: preset = ""
 	dimInfo = getDimInfo(h5fname, s0str, preset)
-	gridVars = dimInfo['gridVars']
 	gDims = dimInfo['gDims']
 	Nd = dimInfo['Nd']
-	geoStr = dimInfo['geoStr']
-	topoStr = dimInfo['topoStr']
-	doAppendStep = dimInfo['doAppendStep']
-	gDimStr = ' '.join([str(v) for v in gDims])
-	vDimStr_corner = ' '.join([str(v) for v in gDims])
-	vDimStr_cc = ' '.join([str(v-1) for v in gDims])
-
-	doAddRCMVars = False
+
+	rcmInfo = None
 	#Prep to include some rcmh5 vars in mhdrcm.xmf file
 	if 'mhdrcm' in preset and rcmVars is not None:
-		doAddRCMVars = True
 		rcmVars = rcmVars.split(',')
 		rcmKs = [int(k) for k in rcmKs.split(',')] if rcmKs is not None else []
 		rcmInfo = {}
 		rcmInfo['rcmh5fname'] = rcmh5fname
 		rcmInfo['rcmVars'] = rcmVars
 		rcmInfo['rcmKs'] = rcmKs
+		getRCMInfo(rcmInfo, s0)
 
 	#Get variable information
 	print("Getting variable information")
-	Nt = len(sIDstrs)
-	T = np.zeros(Nt)
 	# Also get file info, in case any of the steps are ExternalLinks to other files
 	# Assume this is done at the step level
-	fNames_link = [""]*Nt
-	steps_link = [""]*Nt
-	with h5.File(h5fname,'r') as f5:
-		for i,sIDstr in enumerate(sIDstrs):
-			if 'time' in f5[sIDstr].attrs.keys():
-				T[i] = f5[sIDstr].attrs['time']
-			else:
-				T[i] = int(sIDstr.split("#")[1])
-			fNames_link[i] = f5[sIDstr].file.filename.split('/')[-1]  # !!NOTE: This means the xdmf file must live in the same directory as the data files
-			steps_link[i] = int(f5[sIDstr].name.split('#')[1])
-
-		#steps = np.array([k for k in f5.keys() if "Step" in k])
+	#!!NOTE: This means the xdmf file must live in the same directory as the data files
+	fNames_link,steps_link = kxmf.getStepLinks(h5fname,sIDs)
+	dtCpls = [None]*nSteps
+	if preset=="rcm3D":
+		dtCpls = kh5.getTs(h5fname,sIDs,'dtCpl')
+
 	print("Getting Vars and RootVars")
 	vIds ,vLocs  = kxmf.getVars(h5fname,s0str,gDims)
 	rvIds,rvLocs = kxmf.getRootVars(h5fname,gDims)
@@ -233,9 +294,15 @@ def main():
 		print("\nStep Vars:")
 		kxmf.printVidAndLocs(vIds, vLocs)
 
-	Nv = len(vIds)
-	Nrv = len(rvIds)
-
+	ctx = dict(dimInfo)
+	ctx['gDimStr'] = ' '.join([str(v) for v in gDims])
+	ctx['vDimStr_corner'] = ' '.join([str(v) for v in gDims])
+	ctx['vDimStr_cc'] = ' '.join([str(v-1) for v in gDims])
+	ctx['vIds'] = vIds ; ctx['vLocs'] = vLocs
+	ctx['rvIds'] = rvIds ; ctx['rvLocs'] = rvLocs
+	ctx['preset'] = preset
+	ctx['dimInfo'] = dimInfo
+	ctx['rcmInfo'] = rcmInfo
 
 	print("Generating XDMF from %s"%(h5fname))
 	print("Writing to %s"%(fOutXML))
@@ -243,75 +310,24 @@ def main():
 	print("\tGrid: %s"%str(gDims))
 	print("\tSlices: %d -> %d"%(sIDs.min(),sIDs.max()))
 	print("\tTime: %3.3f -> %3.3f"%(T.min(),T.max()))
-	
+
+	#Reuse the steps already in the file when appending
+	stepStrs = []
+	if doAppend:
+		grids,Told = kxmf.readTemporal(fOutXML)
+		nOld = kxmf.nAppend(Told,T)
+		stepStrs = [kxmf.toStr(g,3) for g in grids[:nOld]]
+		print("\tKeeping %d steps, adding %d"%(nOld,nSteps-nOld))
 
 	#Construct XDMF XML file
 	#-----------------------
-	Xdmf = et.Element("Xdmf")
-	Xdmf.set("Version","2.0")
-	
-	Dom = et.SubElement(Xdmf,"Domain")
-	
-	TGrid = et.SubElement(Dom,"Grid")
-	TGrid.set("Name","tMesh")
-	TGrid.set("GridType","Collection")
-	TGrid.set("CollectionType","Temporal")
-
-	#Loop over time slices
 	print("Writing info for each step")
-	for n in range(Nt):
-		nStp = sIDs[n]
-		Grid = et.SubElement(TGrid,"Grid")
-		mStr = "gMesh"#+str(nStp)
-		Grid.set("Name",mStr)
-		Grid.set("GridType","Uniform")
-
-		Topo = et.SubElement(Grid,"Topology")
-		Topo.set("TopologyType",topoStr)
-		Topo.set("NumberOfElements",gDimStr)
-		Geom = et.SubElement(Grid,"Geometry")
-		Geom.set("GeometryType",geoStr)
-		
-		#Add grid info to each step
-		if doAppendStep:
-			stepStr = sIDstrs[n]
-			sgVars = [os.path.join(stepStr, v) for v in gridVars]
-			kxmf.AddGrid(fNames_link[n],Geom,gDimStr,sgVars)
-		else:
-			kxmf.AddGrid(fNames_link[n],Geom,gDimStr,gridVars)
-
-		Time = et.SubElement(Grid,"Time")
-		Time.set("Value","%f"%T[n])
-
-		if preset=="rcm3D":
-			with h5.File(h5fname,'r') as f5:
-				other  = et.SubElement(Grid, "dtCpl")
-				other.set("Value","%f"%f5[sIDstrs[n]].attrs['dtCpl'])
-
-		#--------------------------------
-		#Step variables
-		for v in range(Nv):
-			vDimStr = vDimStr_corner if vLocs[v]=="Node" else vDimStr_cc
-			kxmf.AddData(Grid,fNames_link[n],vIds[v],vLocs[v],vDimStr,steps_link[n])
-		#--------------------------------
-		#Base grid variables
-		for v in range(Nrv):
-			vDimStr = vDimStr_corner if rvLocs[v]=="Node" else vDimStr_cc
-			kxmf.AddData(Grid,fNames_link[n],rvIds[v],rvLocs[v],vDimStr)
-
-		if doAddRCMVars:
-			addRCMVars(Grid, dimInfo, rcmInfo, sIDs[n])
-
-		#--------------------------------
-		#Add some extra aliases
-		if preset=="gam":
-			kxmf.AddVectors(Grid,h5fname,vIds,cDims,vDims,Nd,nStp)
-
-	#Finished creating XML tree, now write
-	xmlStr = xml.dom.minidom.parseString(et.tostring(Xdmf)).toprettyxml(indent="    ")
+	nOld = len(stepStrs)
+	stepArgs = [(sIDs[n],T[n],fNames_link[n],steps_link[n],dtCpls[n]) for n in range(nOld,nSteps)]
+	stepStrs += kxmf.genStepStrs(partial(genStepGrid,ctx),stepArgs,level=3,nWorkers=ncpus)
+
 	print("Saving as {}".format(fOutXML))
-	with open(fOutXML,"w") as f:
-		f.write(xmlStr)
+	kxmf.writeTemporal(fOutXML,stepStrs)
 		
 if __name__ == "__main__":
-	main()
\ No newline at end of file
+	main()
@@ -13,6 +13,7 @@ import numpy as np
 
 # Kaipy modules
 import kaipy.kaiH5 as kh5
+import kaipy.chimp.fieldlines as fl
 
 def cntX(fname,gID=None,StrX="/Step#"):
 	with h5py.File(fname,'r') as hf:
@@ -48,18 +49,15 @@ def getAtts(fIn,n,m):
 	with h5py.File(fIn,'r') as hf:
 		gId = "Step#%d"%(n)
 		lId = "Line#%d"%(m)
-		Atts = hf[gId][lId].attrs.keys()
-
-		aNull = ["Np","n0"]
-		aIDs = [x for x in Atts if x not in aNull]
-		aVs = []
-		Na = len(aIDs)
-		for n in range(Na):
-			aVs.append(float(hf[gId][lId].attrs[aIDs[n]]))
-
-		aVs.append(float(m))
-		aIDs.append("ID")
-		
+		return grpAtts(hf[gId][lId],m)
+
+def grpAtts(lGrp,m):
+	#Scalar attributes of an already open Line#m group
+	aIDs = [x for x in lGrp.attrs.keys() if x not in fl.nullAtts]
+	aVs = [float(lGrp.attrs[aID]) for aID in aIDs]
+
+	aVs.append(float(m))
+	aIDs.append("ID")
 	return aIDs,aVs
 
 
@@ -79,7 +77,7 @@ def create_command_line_parser():
 		argparse.ArgumentParser: Command-line argument parser for this script.
 	"""
 	#Set defaults
-	parser = argparse.ArgumentParser(description="Generates XDMF file from CHIMP tracer HDF5 output")
+	parser = argparse.ArgumentParser(description="Generates XDMF file from CHIMP tracer HDF5 output\nRagged files (see slimFL -ragged) get one Mixed polyline grid per step")
 	parser.add_argument('h5F',nargs=1,type=str,metavar='tracer.h5',help="Filename of CHIMP tracer HDF5 Output")
 	parser.add_argument('-noatts', action='store_true', default=False,help="Don't add XDMF scalars (default: %(default)s)")
 	return parser
@@ -99,6 +97,12 @@ def main():
 
 	print("Reading from %s"%(fIn))
 	kh5.CheckOrDie(fIn)
+
+	if fl.isRagged(fIn):
+		#One grid per step, built from dataset shapes only
+		fl.genXDMF(fIn,fOutXML,doAtts=doAtts)
+		print("Wrote %s"%(fOutXML))
+		return
 	
 	#Count steps and lines
 	
@@ -130,6 +134,8 @@ def main():
 	TGrid.set("GridType","Collection")
 	TGrid.set("CollectionType","Temporal")
 
+	#Keep the file open, line groups are visited once each
+	hf = h5py.File(fIn,'r')
 	#Loop over time slices
 	for n in range(Nstp):
 		lGrid = et.SubElement(TGrid,"Grid")
@@ -142,7 +148,8 @@ def main():
 		#Loop over individual lines
 		for m in range(Nl):
 			#Get number of points for this step/line
-			Np = getNum(fIn,nStp,m)
+			lGrp = hf["Step#%d"%(nStp)]["Line#%d"%(m)]
+			Np = lGrp.attrs["Np"]
 
 			#Create main grid structure
 			l0G = et.SubElement(lGrid,"Grid")
@@ -179,7 +186,7 @@ def main():
 				vDI.text = "%s:/Step#%d/Line#%d/%s"%(fIn,nStp,m,vIds[v])
 			if (doAtts):
 				#Add scalar attributes in lazy XDMF way
-				aIDs,aVs = getAtts(fIn,nStp,m)
+				aIDs,aVs = grpAtts(lGrp,m)
 				Na = len(aIDs)
 				for a in range(Na):
 					#Main variable
@@ -200,6 +207,7 @@ def main():
 					vNull.set("Format","HDF")
 					vNull.text = "%s:/Step#%d/Line#%d/%s"%(fIn,nStp,m,vIds[v])
 
+	hf.close()
 	#Finished creating XML, now write
 	xmlStr = xml.dom.minidom.parseString(et.tostring(Xdmf)).toprettyxml(indent="    ")
 	with open(fOutXML,"w") as f:
@@ -5,11 +5,11 @@
 import argparse
 from argparse import RawTextHelpFormatter
 import os
+from functools import partial
 
 # Third-party modules
 import numpy as np
 import xml.etree.ElementTree as et
-import xml.dom.minidom
 
 # Kaipy modules
 import kaipy.kaiH5 as kh5
@@ -37,9 +37,73 @@ def create_command_line_parser():
 	parser.add_argument('-outid',type=str,metavar="outid",default=outid,help="RunID of output XMF files (default: %(default)s)")
 	parser.add_argument('-sS',type=int,metavar="stride",default=sStride,help="Output cadence (default: %(default)s)")
 	parser.add_argument('--printVars',action='store_true',default=False,help="Print root and step vars (default: %(default)s)")
+	parser.add_argument('--append',action='store_true',default=False,help="Only write the XMF files that don't exist yet (default: %(default)s)")
+	parser.add_argument('--ncpus',type=int,metavar="ncpus",default=1,help="Number of processes building the XMF files (default: %(default)s)")
 
 	return parser
 
+def genStepXdmf(ctx, n, T):
+	"""
+	Build the XDMF document of one step, a spatial collection over the MPI ranks.
+
+	Args:
+		ctx (dict): Decomposition/variable information shared by all steps, see main.
+		n (int): Step ID.
+		T (float): Time of the step.
+
+	Returns:
+		Element: The Xdmf element.
+	"""
+	Ri = ctx['Ri'] ; Rj = ctx['Rj'] ; Rk = ctx['Rk']
+	iDims = ctx['iDims']
+	vDimStr = ctx['vDimStr']
+
+	#Create XMF tree
+	Xdmf = et.Element("Xdmf")
+	Xdmf.set("Version","2.0")
+	
+	Dom = et.SubElement(Xdmf,"Domain")
+
+	#Spatial collection
+	gCol = et.SubElement(Dom,"Grid")
+	gCol.set("Name","gMesh")
+	gCol.set("GridType","Collection")
+	gCol.set("CollectionType","Spatial")
+
+	Time = et.SubElement(gCol,"Time")
+	Time.set("Value","%s"%(T))
+	
+	Cyc = et.SubElement(gCol,"Cycle")
+	Cyc.set("Value","%d"%(n))
+
+	#Now loop over MPI decomposition
+	for i in range(Ri):
+		for j in range(Rj):
+			for k in range(Rk):
+				nMPI = j + i*Rj + k*Ri*Rj
+				h5F = kh5.genName(ctx['ftag'],i,j,k,Ri,Rj,Rk)
+				h5F = os.path.join(ctx['fdir'], h5F)
+
+				#Create new subgrid
+				gName = "gMesh%d"%(nMPI)
+				Grid = et.SubElement(gCol,"Grid")
+				Grid.set("GridType","Uniform")
+				Grid.set("Name",gName)
+
+				Topo = et.SubElement(Grid,"Topology")
+				Topo.set("TopologyType",ctx['topoStr'])
+				Topo.set("NumberOfElements",iDims)
+				Geom = et.SubElement(Grid,"Geometry")
+				Geom.set("GeometryType",ctx['geoStr'])
+				kxmf.AddGrid(h5F,Geom,iDims,["X","Y","Z"])
+
+				#Create variables
+				for vId,vLoc in zip(ctx['vIds'],ctx['vLocs']):
+					kxmf.AddData(Grid,h5F,vId,vLoc,vDimStr,n)
+				for vId,vLoc in zip(ctx['rvIds'],ctx['rvLocs']):
+					kxmf.AddData(Grid,h5F,vId,vLoc,vDimStr)
+	return Xdmf
+
 def main():
 
 	parser = create_command_line_parser()
@@ -51,147 +115,56 @@ def main():
 	outid = args.outid
 	sStride = args.sS
 	doPrintVars = args.printVars
+	doAppend = args.append
+	ncpus = args.ncpus
 
 	#---------------------
-	#Init data
+	#Init data, step list and times come from the time attribute cache
 	
 	gamData = gampp.GameraPipe(fdir,ftag)
 	
 	#---------------------
 	#Do work
-	Ri = gamData.Ri
-	Rj = gamData.Rj
-	Rk = gamData.Rk
-
 	Ni = gamData.dNi
 	Nj = gamData.dNj
 	Nk = gamData.dNk
 
-	iDims = "%d %d %d"%(Nk+1,Nj+1,Ni+1)
-	cDims = "%d %d %d"%(Nk+0,Nj+0,Ni+0)
-	iDimA = "%d %d %d"%(Nk*Rk+1,Nj*Rj+1,Ni*Ri+1)
-	tOut = 0
-
-	topoStr = "3DSMesh"
-	geoStr = "X_Y_Z"	
-
-	#for n in range(gamData.s0,gamData.sFin+1,sStride):
-	for n in gamData.sids:
-		if (n-gamData.s0)%sStride != 0: continue
-		nslc = n-gamData.s0
-		#print(n,gamData.T[nslc])
-
-		#Create XMF tree
-		Xdmf = et.Element("Xdmf")
-		Xdmf.set("Version","2.0")
-		
-		Dom = et.SubElement(Xdmf,"Domain")
-
-
-		#Spatial collection
-		gCol = et.SubElement(Dom,"Grid")
-		gCol.set("Name","gMesh")
-		gCol.set("GridType","Collection")
-		gCol.set("CollectionType","Spatial")
-
-		Time = et.SubElement(gCol,"Time")
-		#Time.set("Value","%s"%(str(gamData.T[np.where(gamData.sids == n)][0])))
-		Time.set("Value","%s"%(gamData.T[nslc]))
-		
-		Cyc = et.SubElement(gCol,"Cycle")
-		Cyc.set("Value","%d"%(n))
-
-		#Now loop over MPI decomposition
-		for i in range(Ri):
-			for j in range(Rj):
-				for k in range(Rk):
-					nMPI = j + i*Rj + k*Ri*Rj
-					h5F = kh5.genName(ftag,i,j,k,Ri,Rj,Rk)
-					h5F = os.path.join(fdir, h5F)
-					
-					#Get variable info
-					gDims = np.array([gamData.dNk+1,gamData.dNj+1,gamData.dNi+1])
-					vDims = np.array([gamData.dNk,gamData.dNj,gamData.dNi])
-					vDimStr = ' '.join([str(v) for v in vDims])
-					if nMPI == 0 and tOut == 0:  # Only do this the first time
-						vIds ,vLocs  = kxmf.getVars(h5F,'Step#'+str(n),gDims)
-						rvIds,rvLocs = kxmf.getRootVars(h5F,gDims)
-						Nv = len(vIds)
-						Nrv = len(rvIds)
-						if doPrintVars:
-							print("Root Vars:")
-							kxmf.printVidAndLocs(rvIds, rvLocs)
-							print("\nStep Vars:")
-							kxmf.printVidAndLocs(vIds, vLocs)
-
-					#Create new subgrid
-					gName = "gMesh%d"%(nMPI)
-					Grid = et.SubElement(gCol,"Grid")
-					Grid.set("GridType","Uniform")
-					Grid.set("Name",gName)
-
-					# Time = et.SubElement(Grid,"Time")
-					# Time.set("TimeType","Single")
-					# Time.set("Value","%s"%(str(gamData.T[nslc])))
-
-					Topo = et.SubElement(Grid,"Topology")
-					Topo.set("TopologyType",topoStr)
-					Topo.set("NumberOfElements",iDims)
-					Geom = et.SubElement(Grid,"Geometry")
-					Geom.set("GeometryType",geoStr)
-
-					xC = et.SubElement(Geom,"DataItem")
-					xC.set("Dimensions",iDims)
-					xC.set("NumberType","Float")
-					xC.set("Precision","4")
-					xC.set("Format","HDF")
-					xC.text = "%s:/X"%(h5F)
-
-					yC = et.SubElement(Geom,"DataItem")
-					yC.set("Dimensions",iDims)
-					yC.set("NumberType","Float")
-					yC.set("Precision","4")
-					yC.set("Format","HDF")
-					yC.text = "%s:/Y"%(h5F)
-
-					zC = et.SubElement(Geom,"DataItem")
-					zC.set("Dimensions",iDims)
-					zC.set("NumberType","Float")
-					zC.set("Precision","4")
-					zC.set("Format","HDF")
-					zC.text = "%s:/Z"%(h5F)
-
-					#Create variables
-					"""
-					for v in range(Nv):
-						vID = vIDs[v]
-						vAtt = et.SubElement(Grid,"Attribute")
-						vAtt.set("Name",vID)
-						vAtt.set("AttributeType","Scalar")
-						vAtt.set("Center","Cell")
-						aDI = et.SubElement(vAtt,"DataItem")
-						aDI.set("Dimensions",cDims)
-						aDI.set("NumberType","Float")
-						aDI.set("Precision","4")
-						aDI.set("Format","HDF")
-						aDI.text = "%s:/Step#%d/%s"%(h5F,n,vID)
-					"""
-					for v in range(Nv):
-						kxmf.AddData(Grid,h5F,vIds[v],vLocs[v],vDimStr,n)
-					for rv in range(Nrv):
-						kxmf.AddData(Grid,h5F,rvIds[rv],rvLocs[rv],vDimStr)
-
-		#Write output
-		fOut = "%s/%s.%06d.xmf"%(fdir,outid,tOut)
-		print("Writing %s"%(fOut))
-		#xTree = et.ElementTree(Xdmf)
-		#xTree.write(fOut,pretty_print=True,xml_declaration=True,encoding='UTF-8')
-		xmlStr = xml.dom.minidom.parseString(et.tostring(Xdmf)).toprettyxml(indent="    ")
+	#Variable inventory from a representative rank/step, same for all
+	h5F = os.path.join(fdir,kh5.genName(ftag,0,0,0,gamData.Ri,gamData.Rj,gamData.Rk))
+	gDims = np.array([Nk+1,Nj+1,Ni+1])
+	vIds ,vLocs  = kxmf.getVars(h5F,'Step#'+str(gamData.s0),gDims)
+	rvIds,rvLocs = kxmf.getRootVars(h5F,gDims)
+	if doPrintVars:
+		print("Root Vars:")
+		kxmf.printVidAndLocs(rvIds, rvLocs)
+		print("\nStep Vars:")
+		kxmf.printVidAndLocs(vIds, vLocs)
+
+	ctx = {
+		'fdir': fdir, 'ftag': ftag,
+		'Ri': gamData.Ri, 'Rj': gamData.Rj, 'Rk': gamData.Rk,
+		'iDims': "%d %d %d"%(Nk+1,Nj+1,Ni+1),
+		'vDimStr': "%d %d %d"%(Nk,Nj,Ni),
+		'topoStr': "3DSMesh", 'geoStr': "X_Y_Z",
+		'vIds': vIds, 'vLocs': vLocs, 'rvIds': rvIds, 'rvLocs': rvLocs,
+	}
+
+	#Output files are numbered by position in the strided step list
+	sIds = [n for n in gamData.sids if (n-gamData.s0)%sStride == 0]
+	Ts = [T for n,T in zip(gamData.sids,gamData.T) if (n-gamData.s0)%sStride == 0]
+	fOuts = ["%s/%s.%06d.xmf"%(fdir,outid,tOut) for tOut in range(len(sIds))]
+	stepArgs = list(zip(sIds,Ts,fOuts))
+	if doAppend:
+		stepArgs = [a for a in stepArgs if not os.path.exists(a[-1])]
+		print("Adding %d of %d steps"%(len(stepArgs),len(sIds)))
+
+	xmlStrs = kxmf.genStepStrs(partial(genStepXdmf,ctx),[a[:-1] for a in stepArgs],nWorkers=ncpus)
+
+	#Write output
+	for (n,T,fOut),xmlStr in zip(stepArgs,xmlStrs):
 		with open(fOut,"w") as f:
+			f.write(kxmf.xmlHeader)
 			f.write(xmlStr)
 
-		#Prep for next step
-		tOut = tOut+1
-
 if __name__ == "__main__":
-	main()
\ No newline at end of file
+	main()
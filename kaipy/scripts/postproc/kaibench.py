@@ -0,0 +1,55 @@
+#!/usr/bin/env python
+#Run the kaipy post-processing benchmark suite on synthetic data and write JSON timings
+
+# Standard modules
+import argparse
+from argparse import RawTextHelpFormatter
+import json
+
+# Kaipy modules
+import kaipy.benchmarks.bench as kbench
+
+def create_command_line_parser():
+	"""Create the command-line argument parser.
+	Create the parser for command-line arguments.
+	Returns:
+		argparse.ArgumentParser: Command-line argument parser for this script.
+	"""
+	MainS = """Times kaipy post-processing hot paths (kaiH5.getTs, GameraPipe reads, EggSlice,
+ReMIX dB, embiggen upscaling, supermage interpolation, cached CDAWeb pulls) on synthetic data.
+Runs offline, results (with peak memory) are written as JSON.
+Use --compare to print the speedup of the new results over a previous JSON."""
+
+	parser = argparse.ArgumentParser(description=MainS, formatter_class=RawTextHelpFormatter)
+	parser.add_argument('-o',type=str,metavar="outfile",default="kaibench.json",help="Output JSON file (default: %(default)s)")
+	parser.add_argument('--size',type=str,choices=list(kbench.SIZES.keys()),default="small",help="Problem size (default: %(default)s)")
+	parser.add_argument('--groups',type=str,nargs='+',choices=list(kbench.GROUPS.keys()),default=None,help="Benchmark groups to run (default: all)")
+	parser.add_argument('--nrep',type=int,metavar="nRep",default=3,help="Timed repetitions per case (default: %(default)s)")
+	parser.add_argument('--nwarm',type=int,metavar="nWarm",default=1,help="Untimed warm-up calls per case (default: %(default)s)")
+	parser.add_argument('--ncpus',type=int,metavar="ncpus",default=2,help="Workers for the parallel readers (default: %(default)s)")
+	parser.add_argument('--nomem',action='store_true',default=False,help="Skip the peak memory measurement (default: %(default)s)")
+	parser.add_argument('--dir',type=str,metavar="directory",default=None,help="Keep the synthetic files in this directory (default: temporary)")
+	parser.add_argument('--compare',type=str,metavar="base.json",default=None,help="Baseline JSON to compare against (default: %(default)s)")
+	return parser
+
+def main():
+	parser = create_command_line_parser()
+	#Finished getting arguments, parse and move on
+	args = parser.parse_args()
+
+	res = kbench.runSuite(size=args.size, groups=args.groups, nRep=args.nrep, nWarm=args.nwarm,
+		doMem=not args.nomem, fdir=args.dir, opts={"nWorkers": args.ncpus})
+	kbench.writeResults(args.o, res)
+	print("Wrote %d timings to %s" % (len(res["results"]), args.o))
+
+	if args.compare is not None:
+		with open(args.compare, 'r') as f:
+			res0 = json.load(f)
+		ratios = kbench.compareResults(res0, res)
+		print("Time relative to %s (min):" % (args.compare))
+		for k, r in ratios.items():
+			print("\t%-44s %6.3f" % (k, r))
+	#---------------------
+
+if __name__ == "__main__":
+	main()
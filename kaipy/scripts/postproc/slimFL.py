@@ -11,6 +11,7 @@ import numpy as np
 
 # Kaipy modules
 import kaipy.kaiH5 as kh5
+import kaipy.chimp.fieldlines as fl
 
 #Create new file w/ same root vars/attributes as old
 def createfile(iH5,fOut):
@@ -44,6 +45,7 @@ def create_command_line_parser():
     parser.add_argument('outH5',metavar='Slim.h5',help="Filename of slimmed HDF5 file")
     parser.add_argument( '-pskip',metavar='pskip',default=1,help="Stride over points on field line")
     parser.add_argument('-flskip',metavar='flskip',default=1,help="Stride over field lines")
+    parser.add_argument('-ragged',action='store_true',default=False,help="Write concatenated per-step line arrays instead of one group per line, always on for ragged input (default: %(default)s)")
 
     return parser
 
@@ -62,6 +64,11 @@ def main():
 
     kh5.CheckOrDie(fIn)
 
+    if args.ragged or fl.isRagged(fIn):
+        #Bulk reads/writes per step, see kaipy.chimp.fieldlines
+        fl.toRagged(fIn,fOut,pSk,lSk)
+        return
+
     N,sIDs = kh5.cntSteps(fIn)
     
     nS = sIDs.min()
@@ -4,13 +4,20 @@
 # Standard modules
 import argparse
 import os
+from concurrent.futures import ProcessPoolExecutor, as_completed
 
 # Third-party modules
 import h5py
 import numpy as np
 
+# Kaipy modules
+import kaipy.kaiH5 as kh5
+
 cacheName = "timeAttributeCache"
 
+#Size of the slabs streamed through memory when a dataset has to be rewritten
+slabMB = 64
+
 def genMPIStr(di,dj,dk,i,j,k,n_pad=4):
     inpList = [di, dj, dk, i, j, k]
     sList = ["{:0>{n}d}".format(s, n=n_pad) for s in inpList]
@@ -42,25 +49,157 @@ def cntSteps(fname):
             nSteps = len(sIds)
     return nSteps,sIds
 
-def createfile(iH5,fOut):
+def copyAtts(src,dst):
+    for k in src.attrs.keys():
+        dst.attrs.create(k,src.attrs[k])
+
+def doRewrite(opts):
+    """
+    Whether datasets have to be rewritten (filters/down-conversion), otherwise they are copied as is.
+    """
+    return (opts['comp'] is not None) or opts['shuffle'] or (len(opts['f32']) > 0)
+
+def copyDset(dIn,gOut,name,opts):
+    """
+    Copy a dataset into group gOut, applying the filters/down-conversion in opts.
+
+    Without filters or down-conversion the dataset is copied by HDF5 (H5Ocopy), raw
+    chunks and all. Otherwise it is written chunked, streaming slabs of whole chunks
+    along the first axis so memory use doesn't scale with the dataset size.
+
+    :param dIn: h5py.Dataset, dataset to copy.
+    :param gOut: h5py.Group, destination group.
+    :param name: str, name of the copy.
+    :param opts: dict, copy options (comp, level, shuffle, f32).
+    """
+    dtype = dIn.dtype
+    if (name in opts['f32'] or 'all' in opts['f32']) and dtype == np.float64:
+        dtype = np.dtype(np.float32)
+
+    if dtype == dIn.dtype and opts['comp'] is None and not opts['shuffle']:
+        gOut.copy(dIn,name)
+        return
+    if dIn.shape == () or dIn.size == 0:
+        dOut = gOut.create_dataset(name,data=dIn[()],dtype=dtype)
+        copyAtts(dIn,dOut)
+        return
+
+    doFilt = (opts['comp'] is not None) or opts['shuffle']
+    dOut = gOut.create_dataset(name,shape=dIn.shape,dtype=dtype,
+        chunks=True if doFilt else None,
+        compression=opts['comp'],compression_opts=opts['level'] if opts['comp'] == 'gzip' else None,
+        shuffle=opts['shuffle'])
+    #Slabs of whole output chunks along the first axis
+    nC = dOut.chunks[0] if dOut.chunks is not None else 1
+    rowB = max(1,dIn.nbytes//dIn.shape[0])
+    nRow = max(nC,(slabMB*1024**2//rowB)//nC*nC)
+    for i0 in range(0,dIn.shape[0],nRow):
+        dOut[i0:i0+nRow] = dIn[i0:i0+nRow]
+    copyAtts(dIn,dOut)
+
+def copyGroup(gIn,gOut,opts):
+    """
+    Copy attributes and members of group gIn into the existing group gOut.
+    """
+    copyAtts(gIn,gOut)
+    for Q in gIn.keys():
+        sQ = str(Q)
+        if isinstance(gIn[sQ],h5py.Group):
+            if doRewrite(opts):
+                copyGroup(gIn[sQ],gOut.create_group(sQ),opts)
+            else:
+                gOut.copy(gIn[sQ],sQ)
+        else:
+            copyDset(gIn[sQ],gOut,sQ,opts)
+
+def createfile(iH5,fOut,opts=None):
     print('Creating new output file:',fOut)
+    if opts is None:
+        opts = {'comp': None, 'level': None, 'shuffle': False, 'f32': []}
     oH5 = h5py.File(fOut,'w')
 
     #Start by scraping all variables from root
     #Copy root attributes
-    for k in iH5.attrs.keys():
-        aStr = str(k)
-        oH5.attrs.create(k,iH5.attrs[aStr])
+    copyAtts(iH5,oH5)
     #Copy root groups
     for Q in iH5.keys():
         sQ = str(Q)
         #Don't include stuff that starts with "Step"
         if "Step" not in sQ and cacheName not in sQ:
-            oH5.create_dataset(sQ,data=iH5[sQ])
+            if isinstance(iH5[sQ],h5py.Group):
+                oH5.copy(iH5[sQ],sQ)
+            else:
+                copyDset(iH5[sQ],oH5,sQ,opts)
         if cacheName in sQ:
             oH5.create_group(sQ)
     return oH5
 
+def writeCache(iH5,oH5,steps,p):
+    """
+    Copy the rows of the time attribute cache for the steps written to oH5.
+
+    :param steps: list, step IDs (in iH5) written to oH5, in order.
+    :param p: bool, whether step numbers were preserved.
+    """
+    if cacheName not in iH5.keys():
+        return
+    tac = iH5[cacheName]
+    idx = kh5.tacRows(tac,steps)
+    if idx is None:
+        print("%s of %s doesn't hold all the steps, skipping it"%(cacheName,iH5.filename))
+        return
+    for Q in tac.keys():
+        sQ = str(Q)
+        if(sQ == "step" and not p):
+            oH5[cacheName].create_dataset(sQ, data=np.arange(len(steps)))
+        else:
+            oH5[cacheName].create_dataset(sQ, data=np.asarray(tac[sQ])[idx])
+        copyAtts(tac[sQ],oH5[cacheName][sQ])
+
+def slimFile(fIn,segs,p,opts):
+    """
+    Copy the steps of one input file into one or more output files.
+
+    :param fIn: str, input file.
+    :param segs: list of (fOut,steps), output files and the step IDs each gets.
+    :param p: bool, preserve step numbers instead of relabeling from Step#0.
+    :param opts: dict, copy options, see copyDset.
+    :return: list of str, the files written.
+    """
+    with h5py.File(fIn,'r') as iH5:
+        for fOut,steps in segs:
+            with createfile(iH5,fOut,opts) as oH5:
+                for nOut,n in enumerate(steps):
+                    if(p): nOut = n
+                    gIn = "Step#%d"%(n)
+                    gOut = "Step#%d"%(nOut)
+                    print("Copying %s to %s (%s)"%(gIn,gOut,fOut))
+                    if doRewrite(opts):
+                        copyGroup(iH5[gIn],oH5.create_group(gOut),opts)
+                    else:
+                        #Let HDF5 copy the whole step
+                        oH5.copy(iH5[gIn],gOut)
+                writeCache(iH5,oH5,steps,p)
+    return [fOut for fOut,steps in segs]
+
+def segSteps(steps,Nsf):
+    """
+    Split the steps to write into output files, a new file starts after every step divisible by Nsf.
+
+    :return: list of (first step of the file, steps in the file).
+    """
+    segs = []
+    cur = []
+    for n in steps:
+        cur.append(n)
+        if(n%Nsf==0 and n != 0):
+            segs.append(cur)
+            cur = []
+    if len(cur) > 0:
+        segs.append(cur)
+    #Files after the first are labeled by the step that closed the previous one
+    starts = [None] + [s[-1] for s in segs[:-1]]
+    return list(zip(starts,segs))
 
 def create_command_line_parser():
     """Create the command-line argument parser.
@@ -82,15 +221,15 @@ def create_command_line_parser():
     parser.add_argument('-sk',type=int,metavar="nsk",default=1,help="Stride (default: %(default)s)")
     parser.add_argument('-sf',type=int,metavar="nsf",default=250,help="File write stride (default: %(default)s)")
     parser.add_argument('-mpi',type=str,metavar="ijk",default="", help="Comma-separated mpi dimensions (example: '4,4,1', default: noMPI)")
-    parser.add_argument('--p',action='store_true', help="Preserve Step # instead of labeling at Step#0") 
-    
-    return parser    
-def main():
-    #Set defaults
-    ns = -1
-    ne = -1 #Proxy for last entry
+    parser.add_argument('--p',action='store_true', help="Preserve Step # instead of labeling at Step#0")
+    parser.add_argument('--comp',type=str,choices=['gzip','lzf'],default=None,help="Compress the output datasets (default: none)")
+    parser.add_argument('--level',type=int,metavar="level",default=4,help="gzip compression level (default: %(default)s)")
+    parser.add_argument('--shuffle',action='store_true',help="Apply the shuffle filter (helps compression)")
+    parser.add_argument('--f32',type=str,metavar="vars",default="",help="Comma-separated variables to store as float32, or 'all' (default: none)")
+    parser.add_argument('--ncpus',type=int,metavar="ncpus",default=1,help="Number of input (rank) files processed at once (default: %(default)s)")
 
-    doMPI = False
+    return parser
+def main():
     parser = create_command_line_parser()
     #Finalize parsing
     args = parser.parse_args()
@@ -103,6 +242,13 @@ def main():
     outTag = args.outH5
     p = args.p
     mpiIn = args.mpi
+    ncpus = args.ncpus
+    opts = {
+        'comp': args.comp,
+        'level': args.level,
+        'shuffle': args.shuffle,
+        'f32': [v for v in args.f32.split(',') if v != ""],
+    }
 
     N,sIds = cntSteps(fIn)
     N0 = np.sort(sIds)[0]
@@ -113,9 +259,13 @@ def main():
     if Nsf == -1:
         Nsf = Ne
 
+    #Steps to write, split into output files
+    sIdSet = set(sIds.tolist())
+    steps = [n for n in range(Ns,Ne,Nsk) if n in sIdSet]
+    segs = segSteps(steps,Nsf)
+
     #Designed for 3-dim gamera mpi decomp
     if mpiIn != "":
-        doMPI = True
         spl = [int(x) for x in mpiIn.split(',')]
         if len(spl) != 3:
             print("Need 3 dimensions for MPI decomp, try again")
@@ -124,7 +274,7 @@ def main():
         runTag = fIn.split('_')[0]
         endTag = '.'.join(fIn.split('.')[1:]) #Exclude anything before the first '.'
         inFiles = []
-        outFiles = []
+        mpiStrs = []
         for i in range(mi):
             for j in range(mj):
                 for k in range(mk):
@@ -132,73 +282,26 @@ def main():
                     fName = runTag+"_"+mpiStr+'.'+endTag
                     if os.path.exists(fName):
                         inFiles.append(fName)
-                        outFiles.append("{}-{}_{}_{}.{}".format(Ns,Nsf,runTag,mpiStr,outTag))
+                        mpiStrs.append(mpiStr)
+        fileSegs = []
+        for mpiStr in mpiStrs:
+            fileSegs.append([("{}-{}_{}_{}.{}".format(Ns,Nsf,runTag,mpiStr,outTag) if n0 is None else
+                              "{}-{}_{}_{}.{}".format(n0,Nsf+n0,runTag,mpiStr,outTag),stp) for n0,stp in segs])
     else:
         inFiles = [fIn]
-        outFiles = [str(Ns)+'-'+str(Nsf)+outTag]
-
-    for i in range(len(inFiles)):
-        fOut = str(Ns)+'-'+str(Nsf)+outTag
-
-        #Open both files, get to work
-        iH5 = h5py.File(inFiles[i],'r')
-        oH5=createfile(iH5,outFiles[i])
-
-        #Now loop through steps and do same thing
-        nOut = 0
-        for n in range(Ns,Ne,Nsk):
-            if(p):nOut = n
-            gIn = "Step#%d"%(n)
-            gOut = "Step#%d"%(nOut)
-            if(not p): nOut = nOut+1 # use the same group numbers as originally in file - frt
-
-            print("Copying %s to %s"%(gIn,gOut))
-
-            oH5.create_group(gOut)
-            #Root atts
-            for k in iH5[gIn].attrs.keys():
-                aStr = str(k)
-                oH5[gOut].attrs.create(k,iH5[gIn].attrs[aStr])
-            #Root vars
-            for Q in iH5[gIn].keys():
-                sQ = str(Q)
-                #print("\tCopying %s"%(sQ))
-                oH5[gOut].create_dataset(sQ,data=iH5[gIn][sQ])
-                for k in iH5[gIn][sQ].attrs.keys():
-                    aStr = str(k)
-                    oH5[gOut][sQ].attrs.create(k,iH5[gIn][sQ].attrs[aStr])
-        
-        #If cache present
-        #Add the cache after steps, select the same steps for the cache that are contained in the
-        #Ns:Ne:Nsk start,end,stride
-        if cacheName in iH5.keys():
-            for Q in iH5[cacheName].keys():
-                sQ = str(Q)
-               
-                if(sQ == "step"):
-                    if(p): 
-                        oH5[cacheName].create_dataset(sQ, data=iH5[cacheName][sQ][Ns-N0:Ne-N0:Nsk])
-                    else:                 
-                        cacheSteps = range(len(range(Ns,Ne,Nsk)))
-                        oH5[cacheName].create_dataset(sQ, data=cacheSteps)
-                else:
-                    oH5[cacheName].create_dataset(sQ, data=iH5[cacheName][sQ][Ns-N0:Ne-N0:Nsk])
-                for k in iH5[cacheName][sQ].attrs.keys():
-                    aStr = str(k)
-                    oH5[cacheName][sQ].attrs.create(k,iH5[cacheName][sQ].attrs[aStr])
-
-        # make a new file every Nsf steps
-            if(n%Nsf==0 and n != 0):
-                oH5.close()
-                if not doMPI:
-                    fOut = str(n)+'-'+str(Nsf+n)+args.outH5
-                else:
-                    fOut = "{}-{}_{}_{}.{}".format(n,Nsf+n,runTag,mpiStr,outTag)
-                oH5=createfile(iH5,fOut)
-
-        #Close up
-        iH5.close()
-        oH5.close()
+        fileSegs = [[(str(Ns)+'-'+str(Nsf)+outTag if n0 is None else
+                      str(n0)+'-'+str(Nsf+n0)+outTag,stp) for n0,stp in segs]]
+
+    #Rank files are independent, run them side by side
+    if ncpus <= 1 or len(inFiles) <= 1:
+        for fIn,fSegs in zip(inFiles,fileSegs):
+            slimFile(fIn,fSegs,p,opts)
+    else:
+        with ProcessPoolExecutor(max_workers=ncpus) as executor:
+            futures = [executor.submit(slimFile,fIn,fSegs,p,opts) for fIn,fSegs in zip(inFiles,fileSegs)]
+            for future in as_completed(futures):
+                for fOut in future.result():
+                    print("Finished %s"%(fOut))
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    main()
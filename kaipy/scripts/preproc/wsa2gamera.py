@@ -3,7 +3,8 @@
 """Convert data from a WSA model run to gamhelio format.
 
 This script converts a FITS file created by a WSA run to a HDF5 format
-suitable for use by gamhelio.
+suitable for use by gamhelio. A sequence of FITS maps can be converted in
+one go, giving a time-dependent innerbc file with one step per map.
 
 Authors
 -------
@@ -15,18 +16,20 @@ Eric Winter
 
 # Standard modules
 import argparse
+from concurrent.futures import ProcessPoolExecutor
+from functools import partial
+import glob
 import os
 
 # Third-party modules
 from astropy.convolution import convolve, Gaussian2DKernel
-import h5py
+from astropy.io import fits
 import numpy as np
-from scipy import interpolate
 
 # Kaipy modules
 from kaipy.gamera import gamGrids as gg
 from kaipy.gamhelio.wsa2gamera import params as ini_params
-from kaipy.gamhelio.lib import wsa
+from kaipy.gamhelio.lib import innerbc, wsa
 from kaipy.kdefs import JD2MJD, Mp_cgs, kbltz, Tsolar, Day2s, Rsolar, vc_cgs
 
 
@@ -65,6 +68,15 @@ def create_command_line_parser():
         "--verbose", "-v", action="store_true",
         help="Print verbose output (default: %(default)s)."
     )
+    parser.add_argument(
+        "--maps", nargs="+", default=None,
+        help="WSA FITS files or glob patterns to convert, one innerbc step "
+             "per map (default: wsafile from the configuration file)."
+    )
+    parser.add_argument(
+        "--ncpus", type=int, default=1,
+        help="Number of maps to convert in parallel (default: %(default)s)."
+    )
     parser.add_argument(
         "ConfigFileName", default="startup.config",
         help="Name of the configuration file to use (default: %(default)s).")
@@ -93,63 +105,68 @@ def read_config_file(path: str):
     # prm = ini_params.params(args["ConfigFileName"])
 
 
-def wsa2gamera(args):
-    """Convert WSA FITS output files to gamhelio format.
+def expand_map_list(patterns):
+    """Expand a list of WSA FITS paths and glob patterns.
 
-    Convert WSA FITS output files to gamhelio format.
+    Expand a list of WSA FITS paths and glob patterns, and sort the maps
+    by the Julian date at the center of each map.
 
     Parameters
     ----------
-    args : dict
-        Dictionary of command-line and other options.
+    patterns : list of str
+        Paths and/or glob patterns of WSA FITS files
 
     Returns
     -------
-    None
+    maps : list of str
+        Paths to the WSA FITS files, in time order
 
     Raises
     ------
-    None
+    FileNotFoundError
+        If no file matches the patterns
     """
-    # Local convenience variables.
-    # debug = args["debug"]
-    # verbose = args["verbose"]
+    maps = []
+    for pattern in patterns:
+        found = sorted(glob.glob(pattern))
+        maps.extend(found if found else [pattern])
+    maps = [m for m in dict.fromkeys(maps) if os.path.exists(m)]
+    if len(maps) == 0:
+        raise FileNotFoundError(f"No WSA FITS files match {patterns}")
+    return sorted(maps, key=lambda m: fits.getval(m, "JULDATE"))
 
-    # ------------------------------------------------------------------------
 
-    # Read the configuration file.
-    prm = ini_params.params(args["ConfigFileName"])
+def setup_boundary(prm, ffits):
+    """Build the gamhelio grid and the WSA -> gamhelio interpolation weights.
 
-    # Fetch individual parameters.
-    Ng = prm.Nghost
-    # gamma = prm.gamma
-    # Temperature in the current sheet for pressure balance calculation
-    TCS = prm.TCS
-    # Density in the current sheet for pressure balance calculation
-    nCS = prm.nCS
-
-    # Grid parameters
-    tMin = prm.tMin
-    tMax = prm.tMax
-    Rin = prm.Rin
-    Rout = prm.Rout
-    Ni = prm.Ni
-    Nj = prm.Nj
-    Nk = prm.Nk
+    The grid and the weights only depend on the configuration and the size
+    of the WSA maps, so they are computed once and reused for every map.
 
-    # Conversions from wsa to gamera units.
-    cms2kms = 1.e-5  # cm/s => km/s
-    Gs2nT = 1.e5     # Gs => nT
-    # Conversion for E field  1 statV/cm = 3.e7 mV/m
-    eScl = 3.e7
+    Parameters
+    ----------
+    prm : params.params
+        params object containing the configuration content
+    ffits : str
+        Path to a representative WSA FITS file
+
+    Returns
+    -------
+    bcG : innerbc.HelioBCGrid
+        Inner boundary geometry of the gamhelio grid
+    bcW : dict
+        Interpolation weights and geometric factors shared by all maps
 
-    # Fetch the name of the WSA FITS file.
-    ffits = prm.wsaFile
+    Raises
+    ------
+    None
+    """
+    Ng = prm.Nghost
 
     # Generate spherical helio grid
-    print(f"Generating gamera-helio grid Ni = {Ni}, Nj  = {Nj}, Nk = {Nk}")
+    print(f"Generating gamera-helio grid Ni = {prm.Ni}, Nj  = {prm.Nj}, Nk = {prm.Nk}")
     X3, Y3, Z3 = gg.GenKSph(
-        Ni=Ni, Nj=Nj, Nk=Nk, Rin=Rin, Rout=Rout, tMin=tMin, tMax=tMax
+        Ni=prm.Ni, Nj=prm.Nj, Nk=prm.Nk, Rin=prm.Rin, Rout=prm.Rout,
+        tMin=prm.tMin, tMax=prm.tMax
     )
     gg.WriteGrid(
         X3, Y3, Z3, fOut=os.path.join(prm.GridDir, prm.gameraGridFile)
@@ -157,84 +174,108 @@ def wsa2gamera(args):
     if os.path.exists(prm.gameraGridFile):
         print("Grid file heliogrid.h5 is ready!")
 
+    # Geometry of the inner ghost region, note order of indexes [k,j,i].
+    bcG = innerbc.HelioBCGrid(X3, Y3, Z3, Ng)
+
+    # Cell centers of the WSA map.
+    (_, _, _, phi_wsa_c, theta_wsa_c, _, _, _, _) = wsa.read(
+        ffits, prm.densTempInfile, prm.normalized, verbose=False
+    )
+
+    # Theta at centers of k-faces (== theta at kedges)
+    T = bcG.T
+    Tcf = 0.25*(T[:, :-1, :-1] + T[:, 1:, 1:] + T[:, :-1, 1:] +
+                T[:, 1:, : -1])
+
+    bcW = {
+        # Same result as RectBivariateSpline(kx=1, ky=1), which is fast and
+        # better than griddata in that it nicely extrapolates boundaries.
+        "wsaMap": innerbc.BilinearMap(
+            phi_wsa_c, theta_wsa_c, bcG.pC, bcG.tC
+        ),
+        # Note this has to extrapolate.
+        "kfMap": innerbc.BilinearMap(
+            bcG.pC, bcG.tC, bcG.pK[:-1], bcG.tC
+        ),  # (Nk,Nj)
+        "mapShape": (len(theta_wsa_c), len(phi_wsa_c)),
+        "gScl": bcG.ghostScale(),
+        "sinTcf": np.sin(Tcf[:-1, :, Ng-1]),
+        "R0": bcG.R0,
+    }
+    return bcG, bcW
+
+
+def convert_map(ffits, bcW, densTempInfile, normalized, gaussSmoothWidth,
+                TCS, nCS):
+    """Convert a single WSA FITS map to gamhelio inner boundary variables.
+
+    Parameters
+    ----------
+    ffits : str
+        Path to the WSA FITS file
+    bcW : dict
+        Interpolation weights and geometric factors from setup_boundary
+    densTempInfile : bool
+        True if density and temperature are in the WSA file
+    normalized : bool
+        True if the WSA map is normalized
+    gaussSmoothWidth : int
+        Width of the Gaussian kernel used to smooth br (0 = off)
+    TCS : float
+        Temperature in the current sheet for pressure balance calculation
+    nCS : float
+        Density in the current sheet for pressure balance calculation
+
+    Returns
+    -------
+    mjd_c : float
+        Modified Julian date at the center of the WSA map
+    bcVars : dict
+        innerbc variables for this map
+
+    Raises
+    ------
+    ValueError
+        If the map size differs from the one used to build the weights
+    """
+    # Conversions from wsa to gamera units.
+    cms2kms = 1.e-5  # cm/s => km/s
+    Gs2nT = 1.e5     # Gs => nT
+    # Conversion for E field  1 statV/cm = 3.e7 mV/m
+    eScl = 3.e7
+
     # Read the WSA FITS file.
     (jd_c, phi_wsa_v, theta_wsa_v, phi_wsa_c, theta_wsa_c, bi_wsa, v_wsa,
-     n_wsa, T_wsa) = wsa.read(ffits, prm.densTempInfile, prm.normalized)
+     n_wsa, T_wsa) = wsa.read(ffits, densTempInfile, normalized, verbose=False)
     # Units of WSA input
     # bi_wsa in [Gs]
     # v_wsa in [cm/s]
     # n_wsa in [g cm-3]
     # T_wsa in [K]
+    if bi_wsa.shape != bcW["mapShape"]:
+        raise ValueError(
+            f"{ffits} is {bi_wsa.shape}, expected {bcW['mapShape']}"
+        )
 
     # Convert the Julian day in the center of the WSA map into modified
     # Julian day.
     mjd_c = jd_c - JD2MJD
 
-    # Get the GAMERA grid for further interpolation.
-    with h5py.File(os.path.join(prm.GridDir, prm.gameraGridFile), "r") as f:
-        x = f["X"][:]
-        y = f["Y"][:]
-        z = f["Z"][:]
-
-    # Compute the cell centers, note order of indexes [k,j,i].
-    xc = 0.125*(x[:-1, :-1, :-1] + x[:-1, 1:, :-1] + x[:-1, :-1, 1:] +
-                x[:-1, 1:, 1:] + x[1:, :-1, :-1] + x[1:, 1:, :-1] +
-                x[1:, :-1, 1:] + x[1:, 1:, 1:])
-    yc = 0.125*(y[:-1, :-1, :-1] + y[:-1, 1:, :-1] + y[:-1, :-1, 1:] +
-                y[:-1, 1:, 1:] + y[1:, :-1, :-1] + y[1:, 1:, :-1] +
-                y[1:, :-1, 1:] + y[1:, 1:, 1:])
-    zc = 0.125*(z[:-1, :-1, :-1] + z[:-1, 1:, :-1] + z[:-1, :-1, 1:] +
-                z[:-1, 1:, 1:] + z[1:, :-1, :-1] + z[1:, 1:, :-1] +
-                z[1:, :-1, 1:] + z[1:, 1:, 1:])
-
-    # Compute the radius of the inner boundary.
-    R0 = np.sqrt(x[0, 0, Ng]**2 + y[0, 0, Ng]**2 + z[0, 0, Ng]**2)
-
-    # Compute the heliocentric radius at each grid vertex.
-    r = np.sqrt(x**2 + y**2 + z**2)
-
-    # Calculate phi and theta in physical domain (excluding ghost cells).
-    P = np.arctan2(y[Ng:-Ng, Ng:-Ng, :], x[Ng:-Ng, Ng:-Ng, :])
-    P[P < 0] = P[P < 0] + 2*np.pi
-    # sometimes the very first point may be a very small negative number,
-    # which the above call sets to 2*pi. This takes care of it.
-    # P = P % (2*np.pi)
-    T = np.arccos(z[Ng:-Ng, Ng:-Ng, :]/r[Ng:-Ng, Ng:-Ng, :])
-
-    # Compute the grid for inner i-ghost region; output to innerbc.h5.
-    P_out = P[:, :, 0:Ng + 1]
-    T_out = T[:, :, 0:Ng + 1]
-    R_out = r[Ng:-Ng, Ng:-Ng, 0:Ng + 1]
-
-    # Calculate r, phi and theta coordinates of cell centers in physical
-    # domain (excluding ghost cells)
-    Rc = np.sqrt(xc[Ng:-Ng, Ng:-Ng, :]**2 + yc[Ng:-Ng, Ng:-Ng, :]**2 +
-                 zc[Ng:-Ng, Ng:-Ng, :]**2)
-    Pc = np.arctan2(yc[Ng:-Ng, Ng:-Ng, :], xc[Ng:-Ng, Ng:-Ng, :])
-    Pc[Pc < 0] = Pc[Pc < 0] + 2*np.pi
-    Tc = np.arccos(zc[Ng:-Ng, Ng:-Ng, :]/Rc)
-
-    # This is fast and better than griddata in that it nicely extrapolates
-    # boundaries:
-    fbi = interpolate.RectBivariateSpline(
-        phi_wsa_c, theta_wsa_c, bi_wsa.T, kx=1, ky=1
-    )
-    br = fbi(Pc[:, 0, 0], Tc[0, :, 0])
+    wsaMap = bcW["wsaMap"]
+    kfMap = bcW["kfMap"]
+    gScl = bcW["gScl"]
+    Ng = len(gScl)
+
+    br = wsaMap(bi_wsa.T)
 
     # Smoothing
-    if prm.gaussSmoothWidth != 0:
-        gauss = Gaussian2DKernel(width=prm.gaussSmoothWidth)
+    if gaussSmoothWidth != 0:
+        gauss = Gaussian2DKernel(gaussSmoothWidth)
         br = convolve(br, gauss, boundary="extend")
 
     # Interpolate to Gamera grid
-    fv = interpolate.RectBivariateSpline(
-        phi_wsa_c, theta_wsa_c, v_wsa.T, kx=1, ky=1
-    )
-    vr = fv(Pc[:, 0, 0], Tc[0, :, 0])
-
-    f = interpolate.RectBivariateSpline(
-        phi_wsa_c, theta_wsa_c, n_wsa.T, kx=1, ky=1)
-    rho = f(Pc[:, 0, 0], Tc[0, :, 0])
+    vr = wsaMap(v_wsa.T)
+    rho = wsaMap(n_wsa.T)
 
     # Not interpolating temperature, but calculating from the total pressure
     # balance AFTER interpolating br and rho to the gamera grid
@@ -242,24 +283,11 @@ def wsa2gamera(args):
     temp = (nCS*kbltz*TCS - br**2/8./np.pi)*Mp_cgs/rho/kbltz
     # temperature in [K]
 
-    # check
-    # print ("Max and min of temperature in MK")
-    # print (np.amax(temp)*1.e-6, np.amin(temp)*1.e-6)
-
-    # note, redefining interpolation functions we could also
-    # interpolate from bi_wsa as above, but then we would have to
-    # smooth bk, if necessary. The way we're doing it here, bk will be
-    # smoothed or not, dependent on whether br has been smoothed.
-    # note also, this has to extrapolate
-    fbi = interpolate.RectBivariateSpline(
-        Pc[:, 0, 0], Tc[0, :, 0], br, kx=1, ky=1
-    )
-    fv = interpolate.RectBivariateSpline(
-        Pc[:, 0, 0], Tc[0, :, 0], vr, kx=1, ky=1
-    )
-
-    br_kface = fbi(P[:-1, 0, 0], Tc[0, :, 0])  # (Nk,Nj)
-    vr_kface = fv(P[:-1, 0, 0], Tc[0, :, 0])   # (Nk,Nj)
+    # note, interpolating from the gamera cell centers rather than from
+    # bi_wsa, so bk will be smoothed or not, dependent on whether br has
+    # been smoothed.
+    br_kface = kfMap(br)  # (Nk,Nj)
+    vr_kface = kfMap(vr)  # (Nk,Nj)
 
     # before applying scaling inside ghost region
     # get br values to the left of an edge for E_theta calculation
@@ -269,19 +297,15 @@ def wsa2gamera(args):
     (vr, vr_kface, rho, temp, br, br_kface) = [
         np.dstack(Ng*[var]) for var in (vr, vr_kface, rho, temp, br, br_kface)
     ]
-    rho *= (R0/Rc[0, 0, :Ng])**2
-    br *= (R0/Rc[0, 0, :Ng])**2
-    br_kface *= (R0/Rc[0, 0, :Ng])**2
+    rho *= gScl
+    br *= gScl
+    br_kface *= gScl
 
     # Calculating E-field component on k_edges in [mV/m]
     # E_theta = B_phi*Vr/c = - Omega*R*sin(theta)/Vr*Br * Vr/c =
     # - Omega*R*sin(theta)*Br/c
     omega = 2*np.pi/(Tsolar*Day2s)  # [1/s]
-    # Theta at centers of k-faces (== theta at kedges)
-    Tcf = 0.25*(T[:, :-1, :-1] + T[:, 1:, 1:] + T[:, :-1, 1:] +
-                T[:, 1:, : -1])
-    et_kedge = -omega*R0*Rsolar*np.sin(
-        Tcf[:-1, :, Ng-1])*br_kedge/vc_cgs  # [statV/cm]
+    et_kedge = -omega*bcW["R0"]*Rsolar*bcW["sinTcf"]*br_kedge/vc_cgs  # [statV/cm]
 
     # Unit conversion agreement. Input to GAMERA innerbc.h5 has units V[km/s],
     # Rho[cm-3], T[K], B[nT], E[mV/m]
@@ -292,28 +316,79 @@ def wsa2gamera(args):
     br_kface *= Gs2nT
     et_kedge *= eScl
 
-    # Create the output HDF5 file.
-    with h5py.File(os.path.join(prm.IbcDir, prm.gameraIbcFile), "w") as hf:
-        hf.create_dataset("X", data=P_out)
-        hf.create_dataset("Y", data=T_out)
-        hf.create_dataset("Z", data=R_out)
-        grname = "Step#0"
-        grp = hf.create_group(grname)
-        grp.attrs.create("MJD", mjd_c)
-        grp.create_dataset("vr", data=vr)
-        grp.create_dataset("vr_kface", data=vr_kface)  # size (Nk,Nj,Ng)
-        grp.create_dataset("rho", data=rho)
-        grp.create_dataset("temp", data=temp)
-        grp.create_dataset("br", data=br)
-        grp.create_dataset("br_kface", data=br_kface)  # size (Nk,Nj,Ng)
-        grp.create_dataset("et_kedge", data=et_kedge)  # size (Nk, Nj)
-    hf.close()
+    bcVars = {
+        "vr": vr,
+        "vr_kface": vr_kface,  # size (Nk,Nj,Ng)
+        "rho": rho,
+        "temp": temp,
+        "br": br,
+        "br_kface": br_kface,  # size (Nk,Nj,Ng)
+        "et_kedge": et_kedge,  # size (Nk, Nj)
+    }
+    return mjd_c, bcVars
+
+
+def wsa2gamera(args):
+    """Convert WSA FITS output files to gamhelio format.
+
+    Convert one or more WSA FITS maps to a gamhelio innerbc file, with one
+    Step#N group per map in time order. The grid and the interpolation
+    weights are computed once and the maps are converted in parallel.
+
+    Parameters
+    ----------
+    args : dict
+        Dictionary of command-line and other options.
+
+    Returns
+    -------
+    None
+
+    Raises
+    ------
+    None
+    """
+    # Local convenience variables.
+    # debug = args["debug"]
+    verbose = args.get("verbose", False)
+    ncpus = args.get("ncpus", 1)
+
+    # ------------------------------------------------------------------------
+
+    # Read the configuration file.
+    prm = ini_params.params(args["ConfigFileName"])
+
+    # Fetch the names of the WSA FITS files, either from the command line
+    # or the configuration file (which may be a glob pattern).
+    maps = args.get("maps") or [prm.wsaFile]
+    maps = expand_map_list(maps)
+    if verbose:
+        wsa.info(maps[0])
+    print(f"Converting {len(maps)} WSA map(s)")
+
+    # Grid and interpolation weights shared by all maps.
+    bcG, bcW = setup_boundary(prm, maps[0])
+
+    doMap = partial(
+        convert_map, bcW=bcW, densTempInfile=prm.densTempInfile,
+        normalized=prm.normalized, gaussSmoothWidth=prm.gaussSmoothWidth,
+        TCS=prm.TCS, nCS=prm.nCS
+    )
+
+    # Create the output HDF5 file, one step per map, stamped with the MJD
+    # convert_map read from each map.
+    fOut = os.path.join(prm.IbcDir, prm.gameraIbcFile)
+    if ncpus > 1 and len(maps) > 1:
+        with ProcessPoolExecutor(max_workers=ncpus) as executor:
+            innerbc.WriteInnerBC(fOut, bcG, None, executor.map(doMap, maps))
+    else:
+        innerbc.WriteInnerBC(fOut, bcG, None, map(doMap, maps))
 
 
 def main():
     """Driver for command-line version of code."""
     # Set up the command-line parser.
-    parser = create_command_line_parser(DESCRIPTION)
+    parser = create_command_line_parser()
 
     # Parse the command-line arguments.
     args = parser.parse_args()
@@ -81,7 +81,9 @@ def makeImage(i,gsph1,gsph2,tOut,doVerb,xyBds,fnList,oDir,errTimes,errListRel,er
 	AxTL.set_title("Equatorial Slice of Relative Error")
 	
 	#plot upper right k-axis error
-	mviz.PlotLogicalErrRel(gsph1,gsph2,nStp,AxTR,fnList,2,doVerb=doVerb)
+	#One pass over both runs for the K-axis map and the total errors
+	errStats = mviz.CalcErrStats(gsph1,gsph2,nStp,fnList,meanAxis=2)
+	mviz.PlotLogicalErrRel(gsph1,gsph2,nStp,AxTR,fnList,2,doVerb=doVerb,errStats=errStats)
 	AxTR.set_title("Per-Cell Relative Error along K-Axis")
 	if (not noMPI):
 		#plot I-MPI decomp on logical plot
@@ -97,8 +99,8 @@ def makeImage(i,gsph1,gsph2,tOut,doVerb,xyBds,fnList,oDir,errTimes,errListRel,er
 	
 	#plot bottom line plot
 	etval = tOut[i]/60.0
-	erval = mviz.CalcTotalErrRel(gsph1,gsph2,nStp,fnList,doVerb=doVerb)
-	eaval = mviz.CalcTotalErrAbs(gsph1,gsph2,nStp,fnList,doVerb=doVerb)
+	erval = errStats["relL1"]
+	eaval = errStats["absL1"]
 	
 	# this section is the code must be performed sequentially to add data to the line plots one-by-one
 	with cv:
@@ -6,6 +6,7 @@ import argparse
 from argparse import RawTextHelpFormatter
 import os
 import errno
+import itertools
 
 # Third-party modules
 import matplotlib as mpl
@@ -171,10 +172,17 @@ def main():
 	cbM = kv.genCB(AxC2,kv.genNorm(remix.facMax),"FAC",cM=remix.facCM,Ntk=4)
 	AxC2.xaxis.set_ticks_position('top')
 
+	#Convert times (in seconds) of the sub-range to Step #
+	sIds = [np.abs(gsph.T-tOut[i]).argmin()+gsph.s0 for i in range(i0,i1)]
+	doInset = doRCM and (not args.norcm)
+	if (doInset):
+		#Read the next RCM step while this one is plotted
+		rcmSnaps = rcmpp.PrefetchSnapshots(rcmdata,sIds)
+	else:
+		rcmSnaps = itertools.repeat(None)
+
 	#Loop over sub-range
-	for i in range(i0,i1):
-		#Convert time (in seconds) to Step #
-		nStp = np.abs(gsph.T-tOut[i]).argmin()+gsph.s0
+	for i,nStp,rcmSnap in zip(range(i0,i1),sIds,rcmSnaps):
 		print("Minute = %5.2f / Step = %d"%(tOut[i]/60.0,nStp))
 		npl = vO[i]
 
@@ -193,9 +201,9 @@ def main():
 
 			
 		#Add inset RCM plot
-		if (doRCM and (not args.norcm)):
+		if (doInset):
 			AxRCM = inset_axes(AxL,width="30%",height="30%",loc=3)
-			rcmpp.RCMInset(AxRCM,rcmdata,nStp,mviz.vP)
+			rcmpp.RCMInset(AxRCM,rcmSnap,nStp,mviz.vP)
 			AxRCM.contour(kv.reWrap(gsph.xxc),kv.reWrap(gsph.yyc),kv.reWrap(Bz),[0.0],colors=mviz.bz0Col,linewidths=mviz.cLW)
 			rcmpp.AddRCMBox(AxL)
 
@@ -142,6 +142,25 @@ def create_command_line_parser():
     )
     return parser
 
+def snapVars(args):
+    """Variables of a step read by makePlot, for prefetching.
+
+    Parameters
+    ----------
+    args : argparse.Namespace
+        Command-line arguments.
+
+    Returns
+    -------
+    vIDs : list of str
+        Names of the RCM variables.
+    """
+    vIDs = ["xMin", "yMin", "zMin", "IOpen", "P", "N", "Pmhd", "Nmhd", "S", "toMHD", "pot", "colat"]
+    optVars = [(args.elec, "Pe"), (args.wgt, "wIMAG"), (args.vol, "bVol"), (args.beta, "beta"),
+               (args.tbnc, "Tb"), (args.bmin, "bMin"), (args.fac, "birk")]
+    return vIDs + [vID for doV, vID in optVars if doV]
+
+
 def makePlot(i,rcmdata,nStp, args, varDict, fig):
     doBeta = args.beta
     doBig = args.big
@@ -262,13 +281,20 @@ def makePlot(i,rcmdata,nStp, args, varDict, fig):
     AxM.clear()
     AxR.clear()
 
+    # This is not working yet. A blank bar still shows up
+    doVerb = debug
+    doVerb = True
+
     # Fetch the coordinates to plot.
+    # Every variable of the step is read once and the mask computed once,
+    # rcmdata can already be a (prefetched) snapshot of the step.
+    rcmSnap = rcmpp.GetSnapshot(rcmdata, nStp, doVerb=doVerb)
     try:
-        bmX, bmY = rcmpp.RCMEq(rcmdata, nStp, doMask=True)
+        bmX, bmY = rcmpp.RCMEq(rcmSnap, nStp, doMask=True)
     except:
         print(f"Step #{nStp} does not exist!")
         sys.exit(1)
-    I = rcmpp.GetMask(rcmdata, nStp)
+    I = rcmSnap.GetMask()
     Ni = (~I).sum()
     if debug:
         print("bmX = %s" % bmX)
@@ -281,42 +307,38 @@ def makePlot(i,rcmdata,nStp, args, varDict, fig):
         print("No closed field region in RCM, exiting ...")
         exit()
 
-    # This is not working yet. A blank bar still shows up
-    doVerb = debug
-    doVerb = True
-
     # Fetch the data to plot.
     if doElec:
-        Prcm = rcmpp.GetVarMask(rcmdata, nStp, "Pe", I, doVerb=doVerb)
+        Prcm = rcmpp.GetVarMask(rcmSnap, nStp, "Pe", I, doVerb=doVerb)
     else:
-        Prcm = rcmpp.GetVarMask(rcmdata, nStp, "P", I, doVerb=doVerb)
-    Nrcm = rcmpp.GetVarMask(rcmdata, nStp, "N", I, doVerb=doVerb)
-    Pmhd = rcmpp.GetVarMask(rcmdata, nStp, "Pmhd", I, doVerb=doVerb)
-    Nmhd = rcmpp.GetVarMask(rcmdata, nStp, "Nmhd", I, doVerb=doVerb)
-    S = rcmpp.GetVarMask(rcmdata,nStp, "S", I, doVerb=doVerb)
-    toMHD = rcmpp.GetVarMask(rcmdata, nStp, "toMHD", I, doVerb=doVerb)
-    pot, pVals = rcmpp.GetPotential(rcmdata, nStp, I, doVerb=doVerb)
+        Prcm = rcmpp.GetVarMask(rcmSnap, nStp, "P", I, doVerb=doVerb)
+    Nrcm = rcmpp.GetVarMask(rcmSnap, nStp, "N", I, doVerb=doVerb)
+    Pmhd = rcmpp.GetVarMask(rcmSnap, nStp, "Pmhd", I, doVerb=doVerb)
+    Nmhd = rcmpp.GetVarMask(rcmSnap, nStp, "Nmhd", I, doVerb=doVerb)
+    S = rcmpp.GetVarMask(rcmSnap, nStp, "S", I, doVerb=doVerb)
+    toMHD = rcmpp.GetVarMask(rcmSnap, nStp, "toMHD", I, doVerb=doVerb)
+    pot, pVals = rcmpp.GetPotential(rcmSnap, nStp, I, doVerb=doVerb)
     wRCM = None
     if doWgt:
-        wRCM = rcmpp.GetVarMask(rcmdata, nStp, "wIMAG", I, doVerb=doVerb)
+        wRCM = rcmpp.GetVarMask(rcmSnap, nStp, "wIMAG", I, doVerb=doVerb)
     bVol = None
     if doVol:
-        bVol = rcmpp.GetVarMask(rcmdata, nStp, "bVol", I, doVerb=doVerb)
+        bVol = rcmpp.GetVarMask(rcmSnap, nStp, "bVol", I, doVerb=doVerb)
     beta = None
     if doBeta:
-        beta = rcmpp.GetVarMask(rcmdata, nStp, "beta", I, doVerb=doVerb)
+        beta = rcmpp.GetVarMask(rcmSnap, nStp, "beta", I, doVerb=doVerb)
     Tb = None
     if doTb:
-        Tb = rcmpp.GetVarMask(rcmdata,nStp,"Tb", I, doVerb=doVerb)
+        Tb = rcmpp.GetVarMask(rcmSnap, nStp, "Tb", I, doVerb=doVerb)
     Bmin = None
     if doBMin:
-        Bmin = rcmpp.GetVarMask(rcmdata, nStp, "bMin", I, doVerb=doVerb)
+        Bmin = rcmpp.GetVarMask(rcmSnap, nStp, "bMin", I, doVerb=doVerb)
     toRCM = None
     if doBig:
-        toRCM = rcmpp.GetVarMask(rcmdata, nStp, "IOpen", I, doVerb=doVerb)
+        toRCM = rcmpp.GetVarMask(rcmSnap, nStp, "IOpen", I, doVerb=doVerb)
     jBirk = None
     if doFAC:
-        jBirk = rcmpp.GetVarMask(rcmdata, nStp, "birk", I, doVerb=doVerb)
+        jBirk = rcmpp.GetVarMask(rcmSnap, nStp, "birk", I, doVerb=doVerb)
     if debug:
         print("Prcm = %s" % Prcm)
         print("Nrcm = %s" % Nrcm)
@@ -663,7 +685,9 @@ def main():
         n_pad = int(np.log10(nsteps)) + 1
 
         if ncpus == 1:
-            for i, nStp in enumerate(sIds):
+            # Read the next step while this one is plotted
+            rcmSnaps = rcmpp.PrefetchSnapshots(rcmdata, sIds, vIDs=snapVars(args))
+            for i, (nStp, rcmSnap) in enumerate(zip(sIds, rcmSnaps)):
                 varDict = {
                     "vP": vP,
                     "vS": vS,
@@ -693,7 +717,7 @@ def main():
                     "branch": branch,
                     "githash": githash
                 }
-                makePlot(i,rcmdata, nStp, args, varDict, fig)
+                makePlot(i,rcmSnap, nStp, args, varDict, fig)
         else:
             # Make list of parallel arguments
             varDict = {
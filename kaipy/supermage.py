@@ -11,6 +11,7 @@ from multiprocessing import Pool
 import numpy as np
 import h5py
 import kaipy.kaiH5 as kh5
+import kaipy.geoelectric as geo
 from astropy.time import Time
 from scipy.spatial import qhull
 import matplotlib.dates as mdates
@@ -823,50 +824,14 @@ def Z_Tensor_1D(resistivities, thicknesses, frequencies):
 
     Taken from:
     http://www.digitalearthlab.com/tutorial/tutorial-1d-mt-forward/
+    Vectorised over frequency in kaipy.geoelectric.impedance1D.
     """
     
     if len(resistivities) != len(thicknesses) + 1:
         print("Length of inputs incorrect!")
         return 
-    
-    mu = 4*np.pi*1E-7; #Magnetic Permeability (H/m)
-    n = len(resistivities);
-    master_Z, master_absZ, master_phase = [], [], []
-
-    for frequency in frequencies:   
-        w =  2*np.pi*frequency;       
-        impedances = list(range(n));
-        #compute basement impedance
-        impedances[n-1] = np.sqrt(w*mu*resistivities[n-1]*1j);
-       
-        for j in range(n-2,-1,-1):
-            resistivity = resistivities[j];
-            thickness = thicknesses[j];
-      
-            # 3. Compute apparent resistivity from top layer impedance
-            #Step 2. Iterate from bottom layer to top(not the basement) 
-            # Step 2.1 Calculate the intrinsic impedance of current layer
-            dj = np.sqrt((w * mu * (1.0/resistivity))*1j);
-            wj = dj * resistivity;
-            # Step 2.2 Calculate Exponential factor from intrinsic impedance
-            ej = np.exp(-2*thickness*dj);                     
-        
-            # Step 2.3 Calculate reflection coeficient using current layer
-            #          intrinsic impedance and the below layer impedance
-            belowImpedance = impedances[j + 1];
-            rj = (wj - belowImpedance)/(wj + belowImpedance);
-            re = rj*ej; 
-            Zj = wj * ((1 - re)/(1 + re));
-            impedances[j] = Zj;    
-    
-        # Step 3. Compute apparent resistivity from top layer impedance
-        Z = impedances[0];
-        phase = math.atan2(Z.imag, Z.real)
-        master_Z.append(Z)
-        master_absZ.append(abs(Z))
-        master_phase.append(phase)
-        #master_res.append((absZ * absZ)/(mu * w))
-    return np.array(master_Z)
+
+    return geo.impedance1D(resistivities, thicknesses, frequencies)
 
 def E_Field_1D(bx, by, resistivities, thicknesses, timestep = 60., Z = None, calc_Z = True, pad = True, padnum = 150):
     """
@@ -889,20 +854,17 @@ def E_Field_1D(bx, by, resistivities, thicknesses, timestep = 60., Z = None, cal
         eyt (array): Array of electric field components in mV/km.
     """
     
+    if calc_Z == True:  # if you need to calculate Z
+        return geo.eField(bx, by, resistivities, thicknesses, dt=timestep, pad=pad, padnum=padnum, doFill=False)
+
     if pad == False:
         new_bx = bx
         new_by = by
     else:
-        new_bx = np.concatenate((bx[:padnum], bx, bx[-padnum:][::-1]))
-        new_by = np.concatenate((by[:padnum], by, by[-padnum:][::-1]))
+        new_bx = geo.padSeries(bx, padnum)
+        new_by = geo.padSeries(by, padnum)
     
-    mu0 = 4*np.pi * 1e-7
-    freq = np.fft.fftfreq(new_bx.size, d = timestep)
-    freq[0] = 1e-100
-
-    if calc_Z == True:  # if you need to calculate Z
-        Z = Z_Tensor_1D(resistivities, thicknesses, freq)
-        
+    mu0 = geo.mu0
     bx_fft = np.fft.fft(new_bx)
     by_fft = np.fft.fft(new_by)
 
@@ -921,11 +883,11 @@ def EField1DCalculation(BX, BY, TD):
     """
     Calculates Ex and Ey using a resistive 1-D ground model.
 
-    This function assumes that it is given 60 second data.
+    This function assumes that it is given 60 second data. All stations are
+    done at once, see kaipy.geoelectric.eField.
 
-    **WARNING** and time-series with nans will return all nans for that location.
-    I'm not sure what the best way to handle these are, probably a linear interpolation
-    before calculating E-fields.
+    Gaps (nans) are linearly interpolated over, stations without any data
+    get zero E-fields.
 
     Also, be wary of FFT edge values at start and end of E-field calculation.
 
@@ -938,29 +900,9 @@ def EField1DCalculation(BX, BY, TD):
         EX (array): Array of Ex in mV/km, same shape as input Bx.
         EY (array): Array of Ey in mV/km, same shape as input By.
     """
-    Qres = np.array([500., 150., 20., 300., 100., 10., 1.])
-    Qthick = 1000. * np.array([4., 6., 5., 65., 300., 200.])
-
-    freq = np.fft.fftfreq(len(TD), d = 60.)
-    freq[0] = 1e-100
-    ZZ = Z_Tensor_1D(Qres, Qthick, freq)
-
-    EX, EY = np.zeros((BX.shape)), np.zeros((BY.shape))
-
-    for i, v in enumerate(EX.T):
-        bx, by = BX[:,i], BY[:,i]
-        
-        bx[np.isnan(bx)] = 0
-        bx[np.isnan(bx)] = 0
-        
-        ex, ey = E_Field_1D(bx, by, Qres, Qthick, timestep = 60., Z = ZZ, calc_Z = True, pad = True, padnum = 150)
-
-        EX[:,i] = ex
-        EY[:,i] = ey
-
-        print("E-field calc: ", i)
+    EX, EY = geo.eField(np.asarray(BX).T, np.asarray(BY).T, geo.QRes, geo.QThick, dt=60., pad=True, padnum=150)
 
-    return EX, EY
+    return EX.T, EY.T
 
 def SMdict_to_df(SM, sitenames=None, geo_names=['glat', 'glon', 'mlat', 'mlon', 'mcolat'],
                   var_names=['BNm', 'BEm', 'BZm', 'BNg', 'BEg', 'BZg', 'mlt', 'decl', 'sza']):
@@ -52,6 +52,7 @@ setup(
     entry_points={
         'console_scripts': [
             'ih2oh=kaipy.scripts.OHelio.ih2oh:main',
+            'cdasCache=kaipy.scripts.datamodel.cdasCache:main',
             'helioSatComp=kaipy.scripts.datamodel.helioSatComp:main',
             'msphParallelSatComp=kaipy.scripts.datamodel.msphParallelSatComp:main',
             'msphPbsSatComp=kaipy.scripts.datamodel.msphPbsSatComp:main',
@@ -59,13 +60,16 @@ setup(
             'rbspSCcomp=kaipy.scripts.datamodel.rbspSCcomp:main',
             'rcm_rbsp_satcomp=kaipy.scripts.datamodel.rcm_rbsp_satcomp:main',
             'block_genmpiXDMF=kaipy.scripts.postproc.block_genmpiXDMF:main',
+            'chimpstats=kaipy.scripts.postproc.chimpstats:main',
             'embiggen=kaipy.scripts.postproc.embiggen:main',
             'embiggenMIX=kaipy.scripts.postproc.embiggenMIX:main',
             'embiggenRCM=kaipy.scripts.postproc.embiggenRCM:main',
             'embiggenVOLT=kaipy.scripts.postproc.embiggenVOLT:main',
             'genmpiXDMF=kaipy.scripts.postproc.genmpiXDMF:main',
+            'genTAC=kaipy.scripts.postproc.genTAC:main',
             'genXDMF=kaipy.scripts.postproc.genXDMF:main',
             'genXLine=kaipy.scripts.postproc.genXLine:main',
+            'kaibench=kaipy.scripts.postproc.kaibench:main',
             'numSteps=kaipy.scripts.postproc.numSteps:main',
             'pitmerge=kaipy.scripts.postproc.pitmerge:main',
             'printResTimes=kaipy.scripts.postproc.printResTimes:main',
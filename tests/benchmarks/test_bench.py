@@ -0,0 +1,52 @@
+import pytest
+import json
+import numpy as np
+
+import kaipy.kaiH5 as kh5
+import kaipy.benchmarks.synth as synth
+import kaipy.benchmarks.bench as bench
+from kaipy.gamera.gampp import GameraPipe
+
+def test_writeGamera_mpi(tmpdir):
+	fdir = str(tmpdir)
+	fOuts = synth.writeGamera(fdir, "msphere", Ni=8, Nj=4, Nk=8, Ri=2, Rj=1, Rk=2, Nt=3)
+	assert len(fOuts) == 4
+	gsph = GameraPipe(fdir, "msphere", doVerbose=False)
+	assert gsph.isMPI
+	assert (gsph.Ni, gsph.Nj, gsph.Nk) == (8, 4, 8)
+	assert gsph.Nt == 3
+	D = gsph.GetVar("D", 1, doVerb=False)
+	assert D.shape == (8, 4, 8)
+	assert np.all(np.isfinite(D))
+	T = kh5.getTs(fOuts[0], aID="time", useBars=False)
+	assert np.allclose(T, [0, 60, 120])
+
+def test_cellVolumes():
+	X, Y, Z = synth.lfmGrid(16, 32, 32, Rin=1.0, Rout=2.0)
+	dV = synth.cellVolumes(X, Y, Z)
+	assert dV.shape == (32, 32, 16)
+	assert np.isclose(dV.sum(), 4.0/3.0*np.pi*(2.0**3 - 1.0), rtol=0.02)
+
+def test_timeCall():
+	rec = bench.timeCall(lambda: np.zeros(2**20), nRep=2, nWarm=0)
+	assert len(rec["times"]) == 2
+	assert rec["min"] <= rec["median"] <= max(rec["times"])
+	assert rec["peakMB"] >= 7.9
+
+def test_runSuite(tmpdir):
+	res = bench.runSuite("small", groups=["kaiH5", "remix"], nRep=1, nWarm=0, doVerb=False)
+	names = [r["name"] for r in res["results"]]
+	assert "getTs/rcm/TAC" in names
+	assert "remix/dB" in names
+	assert res["meta"]["size"] == "small"
+	fOut = str(tmpdir.join("bench.json"))
+	bench.writeResults(fOut, res)
+	with open(fOut) as f:
+		res1 = json.load(f)
+	ratios = bench.compareResults(res1, res)
+	assert len(ratios) == len(names)
+	assert np.allclose(list(ratios.values()), 1.0)
+
+def test_runSuite_badGroup():
+	with pytest.raises(ValueError):
+		bench.runSuite("small", groups=["nope"])
@@ -0,0 +1,90 @@
+import pytest
+import numpy as np
+import h5py
+import xml.etree.ElementTree as et
+
+import kaipy.chimp.fieldlines as fl
+
+@pytest.fixture
+def legacy_file(tmpdir):
+	#One group per line, as written by the CHIMP tracer
+	fname = str(tmpdir.join("fl.h5"))
+	rng = np.random.default_rng(0)
+	with h5py.File(fname, 'w') as hf:
+		hf.attrs["Units"] = "Re"
+		hf.create_dataset("X0", data=np.arange(4.0))
+		for n in range(3):
+			gS = hf.create_group("Step#%d" % (n))
+			gS.attrs["time"] = 10.0*n
+			for m in range(5):
+				Np = int(rng.integers(2, 12))
+				gL = gS.create_group("Line#%d" % (m))
+				gL.create_dataset("xyz", data=rng.random((Np, 3)).astype(np.float32))
+				gL.create_dataset("B", data=rng.random(Np).astype(np.float32))
+				gL.create_dataset("D", data=rng.random(Np).astype(np.float32))
+				LCon = np.stack([np.arange(Np-1), np.arange(1, Np)], axis=1).astype(np.int32)
+				gL.create_dataset("LCon", data=LCon)
+				gL.attrs["Np"] = Np
+				gL.attrs["n0"] = Np//2
+				gL.attrs["x0"] = float(m)
+	return fname
+
+def test_polyCon():
+	con = fl.polyCon([3, 1, 2])
+	assert np.array_equal(con, [2, 3, 0, 1, 2, 2, 1, 3, 2, 2, 4, 5])
+
+@pytest.mark.parametrize("pSk,lSk", [(1, 1), (3, 2)])
+def test_toRagged(legacy_file, tmpdir, pSk, lSk):
+	fOut = str(tmpdir.join("rag.h5"))
+	fl.toRagged(legacy_file, fOut, pSk=pSk, lSk=lSk, doVerb=False)
+	assert fl.isRagged(fOut) and not fl.isRagged(legacy_file)
+	with h5py.File(legacy_file, 'r') as iH5, h5py.File(fOut, 'r') as oH5:
+		assert oH5.attrs["Units"] == "Re"
+		assert np.array_equal(oH5["X0"][()], iH5["X0"][()])
+		for n in range(3):
+			gStr = "Step#%d" % (n)
+			assert oH5[gStr].attrs["time"] == iH5[gStr].attrs["time"]
+			lines = fl.readStep(oH5[gStr])
+			mIds = list(range(0, 5, lSk))
+			assert np.array_equal(lines["atts"]["ID"], mIds)
+			assert ("n0" in lines["atts"]) == (pSk == 1)
+			xyz = fl.splitLines(lines)
+			B = fl.splitLines(lines, "B")
+			for l, m in enumerate(mIds):
+				gL = iH5[gStr]["Line#%d" % (m)]
+				assert np.array_equal(xyz[l], gL["xyz"][::pSk])
+				assert np.array_equal(B[l], gL["B"][::pSk])
+				assert lines["atts"]["x0"][l] == gL.attrs["x0"]
+			assert np.array_equal(oH5[gStr]["PolyCon"][()], fl.polyCon(lines["Np"]))
+
+def test_slim_ragged(legacy_file, tmpdir):
+	#Slimming a ragged file is the same as slimming on conversion
+	fRag = str(tmpdir.join("rag.h5"))
+	fA = str(tmpdir.join("slimA.h5"))
+	fB = str(tmpdir.join("slimB.h5"))
+	fl.toRagged(legacy_file, fRag, doVerb=False)
+	fl.toRagged(fRag, fA, pSk=2, lSk=2, doVerb=False)
+	fl.toRagged(legacy_file, fB, pSk=2, lSk=2, doVerb=False)
+	with h5py.File(fA, 'r') as hA, h5py.File(fB, 'r') as hB:
+		for n in range(3):
+			a = fl.readStep(hA["Step#%d" % (n)])
+			b = fl.readStep(hB["Step#%d" % (n)])
+			assert np.array_equal(a["xyz"], b["xyz"]) and np.array_equal(a["Offsets"], b["Offsets"])
+			assert np.array_equal(a["vars"]["D"], b["vars"]["D"])
+			assert a["atts"].keys() == b["atts"].keys()
+
+def test_genXDMF(legacy_file, tmpdir):
+	fRag = str(tmpdir.join("rag.h5"))
+	fXML = str(tmpdir.join("rag.xmf"))
+	fl.toRagged(legacy_file, fRag, doVerb=False)
+	fl.genXDMF(fRag, fXML)
+	grids = et.parse(fXML).getroot().findall("./Domain/Grid/Grid")
+	assert len(grids) == 3
+	with h5py.File(fRag, 'r') as hf:
+		Np = hf["Step#1/Np"][()]
+	g = grids[1]
+	assert g.find("Time").get("Value") == "%f" % (10.0)
+	assert g.find("Topology").get("NumberOfElements") == str(len(Np))
+	assert g.find("Geometry/DataItem").get("Dimensions") == "%d 3" % (Np.sum())
+	atts = {a.get("Name"): a.get("Center") for a in g.findall("Attribute")}
+	assert atts == {"B": "Node", "D": "Node", "x0": "Cell", "ID": "Cell"}
@@ -1,7 +1,8 @@
 import pytest
 import numpy as np
 import h5py
-from kaipy.chimp.kCyl import getGrid, getSlc, PIso, getEQGrid
+import kaipy.kdefs as kdefs
+from kaipy.chimp.kCyl import getGrid, getSlc, PIso, getEQGrid, anisotropy, kMoments, getMoments, phiAvg
 
 @pytest.fixture
 def h5file(tmpdir):
@@ -71,4 +72,85 @@ def test_getEQGrid(h5eqfile):
 
 	xxc_wrap, yyc_wrap = getEQGrid(h5eqfile, doCenter=True, doWrap=True)
 	assert xxc_wrap.shape == (9, 10)
-	assert yyc_wrap.shape == (9, 10)
\ No newline at end of file
+	assert yyc_wrap.shape == (9, 10)
+
+def PIsoLoop(Pxy, Pz, pCut, doAsym):
+	# Per-cell reference of the anisotropy
+	pR = np.zeros(Pz.shape)
+	for i in range(Pz.shape[0]):
+		for j in range(Pz.shape[1]):
+			if (2*Pxy[i, j] + Pz[i, j]) > pCut and Pz[i, j] > pCut:
+				pR[i, j] = Pxy[i, j]/Pz[i, j] - 1.0 if doAsym else Pxy[i, j]/(Pxy[i, j] + Pz[i, j])
+			else:
+				pR[i, j] = 0.0 if doAsym else np.nan
+	return pR
+
+def test_anisotropy():
+	rng = np.random.default_rng(0)
+	Pxy = rng.random((12, 8))
+	Pz = rng.random((12, 8))
+	Pz[0, :] = 0.0
+	for doAsym in [False, True]:
+		pR = anisotropy(Pxy, Pz, pCut=0.1, doAsym=doAsym)
+		assert np.array_equal(np.isnan(pR), np.isnan(PIsoLoop(Pxy, Pz, 0.1, doAsym)))
+		assert np.allclose(pR, PIsoLoop(Pxy, Pz, 0.1, doAsym), equal_nan=True)
+
+def maxwellJ(n, kT, Kc):
+	mass = kdefs.Mp_cgs*1.0e-3
+	f = n*(mass/(2*np.pi*kT))**1.5*np.exp(-Kc/kT)
+	return 2*Kc/mass**2*f*1e2*np.sqrt(kdefs.kev2J)
+
+def test_kMoments_maxwellian():
+	Ki = np.logspace(-2, 3, 400)
+	Kc = 0.5*(Ki[1:] + Ki[:-1])
+	n0, kT = 2.0, 5.0
+	j = maxwellJ(n0, kT, Kc)
+	moms = kMoments(j[None, :], Ki)
+	assert np.isclose(moms["n"][0], n0, rtol=1e-2)
+	# P = nkT
+	P0 = n0*1.0e6*kT*kdefs.kev2J*1.0e9
+	assert np.isclose(moms["P"][0], P0, rtol=1e-2)
+	# Partial pressure of a band is a fraction of the total
+	mB = kMoments(j[None, :], Ki, kMin=5.0, kMax=50.0)
+	assert 0 < mB["P"][0] < moms["P"][0]
+	# Isotropic pitch angle resolved intensity gives the same moments
+	Ai = np.linspace(0, np.pi/2, 10)
+	mA = kMoments(np.repeat(j[None, :, None], 9, axis=2), Ki, Ai=Ai)
+	assert np.isclose(mA["n"][0], moms["n"][0])
+	assert np.isclose(mA["P"][0], moms["P"][0])
+	assert np.isclose(mA["Pxy"][0], mA["Pz"][0])
+
+@pytest.fixture
+def kcylfile(tmpdir):
+	file_path = tmpdir.join("kcyl.h5")
+	Ni, Nj, Nk, Nt = 6, 8, 40, 4
+	rng = np.random.default_rng(1)
+	Ki = np.logspace(0, 2, Nk+1)
+	Z = np.broadcast_to(np.log10(Ki)[:, None, None], (Nk+1, Nj+1, Ni+1))
+	with h5py.File(file_path, 'w') as hf:
+		hf.create_dataset("X", data=rng.random((Nk+1, Nj+1, Ni+1)))
+		hf.create_dataset("Y", data=rng.random((Nk+1, Nj+1, Ni+1)))
+		hf.create_dataset("Z", data=Z)
+		for n in range(Nt):
+			step_grp = hf.create_group("Step#%d" % (n))
+			step_grp.attrs["time"] = 10.0*n
+			step_grp.create_dataset("jPSD", data=rng.random((Nk, Nj, Ni)))
+			step_grp.create_dataset("Pxy", data=rng.random((Nj, Ni)))
+			step_grp.create_dataset("Pz", data=rng.random((Nj, Ni)))
+	return str(file_path)
+
+def test_getMoments(kcylfile):
+	moms = getMoments(kcylfile, pCut=0.2)
+	assert moms["pR"].shape == (4, 6, 8)
+	assert np.allclose(moms["T"], [0, 10, 20, 30])
+	xx, yy, Ki, Kc = getGrid(kcylfile)
+	for n in range(4):
+		assert np.allclose(moms["pR"][n], PIso(kcylfile, n, pCut=0.2), equal_nan=True)
+		jM = kMoments(getSlc(kcylfile, n, "jPSD"), Ki)
+		assert np.allclose(moms["P"][n], jM["P"])
+		assert np.allclose(moms["n"][n], jM["n"])
+	mW = getMoments(kcylfile, sIds=[1, 3], doWrap=True, doJ=False)
+	assert mW["Pz"].shape == (2, 6, 9)
+	assert "P" not in mW
+	assert np.allclose(mW["Pz"][1], getSlc(kcylfile, 3, "Pz", doWrap=True))
+	assert phiAvg(moms["P"]).shape == (4, 6)
@@ -0,0 +1,134 @@
+import pytest
+import numpy as np
+import h5py
+
+import kaipy.chimp.tpstats as tps
+from kaipy.chimp.chimph5p import getH5p
+
+Np = 500
+Nt = 13
+
+@pytest.fixture
+def h5pfile(tmpdir):
+	# Particles drifting inwards and being lost over time, IDs starting at 11
+	fname = str(tmpdir.join("tps.h5part"))
+	rng = np.random.default_rng(0)
+	L0 = rng.uniform(4, 10, Np)
+	ph0 = rng.uniform(0, 2*np.pi, Np)
+	K0 = 10.0**rng.uniform(0.5, 3.5, Np)
+	a0 = rng.uniform(5, 175, Np)
+	tLoss = rng.integers(2, 3*Nt, Np)
+	with h5py.File(fname, 'w') as hf:
+		for n in range(Nt):
+			grp = hf.create_group("Step#%d" % (n))
+			grp.attrs["time"] = 60.0*n
+			L = L0*(1 - 0.02*n)
+			ph = ph0 + 0.1*n
+			grp.create_dataset("id", data=np.arange(11, Np+11))
+			grp.create_dataset("x", data=L*np.cos(ph))
+			grp.create_dataset("y", data=L*np.sin(ph))
+			grp.create_dataset("z", data=np.zeros(Np))
+			grp.create_dataset("K", data=K0*(1 + 0.05*n))
+			grp.create_dataset("alpha", data=a0)
+			grp.create_dataset("wgt", data=np.linspace(1, 2, Np))
+			grp.create_dataset("isIn", data=(n < tLoss).astype(float))
+	return fname
+
+def denseFirst(isX):
+	# First step of every particle where isX holds, from the dense (Nt x Np) arrays
+	first = np.where(isX.any(axis=0), isX.argmax(axis=0), -1)
+	return first
+
+def test_tpStats_dense(h5pfile):
+	stats = tps.tpStats(h5pfile, nChunk=4, doVerb=False)
+	assert sorted(stats["hists"].keys()) == ["KL", "MLTL", "alpha"]
+	assert sorted(stats["cross"].keys()) == ["geo", "lost"]
+	t, K = getH5p(h5pfile, "K")
+	t, x = getH5p(h5pfile, "x")
+	t, y = getH5p(h5pfile, "y")
+	t, isIn = getH5p(h5pfile, "isIn")
+	t, alpha = getH5p(h5pfile, "alpha")
+	L = np.sqrt(x**2 + y**2)
+	mlt = np.mod(12 + np.arctan2(y, x)*12/np.pi, 24)
+	assert np.allclose(stats["T"], t)
+	assert np.array_equal(stats["ids"], np.arange(11, Np+11))
+	assert np.array_equal(stats["nIn"], (isIn > 0.5).sum(axis=1))
+	assert np.array_equal(stats["nIn"] + stats["nOut"], np.full(Nt, Np))
+
+	hKL, hMLT, hA = [{h["name"]: h for h in stats["hSpecs"]}[n] for n in ["KL", "MLTL", "alpha"]]
+	for n in range(Nt):
+		I = isIn[n] > 0.5
+		H, _ = np.histogramdd(np.stack((K[n, I], L[n, I]), axis=-1), bins=hKL["edges"])
+		assert np.array_equal(stats["hists"]["KL"][n], H)
+		H, _ = np.histogramdd(np.stack((mlt[n, I], L[n, I]), axis=-1), bins=hMLT["edges"])
+		assert np.array_equal(stats["hists"]["MLTL"][n], H)
+		H, _ = np.histogram(alpha[n, I], bins=hA["edges"][0])
+		assert np.array_equal(stats["hists"]["alpha"][n], H)
+
+	lost = denseFirst(isIn < 0.5)
+	assert np.array_equal(stats["cross"]["lost"], lost)
+	# Injection: in the domain, and started outside geosynchronous orbit
+	geo = denseFirst((L < 6.6) & (isIn > 0.5))
+	geo[L[0] < 6.6] = -1
+	assert np.array_equal(stats["cross"]["geo"], geo)
+	assert np.any(geo > 0) and not np.any(geo == 0)
+	assert np.any((L < 6.6).any(axis=0) & (geo < 0) & (L[0] >= 6.6))
+	assert np.allclose(stats["cTimes"]["lost"][lost >= 0], t[lost[lost >= 0]])
+	assert np.all(np.isnan(stats["cTimes"]["lost"][lost < 0]))
+
+def test_tpStats_workers(h5pfile, tmpdir):
+	hSpecs = [tps.histSpec("Kw", ["K"], [np.geomspace(1, 1e4, 20)], wID="wgt", onlyIn=False)]
+	cSpecs = [tps.crossSpec("hot", "K", ">=", 1000.0)]
+	sIds = np.arange(1, Nt, 2)
+	S1 = tps.tpStats(h5pfile, hSpecs, cSpecs, sIds=sIds, nChunk=2, doVerb=False)
+	S2 = tps.tpStats(h5pfile, hSpecs, cSpecs, sIds=sIds, nChunk=3, nWorkers=2, doVerb=False)
+	assert np.array_equal(S1["sIds"], sIds)
+	assert np.allclose(S1["hists"]["Kw"], S2["hists"]["Kw"])
+	assert np.array_equal(S1["cross"]["hot"], S2["cross"]["hot"])
+	t, K = getH5p(h5pfile, "K")
+	t, w = getH5p(h5pfile, "wgt")
+	H, _ = np.histogram(K[3], bins=hSpecs[0]["edges"][0], weights=w[3])
+	assert np.allclose(S1["hists"]["Kw"][1], H)
+	first = denseFirst(K[sIds] >= 1000.0)
+	assert np.array_equal(S1["cross"]["hot"], np.where(first >= 0, sIds[first], -1))
+
+	fOut = str(tmpdir.join("tps.stats.h5"))
+	tps.writeStats(fOut, S1)
+	R = tps.readStats(fOut)
+	assert np.array_equal(R["sIds"], S1["sIds"])
+	assert np.allclose(R["hists"]["Kw"], S1["hists"]["Kw"])
+	assert np.array_equal(R["cross"]["hot"], S1["cross"]["hot"])
+	assert np.allclose(R["cTimes"]["hot"], S1["cTimes"]["hot"], equal_nan=True)
+	assert R["hSpecs"][0]["wID"] == "wgt" and not R["hSpecs"][0]["onlyIn"]
+	assert np.allclose(R["hSpecs"][0]["edges"][0], hSpecs[0]["edges"][0])
+	assert R["cSpecs"][0]["op"] == ">="
+
+def test_cross_fromOut_chunks(h5pfile, tmpdir):
+	# Start state is that of the first step used, whichever chunk it is in
+	cSpecs = [tps.crossSpec("in5", "L", "<", 5.0, fromOut=True), tps.crossSpec("in5all", "L", "<", 5.0)]
+	sIds = np.arange(2, Nt)
+	S1 = tps.tpStats(h5pfile, cSpecs=cSpecs, hSpecs=[], sIds=sIds, nChunk=1, doVerb=False)
+	S2 = tps.tpStats(h5pfile, cSpecs=cSpecs, hSpecs=[], sIds=sIds, nChunk=5, nWorkers=2, doVerb=False)
+	assert np.array_equal(S1["cross"]["in5"], S2["cross"]["in5"])
+	assert "cStart" not in S1
+	t, x = getH5p(h5pfile, "x")
+	t, y = getH5p(h5pfile, "y")
+	L = np.sqrt(x**2 + y**2)[sIds]
+	first = denseFirst(L < 5.0)
+	ref = np.where(first >= 0, sIds[first], -1)
+	assert np.array_equal(S1["cross"]["in5all"], ref)
+	ref[L[0] < 5.0] = -1
+	assert np.array_equal(S1["cross"]["in5"], ref)
+	fOut = str(tmpdir.join("in5.stats.h5"))
+	tps.writeStats(fOut, S1)
+	R = tps.readStats(fOut)
+	cIn5 = {c["name"]: c for c in R["cSpecs"]}["in5"]
+	assert cIn5["fromOut"] and not cIn5["onlyIn"]
+
+def test_specs():
+	with pytest.raises(ValueError):
+		tps.histSpec("bad", ["K", "L"], [np.arange(3)])
+	with pytest.raises(ValueError):
+		tps.crossSpec("bad", "K", "==", 1.0)
+	assert tps.hasVar(["x", "y", "z"], "L")
+	assert not tps.hasVar(["x", "y"], "L")
@@ -7,7 +7,7 @@ import h5py
 from kaipy.gamera.gamGrids import (
 	genEllip, genSph, genEgg, genFatEgg, RampUp, Egglipses,
 	GenKSph, GenKSphNonU, GenKSphNonUGL, Aug2D, Aug2Dext, genRing,
-	PrintRing, Aug3D, WriteGrid, WriteChimp, VizGrid, LoadTabG, regrid
+	PrintRing, Aug3D, WriteGrid, WriteChimp, VizGrid, LoadTabG, regrid, Ng
 )
 
 def test_genEllip():
@@ -135,4 +135,66 @@ def test_regrid():
 	yyi = np.fromfunction(lambda i, j: i * 100 + j, (Ni, Nj))
 	XXi, YYi = regrid(xxi, yyi, 2*Ni, 2*Nj)
 	assert XXi.shape == (33, 65)
-	assert YYi.shape == (33, 65)
\ No newline at end of file
+	assert YYi.shape == (33, 65)
+def loopRing(XX, YY, Nk):
+	#Cell by cell spacings, as genRing used to compute them
+	Ni, Nj = XX.shape[0]-1, XX.shape[1]-1
+	rr = np.sqrt(XX**2 + YY**2)
+	pp = np.arctan2(YY, XX)
+	dI = np.zeros((Ni, Nj)); dJ = np.zeros((Ni, Nj)); dK = np.zeros((Ni, Nj))
+	for i in range(Ni):
+		for j in range(Nj):
+			dI[i, j] = 0.5*(rr[i+1, j] + rr[i+1, j+1]) - 0.5*(rr[i, j] + rr[i, j+1])
+			dP = 0.5*(pp[i, j+1] + pp[i+1, j+1]) - 0.5*(pp[i, j] + pp[i+1, j])
+			dJ[i, j] = 0.25*(rr[i, j] + rr[i, j+1] + rr[i+1, j] + rr[i+1, j+1])*dP
+			dK[i, j] = 0.25*(YY[i, j] + YY[i, j+1] + YY[i+1, j] + YY[i+1, j+1])*2*np.pi/Nk
+	return dI, dJ, dK
+
+def test_genRing_lfm():
+	from kaipy.gamera.gamGrids import ringSpacing
+	xx0, yy0 = LoadTabG("lfmG", 8)
+	XX, YY = regrid(xx0, yy0, 48, 48, Rin=2.0)
+	for Q, R in zip(ringSpacing(XX, YY, 64), loopRing(XX, YY, 64)):
+		assert np.array_equal(Q, R)
+	NChs, NCha = genRing(XX, YY, Nk=64)
+	assert NChs.shape == (24,)
+	#Safe chunking never uses fewer chunks than aggressive
+	isBoth = (NChs > 0) & (NCha > 0)
+	assert (NChs[isBoth] >= NCha[isBoth]).all()
+	assert NChs[0] > 0 and (NChs % 8 == 0).all()
+
+def test_regrid_pointwise():
+	from scipy.interpolate import RectBivariateSpline
+	xx0, yy0 = LoadTabG("lfmG", 8)
+	XX, YY = regrid(xx0, yy0, 20, 24)
+	fR = RectBivariateSpline(np.linspace(0, 1, xx0.shape[0]), np.linspace(0, 1, xx0.shape[1]), np.sqrt(xx0**2 + yy0**2))
+	si, sj = np.linspace(0, 1, 21), np.linspace(0, 1, 25)
+	for i, j in [(0, 0), (7, 11), (20, 24)]:
+		assert np.isclose(np.sqrt(XX[i, j]**2 + YY[i, j]**2), fR(si[i], sj[j])[0, 0], rtol=1e-12)
+
+def test_Aug3D_ghosts():
+	xx, yy = genEgg(16, 16)
+	xxG, yyG = Aug2D(xx, yy, doEps=True)
+	Nk = 16
+	X3, Y3, Z3 = Aug3D(xxG, yyG, Nk=Nk)
+	kS, kE, jS, jE = Ng, Ng+Nk+1, Ng, Ng+16+1
+	# Rotation of the 2D grid, K periodic
+	A = np.linspace(0, 2*np.pi, Nk+1)
+	assert np.allclose(Y3[:, jS:jE, kS+3], yyG[:, jS:jE]*np.cos(A[3]))
+	for ip in range(1, Ng+1):
+		assert np.array_equal(X3[:, :, kS-ip], X3[:, :, kE-1-ip])
+		assert np.array_equal(Z3[:, :, kE-1+ip], Z3[:, :, kS+ip])
+	# J ghosts are copied across the axis, half a turn away
+	for k in [0, 5, Ng+Nk//2, X3.shape[2]-1]:
+		kp = k + Nk//2
+		if kp >= kE-1:
+			kp = k - Nk//2
+		for ip in range(1, Ng+1):
+			assert np.array_equal(X3[:, jS-ip, k], X3[:, jS+ip, kp])
+			assert np.array_equal(X3[:, jE-1+ip, k], X3[:, jE-1-ip, kp])
+
+def test_RampUp_array():
+	r = np.linspace(-1, 3, 17)
+	M = RampUp(r, 0.5, 2.0)
+	assert np.array_equal(M, [RampUp(x, 0.5, 2.0) for x in r])
+	assert isinstance(RampUp(1.0, 0.5, 2.0), float)
@@ -0,0 +1,107 @@
+import pytest
+import numpy as np
+import h5py
+
+import kaipy.kaiH5 as kh5
+import kaipy.gamera.gamcomp as gcmp
+from kaipy.gamera.gampp import GameraPipe
+from kaipy.gamera.msphViz import CalcTotalErrAbs, CalcTotalErrRel, CalcErrStats
+
+Ni, Nj, Nk = 8, 6, 4
+Nt = 3
+fieldNames = ["Bx", "By", "Bz"]
+
+def writeRun(fdir, ftag, data, Rs=(1, 1, 1)):
+    # Write data[step][field] (Ni,Nj,Nk) as a serial (Rs=1,1,1) or MPI run
+    xyz = np.meshgrid(np.arange(Ni+1.0), np.arange(Nj+1.0), np.arange(Nk+1.0), indexing='ij')
+    Ri, Rj, Rk = Rs
+    dNi, dNj, dNk = Ni//Ri, Nj//Rj, Nk//Rk
+    for i in range(Ri):
+        for j in range(Rj):
+            for k in range(Rk):
+                if Rs == (1, 1, 1):
+                    fOut = "%s/%s.gam.h5" % (fdir, ftag)
+                else:
+                    fOut = "%s/%s" % (fdir, kh5.genName(ftag, i, j, k, Ri, Rj, Rk))
+                cI = slice(i*dNi, (i+1)*dNi)
+                cJ = slice(j*dNj, (j+1)*dNj)
+                cK = slice(k*dNk, (k+1)*dNk)
+                nI = slice(i*dNi, (i+1)*dNi+1)
+                nJ = slice(j*dNj, (j+1)*dNj+1)
+                nK = slice(k*dNk, (k+1)*dNk+1)
+                with h5py.File(fOut, 'w') as f:
+                    for n, X in zip("XYZ", xyz):
+                        f.create_dataset(n, data=X[nI, nJ, nK].T)
+                    f.create_dataset("dV", data=np.ones((dNi, dNj, dNk)).T)
+                    for s in range(Nt):
+                        g = f.create_group("Step#%d" % (s))
+                        g.attrs['time'] = 1.0*s
+                        for fn in fieldNames:
+                            g.create_dataset(fn, data=data[s][fn][cI, cJ, cK].T)
+    return GameraPipe(str(fdir), ftag, doFast=True, doVerbose=False)
+
+@pytest.fixture
+def runs(tmpdir):
+    rng = np.random.default_rng(0)
+    dataP = [{fn: rng.standard_normal((Ni, Nj, Nk)) for fn in fieldNames} for s in range(Nt)]
+    dataO = [{fn: V + 1e-3*rng.standard_normal((Ni, Nj, Nk)) for fn, V in D.items()} for D in dataP]
+    # A cell with zero base field
+    for fn in fieldNames:
+        dataP[1][fn][0, 0, 0] = 0.0
+    gsphP = writeRun(tmpdir.mkdir("P"), "msphere", dataP)
+    gsphO = writeRun(tmpdir.mkdir("O"), "msphere", dataO, Rs=(2, 3, 1))
+    return gsphP, gsphO, dataP, dataO
+
+def fullErrors(P, O):
+    # Whole-volume reference, as msphViz always did
+    dAbs = np.sqrt(sum(np.square(O[fn] - P[fn]) for fn in fieldNames))
+    dBase = np.sqrt(sum(np.square(P[fn]) for fn in fieldNames))
+    dBase[dBase == 0] = np.finfo(np.float32).tiny
+    return dAbs, np.absolute(dAbs/dBase)
+
+def test_rankBlocks(runs):
+    gsphP, gsphO, dataP, dataO = runs
+    assert gsphO.isMPI and not gsphP.isMPI
+    assert len(gcmp.rankBlocks(gsphP)) == 1
+    blocks = gcmp.rankBlocks(gsphO)
+    assert len(blocks) == 6
+    cover = np.zeros((Ni, Nj, Nk), dtype=int)
+    for fIn, bds in blocks:
+        cover[bds] += 1
+    assert np.all(cover == 1)
+    assert gcmp.overlapBounds((slice(0, 4),), (slice(4, 8),)) is None
+
+def test_compareRuns(runs):
+    gsphP, gsphO, dataP, dataO = runs
+    R = gcmp.compareRuns(gsphP, gsphO, fieldNames, meanAxes=[0, 2], doVerb=False)
+    assert np.array_equal(R["sIds"], np.arange(Nt))
+    assert R["relMap2"].shape == (Nt, Ni, Nj)
+    for s in range(Nt):
+        dAbs, dRel = fullErrors(dataP[s], dataO[s])
+        assert np.isclose(R["absL1"][s], dAbs.mean())
+        assert np.isclose(R["absL2"][s], np.sqrt(np.mean(dAbs**2)))
+        assert np.isclose(R["absLinf"][s], dAbs.max())
+        assert np.isclose(R["relL1"][s], dRel.mean())
+        assert np.isclose(R["relLinf"][s], dRel.max())
+        assert np.allclose(R["absMap0"][s], dAbs.mean(axis=0))
+        assert np.allclose(R["relMap2"][s], dRel.mean(axis=2))
+    # Workers give the same answer
+    Rw = gcmp.compareRuns(gsphO, gsphP, fieldNames, sIds=[2, 0], meanAxes=[1], nWorkers=2, doVerb=False)
+    Rs = gcmp.compareRuns(gsphO, gsphP, fieldNames, sIds=[2, 0], meanAxes=[1], doVerb=False)
+    for key in Rs:
+        assert np.allclose(Rw[key], Rs[key])
+
+def test_msphViz_errors(runs):
+    gsphP, gsphO, dataP, dataO = runs
+    dAbs, dRel = fullErrors(dataP[1], dataO[1])
+    assert np.isclose(CalcTotalErrAbs(gsphP, gsphO, 1, fieldNames), dAbs.mean())
+    assert np.isclose(CalcTotalErrRel(gsphP, gsphO, 1, fieldNames), dRel.mean())
+    assert np.allclose(CalcTotalErrRel(gsphP, gsphO, 1, fieldNames, meanAxis=-1), dRel.mean(axis=2))
+    R = CalcErrStats(gsphP, gsphO, 1, fieldNames, meanAxis=1)
+    assert np.allclose(R["absMap1"], dAbs.mean(axis=1))
+
+def test_checkGrids(runs, tmpdir):
+    gsphP, gsphO, dataP, dataO = runs
+    gsphO.Nk = Nk + 1
+    with pytest.raises(ValueError):
+        gcmp.compareRuns(gsphP, gsphO, fieldNames, doVerb=False)
@@ -46,4 +46,48 @@ def test_get_root_var(gamera_pipe):
 def test_get_root_slice(gamera_pipe):
     Vs = gamera_pipe.GetRootSlice("dV", ijkdir='idir', n=1)
     assert Vs.shape == (Nj, Nk)
-    assert np.array_equal(Vs, np.zeros((Nj, Nk)))
\ No newline at end of file
+    assert np.array_equal(Vs, np.zeros((Nj, Nk)))
+
+def addStep(fname, n, vIDs=("D", "P", "Bx", "By", "Bz", "Vx", "Vy", "Vz", "Jx", "Jy", "Jz"), shape=(Nk, Nj, Ni)):
+    with h5py.File(fname, 'a') as f:
+        grp = f.create_group("Step#%d" % (n))
+        grp.attrs['time'] = np.double(n)
+        grp.attrs['MJD'] = 58000.0 + n
+        for vID in vIDs:
+            grp.create_dataset(vID, data=np.full(shape, n, dtype=np.float32))
+
+def test_refresh(gamera_pipe):
+    calls = []
+    assert len(gamera_pipe.Refresh()) == 0
+    addStep(gamera_pipe.f0, 3)
+    addStep(gamera_pipe.f0, 4)
+    newIds = gamera_pipe.Refresh(callback=lambda gp, sIds: calls.append(sIds))
+    assert np.array_equal(newIds, [3, 4])
+    assert np.array_equal(gamera_pipe.sids, [0, 1, 2, 3, 4])
+    assert gamera_pipe.Nt == 5 and gamera_pipe.sFin == 4
+    assert len(gamera_pipe.T) == 5 and len(gamera_pipe.MJDs) == 5 and len(gamera_pipe.UT) == 5
+    assert gamera_pipe.MJDs[-1] == 58004.0
+    assert len(calls) == 1 and np.array_equal(calls[0], [3, 4])
+    assert np.all(gamera_pipe.GetVar("D", sID=4, doVerb=False) == 4)
+    # Unchanged files aren't reopened, a step missing variables isn't taken yet
+    assert len(gamera_pipe.Refresh(callback=lambda gp, sIds: calls.append(sIds))) == 0
+    addStep(gamera_pipe.f0, 5, vIDs=("D",))
+    assert len(gamera_pipe.Refresh(useSWMR=False)) == 0
+    assert gamera_pipe.sFin == 4
+    assert len(calls) == 1
+
+def test_refresh_mpi(tmpdir):
+    import kaipy.benchmarks.synth as synth
+    fdir = str(tmpdir)
+    vIDs = ("D", "P")
+    fOuts = synth.writeGamera(fdir, "msphere", Ni=8, Nj=4, Nk=4, Ri=2, Rj=1, Rk=1, Nt=3, vIDs=vIDs, doTAC=False)
+    gp = GameraPipe(fdir, "msphere", doVerbose=False)
+    assert gp.isMPI and len(gp.fTails) == 2
+    shape = (4, 4, 4)
+    # Step only on the first rank so far
+    addStep(fOuts[0], 3, vIDs=vIDs, shape=shape)
+    assert len(gp.Refresh()) == 0
+    addStep(fOuts[1], 3, vIDs=vIDs, shape=shape)
+    assert np.array_equal(gp.Refresh(), [3])
+    assert gp.Nt == 4 and gp.T[-1] == 3.0
+    assert gp.GetVar("P", sID=3, doVerb=False).shape == (8, 4, 4)
@@ -45,19 +45,19 @@ def test_eq_mag_b(gamera_pipe):
     Beq = gamera_pipe.eqMagB(s0=0)
     assert Beq.shape == (gamera_pipe.Ni, 2 * gamera_pipe.Nj)
 
-# def test_b_stream(gamera_pipe):
-#     gamera_pipe.OpenPipe(doVerbose=False)
-#     x1, y1, gu, gv, gM = gamera_pipe.bStream(s0=0)
-#     assert x1.shape[0] > 0
-#     assert y1.shape[0] > 0
-#     assert gu.shape == gv.shape == gM.shape
+def test_b_stream(gamera_pipe):
+    gamera_pipe.OpenPipe(doVerbose=False)
+    x1, y1, gu, gv, gM = gamera_pipe.bStream(s0=0)
+    assert x1.shape[0] > 0
+    assert y1.shape[0] > 0
+    assert gu.shape == gv.shape == gM.shape
 
-# def test_v_stream(gamera_pipe):
-#     gamera_pipe.OpenPipe(doVerbose=False)
-#     x1, y1, gu, gv, gM = gamera_pipe.vStream(s0=0)
-#     assert x1.shape[0] > 0
-#     assert y1.shape[0] > 0
-#     assert gu.shape == gv.shape == gM.shape
+def test_v_stream(gamera_pipe):
+    gamera_pipe.OpenPipe(doVerbose=False)
+    x1, y1, gu, gv, gM = gamera_pipe.vStream(s0=0)
+    assert x1.shape[0] > 0
+    assert y1.shape[0] > 0
+    assert gu.shape == gv.shape == gM.shape
 
 def test_gam2remix(gamera_pipe):
     gamera_pipe.OpenPipe(doVerbose=False)
@@ -90,14 +90,30 @@ def test_add_cpcp(gamera_pipe):
     gamera_pipe.AddCPCP(0, ax)
     assert len(ax.texts) > 0
 
-# def test_do_stream(gamera_pipe):
-#     gamera_pipe.OpenPipe(doVerbose=False)
-#     U = np.random.rand(gamera_pipe.Ni, 2 * gamera_pipe.Nj)
-#     V = np.random.rand(gamera_pipe.Ni, 2 * gamera_pipe.Nj)
-#     x1, y1, gu, gv, gM = gamera_pipe.doStream(U, V)
-#     assert x1.shape[0] > 0
-#     assert y1.shape[0] > 0
-#     assert gu.shape == gv.shape == gM.shape
+def test_do_stream(gamera_pipe):
+    gamera_pipe.OpenPipe(doVerbose=False)
+    U = np.random.rand(gamera_pipe.Ni, 2 * gamera_pipe.Nj)
+    V = np.random.rand(gamera_pipe.Ni, 2 * gamera_pipe.Nj)
+    x1, y1, gu, gv, gM = gamera_pipe.doStream(U, V)
+    assert x1.shape[0] > 0
+    assert y1.shape[0] > 0
+    assert gu.shape == gv.shape == gM.shape
+
+def test_do_stream_griddata(gamera_pipe):
+    from scipy.interpolate import griddata
+    gamera_pipe.OpenPipe(doVerbose=False)
+    rng = np.random.default_rng(0)
+    xyBds = [-60, 40, -50, 50]
+    for n in range(2):
+        U = rng.random((gamera_pipe.Ni, 2 * gamera_pipe.Nj))
+        V = rng.random((gamera_pipe.Ni, 2 * gamera_pipe.Nj))
+        x1, y1, gu, gv, gM = gamera_pipe.doStream(U, V, xyBds=xyBds, dx=1.0)
+        xx1, yy1 = np.meshgrid(x1, y1)
+        pxy = (gamera_pipe.xxc.flatten(), gamera_pipe.yyc.flatten())
+        assert np.allclose(gu, griddata(pxy, U.flatten(), (xx1, yy1), method='linear', fill_value=0.0))
+        assert np.allclose(gM, griddata(pxy, np.sqrt(U**2 + V**2).flatten(), (xx1, yy1), method='linear', fill_value=0.0))
+    # Weights are built once and reused
+    assert list(gamera_pipe.streamCache.keys()) == [(tuple(xyBds), 1.0)]
 
 # def test_cmiviz(gamera_pipe):
 #     import matplotlib.pyplot as plt
@@ -0,0 +1,84 @@
+import pytest
+import numpy as np
+
+import kaipy.gamera.magsphereRescale as msr
+
+def boxGrid(Ni, Nj, Nk, dx=1.0, dy=2.0, dz=0.5):
+	# Cartesian box with ghosts, k-j-i order as in the restart files
+	Ng = msr.NumG
+	x = dx*np.arange(-Ng, Ni+Ng+1)
+	y = dy*np.arange(-Ng, Nj+Ng+1)
+	z = dz*np.arange(-Ng, Nk+Ng+1)
+	Z, Y, X = np.meshgrid(z, y, x, indexing='ij')
+	return X, Y, Z
+
+def test_blockSum_blockRep():
+	rng = np.random.default_rng(0)
+	Q = rng.random((3, 4, 6, 5))
+	Qs = msr.blockSum(Q, (1, 2))
+	assert Qs.shape == (3, 2, 3, 5)
+	assert np.isclose(Qs[1, 1, 2, 3], Q[1, 2:4, 4:6, 3].sum())
+	assert np.allclose(msr.blockMean(Q, (1, 2)), Qs/4)
+	Qr = msr.blockRep(Qs, (1, 2))
+	assert Qr.shape == (3, 4, 6, 5)
+	assert np.allclose(msr.blockSum(Qr, (1, 2)), 4*Qs)
+	# Incomplete trailing blocks are dropped
+	assert msr.blockSum(Q, (3,)).shape == (3, 4, 6, 2)
+
+def test_Volume_box():
+	X, Y, Z = boxGrid(6, 4, 8)
+	dV = msr.Volume(X, Y, Z)
+	assert dV.shape == (8, 4, 6)
+	assert np.allclose(dV, 1.0*2.0*0.5)
+
+def test_Volume_skewed():
+	X, Y, Z = boxGrid(4, 4, 4)
+	# Shearing the box doesn't change the volume
+	Xs = X + 0.3*Y + 0.1*Z
+	assert np.allclose(msr.Volume(Xs, Y, Z), 1.0)
+
+def test_gas_conservation():
+	rng = np.random.default_rng(1)
+	X, Y, Z = boxGrid(8, 4, 4)
+	Xd, Yd, Zd = boxGrid(4, 2, 2, 2.0, 4.0, 1.0)
+	dV  = msr.Volume(X, Y, Z)
+	dVd = msr.Volume(Xd, Yd, Zd)
+	G = rng.random((2, 5, 4, 4, 8))
+	Gd = msr.downGas(X, Y, Z, G, Xd, Yd, Zd)
+	assert Gd.shape == (2, 5, 2, 2, 4)
+	assert np.allclose(msr.gasTotals(Gd, dVd), msr.gasTotals(G, dV))
+	assert np.isclose(Gd[1, 2, 1, 0, 3], G[1, 2, 2:4, 0:2, 6:8].mean())
+	Gu = msr.upGas(Xd, Yd, Zd, Gd, X, Y, Z)
+	assert Gu.shape == G.shape
+	assert np.allclose(msr.gasTotals(Gu, dV), msr.gasTotals(Gd, dVd))
+
+def test_flux_conservation():
+	rng = np.random.default_rng(2)
+	M = rng.random((3, 5, 5, 9))
+	Mu = msr.upFlux(0, 0, 0, M, 0, 0, 0)
+	assert Mu.shape == (3, 9, 9, 17)
+	assert np.allclose(msr.fluxTotals(Mu), msr.fluxTotals(M))
+	Md = msr.downFlux(0, 0, 0, Mu, 0, 0, 0)
+	assert Md.shape == M.shape
+	assert np.allclose(msr.fluxTotals(Md), msr.fluxTotals(M))
+
+def test_MaxDiv():
+	# Uniform flux in i is divergence free
+	M = np.zeros((3, 3, 4, 5))
+	M[msr.IDIR] = 1.0
+	assert np.allclose(msr.MaxDiv(M), 0.0)
+	M[msr.IDIR, 1, 2, 3] = 2.0
+	Div = msr.MaxDiv(M)
+	assert Div.shape == (2, 3, 4)
+	assert Div[1, 2, 3] == -1.0 and Div[1, 2, 2] == 1.0
+
+def test_volt_rcm():
+	rng = np.random.default_rng(3)
+	G = rng.random((3, 8, 4, 2))
+	Gu = msr.upVolt(G)
+	assert Gu.shape == (3, 16, 8, 2)
+	assert np.allclose(msr.downVolt(Gu), G)
+	Q = rng.random((4, 10, 6))
+	Qu = msr.upRCM(Q, Ni=6, Nj=10)
+	assert Qu.shape == (4, 18, 6)
+	assert np.array_equal(Qu[:, -2:, :], Qu[:, :2, :])
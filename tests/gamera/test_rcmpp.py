@@ -1,6 +1,7 @@
 import pytest
 import numpy as np
 from kaipy.gamera.rcmpp import RCMEq
+from kaipy.gamera import rcmpp
 
 # filepath: /glade/u/home/wiltbemj/src/kaipy-private/kaipy/gamera/test_rcmpp.py
 import numpy.ma as ma
@@ -49,4 +50,58 @@ def test_RCMEq_mask_xyz(rcmdata):
     expected_bmX = ma.masked_array([8.06225775, 9.43398113, 10.81665383], mask=[True, True, True])
     expected_bmY = ma.masked_array([4.0, 5.0, 6.0], mask=[True, True, True])
     assert np.array_equal(bmX.mask, expected_bmX.mask)
-    assert np.array_equal(bmY.mask, expected_bmY.mask)
\ No newline at end of file
+    assert np.array_equal(bmY.mask, expected_bmY.mask)
+
+class CountingRCMData:
+    # Step dependent 2D data that counts the reads
+    def __init__(self, Ni=6, Nj=5):
+        rng = np.random.default_rng(0)
+        self.Ni, self.Nj = Ni, Nj
+        self.base = {vID: rng.uniform(-1, 1, (Ni, Nj)) for vID in rcmpp.insetVars}
+        self.reads = {}
+
+    def GetVar(self, vID, nStp, doVerb=True):
+        self.reads[(vID, nStp)] = self.reads.get((vID, nStp), 0) + 1
+        if vID == "IOpen":
+            return np.where(self.base[vID] > 0, 1.0, -1.0)
+        V = self.base[vID] + nStp
+        if vID in ["xMin", "yMin"]:
+            V = 5*V
+        return V
+
+def test_RCMSnapshot_shared_reads():
+    rcmdata = CountingRCMData()
+    nStp = 2
+    bmX, bmY = RCMEq(rcmdata, nStp, doMask=True, doVerb=False)
+    I = rcmpp.GetMask(rcmdata, nStp, doVerb=False)
+    P = rcmpp.GetVarMask(rcmdata, nStp, "P", I, doVerb=False)
+    pot, pVals = rcmpp.GetPotential(rcmdata, nStp, I, doVerb=False)
+
+    direct = dict(rcmdata.reads)
+    rcmdata.reads = {}
+    snap = rcmpp.RCMSnapshot(rcmdata, nStp)
+    sX, sY = RCMEq(snap, nStp, doMask=True)
+    assert np.array_equal(rcmpp.GetMask(snap, nStp), I)
+    assert np.array_equal(snap.GetMask(), I)
+    assert np.array_equal(rcmpp.GetVarMask(snap, nStp, "P"), P)
+    assert np.array_equal(rcmpp.GetVarMask(snap, nStp, "P").mask, P.mask)
+    sPot, sVals = rcmpp.GetPotential(snap, nStp)
+    assert 0 < I.sum() < I.size
+    assert np.array_equal(sX.mask, bmX.mask)
+    assert np.allclose(sX.data, bmX.data) and np.allclose(sY.data, bmY.data)
+    assert np.allclose(sPot, pot) and np.allclose(sVals, pVals)
+    # Every variable is read once
+    assert all(n == 1 for n in rcmdata.reads.values())
+    assert sum(rcmdata.reads.values()) < sum(direct.values())
+    with pytest.raises(ValueError):
+        snap.GetVar("P", nStp+1)
+
+def test_PrefetchSnapshots():
+    rcmdata = CountingRCMData()
+    sIds = [1, 3, 4, 7]
+    snaps = list(rcmpp.PrefetchSnapshots(rcmdata, sIds, vIDs=["xMin", "P"], nAhead=2))
+    assert [s.nStp for s in snaps] == sIds
+    for s in snaps:
+        assert sorted(s.Vars.keys()) == ["P", "xMin"]
+        assert np.array_equal(s.GetVar("P"), rcmdata.GetVar("P", s.nStp))
+    assert all(rcmdata.reads[("P", s)] == 2 for s in sIds)
@@ -0,0 +1,84 @@
+import pytest
+import numpy as np
+import h5py
+from scipy import interpolate
+
+# FILE: kaipy/gamhelio/lib/test_innerbc.py
+
+from kaipy.gamera.gamGrids import GenKSph
+from kaipy.gamhelio.lib.innerbc import (
+	linWeights, BilinearMap, HelioBCGrid, cellCenters, WriteInnerBC
+)
+
+def test_linWeights():
+	xs = np.array([0.0, 1.0, 3.0])
+	i0, w = linWeights(xs, np.array([-1.0, 0.5, 2.0, 3.0, 4.0]))
+	assert np.array_equal(i0, [0, 0, 1, 1, 1])
+	assert np.allclose(w, [0.0, 0.5, 0.5, 1.0, 1.0])
+
+def test_BilinearMap_matches_spline():
+	rng = np.random.default_rng(1)
+	pS = np.sort(rng.random(20))*2*np.pi
+	tS = np.sort(rng.random(15))*np.pi
+	Q = rng.random((20, 15))
+	pD = np.linspace(-0.5, 7.0, 33)
+	tD = np.linspace(-0.5, 3.5, 17)
+	fQ = interpolate.RectBivariateSpline(pS, tS, Q, kx=1, ky=1)
+	bMap = BilinearMap(pS, tS, pD, tD)
+	assert bMap.shape == (33, 17)
+	assert np.allclose(bMap(Q), fQ(pD, tD))
+
+def test_BilinearMap_trailing_dims():
+	pS = np.linspace(0, 1, 5)
+	tS = np.linspace(0, 1, 4)
+	Q = np.random.rand(5, 4, 3)
+	bMap = BilinearMap(pS, tS, np.linspace(0, 1, 7), np.linspace(0, 1, 6))
+	Qi = bMap(Q)
+	assert Qi.shape == (7, 6, 3)
+	assert np.allclose(Qi[..., 1], bMap(Q[..., 1]))
+
+def test_cellCenters():
+	x = np.arange(27.0).reshape(3, 3, 3)
+	xc = cellCenters(x)
+	assert xc.shape == (2, 2, 2)
+	assert xc[0, 0, 0] == pytest.approx(x[:2, :2, :2].mean())
+
+def test_HelioBCGrid():
+	Ng = 4
+	X3, Y3, Z3 = GenKSph(Ni=128, Nj=40, Nk=24, Rin=21.5, Rout=220, tMin=0.1, tMax=0.9)
+	bcG = HelioBCGrid(X3, Y3, Z3, Ng)
+	assert bcG.R0 == pytest.approx(21.5)
+	assert bcG.P_out.shape == (25, 41, Ng+1)
+	assert bcG.Rc.shape == (24, 40, Ng)
+	assert bcG.pC.shape == (24,)
+	assert bcG.tC.shape == (40,)
+	assert bcG.pK.shape == (25,)
+	assert np.all(bcG.ghostScale() > 1.0)
+
+def test_WriteInnerBC(tmpdir):
+	X3, Y3, Z3 = GenKSph(Ni=128, Nj=40, Nk=24, Rin=21.5, Rout=220, tMin=0.1, tMax=0.9)
+	bcG = HelioBCGrid(X3, Y3, Z3, 4)
+	fOut = str(tmpdir.join("innerbc.h5"))
+	steps = ({"rho": np.full((24, 40, 4), n)} for n in range(3))
+	assert WriteInnerBC(fOut, bcG, [58000.0, 58001.0, 58002.0], steps) == 3
+	with h5py.File(fOut, 'r') as hf:
+		assert hf["X"].shape == bcG.P_out.shape
+		assert hf["Step#2"].attrs["MJD"] == 58002.0
+		assert np.all(hf["Step#1/rho"][:] == 1)
+
+def test_WriteInnerBC_root(tmpdir):
+	X3, Y3, Z3 = GenKSph(Ni=128, Nj=40, Nk=24, Rin=21.5, Rout=220, tMin=0.1, tMax=0.9)
+	bcG = HelioBCGrid(X3, Y3, Z3, 4)
+	fOut = str(tmpdir.join("innerbc.h5"))
+	fGrid = str(tmpdir.join("innerbc_OHighostgr.h5"))
+	steps = ({"rho": np.full((24, 40, 4), n), "vr": np.full((24, 40, 4), 2.0*n)} for n in range(2))
+	assert WriteInnerBC(fOut, bcG, [58000.0, 58001.0], steps, doRoot=True, fGrid=fGrid) == 2
+	with h5py.File(fOut, 'r') as hf:
+		# Static runs read the first step from the root
+		assert hf.attrs["MJD"] == 58000.0
+		assert np.all(hf["rho"][:] == 0) and hf["vr"].shape == (24, 40, 4)
+		assert np.all(hf["Step#1/vr"][:] == 2.0)
+	with h5py.File(fGrid, 'r') as hf:
+		assert hf["Z"].shape == bcG.R_out.shape
+		assert hf["Step#1"].attrs["MJD"] == 58001.0
+		assert np.all(hf["Step#1/rho"][:] == 1)
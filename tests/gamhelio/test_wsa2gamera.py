@@ -0,0 +1,121 @@
+import pytest
+import numpy as np
+import h5py
+from astropy.io import fits
+
+from kaipy.kdefs import JD2MJD
+from kaipy.scripts.preproc.wsa2gamera import wsa2gamera, expand_map_list
+
+Nth, Nph = 18, 36
+
+def write_map(fName, jd, seed):
+	#Small synthetic WSA map, Br [nT] and V [km/s] (normalized units)
+	rng = np.random.default_rng(seed)
+	data = np.zeros((2, Nth, Nph))
+	data[0] = 100.0*rng.standard_normal((Nth, Nph))
+	data[1] = 400.0 + 300.0*rng.random((Nth, Nph))
+	hdu = fits.PrimaryHDU(data)
+	hdu.header['JULDATE'] = jd
+	hdu.writeto(fName)
+	return fName
+
+def write_config(tmpdir, wsaFile, ibcFile):
+	fCfg = str(tmpdir.join(ibcFile + ".ini"))
+	with open(fCfg, 'w') as f:
+		f.write("""[Gamera]
+gameraGridFile = heliogrid.h5
+GridDir = {d}
+gameraIbcFile = {ibc}
+IbcDir = {d}
+
+[WSA]
+wsafile = {wsa}
+gauss_smooth_width = 0
+density_temperature_infile = False
+normalized = True
+
+[Constants]
+gamma = 1.5
+Nghost = 4
+Tsolar = 25.38
+TCS = 1.e6
+nCS = 1100.
+
+[Normalization]
+B0 = 1.e-3
+n0 = 200.
+
+[Grid]
+tMin = 0.1
+tMax = 0.9
+Rin = 21.5
+Rout = 220.
+Ni = 128
+Nj = 40
+Nk = 24
+""".format(d=str(tmpdir), ibc=ibcFile, wsa=wsaFile))
+	return fCfg
+
+#Output of the single-map converter before the batch rewrite on write_map(.., 2458001.25, 0),
+#values at (k,j,i) = (0,0,0), (5,17,2), (23,39,3) and the sum over the ghost region
+refIdx = [(0, 0, 0), (5, 17, 2), (23, 39, 3)]
+refVals = {
+	'br': ([-3434863.100985, -2992127.329854, 4480870.478728], -1553566900.004),
+	'br_kface': ([-3434863.100985, -2260693.290887, -5352882.713288], -1334372250.007),
+	'et_kedge': ([305.040997632, 229838.8471086, -47924.7193425], 13082077.73724),
+	'rho': ([695.3407035203, 649.8001946144, 437.5597515228], 2438816.732277),
+	'temp': ([-272584409506700.0, -315009436560000.0, -1225704335760000.0], -1.024532323967e+19),
+	'vr': ([0.005930348573089, 0.004891928796685, 0.005790584183721], 21.09466181891),
+	'vr_kface': ([0.005930348573089, 0.005062683772911, 0.005719620000414], 21.08252795062),
+}
+refMJD = 2458001.25 - JD2MJD
+
+@pytest.fixture
+def wsaMaps(tmpdir):
+	#Written out of time order on purpose
+	jds = [2458001.25, 2458000.75, 2458000.25]
+	return [write_map(str(tmpdir.join("wsa_%d.fits" % n)), jd, n) for n, jd in enumerate(jds)]
+
+def test_expand_map_list(tmpdir, wsaMaps):
+	maps = expand_map_list([str(tmpdir.join("wsa_*.fits"))])
+	assert maps == wsaMaps[::-1]
+	with pytest.raises(FileNotFoundError):
+		expand_map_list([str(tmpdir.join("nope_*.fits"))])
+
+@pytest.mark.parametrize("ncpus", [1, 2])
+def test_batch_matches_single(tmpdir, wsaMaps, ncpus):
+	fCfg = write_config(tmpdir, wsaMaps[0], "batch.h5")
+	wsa2gamera({"ConfigFileName": fCfg, "maps": [str(tmpdir.join("wsa_*.fits"))], "ncpus": ncpus})
+	# Reference, every map converted on its own
+	refs = []
+	for n, m in enumerate(wsaMaps):
+		fOne = write_config(tmpdir, m, "single%d.h5" % n)
+		wsa2gamera({"ConfigFileName": fOne})
+		refs.append(str(tmpdir.join("single%d.h5" % n)))
+	with h5py.File(str(tmpdir.join("batch.h5")), 'r') as hB:
+		sKeys = sorted(k for k in hB.keys() if k.startswith("Step#"))
+		assert sKeys == ["Step#0", "Step#1", "Step#2"]
+		MJDs = [hB[k].attrs["MJD"] for k in sKeys]
+		assert np.all(np.diff(MJDs) > 0)
+		# Steps are in time order, maps were written newest first
+		for n, fRef in zip([2, 1, 0], refs):
+			with h5py.File(fRef, 'r') as hR:
+				assert list(hR.keys()) == ["Step#0", "X", "Y", "Z"]
+				assert hR["Step#0"].attrs["MJD"] == MJDs[n]
+				assert np.isclose(MJDs[n], fits.getval(wsaMaps[2-n], "JULDATE") - JD2MJD)
+				for vID in hR["Step#0"].keys():
+					assert np.array_equal(hB["Step#%d" % n][vID][:], hR["Step#0"][vID][:])
+				for xID in ["X", "Y", "Z"]:
+					assert np.array_equal(hB[xID][:], hR[xID][:])
+
+def test_matches_reference(tmpdir, wsaMaps):
+	fCfg = write_config(tmpdir, wsaMaps[0], "ref.h5")
+	wsa2gamera({"ConfigFileName": fCfg})
+	with h5py.File(str(tmpdir.join("ref.h5")), 'r') as hf:
+		grp = hf["Step#0"]
+		assert grp.attrs["MJD"] == pytest.approx(refMJD, abs=1e-9)
+		assert sorted(grp.keys()) == sorted(refVals.keys())
+		for vID, (vals, vSum) in refVals.items():
+			V = grp[vID][:]
+			assert np.allclose([V[i[:V.ndim]] for i in refIdx], vals, rtol=1e-9, atol=0)
+			assert np.isclose(V.sum(), vSum, rtol=1e-9, atol=0)
@@ -0,0 +1,79 @@
+import pytest
+import numpy as np
+import h5py
+
+Ni = 12
+Nj = 16
+Nt = 5
+
+def write_raiju_h5(fname, Ni=Ni, Nj=Nj, Nt=Nt, seed=0):
+	#Synthetic RAIJU output, datasets stored in Fortran order like the model writes them
+	rng = np.random.default_rng(seed)
+	nK = {0: 1, 1: 6, 2: 8}  #Flav -> number of channels
+	Nk = sum(nK.values())
+	colat = np.linspace(0.2, 1.0, Ni+1)
+	lon = np.linspace(0, 2*np.pi, Nj+1)
+	X, Y = np.meshgrid(colat, lon, indexing='ij')
+	with h5py.File(fname, 'w') as f5:
+		f5.create_dataset("X", data=X.T)
+		f5.create_dataset("Y", data=Y.T)
+		f5.create_dataset("Grid/areaCC", data=(0.01 + rng.random((Ni, Nj))).T)
+		f5.create_dataset("Grid/BrCC", data=(3e4 + 1e4*rng.random((Ni, Nj))).T)
+		pl = f5.create_group("Planet")
+		pl.attrs['Rad_ionosphere'] = 6.5e6
+		pl.attrs['Rad_surface'] = 6.38e6
+		kS = 0
+		for n, (flav, N) in enumerate(nK.items()):
+			sp = f5.create_group("Species/Spc%d" % n)
+			sp.attrs['N'] = N
+			sp.attrs['flav'] = flav
+			sp.attrs['spcType'] = n
+			sp.attrs['kStart'] = kS
+			sp.attrs['kEnd'] = kS + N - 1
+			sp.attrs['numNuc_p'] = 1
+			sp.attrs['amu'] = 1.0
+			sp.attrs['q'] = 1.0 if flav != 1 else -1.0
+			sgn = -1 if flav == 1 else 1
+			sp.create_dataset('alami', data=sgn*np.concatenate([[0.0], np.logspace(1, 5, N)]))
+			kS += N
+		for n in range(Nt):
+			s5 = f5.create_group("Step#%d" % n)
+			s5.attrs['time'] = 60.0*n
+			s5.attrs['MJD'] = 58000.0 + n/1440.0
+			r = np.linspace(2, 10, Ni+1)[:, None]*np.ones(Nj+1)
+			s5.create_dataset('xmin', data=(r*np.cos(Y)).T)
+			s5.create_dataset('ymin', data=(r*np.sin(Y)).T)
+			s5.create_dataset('active', data=rng.integers(-1, 2, (Ni, Nj)).astype(float).T)
+			s5.create_dataset('bVol_cc', data=(0.01 + rng.random((Ni, Nj))).T)
+			for vID in ['Pressure', 'Density', 'Pavg_in', 'Davg_in']:
+				s5.create_dataset(vID, data=(0.1 + rng.random((Ni, Nj, len(nK)+1))).T)
+			s5.create_dataset('intensity', data=rng.random((Ni, Nj, Nk)).T)
+	return fname
+
+def write_mhdrcm_h5(fname, Ni=Ni, Nj=Nj, Nt=Nt, seed=1):
+	rng = np.random.default_rng(seed)
+	#Longitude along i, latitude along j
+	lon = np.linspace(0, 360, Ni+1)
+	lat = np.linspace(50, 80, Nj+1)
+	X, Y = np.meshgrid(lon, lat, indexing='ij')
+	with h5py.File(fname, 'w') as f5:
+		f5.create_dataset("X", data=X)
+		f5.create_dataset("Y", data=Y)
+		for n in range(Nt):
+			s5 = f5.create_group("Step#%d" % n)
+			s5.attrs['time'] = 60.0*n
+			s5.attrs['MJD'] = 58000.0 + n/1440.0
+			for vID in ['xMin', 'yMin']:
+				s5.create_dataset(vID, data=10*rng.standard_normal((Ni, Nj)))
+			s5.create_dataset('IOpen', data=rng.integers(-1, 2, (Ni, Nj)).astype(float))
+			for vID in ['P', 'Pe', 'bVol']:
+				s5.create_dataset(vID, data=rng.random((Ni, Nj)))
+	return fname
+
+@pytest.fixture
+def raiju_file(tmpdir):
+	return write_raiju_h5(str(tmpdir.join("test.raiju.h5")))
+
+@pytest.fixture
+def mhdrcm_file(tmpdir):
+	return write_mhdrcm_h5(str(tmpdir.join("test.mhdrcm.h5")))
@@ -0,0 +1,24 @@
+import pytest
+import numpy as np
+
+import kaipy.raiju.lambdautils.DistTypes as dT
+from kaipy.raiju.lambdautils.AlamParams import SpecParams
+
+def loopAlami(dist, n, amin, amax):
+	# Interfaces one k at a time, as DT_Wolf.genAlami used to
+	kmin = dist.kmin
+	kmax = n+1 if dist.kmax == -1 else dist.kmax
+	alams = []
+	for k in range(n+1):
+		kfrac = (k-kmin)/(kmax-kmin)
+		pstar = (1-kfrac)*dist.p1 + kfrac*dist.p2
+		alams.append((amax-amin)*((k - kmin + 0.5)/(kmax-kmin + 0.5))**pstar + amin)
+	return alams
+
+@pytest.mark.parametrize("kmin,kmax", [(0, -1), (0, 10), (0, 30)])
+def test_Wolf_genAlami(kmin, kmax):
+	dist = dT.DT_Wolf(p1=1.0, p2=2.0, kmin=kmin, kmax=kmax)
+	sP = SpecParams(n=20, amin=10.0, amax=1.0e5, distType=dist, flav=2, numNuc_p=1, numNuc_n=0, q=1)
+	alami = sP.genAlami()
+	assert isinstance(alami, list) and len(alami) == 21
+	assert np.allclose(alami, loopAlami(dist, 20, 10.0, 1.0e5), rtol=1e-14)
@@ -0,0 +1,63 @@
+import pytest
+import numpy as np
+import h5py
+
+import kaipy.kaiH5 as kh5
+import kaipy.raiju.raijuUtils as ru
+import kaipy.raiju.dst as dst
+import kaipy.raiju.m2m as m2m
+import kaipy.raiju.diagnostics as diag
+
+def test_raijuDiag_matches_step(raiju_file):
+	raiI = ru.RAIJUInfo(raiju_file, useBars=False)
+	res = diag.raijuDiag(raiI, rmax=6, nChunk=2, doBar=False)
+	for k in diag.raijuVars:
+		assert res[k].shape == (raiI.Nt,)
+	with h5py.File(raiju_file, 'r') as f5:
+		for n, sStr in enumerate(raiI.stepStrs):
+			_, _, dTot, dEle = dst.DPSDst_raiju(raiI, f5[sStr], rmax=6)
+			assert np.isclose(res["DPSDst_tot"][n], np.ma.sum(dTot), rtol=1e-10)
+			assert np.isclose(res["DPSDst_ele"][n], np.ma.sum(dEle), rtol=1e-10)
+			m2mS = m2m.checkMom2Mom_step(raiI, f5[sStr], spcID="HOTP")
+			assert np.isclose(res["fracP_min"][n], np.min(m2mS.frac_P))
+			assert np.isclose(res["fracP_max"][n], np.max(m2mS.frac_P))
+			assert np.isclose(res["fracD_avg"][n], np.average(m2mS.frac_D))
+	assert np.allclose(res["time"], raiI.times)
+
+def test_raijuDiag_matches_m2m(raiju_file):
+	raiI = ru.RAIJUInfo(raiju_file, useBars=False)
+	res = diag.raijuDiag(raiI, doBar=False)
+	ref = m2m.checkMom2Mom_run(raiI, spcID="HOTP", doBar=False)
+	for k in ["fracP_min", "fracP_max", "fracP_avg", "fracD_min", "fracD_max", "fracD_avg"]:
+		assert np.array_equal(res[k], ref[k], equal_nan=True)
+
+def test_mhdrcmDiag_matches_step(mhdrcm_file):
+	mrI = kh5.H5Info(mhdrcm_file, useBars=False)
+	res = diag.mhdrcmDiag(mrI, rmax=6, nChunk=3, doBar=False)
+	with h5py.File(mhdrcm_file, 'r') as f5:
+		br, areaCC = dst.calcMRIonoVars(f5['Step#0'])
+		for n, sStr in enumerate(mrI.stepStrs):
+			_, _, dTot, dEle = dst.DPSDst_mhdrcm(mrI, f5[sStr], rmax=6, br=br, areaCC=areaCC)
+			assert np.isclose(res["DPSDst_tot"][n], np.ma.sum(dTot), rtol=1e-10)
+			assert np.isclose(res["DPSDst_ele"][n], np.ma.sum(dEle), rtol=1e-10)
+
+def test_raijuDiag_subset_parallel(raiju_file):
+	raiI = ru.RAIJUInfo(raiju_file, useBars=False)
+	ref = diag.raijuDiag(raiI, doBar=False)
+	res = diag.raijuDiag(raiI, iSteps=[1, 3], nChunk=1, nWorkers=2, doBar=False)
+	assert np.array_equal(res["step"], ref["step"][[1, 3]])
+	for k in diag.raijuVars:
+		assert np.allclose(res[k], ref[k][[1, 3]])
+
+def test_writeDiag_readDiag(raiju_file, tmpdir):
+	raiI = ru.RAIJUInfo(raiju_file, useBars=False)
+	res = diag.raijuDiag(raiI, doBar=False)
+	fOut = str(tmpdir.join("diag.h5"))
+	diag.writeDiag(fOut, res, attrs={"rmax": 6})
+	back = diag.readDiag(fOut)
+	assert set(back.keys()) == set(res.keys())
+	for k in res.keys():
+		assert np.array_equal(back[k], res[k])
+	with h5py.File(fOut, 'r') as f5:
+		assert f5.attrs["rmax"] == 6
+		assert f5["DPSDst_tot"].attrs["units"] == "nT"
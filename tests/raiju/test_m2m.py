@@ -0,0 +1,63 @@
+import pytest
+import numpy as np
+import h5py
+
+import kaipy.kdefs as kd
+import kaipy.raiju.raijuUtils as ru
+import kaipy.raiju.m2m as m2m
+import kaipy.raiju.diagnostics as diag
+
+@pytest.mark.parametrize("spcID", ["BLK", "HOTP", "HOTE"])
+def test_step_matches_pnt(raiju_file, spcID):
+	raiI = ru.RAIJUInfo(raiju_file, useBars=False)
+	with h5py.File(raiju_file, 'r') as f5:
+		s5 = f5[raiI.stepStrs[2]]
+		res = m2m.checkMom2Mom_step(raiI, s5, spcID=spcID)
+		isBuf = ru.getVar(s5, 'active') == ru.domain['BUFFER']
+		assert np.array_equal(res.frac_P.mask, ~isBuf)
+		for i, j in zip(*np.nonzero(isBuf)):
+			pnt = m2m.checkMom2Mom_pnt(raiI, s5, i, j, spcID=spcID)
+			assert np.isclose(res.frac_P[i, j], pnt.p_rai/pnt.p_mhd)
+			assert np.isclose(res.frac_D[i, j], pnt.d_rai/pnt.d_mhd)
+
+def test_intensityMoments_maxwell():
+	mass = kd.Mp_cgs*1e-3
+	alami = np.concatenate([[0.0], np.geomspace(1.0, 1.0e7, 400)])
+	bVol = np.array([[0.5, 1.0], [2.0, 4.0]])
+	n0, kT = 2.0, 5.0
+	Ec = 0.5*(alami[1:] + alami[:-1])*bVol[..., None]**(-2./3.)*1e-3
+	inten = ru.intensity_maxwell(n0, mass, Ec, kT)
+	n, P = m2m.intensityMoments(inten, alami, bVol, mass)
+	assert n.shape == bVol.shape
+	assert np.allclose(n, n0, rtol=1e-2)
+	#P = nkT, keV/cc -> nPa
+	assert np.allclose(P, n0*kT*kd.kev2J*1e6*1e9, rtol=1e-2)
+
+def test_run_matches_maps(raiju_file):
+	raiI = ru.RAIJUInfo(raiju_file, useBars=False)
+	res = m2m.checkMom2Mom_run(raiI, spcID="HOTP", nChunk=2, doBar=False)
+	static = m2m.m2mStatic(raiI, "HOTP")
+	with h5py.File(raiju_file, 'r') as f5:
+		for n, sStr in enumerate(raiI.stepStrs):
+			s5 = f5[sStr]
+			maps = m2m.m2mMaps([s5], static)
+			isIn = ru.getVar(s5, 'active') != ru.domain['INACTIVE']
+			spc = raiI.species[static["idx_rai"]-1]
+			inten = ru.getVar(s5, 'intensity')[..., spc.kStart:spc.kEnd]
+			d_int, p_int = m2m.intensityMoments(inten, np.abs(spc.alami), ru.getVar(s5, 'bVol_cc'), static["mass"])
+			p_rai = ru.getVar(s5, 'Pressure')[..., static["idx_rai"]]
+			assert np.allclose(maps["p_int"][0], p_int)
+			assert np.isclose(res["fracP_int_max"][n], (p_int/p_rai)[isIn].max())
+			assert np.isclose(res["fracD_int_avg"][n], (d_int/ru.getVar(s5, 'Density')[..., static["idx_rai"]])[isIn].mean())
+	#Same buffer stats as the whole-run diagnostics
+	ref = diag.raijuDiag(raiI, spcID="HOTP", doBar=False)
+	for k in ["fracP_min", "fracP_max", "fracP_avg", "fracD_min", "fracD_max", "fracD_avg"]:
+		assert np.allclose(res[k], ref[k])
+	assert np.allclose(res["time"], raiI.times)
+
+def test_run_parallel(raiju_file):
+	raiI = ru.RAIJUInfo(raiju_file, useBars=False)
+	ref = m2m.checkMom2Mom_run(raiI, spcID="HOTE", doBar=False)
+	res = m2m.checkMom2Mom_run(raiI, spcID="HOTE", iSteps=[0, 3, 4], nChunk=1, nWorkers=2, doBar=False)
+	for k in ref.keys():
+		assert np.allclose(res[k], ref[k][[0, 3, 4]], equal_nan=True)
@@ -0,0 +1,58 @@
+import pytest
+import numpy as np
+from scipy.integrate import quad
+
+import kaipy.kdefs as kd
+import kaipy.raiju.raijuUtils as ru
+
+mass = kd.Mp_cgs*1e-3
+
+@pytest.mark.parametrize("kappa", [None, 3, 6])
+def test_fracs_match_intensity(kappa):
+	#Particles below E from the analytic intensity, n = 4pi*int(j/v)dE
+	n, kT = 2.0, 5.0
+	vfac = np.sqrt(2*kd.kev2J/mass)*1e2  #cm/s for 1 keV
+	def dndE(E):
+		if kappa is None:
+			j = ru.intensity_maxwell(n, mass, E, kT)
+		else:
+			j = ru.intensity_kappa(n, mass, E, kT, kappa)
+		return 4*np.pi*j/(vfac*np.sqrt(E))
+	for E in [0.5, 5.0, 40.0]:
+		ref = quad(dndE, 0, E, limit=200)[0]/n
+		F = ru.maxwellFrac(E, kT) if kappa is None else ru.kappaFrac(E, kT, kappa)
+		assert np.isclose(F, ref, rtol=1e-6)
+
+@pytest.mark.parametrize("kappa", [None, 4])
+def test_moments2Eta(kappa):
+	rng = np.random.default_rng(0)
+	Nt, Ni, Nj = 2, 3, 4
+	n = 0.1 + rng.random((Nt, Ni, Nj))
+	kT = 1 + 10*rng.random((Nt, Ni, Nj))
+	bVol = 0.01 + rng.random((Nt, Ni, Nj))
+	alami = np.concatenate(([0], np.geomspace(1, 1e9, 80)))
+	eta = ru.moments2Eta(n, kT, alami, bVol, kappa)
+	assert eta.shape == (Nt, Ni, Nj, len(alami)-1)
+	assert np.all(eta >= 0)
+	#Channels cover (nearly) the whole distribution
+	assert np.allclose(ru.etak2Den(eta, bVol[..., np.newaxis]).sum(axis=-1), n, rtol=1e-3)
+	#Same as one cell at a time
+	fr = ru.channelFracs(alami, bVol[1, 2, 3], kT[1, 2, 3], kappa)
+	assert np.allclose(eta[1, 2, 3], n[1, 2, 3]*fr*bVol[1, 2, 3]*1e9)
+
+@pytest.mark.parametrize("kappa", [None, 6])
+def test_intensityGrid(kappa):
+	rng = np.random.default_rng(1)
+	n = 0.1 + rng.random((3, 4))
+	kT = 1 + 10*rng.random((3, 4))
+	bVol = 0.01 + rng.random((3, 4))
+	alamc = -np.geomspace(10, 1e5, 7)  #Electron channels are negative
+	J = ru.intensityGrid(n, mass, alamc, bVol, kT, kappa)
+	assert J.shape == (3, 4, 7)
+	for i, j in [(0, 0), (2, 3)]:
+		E = ru.lambda2Energy(np.abs(alamc), bVol[i, j])
+		if kappa is None:
+			ref = ru.intensity_maxwell(n[i, j], mass, E, kT[i, j])
+		else:
+			ref = ru.intensity_kappa(n[i, j], mass, E, kT[i, j], kappa)
+		assert np.allclose(J[i, j], ref)
@@ -68,4 +68,34 @@ def test_genPsphereSpecies():
     assert species.amaxs == [0]
     assert species.flav == 1
     assert species.fudge == 0
-    assert species.name == 'Plasmasphere'
\ No newline at end of file
+    assert species.name == 'Plasmasphere'
+def test_wolfLams():
+    # Many configurations at once agree with the channel-by-channel formula
+    n = 12
+    amin = np.array([0.1, 5.0, 10.0])
+    amax = np.array([1.0, 50.0, 1000.0])
+    p1 = np.array([3.0, 2.0, 1.5])
+    p2 = np.array([1.0, 1.0, 2.0])
+    lams = dT.wolfLams(np.arange(n), amin, amax, p1, p2)
+    assert lams.shape == (3, n)
+    for c in range(3):
+        for k in range(n):
+            pstar = (1-k/n)*p1[c] + (k/n)*p2[c]
+            ref = (amax[c]-amin[c])*((k + 0.5)/(n + 0.5))**pstar + amin[c]
+            assert np.isclose(lams[c, k], ref)
+    sP = SpecParams(n=n, amin=amin[1], amax=amax[1], distType=dT.DT_Wolf(p1=p1[1], p2=p2[1]), flav=1)
+    assert np.allclose(sP.genAlams(), lams[1])
+
+def test_wolfLams_mixed_kmax():
+    # -1 is resolved to the number of channels for each configuration on its own
+    n = 12
+    lams = dT.wolfLams(np.arange(n), [0.1, 0.1], [1.0, 1.0], [3.0, 3.0], [1.0, 1.0], kmax=[-1, 20])
+    assert np.allclose(lams[0], dT.wolfLams(np.arange(n), 0.1, 1.0, 3.0, 1.0, kmax=n))
+    assert np.allclose(lams[1], dT.wolfLams(np.arange(n), 0.1, 1.0, 3.0, 1.0, kmax=20))
+    assert np.all(np.isfinite(lams)) and np.all(np.diff(lams, axis=-1) > 0)
+
+def test_ValueSpec_spacing_lin():
+    vs = dT.ValueSpec(start=1.0, end=20.0, scaleType='spacing_lin', c=0.5)
+    line = vs.eval(True)
+    ref = [1.0 + np.sum([vs.c*j for j in range(k)]) for k in range(vs.n)]
+    assert np.allclose(line, ref)
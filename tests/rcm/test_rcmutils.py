@@ -2,6 +2,7 @@ import pytest
 import numpy as np
 import h5py
 from kaipy.rcm.rcmutils import getSpecieslambdata, getClosedRegionMask, getCumulPress, getValAtLoc_linterp, RCMSpeciesInfo, RCMInfo
+from kaipy.rcm.rcmutils import getValsAtLoc_linterp, getEnergyAtPressFrac, getSpeciesPress, getStepsPress, pressure_factor
 
 
 def test_getSpecieslambdata():
@@ -69,5 +70,96 @@ def test_RCMSpeciesInfo_single_cell():
     assert np.array_equal(species_info.alami, np.array([0, 0]))
 
 
+def loopCumulPress(ilamc, vm, eetas):
+    # Channel by channel reference
+    Nk, Nj, Ni = eetas.shape
+    pCumul = np.zeros((Nk, Nj, Ni))
+    for k in range(Nk):
+        pPar = pressure_factor*ilamc[k]*eetas[k]*vm**2.5*1E9
+        pCumul[k] = pPar if k == 0 else pCumul[k-1] + pPar
+    return pCumul
 
+def loopLinterp(val, xData, yData):
+    # Scan for the first point reaching val, as the scalar version always did
+    idx = 0
+    while idx < len(yData)-2 and yData[idx+1] < val:
+        idx += 1
+    m = (yData[idx+1]-yData[idx])/(xData[idx+1]-xData[idx])
+    b = yData[idx] - m*xData[idx]
+    return (val-b)/m
 
+def randomCubes(Nt=3, Nk=8, Nj=4, Ni=5, seed=0):
+    rng = np.random.default_rng(seed)
+    ilamc = np.geomspace(10, 1e4, Nk)
+    vm = rng.uniform(0.5, 2.0, (Nt, Nj, Ni))
+    eetas = rng.uniform(0, 1e10, (Nt, Nk, Nj, Ni))
+    return ilamc, vm, eetas
+
+def test_getCumulPress_steps():
+    ilamc, vm, eetas = randomCubes()
+    pCumul = getCumulPress(ilamc, vm, eetas)
+    pFrac = getCumulPress(ilamc, vm, eetas, doFraction=True)
+    assert pCumul.shape == eetas.shape
+    for n in range(vm.shape[0]):
+        pRef = loopCumulPress(ilamc, vm[n], eetas[n])
+        assert np.allclose(pCumul[n], pRef)
+        assert np.allclose(pFrac[n], pRef/pRef[-1])
+
+def test_getValsAtLoc_linterp():
+    xData = np.array([1, 2, 3, 4])
+    yData = np.array([2, 4, 6, 8])
+    vals = np.array([1.5, 2.5, 3.0, 5.0])
+    assert np.allclose(getValsAtLoc_linterp(vals, xData, yData), 2*vals)
+    assert np.allclose(getValsAtLoc_linterp(2*vals, xData, yData, getAxis='x'), vals)
+    # Many columns, data along axis 1
+    rng = np.random.default_rng(1)
+    Y = np.cumsum(rng.uniform(0, 1, (6, 10)), axis=1)
+    X = np.broadcast_to(np.arange(10.0), Y.shape)
+    vals = np.array([0.5, 2.0, 4.0])
+    locs = getValsAtLoc_linterp(vals, X, Y, getAxis='x', axis=1)
+    assert locs.shape == (3, 6)
+    for v in range(3):
+        for n in range(6):
+            assert np.isclose(locs[v, n], loopLinterp(vals[v], X[n], Y[n]))
+
+def test_getEnergyAtPressFrac():
+    ilamc, vm, eetas = randomCubes()
+    fracs = [0.1, 0.5, 0.9]
+    eFrac = getEnergyAtPressFrac(ilamc, vm, eetas, fracs)
+    assert eFrac.shape == (3,) + vm.shape
+    for n in range(vm.shape[0]):
+        pFrac = loopCumulPress(ilamc, vm[n], eetas[n])
+        pFrac = pFrac/pFrac[-1]
+        for j, i in [(0, 0), (2, 3), (3, 4)]:
+            energies = ilamc*vm[n, j, i]*1E-3
+            for f in range(3):
+                eRef = np.clip(loopLinterp(fracs[f], energies, pFrac[:, j, i]), energies[0], energies[-1])
+                assert np.isclose(eFrac[f, n, j, i], eRef)
+    assert np.all(np.diff(eFrac, axis=0) >= 0)
+
+def test_getSpeciesPress(tmpdir):
+    ilamc, vm, eetas = randomCubes(Nk=6)
+    # Plasmasphere channel, then negative (electron) and positive lambdas
+    alamc = np.concatenate(([0.0], -ilamc[:3], ilamc[3:]))
+    species = [RCMSpeciesInfo(1, 0, 0, 1, alamc[:1]),
+               RCMSpeciesInfo(3, 1, 1, 4, alamc[1:4]),
+               RCMSpeciesInfo(3, 2, 4, 7, alamc[4:])]
+    eetaAll = np.concatenate((np.ones_like(eetas[:, :1]), eetas), axis=1)
+    result = getSpeciesPress(species, vm, eetaAll, fracs=0.5, doCumul=True)
+    assert sorted(result.keys()) == [1, 2]
+    pCumul = getCumulPress(ilamc[:3], vm, eetas[:, :3])
+    assert np.allclose(result[1]['pCumul'], pCumul)
+    assert np.allclose(result[1]['pTot'], pCumul[:, -1])
+    assert np.allclose(result[2]['eFrac'], getEnergyAtPressFrac(ilamc[3:], vm, eetas[:, 3:], 0.5))
+
+    fname = str(tmpdir.join("synth.rcm.h5"))
+    with h5py.File(fname, 'w') as f5:
+        for n in range(vm.shape[0]):
+            g = f5.create_group("Step#%d" % (n))
+            g.create_dataset('rcmvm', data=vm[n])
+            g.create_dataset('rcmeeta', data=eetaAll[n])
+    sRes = getStepsPress(fname, species, [2, 0], fracs=[0.25, 0.75])
+    assert sRes[2]['pTot'].shape == (2,) + vm.shape[1:]
+    assert sRes[1]['eFrac'].shape == (2, 2) + vm.shape[1:]
+    assert np.allclose(sRes[2]['pTot'][0], result[2]['pTot'][2])
+    assert np.allclose(sRes[1]['eFrac'][1], getEnergyAtPressFrac(-alamc[1:4], vm[0], eetas[0, :3], [0.25, 0.75]))
@@ -66,3 +66,38 @@ def test_genWM_basic():
         assert result[2].shape == (41,)
         assert result[3].shape == (155,)
         assert result[4].shape == (155, 41, 97, 6)
+
+def test_ChorusPoly_reference():
+        Li = np.linspace(3.0, 7.0, 5)
+        Eki = np.linspace(-3.0, 0.3, 4)
+        polyArray = np.random.default_rng(0).uniform(-0.1, 0.1, (2, 3, 10))
+        result = ChorusPoly(Li, Eki, polyArray)
+        for k, m, i, j in np.ndindex(result.shape):
+                c = polyArray[k, m]
+                L, E = Li[i], Eki[j]
+                logTau = c[0] + c[1]*L + c[2]*E + c[3]*L**2 + c[4]*E**2 + c[5]*L**3 + c[6]*E**3 + \
+                        c[7]*L*E + c[8]*L**2*E + c[9]*L*E**2
+                assert np.isclose(result[k, m, i, j], 10.0**logTau*86400.0)
+
+def test_ReSample_stack():
+        L = np.linspace(3.0, 7.0, 11)
+        MLT = np.linspace(0, 24, 25)
+        xMLT = np.linspace(0, 24, 49)
+        rng = np.random.default_rng(1)
+        Qp = 10.0**(1.0 + 0.1*rng.random((2, 3, 11, 25)))
+        Qp[..., -1] = Qp[..., 0]
+        xQp = ReSample(L, MLT, Qp, xMLT)
+        assert xQp.shape == (2, 3, 11, 49)
+        for n in np.ndindex(2, 3):
+                assert np.allclose(xQp[n], ReSample(L, MLT, Qp[n], xMLT))
+        assert np.allclose(xQp[..., 0], xQp[..., -1])
+
+def test_genWM_dense():
+        params = wmParams(nKp=6, nMLT=49, nL=81, nEk=309)
+        Kpi, MLTi, Li, Eki, tau = genWM(params)
+        assert tau.shape == (309, 81, 49, 6)
+        assert np.all(tau > 0)
+        # The native energies/L-shells are recovered on the denser grid
+        Kp0, MLT0, L0, Ek0, tau0 = genWM(wmParams(nMLT=49))
+        assert np.allclose(Eki[::2], Ek0) and np.allclose(Li[::2], L0)
+        assert np.allclose(tau[::2, ::2], tau0, rtol=1e-8)
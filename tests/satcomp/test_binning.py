@@ -0,0 +1,63 @@
+#test_binning
+import numpy as np
+import pytest
+
+import kaipy.satcomp.binning as kbin
+import kaipy.satcomp.scutils as scutils
+
+def test_nearestIndex():
+    grid = np.concatenate(([2.0-1e-8], np.linspace(2, 15, 50), [15.0+1e-8]))
+    x = np.random.default_rng(0).uniform(0, 20, 1000)
+    x[:3] = [grid[4], 0.5*(grid[4]+grid[5]), np.nan]
+    idx = kbin.nearestIndex(grid, x)
+    ref = np.array([np.abs(grid-xi).argmin() for xi in x[3:]])
+    assert np.array_equal(idx[3:], ref)
+    assert idx[0] == 4 and idx[1] == 4 and idx[2] == -1
+
+def test_binIndex():
+    edges = np.array([0.0, 1.0, 2.0, 4.0])
+    idx = kbin.binIndex(edges, [-1.0, 0.0, 0.5, 1.0, 3.9, 4.0, 4.1, np.nan])
+    assert np.array_equal(idx, [-1, 0, 0, 1, 2, 2, -1, -1])
+    x = np.random.default_rng(1).uniform(-1, 5, 500)
+    h, _ = np.histogram(x, bins=edges)
+    assert np.array_equal(kbin.accumulate((kbin.binIndex(edges, x),), (3,)), h)
+
+def test_tentWeights():
+    grid = np.array([0.0, 1.0, 3.0])
+    i0, w0, w1 = kbin.tentWeights(grid, [0.25, 2.0, 3.0, 5.0])
+    assert np.array_equal(i0, [0, 1, 1, -1])
+    assert np.allclose(w0[:3], [0.75, 0.5, 0.0]) and np.allclose(w1[:3], [0.25, 0.5, 1.0])
+
+def test_overlapFracs():
+    og = np.array([1.0, 2.0, 4.0, 7.0])
+    ogL = np.array([0.5, 1.5, 3.0, 5.5])
+    ogU = np.array([1.5, 3.0, 5.5, 8.5])
+    ng = np.linspace(0, 9, 7)
+    ngL = ng - 0.75
+    ngU = ng + 0.75
+    fracs = kbin.overlapFracs(ogL, ogU, ngL, ngU)
+    assert fracs.shape == (7, 4)
+    ref = np.zeros((7, 4))
+    for n, row in enumerate(scutils.getWeights_ConsArea(og, ogL, ogU, ng, ngL, ngU)):
+        for k, f in row:
+            ref[n, k] = f
+    assert np.allclose(fracs, ref)
+    # One old grid per point
+    fracs2 = kbin.overlapFracs(np.stack([ogL, 2*ogL]), np.stack([ogU, 2*ogU]), ngL, ngU)
+    assert fracs2.shape == (2, 7, 4)
+    assert np.allclose(fracs2[0], ref)
+
+def test_binMean():
+    rng = np.random.default_rng(2)
+    iT = rng.integers(0, 3, 2000)
+    iE = rng.integers(-1, 5, 2000)
+    w = rng.random(2000)
+    (mean, sq), counts = kbin.binMean((iT, iE), (3, 4), [w, w**2])
+    for t in range(3):
+        for e in range(4):
+            isB = (iT == t) & (iE == e)
+            assert counts[t, e] == isB.sum()
+            assert np.isclose(mean[t, e], w[isB].mean())
+            assert np.isclose(sq[t, e], (w[isB]**2).mean())
+    mean, counts = kbin.binMean((np.array([0]),), (2,), np.array([1.0]))
+    assert mean[0] == 1.0 and np.isnan(mean[1])
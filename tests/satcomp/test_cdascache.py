@@ -0,0 +1,124 @@
+#test_cdascache
+import datetime
+import numpy as np
+import pytest
+import spacepy.datamodel as dm
+from unittest.mock import patch
+
+import kaipy.satcomp.cdascache as cdascache
+import kaipy.satcomp.scutils as scutils
+
+T0 = datetime.datetime(2017, 9, 7)
+
+def makeData(N=60, dt=60):
+    t = np.array([T0 + datetime.timedelta(seconds=dt*n) for n in range(N)])
+    data = dm.SpaceData(attrs={'Source_name': 'Test>Spacecraft'})
+    data['Epoch'] = dm.dmarray(t, attrs={'FIELDNAM': 'Time'})
+    data['XYZ_GSM'] = dm.dmarray(np.arange(3.0*N).reshape(N, 3), attrs={'DEPEND_0': 'Epoch', 'UNITS': 'km', 'FILLVAL': -1.0e31})
+    data['metavar0'] = dm.dmarray(np.array(['x', 'y', 'z']), attrs={'FIELDNAM': 'Labels'})
+    return data
+
+def tStr(minutes):
+    return (T0 + datetime.timedelta(minutes=minutes)).strftime("%Y-%m-%dT%H:%M:%SZ")
+
+class FakeCdas(object):
+    def __init__(self, data):
+        self.data = data
+        self.nCalls = 0
+    def get_data(self, dataset, variables, start, end, **kwargs):
+        self.nCalls += 1
+        return {'http': {'status_code': 200}}, cdascache.subsetData(self.data, cdascache.toDatetime(start), cdascache.toDatetime(end))
+    def get_datasets(self, **kwargs):
+        return ['passthrough']
+
+@pytest.fixture(autouse=True)
+def resetConfig():
+    cdascache.resetConfig()
+    yield
+    cdascache.resetConfig()
+
+def test_dump_load():
+    data = makeData()
+    data1 = cdascache.loadData(cdascache.dumpData(data))
+    assert data1.attrs['Source_name'] == 'Test>Spacecraft'
+    assert data1['Epoch'][5] == data['Epoch'][5]
+    assert isinstance(data1['Epoch'][0], datetime.datetime)
+    assert np.array_equal(data1['XYZ_GSM'], data['XYZ_GSM'])
+    assert data1['XYZ_GSM'].attrs['DEPEND_0'] == 'Epoch'
+    assert data1['XYZ_GSM'].attrs['FILLVAL'] == -1.0e31
+    assert list(data1['metavar0']) == ['x', 'y', 'z']
+
+def test_requestKey():
+    assert cdascache.requestKey('DS', ['a', 'b']) == cdascache.requestKey('DS', ['b', 'a'])
+    assert cdascache.requestKey('DS', 'a') == cdascache.requestKey('DS', ['a'])
+    assert cdascache.requestKey('DS', 'a') != cdascache.requestKey('DS', 'a', binData={'interval': 60})
+
+def test_cache_subset(tmpdir):
+    cache = cdascache.CdasCache(str(tmpdir))
+    data = makeData()
+    assert cache.put('DS', 'XYZ_GSM', tStr(0), tStr(59), {'http': {'status_code': 200}}, data)
+    status, sub = cache.get('DS', 'XYZ_GSM', tStr(10), tStr(19))
+    assert status['http']['status_code'] == 200
+    assert len(sub['Epoch']) == 10
+    assert sub['XYZ_GSM'].shape == (10, 3)
+    assert np.array_equal(sub['XYZ_GSM'], data['XYZ_GSM'][10:20])
+    # Not time dependent, kept whole
+    assert len(sub['metavar0']) == 3
+    # Outside of the cached interval is a miss
+    assert cache.get('DS', 'XYZ_GSM', tStr(50), tStr(70)) == (None, None)
+    # Failed queries aren't cached, empty ones are
+    assert not cache.put('DS', 'Q', tStr(0), tStr(10), {'http': {'status_code': 500}}, None)
+    assert cache.put('DS', 'Q', tStr(0), tStr(10), {'http': {'status_code': 404}}, None)
+    status, sub = cache.get('DS', 'Q', tStr(1), tStr(2))
+    assert status['http']['status_code'] == 404 and sub is None
+    assert cache.summary()['responses'] == 2
+
+def test_wrapCdas_unconfigured():
+    cdas = FakeCdas(makeData())
+    assert cdascache.wrapCdas(cdas) is cdas
+
+def test_cachedCdas(tmpdir):
+    cdascache.configure(cacheDir=str(tmpdir))
+    fake = FakeCdas(makeData())
+    cdas = cdascache.wrapCdas(fake)
+    status, d0 = cdas.get_data('DS', ['XYZ_GSM'], tStr(0), tStr(30))
+    status, d1 = cdas.get_data('DS', ['XYZ_GSM'], tStr(5), tStr(15))
+    assert fake.nCalls == 1
+    assert np.array_equal(d1['XYZ_GSM'], d0['XYZ_GSM'][5:16])
+    # Other methods pass through
+    assert cdas.get_datasets() == ['passthrough']
+    # Offline misses mimic an empty CDAWeb response
+    cdascache.configure(offline=True)
+    cdas = cdascache.wrapCdas(fake)
+    status, d2 = cdas.get_data('DS', ['XYZ_GSM'], tStr(20), tStr(40))
+    assert status['http']['status_code'] == 404 and d2 is None
+    assert fake.nCalls == 1
+
+def test_server(tmpdir):
+    srvDir = str(tmpdir.mkdir("server"))
+    cache = cdascache.CdasCache(srvDir)
+    cache.put('DS', 'XYZ_GSM', tStr(0), tStr(59), {'http': {'status_code': 200}}, makeData(), binData={'interval': 60})
+    with cdascache.CacheServer(srvDir) as srv:
+        locDir = str(tmpdir.mkdir("local"))
+        cdascache.configure(cacheDir=locDir, server=srv.url, offline=True)
+        cdas = cdascache.wrapCdas(None)
+        status, data = cdas.get_data('DS', 'XYZ_GSM', tStr(30), tStr(39), binData={'interval': 60})
+        assert status['http']['status_code'] == 200
+        assert data['XYZ_GSM'].shape == (10, 3)
+        assert data['Epoch'][0] == T0 + datetime.timedelta(minutes=30)
+        # Miss on the server
+        status, data = cdas.get_data('DS', 'XYZ_GSM', tStr(30), tStr(39))
+        assert status['http']['status_code'] == 404 and data is None
+    # Server response was kept locally
+    status, data = cdascache.CdasCache(locDir).get('DS', 'XYZ_GSM', tStr(30), tStr(39), binData={'interval': 60})
+    assert data['XYZ_GSM'].shape == (10, 3)
+
+def test_pullVar_cached(tmpdir):
+    cdascache.configure(cacheDir=str(tmpdir))
+    fake = FakeCdas(makeData())
+    with patch('kaipy.satcomp.scutils.CdasWs', return_value=fake):
+        status, d0 = scutils.pullVar('DS', 'XYZ_GSM', tStr(0), tStr(59), 60)
+        status, d1 = scutils.pullVar('DS', 'XYZ_GSM', tStr(10), tStr(20), 60)
+    assert fake.nCalls == 1
+    assert status['http']['status_code'] == 200
+    assert len(d1['Epoch']) == 11
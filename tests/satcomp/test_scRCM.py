@@ -0,0 +1,85 @@
+#test_scRCM
+import numpy as np
+import h5py
+import pytest
+
+import kaipy.satcomp.scRCM as scRCM
+import kaipy.satcomp.scutils as scutils
+
+@pytest.fixture
+def rcmPair(tmpdir, monkeypatch):
+    Ni, Nj, Nk, Nt = 30, 20, 24, 3
+    rng = np.random.default_rng(0)
+    alamc = np.concatenate([[0.0], -np.logspace(1, 3, 6), np.logspace(1.5, 5, Nk-7)])
+    lon = np.linspace(0, 2*np.pi, Nj)
+    Lg, Pg = np.meshgrid(np.linspace(12, 1.5, Ni+2), lon, indexing='ij')
+    frcm = str(tmpdir.join("t.rcm.h5"))
+    fmhd = str(tmpdir.join("t.mhdrcm.h5"))
+    with h5py.File(frcm, 'w') as f, h5py.File(fmhd, 'w') as g:
+        for n in range(Nt):
+            s = f.create_group("Step#%d" % (n))
+            m = g.create_group("Step#%d" % (n))
+            for grp in (s, m):
+                grp.attrs['time'] = 60.0*n
+                grp.attrs['MJD'] = 58000.0 + n/1440.0
+            Lp = Lg*(1 + 0.05*rng.random(Lg.shape))
+            s['alamc'] = alamc
+            s['rcmxmin'] = Lp*np.cos(Pg)
+            s['rcmymin'] = Lp*np.sin(Pg)
+            s['rcmzmin'] = 0.0*Lp
+            s['rcmvm'] = Lp**(-4.0/3)
+            s['rcmeeta'] = rng.random((Nk,) + Lg.shape)
+            m['IOpen'] = np.where(Lg[2:] > 10, 1.0, -1.0)
+    monkeypatch.setattr(scRCM, 'doProgressBar', False)
+    return frcm, fmhd
+
+def loopIntensities(frcm, fmhd, n, species='ions'):
+    # Cell by cell reference for one step
+    with h5py.File(frcm, 'r') as f, h5py.File(fmhd, 'r') as g:
+        rcmS = f["Step#%d" % (n)]
+        alamData = scRCM.getSpecieslambdata(rcmS, species)
+        kS, kE = alamData['kStart'], alamData['kEnd']
+        lbins = np.linspace(2, 15, 50)
+        eGrid = np.logspace(2, 6, 50)
+        lbins = np.concatenate(([lbins[0]-scRCM.TINY], lbins, [lbins[-1]+scRCM.TINY]))
+        eGrid = np.concatenate(([eGrid[0]-scRCM.TINY], eGrid, [eGrid[-1]+scRCM.TINY]))
+        Ni, Nj = g["Step#%d" % (n)]['IOpen'].shape
+        vm = rcmS['rcmvm'][2:, :]
+        L = scutils.xyz_to_L(rcmS['rcmxmin'][2:, :], rcmS['rcmymin'][2:, :], rcmS['rcmzmin'][2:, :])
+        eeta = rcmS['rcmeeta'][kS:kE, 2:, :]
+        odf = np.zeros((52, 52))
+        cnt = np.zeros((52, 52))
+        for i in range(Ni):
+            for j in range(Nj):
+                iL = np.abs(lbins-L[i, j]).argmin()
+                for k in range(kE-kS):
+                    E = vm[i, j]*alamData['ilamc'][k]
+                    iE = np.abs(eGrid-E).argmin()
+                    odf[iE, iL] += scRCM.specFlux_factor_i*E*eeta[k, i, j]/alamData['lamscl'][k]
+                    cnt[iE, iL] += 1
+    with np.errstate(invalid='ignore'):
+        return (odf/cnt)[1:-1, 1:-1]
+
+def test_getIntensitiesVsL(rcmPair):
+    frcm, fmhd = rcmPair
+    res = scRCM.getIntensitiesVsL(frcm, fmhd, 0, 2, 1, nChunk=2)
+    assert res['odf_tkl'].shape == (3, 50, 50)
+    for n in range(3):
+        ref = loopIntensities(frcm, fmhd, n)
+        assert np.array_equal(np.isnan(ref), np.isnan(res['odf_tkl'][n]))
+        assert np.allclose(res['odf_tkl'][n][~np.isnan(ref)], ref[~np.isnan(ref)])
+    # Chunking doesn't matter
+    res1 = scRCM.getIntensitiesVsL(frcm, fmhd, 0, 2, 1, nChunk=1)
+    assert np.allclose(res1['press_tkl'], res['press_tkl'], equal_nan=True)
+
+def test_getVarWedge(rcmPair):
+    frcm, fmhd = rcmPair
+    lGrid = np.linspace(-10, 8, 19)
+    eGrid = np.logspace(2, 6, 20)
+    res = scRCM.getVarWedge(frcm, fmhd, 0, 2, 1, 40, lGrid=lGrid, eGrid=eGrid)
+    assert res['odf_tkl'].shape == (3, 20, 19)
+    assert np.all(np.isfinite(res['press_tkl'])) and np.all(res['press_tkl'] >= 0)
+    # Nothing inside of tkl_lInner, something on both sides
+    lIn = np.abs(lGrid) < scRCM.tkl_lInner - 1
+    assert np.all(res['press_tkl'][:, :, lIn] == 0)
+    assert res['press_tl'][:, lGrid < -3].sum() > 0 and res['press_tl'][:, lGrid > 3].sum() > 0
@@ -0,0 +1,121 @@
+import pytest
+import numpy as np
+import h5py
+
+import kaipy.geoelectric as geo
+
+def loopZ(res, thick, freqs):
+	#Frequency by frequency reference, as the original supermage.Z_Tensor_1D
+	mu = 4*np.pi*1E-7
+	n = len(res)
+	Zs = []
+	for f in freqs:
+		w = 2*np.pi*f
+		Z = np.sqrt(w*mu*res[n-1]*1j)
+		for j in range(n-2, -1, -1):
+			dj = np.sqrt((w*mu*(1.0/res[j]))*1j)
+			wj = dj*res[j]
+			rj = (wj - Z)/(wj + Z)
+			re = rj*np.exp(-2*thick[j]*dj)
+			Z = wj*((1 - re)/(1 + re))
+		Zs.append(Z)
+	return np.array(Zs)
+
+def loopE(bx, by, res, thick, dt=60.0, padnum=150):
+	#Full complex FFT reference, as the original supermage.E_Field_1D
+	nbx = np.concatenate((bx[:padnum], bx, bx[-padnum:][::-1]))
+	nby = np.concatenate((by[:padnum], by, by[-padnum:][::-1]))
+	freq = np.fft.fftfreq(nbx.size, d=dt)
+	freq[0] = 1e-100
+	Z = loopZ(res, thick, freq)
+	ex = 1e-3*np.fft.ifft(Z*np.fft.fft(nby)/geo.mu0).real
+	ey = 1e-3*np.fft.ifft(-Z*np.fft.fft(nbx)/geo.mu0).real
+	return ex[padnum:-padnum], ey[padnum:-padnum]
+
+def series(Ns, Nt, seed=0):
+	rng = np.random.default_rng(seed)
+	t = np.arange(Nt)
+	bx = 100*np.sin(2*np.pi*t[None, :]/rng.uniform(30, 300, (Ns, 1))) + rng.standard_normal((Ns, Nt))
+	by = 50*np.cos(2*np.pi*t[None, :]/rng.uniform(30, 300, (Ns, 1))) + rng.standard_normal((Ns, Nt))
+	return bx, by
+
+def test_impedance1D():
+	freqs = np.geomspace(1e-5, 1e-1, 50)
+	Z = geo.impedance1D(geo.QRes, geo.QThick, freqs)
+	assert np.allclose(Z, loopZ(geo.QRes, geo.QThick, freqs))
+	# Negative frequencies are the conjugates
+	assert np.allclose(geo.impedance1D(geo.QRes, geo.QThick, -freqs), np.conj(Z))
+	# Uniform half-space
+	w = 2*np.pi*freqs
+	assert np.allclose(geo.impedance1D([100.0], [], freqs), np.sqrt(1j*w*geo.mu0*100.0))
+	with pytest.raises(ValueError):
+		geo.impedance1D([1.0, 2.0], [1.0, 2.0], freqs)
+
+def test_rImpedance_cached():
+	Z0 = geo.rImpedance(geo.QRes, geo.QThick, 100)
+	Z1 = geo.rImpedance(list(geo.QRes), list(geo.QThick), 100)
+	assert Z0 is Z1
+	assert len(Z0) == 51
+	assert not Z0.flags.writeable
+
+@pytest.mark.parametrize("Nt", [400, 401])
+def test_eField_matches_loop(Nt):
+	bx, by = series(5, Nt)
+	ex, ey = geo.eField(bx, by, geo.QRes, geo.QThick)
+	assert ex.shape == (5, Nt)
+	for n in range(5):
+		exR, eyR = loopE(bx[n], by[n], geo.QRes, geo.QThick)
+		assert np.allclose(ex[n], exR)
+		assert np.allclose(ey[n], eyR)
+	# Single station
+	ex0, ey0 = geo.eField(bx[2], by[2])
+	assert np.allclose(ex0, ex[2]) and np.allclose(ey0, ey[2])
+
+def test_eField_models():
+	bx, by = series(4, 300, seed=1)
+	res = [geo.QRes, [100.0]]
+	thick = [geo.QThick, []]
+	iModel = np.array([0, 1, 1, 0])
+	ex, ey = geo.eField(bx, by, res, thick, iModel=iModel)
+	for n in range(4):
+		m = iModel[n]
+		exR, eyR = geo.eField(bx[n], by[n], res[m], thick[m])
+		assert np.allclose(ex[n], exR) and np.allclose(ey[n], eyR)
+
+def test_fillGaps():
+	Q = np.array([[0.0, np.nan, 2.0, 3.0], [np.nan]*4, [1.0, 1.0, 1.0, np.nan]])
+	Qf = geo.fillGaps(Q)
+	assert np.allclose(Qf, [[0, 1, 2, 3], [0, 0, 0, 0], [1, 1, 1, 1]])
+	assert np.isnan(Q[0, 1])
+	bx, by = series(2, 200)
+	bx[0, 50:60] = np.nan
+	ex, ey = geo.eField(bx, by)
+	assert np.isfinite(ex).all() and np.isfinite(ey).all()
+
+def test_gridEField(tmpdir):
+	fname = str(tmpdir.join("synth.deltab.h5"))
+	Nt, Nlat, Nlon = 64, 6, 8
+	rng = np.random.default_rng(2)
+	dBt = rng.standard_normal((Nt, 2, Nlat, Nlon))
+	dBp = rng.standard_normal((Nt, 2, Nlat, Nlon))
+	with h5py.File(fname, 'w') as f:
+		for n in range(Nt):
+			g = f.create_group("Step#%d" % (n))
+			g.attrs["time"] = 30.0*n
+			g.attrs["MJD"] = 58000.0 + 30.0*n/86400.0
+			g.create_dataset("dBt", data=dBt[n])
+			g.create_dataset("dBp", data=dBp[n])
+	iModel = np.zeros((Nlat, Nlon), dtype=int)
+	iModel[:, Nlon//2:] = 1
+	res = [geo.QRes, [100.0]]
+	thick = [geo.QThick, []]
+	E = geo.gridEField(fname, res, thick, iModel=iModel, padnum=20, nChunk=7, dtype=np.float64, doVerb=False)
+	assert E["Ex"].shape == (Nt, Nlat, Nlon)
+	for i, j in [(0, 0), (3, 5), (5, 7)]:
+		m = iModel[i, j]
+		exR, eyR = geo.eField(-dBt[:, 0, i, j], dBp[:, 0, i, j], res[m], thick[m], dt=30.0, padnum=20)
+		assert np.allclose(E["Ex"][:, i, j], exR)
+		assert np.allclose(E["Ey"][:, i, j], eyR)
+	Emax = geo.peakE(E["Ex"], E["Ey"])
+	assert Emax.shape == (Nlat, Nlon)
+	assert np.allclose(Emax, np.sqrt(E["Ex"]**2 + E["Ey"]**2).max(axis=0))
@@ -0,0 +1,99 @@
+import pickle
+import pytest
+import numpy as np
+
+import kaipy.gridLocator as gl
+import kaipy.kaiTools as kt
+
+@pytest.fixture
+def curvGrid():
+	# Stretched polar grid, like an equatorial slice
+	r = np.geomspace(2, 20, 33)
+	p = np.linspace(0, np.pi, 25)
+	R, P = np.meshgrid(r, p, indexing='ij')
+	return R*np.cos(P), R*np.sin(P)
+
+def test_AxisLocator_increasing():
+	loc = gl.AxisLocator([0.0, 1.0, 3.0, 6.0])
+	i0, w = loc.weights([-1.0, 0.0, 0.5, 3.0, 5.0, 7.0])
+	assert np.array_equal(i0, [0, 0, 0, 2, 2, 2])
+	assert np.allclose(w, [-1.0, 0.0, 0.5, 0.0, 2.0/3, 4.0/3])
+	assert np.array_equal(loc.nearest([0.4, 0.5, 2.5]), [0, 1, 2])
+
+def test_AxisLocator_decreasing():
+	x = np.array([80.0, 70.0, 60.0, 50.0])
+	loc = gl.AxisLocator(x)
+	xq = np.array([75.0, 70.0, 51.0])
+	i0 = loc.cellIdx(xq)
+	# Same bracket as walking down from the end of the axis
+	for n, xn in enumerate(xq):
+		ilat = len(x)-1
+		while x[ilat] < xn: ilat -= 1
+		assert i0[n] == ilat
+	i0, w = loc.weights(xq)
+	assert np.allclose((1-w)*x[i0] + w*x[i0+1], xq)
+
+def test_TensorLocator_interp():
+	x = np.linspace(0, 1, 11)
+	y = np.linspace(2, 0, 21)
+	X, Y = np.meshgrid(x, y, indexing='ij')
+	loc = gl.TensorLocator(x, y)
+	rng = np.random.default_rng(0)
+	xq = rng.uniform(0, 1, 50)
+	yq = rng.uniform(0, 2, 50)
+	idx, w = loc.weights(xq, yq)
+	# Bilinear functions are reproduced exactly, trailing dimensions carried along
+	Q = np.stack([1 + 2*X - Y + 3*X*Y, X], axis=-1)
+	Qi = loc.interp(Q, idx, w)
+	assert Qi.shape == (50, 2)
+	assert np.allclose(Qi[:, 0], 1 + 2*xq - yq + 3*xq*yq)
+	assert np.allclose(Qi[:, 1], xq)
+
+def test_KDLocator_nearest(curvGrid):
+	X, Y = curvGrid
+	loc = gl.KDLocator(X, Y)
+	rng = np.random.default_rng(1)
+	pnts = rng.uniform(-15, 15, (40, 2))
+	i, j = loc.nearest(pnts[:, 0], pnts[:, 1])
+	for n in range(len(pnts)):
+		assert (i[n], j[n]) == kt.pntIdx_2D(X, Y, pnts[n])
+	iB, jB = kt.pntIdx_2D(X, Y, pnts)
+	assert np.array_equal(iB, i) and np.array_equal(jB, j)
+
+def test_KDLocator_weights(curvGrid):
+	X, Y = curvGrid
+	loc = gl.KDLocator(X, Y)
+	idx, w = loc.weights([X[3, 4], 1.0], [Y[3, 4], 5.0], k=4)
+	assert w.shape == (2, 4)
+	assert np.allclose(w.sum(axis=-1), 1.0)
+	Qi = loc.interp(X, idx, w)
+	assert Qi[0] == X[3, 4]
+
+def test_pickle(curvGrid):
+	X, Y = curvGrid
+	for loc in [gl.KDLocator(X, Y), gl.raijuLocator(np.hypot(X, Y), np.arctan2(Y, X))]:
+		loc2 = pickle.loads(pickle.dumps(loc))
+		assert np.array_equal(loc.nearest(X[5, 5], Y[5, 5]), loc2.nearest(X[5, 5], Y[5, 5]))
+
+def test_cellCenters(curvGrid):
+	X, Y = curvGrid
+	Xc, Yc = gl.cellCenters(X, Y)
+	assert np.allclose(Xc, 0.25*(X[:-1, :-1] + X[1:, :-1] + X[:-1, 1:] + X[1:, 1:]))
+	assert Yc.shape == (32, 24)
+
+def test_streamGrid(curvGrid):
+	from scipy.interpolate import griddata
+	X, Y = curvGrid
+	U, V = X*Y, X + Y
+	cache = {}
+	xyBds = [-15, 15, 0, 15]
+	x1, y1, gu, gv, gM = gl.streamGrid(cache, X, Y, 4.0, U, V, xyBds, 0.5)
+	xx1, yy1 = np.meshgrid(x1, y1)
+	kIn = np.hypot(xx1, yy1) > 4.0*1.01
+	gd = griddata((X.flatten(), Y.flatten()), U.flatten(), (xx1, yy1), method='linear', fill_value=0.0)
+	assert np.allclose(gu, gd*kIn)
+	assert np.all(gv[~kIn] == 0.0)
+	# Cached weights are reused on the next call
+	W = cache[(tuple(xyBds), 0.5)][2]
+	gl.streamGrid(cache, X, Y, 4.0, V, U, xyBds, 0.5)
+	assert list(cache.keys()) == [(tuple(xyBds), 0.5)] and cache[(tuple(xyBds), 0.5)][2] is W
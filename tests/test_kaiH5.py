@@ -1,11 +1,12 @@
 import pytest
 import h5py
+import kaipy.kdefs as kdefs
 import numpy as np
 import datetime
 import os
 from astropy.time import Time
 
-from kaipy.kaiH5 import H5Info, TPInfo, genName, genNameOld, CheckOrDie, CheckDirOrMake, StampHash, StampBranch, GetHash, GetBranch, tStep, cntSteps, cntX, getTs, LocDT, MageStep, getDims, getRootVars, getVars, PullVarLoc, PullVar, PullAtt
+from kaipy.kaiH5 import H5Info, TPInfo, genName, genNameOld, CheckOrDie, CheckDirOrMake, StampHash, StampBranch, GetHash, GetBranch, tStep, cntSteps, cntX, getTs, LocDT, MageStep, getDims, getRootVars, getVars, PullVarLoc, PullVar, PullAtt, PullAtts, getStepAtts, buildTAC, getTAC
 
 Ni = 32
 Nj = 24
@@ -127,6 +128,76 @@ def test_getTs(tmpdir):
 	result = getTs(str(file_path), [0])
 	assert np.array_equal(result, np.array([123.456]))
 
+def write_steps(file_path, Nt=4):
+	with h5py.File(file_path, 'w') as f:
+		for n in range(Nt):
+			grp = f.create_group("Step#%d" % n)
+			grp.attrs['time'] = 10.0*n
+			grp.attrs['MJD'] = 58000.0 + n
+			grp.attrs['timestep'] = np.int32(100*n)
+			grp.attrs['label'] = "step"
+			if n > 0:
+				grp.attrs['cpcp'] = 1.5*n
+		#Model-written cache with only the time
+		tac = f.create_group(kdefs.grpTimeCache)
+		tac.create_dataset('step', data=np.arange(Nt))
+		tac.create_dataset('time', data=10.0*np.arange(Nt))
+	return str(file_path)
+
+def test_getStepAtts(tmpdir):
+	fname = write_steps(tmpdir.join("test.h5"))
+	sIds, atts = getStepAtts(fname, useBars=False)
+	assert np.array_equal(sIds, [0, 1, 2, 3])
+	assert set(atts.keys()) == {'time', 'MJD', 'timestep', 'cpcp'}
+	assert atts['timestep'].dtype.kind == 'i'
+	assert np.isnan(atts['cpcp'][0]) and atts['cpcp'][3] == 4.5
+
+def test_buildTAC(tmpdir):
+	fname = write_steps(tmpdir.join("test.h5"))
+	# Not cached yet, getTs falls back to the step groups
+	assert np.array_equal(getTs(fname, [1, 3], "MJD", useBars=False), [58001.0, 58003.0])
+	written = buildTAC(fname, useBars=False)
+	assert set(written) == {'MJD', 'timestep', 'cpcp'}
+	assert buildTAC(fname, useBars=False) == []
+	tac = getTAC(fname)
+	assert np.array_equal(tac['time'], 10.0*np.arange(4))
+	assert np.array_equal(getTAC(fname, ['cpcp'], [2, 3])['cpcp'], [3.0, 4.5])
+	with h5py.File(fname, 'a') as f:
+		# Served from the cache from now on
+		f[kdefs.grpTimeCache]['MJD'][2] = -1.0
+	assert np.array_equal(getTs(fname, [3, 2], "MJD", useBars=False), [58003.0, -1.0])
+	assert np.array_equal(getTs(fname, [3, 2], "MJD", useTAC=False, useBars=False), [58003.0, 58002.0])
+	Q = PullAtts(fname, ['MJD', 'cpcp', 'label', 'nope'], 2, a0=0.0)
+	assert Q['MJD'] == -1.0 and Q['cpcp'] == 3.0 and Q['label'] == "step" and Q['nope'] == 0.0
+
+def test_buildTAC_missing(tmpdir):
+	fname = write_steps(tmpdir.join("test.h5"))
+	buildTAC(fname, useBars=False)
+	# Step 0 has no cpcp, cached as NaN but served as aDef
+	assert np.array_equal(getTs(fname, [0, 1, 2], "cpcp", aDef=-5, useBars=False), [-5, 1.5, 3.0])
+	assert np.array_equal(getTs(fname, [0, 1, 2], "cpcp", aDef=-5, useTAC=False, useBars=False), [-5, 1.5, 3.0])
+
+def test_getTs_cachedDtype(tmpdir):
+	fname = write_steps(tmpdir.join("test.h5"))
+	buildTAC(fname, useBars=False)
+	# Integer attributes keep their integer dtype when served from the cache
+	T = getTs(fname, [2, 1], "timestep", useBars=False)
+	assert T.dtype.kind == 'i' and np.array_equal(T, [200, 100])
+	assert getTs(fname, [2, 1], "time", useBars=False).dtype.kind == 'f'
+
+def test_buildTAC_stale(tmpdir):
+	fname = write_steps(tmpdir.join("test.h5"))
+	with h5py.File(fname, 'a') as f:
+		# Cache for other steps, with a model-written quantity of the right length
+		tac = f[kdefs.grpTimeCache]
+		tac['step'][...] = np.arange(4) + 10
+		tac.create_dataset('dst', data=np.zeros(4))
+		tac.create_dataset('old', data=np.zeros(7))
+	buildTAC(fname, useBars=False)
+	tac = getTAC(fname)
+	assert 'dst' not in tac and 'old' not in tac
+	assert np.array_equal(tac['step'], np.arange(4))
+
 def test_LocDT():
 	items = [datetime.datetime(2020, 1, 1), datetime.datetime(2020, 1, 2)]
 	pivot = datetime.datetime(2020, 1, 1, 12)
@@ -0,0 +1,73 @@
+import pytest
+import numpy as np
+import matplotlib
+matplotlib.use('Agg')
+import matplotlib.pyplot as plt
+from PIL import Image
+
+import kaipy.kaiViz as kv
+
+def test_trimFrame():
+	frame = np.full((40, 50, 4), 255, dtype=np.uint8)
+	frame[10:17, 5:30, :3] = 0
+	out = kv.trimFrame(frame, bLenX=3, bLenY=2)
+	#7x25 box, +4 rows and +6 columns of border, then cropped to even
+	assert out.shape == (10, 30, 4)
+	assert (out[2:9, 3:28, :3] == 0).all()
+	assert (out[:2] == 255).all() and (out[:, :3] == 255).all()
+	assert (out[:, 28:] == 255).all()
+	odd = kv.trimFrame(frame, bLenX=3, bLenY=2, doEven=False)
+	assert odd.shape == (11, 31, 4)
+	#Background is the top-left color, not just white
+	frame[...] = [0, 0, 255, 255]
+	frame[20, 20] = [255, 0, 0, 255]
+	out = kv.trimFrame(frame, bLenX=1)
+	assert out.shape == (2, 2, 4)
+	assert (out[1, 1] == [255, 0, 0, 255]).all()
+	assert kv.trimFrame(np.zeros((5, 5, 4), dtype=np.uint8), bLenX=2).shape == (4, 4, 4)
+
+def test_renderFig_matches_png(tmpdir):
+	fig = plt.figure(figsize=(3.3, 2.1))
+	plt.plot([0, 1], [0, 1])
+	fName = str(tmpdir.join("ref.png"))
+	fig.savefig(fName, dpi=97)
+	with Image.open(fName) as img:
+		ref = np.asarray(img.convert('RGBA'))
+	assert np.array_equal(kv.renderFig(fig, dpiQ=97), ref)
+	plt.close(fig)
+
+@pytest.mark.parametrize("figSz,dpiQ", [((3.31, 2.17), 97), ((7.77, 3.01), 113), ((2.0, 2.0), 300)])
+def test_renderFig_sizes(tmpdir, figSz, dpiQ):
+	# Non-integer pixel sizes are read from Agg, not guessed
+	fig = plt.figure(figsize=figSz)
+	plt.plot([0, 1], [0, 1])
+	fName = str(tmpdir.join("ref.png"))
+	fig.savefig(fName, dpi=dpiQ)
+	with Image.open(fName) as img:
+		ref = np.asarray(img.convert('RGBA'))
+	dpi0 = fig.get_dpi()
+	assert np.array_equal(kv.renderFig(fig, dpiQ=dpiQ), ref)
+	assert fig.get_dpi() == dpi0
+	plt.close(fig)
+
+def test_savePic(tmpdir):
+	fig = plt.figure(figsize=(3.3, 2.1))
+	plt.plot([0, 1], [0, 1])
+	fName = str(tmpdir.join("pic.png"))
+	kv.savePic(fName, dpiQ=97, saveFigure=fig)
+	with Image.open(fName) as img:
+		Nx, Ny = img.size
+		pic = np.asarray(img.convert('RGBA'))
+	assert Nx % 2 == 0 and Ny % 2 == 0
+	assert np.array_equal(pic, kv.trimFrame(kv.renderFig(fig, dpiQ=97)))
+	#Same trimming on a file already on disk
+	fRaw = str(tmpdir.join("raw.png"))
+	kv.savePic(fRaw, dpiQ=97, doTrim=False, saveFigure=fig)
+	kv.trimFig(fRaw)
+	assert kv.picSz(fRaw) == (Nx, Ny)
+	#Frames can skip the filesystem
+	frames = {}
+	kv.savePic(str(tmpdir.join("sink.png")), dpiQ=97, saveFigure=fig, frameSink=lambda f, fr: frames.update({f: fr}))
+	assert not tmpdir.join("sink.png").exists()
+	assert np.array_equal(frames[str(tmpdir.join("sink.png"))], pic)
+	plt.close(fig)
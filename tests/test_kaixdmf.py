@@ -2,6 +2,8 @@ import pytest
 import numpy as np
 import h5py
 from kaipy.kaixdmf import AddGrid, AddData, AddDI, getRootVars, getVars, printVidAndLocs, AddVectors, getLoc, addHyperslab
+from kaipy.kaixdmf import getStepTimes, getStepLinks, toStr, genStepStrs, readTemporal, nAppend, writeTemporal
+import kaipy.kaiH5 as kh5
 
 import xml.etree.ElementTree as et
 
@@ -105,3 +107,73 @@ def test_addHyperslab():
 	assert cutDI.get("Dimensions") == "3 3 3"
 	assert cutDI.get("Format") == "XML"
 	assert cutDI.text == "\n0 0 0\n1 1 1\n3 3 3\n"
+
+def write_steps(fname, sIds, withTime=True):
+	with h5py.File(fname, 'a') as hf:
+		for s in sIds:
+			grp = hf.create_group("Step#%d" % s)
+			if withTime:
+				grp.attrs["time"] = 0.5*s
+
+def mkStep(sID, T):
+	Grid = et.Element("Grid")
+	Time = et.SubElement(Grid, "Time")
+	Time.set("Value", "%f" % T)
+	AddData(Grid, "test.h5", "density", "Cell", "3 3 3", sID)
+	return Grid
+
+def test_getStepTimes(tmpdir):
+	fname = str(tmpdir.join("test.h5"))
+	write_steps(fname, [3, 1, 2])
+	write_steps(fname, [7], withTime=False)
+	sIds, T = getStepTimes(fname)
+	assert np.array_equal(sIds, [1, 2, 3, 7])
+	assert np.allclose(T, [0.5, 1.0, 1.5, 7])
+	# Same answer served from the time attribute cache
+	kh5.buildTAC(fname, useBars=False)
+	sIds, T = getStepTimes(fname)
+	assert np.array_equal(sIds, [1, 2, 3, 7])
+	assert np.allclose(T, [0.5, 1.0, 1.5, 7])
+
+def test_getStepLinks(tmpdir):
+	fData = str(tmpdir.join("data.h5"))
+	fname = str(tmpdir.join("test.h5"))
+	write_steps(fData, [5])
+	write_steps(fname, [0])
+	with h5py.File(fname, 'a') as hf:
+		hf["Step#1"] = h5py.ExternalLink(fData, "/Step#5")
+	fNames, steps = getStepLinks(fname, [0, 1])
+	assert fNames == ["test.h5", "data.h5"]
+	assert np.array_equal(steps, [0, 5])
+
+def test_genStepStrs():
+	stepArgs = [(s, 0.5*s) for s in range(10)]
+	strs = genStepStrs(mkStep, stepArgs, level=3, nChunk=3, doBar=False)
+	assert len(strs) == 10
+	assert strs[4] == toStr(mkStep(4, 2.0), 3)
+	assert strs[4].startswith(" "*12 + "<Grid>")
+	assert "Step#4/density" in strs[4]
+	strsP = genStepStrs(mkStep, stepArgs, level=3, nWorkers=2, nChunk=3, doBar=False)
+	assert strsP == strs
+
+def test_writeTemporal_append(tmpdir):
+	fname = str(tmpdir.join("test.xmf"))
+	grids, T = readTemporal(fname)
+	assert len(grids) == 0
+	stepArgs = [(s, 0.5*s) for s in range(4)]
+	writeTemporal(fname, genStepStrs(mkStep, stepArgs, level=3, doBar=False))
+	grids, Told = readTemporal(fname)
+	assert np.allclose(Told, [0, 0.5, 1.0, 1.5])
+	assert grids[2].find("Attribute/DataItem").text == "test.h5:/Step#2/density"
+	# Extending the run reuses the existing steps, changing it rebuilds everything
+	Tnew = 0.5*np.arange(6)
+	assert nAppend(Told, Tnew) == 4
+	assert nAppend(Told, Tnew + 1) == 0
+	assert nAppend(Told, Tnew[:2]) == 0
+	strs = [toStr(g, 3) for g in grids] + genStepStrs(mkStep, [(4, 2.0), (5, 2.5)], level=3, doBar=False)
+	writeTemporal(fname, strs)
+	grids, T = readTemporal(fname)
+	assert np.allclose(T, Tnew)
+	TGrid = et.parse(fname).getroot().find("Domain/Grid")
+	assert TGrid.get("CollectionType") == "Temporal"
+